@@ -18,11 +18,21 @@
 # You should have received a copy of the GNU General Public License
 # along with NOSE. If not, see <http://www.gnu.org/licenses/>.
 
+import os.path
+
+from ops.calibration.autosave import AutosaveService
+
 import gui.main
 import gui.mediator
 import ops.system
 
 
+# The file the calibration data is saved to automatically whenever it changes.
+# The file of the previous session is kept as AUTOSAVE_FILE_NAME + '.1'.
+AUTOSAVE_FILE_NAME = os.path.join(
+    os.path.expanduser('~'), '.nose-autosave.cal')
+
+
 def main():
     """
     Starts the application.
@@ -30,8 +40,14 @@ def main():
     mediator = gui.mediator.Mediator()
     # TODO: Initial calibration data should be loaded from a file.
     system = ops.system.ProductionSystem(mediator)
-    mainWindowHandler = gui.main.MainWindowHandler(mediator, system)
-    mainWindowHandler.start()
+    autosaveService = AutosaveService(system, AUTOSAVE_FILE_NAME)
+    autosaveService.start()
+    try:
+        mainWindowHandler = gui.main.MainWindowHandler(mediator, system)
+        mainWindowHandler.start()
+    finally:
+        # Pending changes must be saved even if the user interface fails.
+        autosaveService.stop()
 
 
 if __name__ == '__main__':
@@ -42,6 +42,7 @@ from ops.calibration.event import CalibrationDataChanged
 import gui.io
 import gui.widgets as widgets
 import ops.calibration.data
+import ops.calibration.planner
 import util
 
 from util import gettext
@@ -67,6 +68,17 @@ NO_CALIBRATION_DATA_ERROR_MESSAGE = gettext(
 NO_SIMULATION_ERROR_MESSAGE = gettext(
     'This function is only available for simulated devices.')
 
+#: An error message that is displayed if the user tries to start an operation
+#: on the system while another operation, such as a calibration procedure,
+#: is still running.
+SYSTEM_LOCKED_ERROR_MESSAGE = gettext(
+    'This function is not available while another operation is running.')
+
+#: A message that is displayed if the user wants to retake suspicious
+#: measurements, but none of the measurements are outliers or stale.
+NO_SUSPICIOUS_MEASUREMENTS_MESSAGE = gettext(
+    'None of the measurements need to be retaken.')
+
 
 ###############################################################################
 # NOSE ACTION                                                                 #
@@ -293,7 +305,7 @@ class SaveCalibrationDataAction(NoseAction):
     def run(self):
         parent = self.mainWindowHandler._window
         cd = self.system.calibrationData
-        gui.io.save(cd, 'CalibrationData', cd.fileName, parent)
+        _saveCalibrationData(cd, cd.fileName, parent)
 
 
 class SaveCalibrationDataAsAction(NoseAction):
@@ -306,7 +318,58 @@ class SaveCalibrationDataAsAction(NoseAction):
     def run(self):
         parent = self.mainWindowHandler._window
         cd = self.system.calibrationData
-        gui.io.save(cd, 'CalibrationData', None, parent)
+        _saveCalibrationData(cd, None, parent)
+
+
+def _saveCalibrationData(calibrationData, fileName, parent):
+    """
+    Saves the given :class:`~ops.calibration.data.CalibrationData` object
+    using :func:`gui.io.save`, passing `fileName` and `parent` along. If it
+    has been saved successfully, and it has
+    a :attr:`~ops.calibration.data.CalibrationData.report`, the report is
+    saved next to it, in a file with the same name and the extension used
+    for calibration reports.
+    """
+    cd = calibrationData
+    if gui.io.save(cd, 'CalibrationData', fileName, parent):
+        if cd.report is not None:
+            reportFileName = gui.io.replaceExtension(
+                cd.fileName, 'CalibrationReport')
+            gui.io.save(cd.report, 'CalibrationReport', reportFileName, parent)
+
+
+class RetakeSuspiciousMeasurementsAction(NoseAction):
+    """
+    Starts a calibration procedure that retakes the measurements that
+    :func:`ops.calibration.planner.planRetake` flags as outliers or as stale.
+    """
+    name = 'retakeSuspiciousMeasurements'
+    text = gettext('_Retake Suspicious Measurements...')
+    stock = gtk.STOCK_REFRESH
+    requiresCalibrationData = True
+
+    def run(self):
+        parent = self.mainWindowHandler._window
+        if self.system.isLocked:
+            widgets.reportError(parent,
+                SYSTEM_LOCKED_ERROR_MESSAGE, None, 'system locked')
+            return
+
+        plan = ops.calibration.planner.planRetake(
+            self.system.calibrationData,
+            maxCurrent=self.system.maxHeatingCurrent)
+
+        if len(plan.currents) == 0:
+            widgets.reportError(parent,
+                NO_SUSPICIOUS_MEASUREMENTS_MESSAGE, None, 'nothing to retake')
+            return
+
+        message = util.ngettext(
+            'Retake %d suspicious measurement?',
+            'Retake %d suspicious measurements?',
+            len(plan.currents)) % len(plan.currents)
+        if widgets.askUser(parent, message):
+            self.system.startCalibration(plan.currents)
 
 
 class ClearCalibrationDataAction(NoseAction):
@@ -326,6 +389,73 @@ class ClearCalibrationDataAction(NoseAction):
             self.system.calibrationData = newCD
 
 
+class _CalibrationHistoryAction(NoseAction):
+    """
+    An abstract base class for actions that undo or redo changes to the
+    calibration data. The action is only sensitive if :meth:`isAvailable`
+    returns ``True``.
+    """
+
+    def __init__(self, mainWindowHandler, actionGroup):
+        NoseAction.__init__(self, mainWindowHandler, actionGroup)
+        self.system.mediator.addListener(
+            self._updateSensitivity, CalibrationDataChanged)
+        self._updateSensitivity()
+
+
+    def _updateSensitivity(self, event=None):
+        """
+        Sets the action's sensitivity depending on whether there is a change
+        to undo or redo.
+        """
+        self.gtkAction.set_sensitive(
+            self.isAvailable(self.system.calibrationData))
+
+
+    def isAvailable(self, calibrationData):
+        """
+        Indicates whether the action can be applied to the given calibration
+        data. Subclasses need to override this method.
+        """
+        assert False, 'abstract method called'
+
+
+class UndoCalibrationChangeAction(_CalibrationHistoryAction):
+    """Undoes the most recent change to the calibration data."""
+    name = 'undoCalibrationChange'
+    text = gettext('_Undo Change')
+    stock = gtk.STOCK_UNDO
+    accelerator = gettext('<Ctrl>Z')
+
+    def isAvailable(self, calibrationData):
+        return calibrationData.canUndo
+
+    def run(self):
+        if self.system.isLocked:
+            widgets.reportError(self.mainWindowHandler._window,
+                SYSTEM_LOCKED_ERROR_MESSAGE, None, 'system locked')
+        elif self.system.calibrationData.canUndo:
+            self.system.calibrationData.undo()
+
+
+class RedoCalibrationChangeAction(_CalibrationHistoryAction):
+    """Redoes the most recently undone change to the calibration data."""
+    name = 'redoCalibrationChange'
+    text = gettext('_Redo Change')
+    stock = gtk.STOCK_REDO
+    accelerator = gettext('<Ctrl><Shift>Z')
+
+    def isAvailable(self, calibrationData):
+        return calibrationData.canRedo
+
+    def run(self):
+        if self.system.isLocked:
+            widgets.reportError(self.mainWindowHandler._window,
+                SYSTEM_LOCKED_ERROR_MESSAGE, None, 'system locked')
+        elif self.system.calibrationData.canRedo:
+            self.system.calibrationData.redo()
+
+
 ###############################################################################
 # CREATE ACTIONS                                                              #
 ###############################################################################
@@ -352,7 +482,10 @@ def createActionGroup(mainWindowHandler):
     LoadCalibrationDataAction(mainWindowHandler, actionGroup)
     SaveCalibrationDataAction(mainWindowHandler, actionGroup)
     SaveCalibrationDataAsAction(mainWindowHandler, actionGroup)
+    RetakeSuspiciousMeasurementsAction(mainWindowHandler, actionGroup)
     ClearCalibrationDataAction(mainWindowHandler, actionGroup)
+    UndoCalibrationChangeAction(mainWindowHandler, actionGroup)
+    RedoCalibrationChangeAction(mainWindowHandler, actionGroup)
 
     import gui.debug
     gui.debug.createDebugActions(mainWindowHandler, actionGroup)
@@ -288,11 +288,11 @@ class ChartHandler(object):
 
             if cd.isComplete:
                 self.measurementsChart.addGraph(FunctionGraph(
-                    cd.getFinalTemperatureFromCurrent, tColor, False))
+                    cd.getFinalTemperaturesFromCurrents, tColor, False, True))
                 self.temperatureChart.addGraph(FunctionGraph(
-                    cd.getTemperatureFromVoltage, tColor, False))
+                    cd.getTemperaturesFromVoltages, tColor, False, True))
                 self.currentChart.addGraph(FunctionGraph(
-                    cd.getCurrentFromTargetTemperature, iColor, False))
+                    cd.getCurrentsFromTargetTemperatures, iColor, False, True))
 
                 captions = COMPLETE_CAPTIONS
 
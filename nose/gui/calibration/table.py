@@ -21,8 +21,10 @@
 """
 This module contains the :class:`MeasurementTableHandler` class, which manages
 a table that shows the measurements collected during the :term:`calibration
-procedure`. The handler also allows the user to delete selected measurements
-and to start a new calibration procedure to retake selected measurements.
+procedure`, along with the influence each measurement has on the estimation
+functions (see :func:`getInfluences`). The handler also allows the user to
+delete selected measurements and to start a new calibration procedure to
+retake selected measurements.
 
 Clients need not actually deal with the :class:`MeasurementTableHandler`
 itself; instead, they can use the :func:`createMeasurementTable` function,
@@ -40,6 +42,7 @@ the function changes.
 """
 
 import gtk
+import numpy
 
 from gui.widgets import createCellDataRounder, addMenuItem
 from ops.calibration.event import CalibrationDataChanged
@@ -60,16 +63,18 @@ def createMeasurementTable(system):
 ###############################################################################
 
 #: A tuple that lists the localized titles for the columns that show the
-#: heating current, temperature sensor voltage, and heating temperature.
+#: heating current, temperature sensor voltage, heating temperature, and
+#: influence.
 COLUMN_TITLES = (
     gettext('Current [mA]'),
     gettext('Voltage [V]'),
-    gettext('Temperature [°C]'))
+    gettext('Temperature [°C]'),
+    gettext('Influence'))
 
 #: A tuple that lists the maximum number of fractional digits that are to
-#: be used for heating currents, temperature sensor voltages, and heating
-#: temperatures.
-FRACTIONAL_DIGITS = (8, 3, 0)
+#: be used for heating currents, temperature sensor voltages, heating
+#: temperatures, and influences.
+FRACTIONAL_DIGITS = (8, 3, 0, 2)
 # Up to eight digits are shown for the current, because it has usually been
 # entered by the user, and suppressing digits the user knows should be there
 # violates the principle of least surprise. Also, the number of digits should
@@ -77,9 +82,39 @@ FRACTIONAL_DIGITS = (8, 3, 0)
 # never actually matter.
 
 #: A tuple that lists whether trailing zeros of the fractional part of the
-#: heating currents, temperature sensor voltages, and heating temperatures
-#: (and the dot, if there is no fractional part) should be omitted.
-TRIM_TRAILING_ZEROS = (True, False, True)
+#: heating currents, temperature sensor voltages, heating temperatures, and
+#: influences (and the dot, if there is no fractional part) should be
+#: omitted.
+TRIM_TRAILING_ZEROS = (True, False, True, False)
+
+
+###############################################################################
+# INFLUENCE                                                                   #
+###############################################################################
+
+def getInfluences(calibrationData):
+    """
+    Returns a :class:`numpy.ndarray` that contains the influence of each
+    measurement of the given
+    :class:`~ops.calibration.data.CalibrationData`, in the order of its
+    :attr:`~ops.calibration.data.CalibrationData.measurements`. The influence
+    of a measurement is the largest of its Cook's distances in the
+    :attr:`~ops.calibration.data.CalibrationData.diagnostics` of the three
+    estimation functions; values well above one indicate a measurement that
+    should probably be retaken. If none of the estimation functions has been
+    fitted, the influences are ``nan``.
+
+    Since the diagnostics are cached by the calibration data, this is cheap
+    enough to call on every change of the measurements.
+    """
+    influences = numpy.empty(len(calibrationData.heatingCurrentArray))
+    influences.fill(numpy.nan)
+
+    for diagnostics in calibrationData.diagnostics:
+        if diagnostics is not None:
+            influences = numpy.fmax(influences, diagnostics.cooksDistances)
+
+    return influences
 
 
 ###############################################################################
@@ -113,7 +148,7 @@ class MeasurementTableHandler(object):
         """
         Creates the widgets this class is responsible for.
         """
-        self._listStore = gtk.ListStore(float, float, float)
+        self._listStore = gtk.ListStore(float, float, float, float)
 
         self._treeView = gtk.TreeView(self._listStore)
         self._treeView.get_selection().set_mode(gtk.SELECTION_MULTIPLE)
@@ -122,9 +157,11 @@ class MeasurementTableHandler(object):
         renderer = gtk.CellRendererText()
         renderer.set_property('xalign', 0.5)   # Alignment of the contents.
 
-        for index in xrange(3):
+        for index in xrange(4):
             rounder = createCellDataRounder(
                 index, FRACTIONAL_DIGITS[index], TRIM_TRAILING_ZEROS[index])
+            if index == 3:
+                rounder = _hideUnknownValues(rounder, index)
 
             column = gtk.TreeViewColumn(COLUMN_TITLES[index], renderer)
             column.set_cell_data_func(renderer, rounder)
@@ -151,9 +188,11 @@ class MeasurementTableHandler(object):
         Updates the information shown in the table to reflect changes in the
         calibration data.
         """
+        influences = getInfluences(calibrationData)
+
         self._listStore.clear()
-        for m in calibrationData.measurements:
-            self._listStore.append(m)
+        for m, influence in zip(calibrationData.measurements, influences):
+            self._listStore.append(m + (influence,))
 
 
     ###########################################################################
@@ -220,8 +259,7 @@ class MeasurementTableHandler(object):
         from the table's pop-up menu. Deletes the measurements for the given
         currents from the system's calibration data.
         """
-        for i in currents:
-            self._system.calibrationData.removeMeasurement(i)
+        self._system.calibrationData.removeMeasurements(currents)
 
 
     def _currentsFromRows(self, rows):
@@ -231,3 +269,16 @@ class MeasurementTableHandler(object):
         """
         return tuple(self._listStore[row][0] for row in rows)
 
+
+
+def _hideUnknownValues(cellDataFunction, index):
+    """
+    Returns a *cell data function* that calls `cellDataFunction`, unless the
+    value in column `index` is ``nan``, in which case the cell is left empty.
+    """
+    def hideUnknownValues(column, renderer, model, iterator):
+        if numpy.isnan(model.get_value(iterator, index)):
+            renderer.set_property('text', '')
+        else:
+            cellDataFunction(column, renderer, model, iterator)
+    return hideUnknownValues
@@ -31,6 +31,8 @@ A usage example can be found on the documentation page of the
 :mod:`gui.charting` package.
 """
 
+import numpy
+
 from gui.widgets import getColor
 
 
@@ -64,6 +66,11 @@ class FunctionGraph(object):
     `color` may be a :class:`gtk.gdk.Color` object, an X11 color name
     (:samp:`'misty rose'`) or a hexadecimal string (:samp:`'#FFE4E1'`).
 
+    If `isVectorized` is ``True``, the function must accept
+    a :class:`numpy.ndarray` of values instead, and return an array of the
+    results. The graph then calls it only once per redraw, rather than once
+    for each pixel column.
+
     .. note::
 
         The graph draws one *y* value for each pixel of the chart area's width.
@@ -72,10 +79,11 @@ class FunctionGraph(object):
         and may thus not appear on the chart.
     """
 
-    def __init__(self, function, color, drawOnFrame=True):
+    def __init__(self, function, color, drawOnFrame=True, isVectorized=False):
         self._function = function
         self._color = getColor(color)
         self._drawOnFrame = drawOnFrame
+        self._isVectorized = isVectorized
         self._graphicsContext = None
 
 
@@ -106,9 +114,15 @@ class FunctionGraph(object):
         # The loop should be run for the first value, even if it isn't drawn,
         # so that lastYPosition can be set, but it doesn't need to be run for
         # the last value.
-        for xPosition in xrange(cax, cax + caw):
-            xValue = abscissa.valueFromX(xPosition)
-            yValue = self._function(xValue)
+        xPositions = xrange(cax, cax + caw)
+        xValues = [abscissa.valueFromX(x) for x in xPositions]
+
+        if self._isVectorized:
+            yValues = self._function(numpy.array(xValues)).tolist()
+        else:
+            yValues = [self._function(x) for x in xValues]
+
+        for xPosition, yValue in zip(xPositions, yValues):
             yPosition = ordinate.yFromValue(yValue)
 
             if lastYPosition != None:
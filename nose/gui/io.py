@@ -29,9 +29,11 @@ import gtk
 import os.path
 
 import gui.widgets as widgets
+import ops.calibration.binary
 import ops.calibration.data
+import ops.calibration.report
 
-from util import gettext
+from util import gettext, writeAtomically
 
 
 #: A dictionary containing information about the file types used by *NOSE*.
@@ -39,9 +41,22 @@ from util import gettext
 #: displayed to the user). The associated values are tupels containing a
 #: human-readable description of the file type, the type’s extension, and
 #: the module that contains the ``toXML()`` and ``fromXML()`` functions
-#: used for the objects saved in files of that type.
+#: used for the objects saved in files of that type (or, for the types in
+#: :data:`BINARY_FILE_TYPES`, the ``toBinary()``, ``fromBinary()``, and
+#: ``isBinary()`` functions).
 FILE_TYPES = {
-    'CalibrationData': ('Calibration Data Files', 'cal', ops.calibration.data)}
+    'CalibrationData': ('Calibration Data Files', 'cal', ops.calibration.data),
+    'BinaryCalibrationData':
+        ('Binary Calibration Data Files', 'calb', ops.calibration.binary),
+    'CalibrationReport':
+        ('Calibration Reports', 'calreport', ops.calibration.report)}
+
+#: A dictionary that maps the file types in :data:`FILE_TYPES` that use
+#: a binary format to the XML-based file types for the same kind of objects.
+#: When an object of either type is loaded, the format of the file is
+#: detected automatically; when it is saved, the format is chosen by the
+#: extension of the file name.
+BINARY_FILE_TYPES = {'BinaryCalibrationData': 'CalibrationData'}
 
 
 ###############################################################################
@@ -56,6 +71,9 @@ def load(type, fileName=None, parent=None, *parserParameters):
     in which case the user is queried for a file name. ``parent`` is used as
     the *transient parent* of any windows that are shown during loading. Any
     extra arguments are passed to the ``fromXML()`` function for ``type``.
+    If the file turns out to be in a binary format for the same kind of
+    objects (see :data:`BINARY_FILE_TYPES`), it is loaded from that format
+    instead.
 
     If the object has a ``fileName`` attribute, it is set to the file name
     the object was loaded from.
@@ -75,7 +93,7 @@ def load(type, fileName=None, parent=None, *parserParameters):
     if text is None:
         return None
 
-    obj = getattr(FILE_TYPES[type][2], 'fromXML')(text, *parserParameters)
+    obj = _getParser(type, text)(text, *parserParameters)
 
     if obj is None:
         message = PARSE_ERROR_MESSAGE % stripPath(fileName)
@@ -103,6 +121,10 @@ def save(obj, type, fileName=None, parent=None):
 
     If the object has a ``fileName`` attribute, it is set to the file name the
     object was saved to.
+
+    If the extension of the file name is that of a binary file type for the
+    same kind of objects (see :data:`BINARY_FILE_TYPES`), or vice versa,
+    the object is saved in the format the extension belongs to.
     """
     if fileName is None:
         fileName = chooseFile(type, 'w', parent)
@@ -113,7 +135,13 @@ def save(obj, type, fileName=None, parent=None):
     if hasattr(obj, 'fileName'):
         obj.fileName = fileName
 
-    return write(getattr(FILE_TYPES[type][2], 'toXML')(obj), fileName, parent)
+    type = _getTypeForFileName(type, fileName)
+    module = FILE_TYPES[type][2]
+
+    if type in BINARY_FILE_TYPES:
+        return write(module.toBinary(obj), fileName, parent)
+    else:
+        return write(module.toXML(obj), fileName, parent)
 
 
 ###############################################################################
@@ -148,7 +176,7 @@ def read(fileName, parent=None):
     this function returns ``None``.
     """
     try:
-        inFile = open(fileName, 'r')
+        inFile = open(fileName, 'rb')
         text = inFile.read()
         inFile.close()
         return text
@@ -164,13 +192,15 @@ def write(text, fileName, parent=None):
     while writing to the file, it is reported to the user, using ``parent``
     as the *transient parent* of the error dialog. The function returns
     ``True`` if the text has been successfully saved.
+
+    The file is replaced atomically rather than truncated and rewritten, so
+    calibration data that is still mapped from the file by
+    :func:`ops.calibration.binary.mapFile` remains valid.
     """
     try:
-        outFile = open(fileName, 'w')
-        outFile.write(text)
-        outFile.close()
+        writeAtomically(fileName, lambda outFile: outFile.write(text))
         return True
-    except IOError, e:
+    except EnvironmentError, e:
         widgets.reportError(parent, WRITE_ERROR_MESSAGE, e, 'io')
         return False
 
@@ -185,10 +215,61 @@ def stripPath(fileName):
     return os.path.split(fileName)[1]
 
 
+def replaceExtension(fileName, type):
+    """
+    Returns ``fileName`` with its extension replaced by the extension of the
+    given file type, which must be one of the file types listed in
+    :data:`FILE_TYPES`.
+
+    >>> replaceExtension('foo/bar.cal', 'CalibrationReport')
+    'foo/bar.calreport'
+    """
+    return os.path.splitext(fileName)[0] + '.' + FILE_TYPES[type][1]
+
+
 ###############################################################################
 # LOW-LEVEL FUNCTIONS                                                         #
 ###############################################################################
 
+def _getRelatedTypes(type):
+    """
+    Returns a list of the given file type and all file types in
+    :data:`FILE_TYPES` that store the same kind of objects in another format,
+    starting with the XML-based type.
+    """
+    xmlType = BINARY_FILE_TYPES.get(type, type)
+    binaryTypes = [binaryType for binaryType, otherType
+        in sorted(BINARY_FILE_TYPES.items()) if otherType == xmlType]
+    return [xmlType] + binaryTypes
+
+
+def _getParser(type, text):
+    """
+    Returns the function that creates an object of the given file type from
+    ``text``: the ``fromBinary()`` function of a related binary file type if
+    ``text`` is in that format, and the ``fromXML()`` function of the
+    XML-based file type otherwise.
+    """
+    xmlType = _getRelatedTypes(type)[0]
+    for relatedType in _getRelatedTypes(type)[1:]:
+        module = FILE_TYPES[relatedType][2]
+        if module.isBinary(text):
+            return module.fromBinary
+    return FILE_TYPES[xmlType][2].fromXML
+
+
+def _getTypeForFileName(type, fileName):
+    """
+    Returns the file type, among the given type and its related types, whose
+    extension matches that of ``fileName``, or ``type`` if there is none.
+    """
+    extension = os.path.splitext(fileName)[1][1:]
+    for relatedType in _getRelatedTypes(type):
+        if FILE_TYPES[relatedType][1] == extension:
+            return relatedType
+    return type
+
+
 def _createFileChooser(type, mode, parent):
     """
     Creates a :class:`gtk.FileChooserDialog` that has the user choose
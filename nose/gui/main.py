@@ -26,6 +26,7 @@ import weakref
 
 from gui.calibration.dialog import CalibrationDialogHandler
 from gui.systemprops import SystemPropertiesDialogHandler
+from ops.event import TemperatureSensorSampled
 
 import gui.actions
 import util
@@ -56,10 +57,6 @@ MAIN_WINDOW_SIZE = (800, 600)
 MAIN_WINDOW_MAX_SCREEN_FRACTION = 0.8
 
 
-# The time between updates of the main window's status bar, in milliseconds.
-STATUS_BAR_UPDATE_INTERVAL = 250
-
-
 
 ###############################################################################
 # SETUP                                                                       #
@@ -207,8 +204,8 @@ class MainWindowHandler(object):
         self._mainBox.pack_end(self._temperatureLabel, expand=False)
         self._mainBox.pack_end(gtk.HSeparator(), expand=False)
 
-        gobject.timeout_add(STATUS_BAR_UPDATE_INTERVAL,
-            util.WeakMethod(self._updateStatusBar))
+        self.mediator.addListener(
+            self._updateStatusBar, TemperatureSensorSampled)
 
 
     ###########################################################################
@@ -240,22 +237,24 @@ class MainWindowHandler(object):
     # UPDATES                                                                 #
     ###########################################################################
 
-    def _updateStatusBar(self):
+    def _updateStatusBar(self, event):
         """
-        Updates the information shown in the window's status bar. This method
-        is called by GTK in the main event loop.
+        Updates the information shown in the window's status bar. Called when
+        a :class:`~ops.event.TemperatureSensorSampled` event is sent, so the
+        status bar shows the reading the system has already taken instead of
+        reading the device itself.
         """
-        temperature = self._system.temperature
-        voltage = self._system.temperatureSensorVoltage
-        if temperature != None:
-            text = u'%d °C' % temperature
+        if event.system is not self._system:
+            return
+
+        voltage = event.reading.value
+        if self._system.isCalibrated:
+            cd = self._system.calibrationData
+            text = u'%d °C' % cd.getTemperatureFromVoltage(voltage)
         else:
             text = u'%s V' % util.stringFromFloat(voltage, 4, False)
         self._temperatureLabel.set_text(text)
 
-        # TODO: The timeout is never properly removed.
-        return True   # Yes, this method should be called again.
-
 
     ###########################################################################
     # UTILITY METHODS                                                         #
@@ -71,7 +71,9 @@ class Mediator(object):
     def noteEvent(self, event):
         if self.logging:
             self.eventsNoted.append(event)
-        for listener in self._listeners.get(event.__class__, ()):
+        # Listeners may remove themselves when they are called, so a copy of
+        # the list is iterated.
+        for listener in list(self._listeners.get(event.__class__, ())):
             listener(event)
 
 
@@ -0,0 +1,481 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This module contains the :class:`CalibrationArchive` class, which stores the
+calibration procedures of many systems in a single SQLite database, so that
+questions like "how has the time constant at 20 mA changed on a system over
+the last months" can be answered with a query instead of reading files.
+
+For each calibration procedure, or *run*, the archive stores
+
+* the system identifier, the date, the status, and the total time,
+* the measurements of the resulting calibration data,
+* one row per heating stage, with the times from the
+  :class:`~ops.calibration.report.CalibrationReport` and the parameters of
+  the solution found by the minimization, and
+* the trace of the temperature sensor voltage during each heating stage,
+  downsampled to at most :attr:`~CalibrationArchive.maxTracePoints` points
+  by :func:`downsample`.
+
+The query methods return :class:`numpy.ndarray`\s. Values that are not
+known are ``nan``.
+
+An :class:`ArchiveRecorder` adds a run to an archive whenever a calibration
+procedure of a system is over.
+"""
+
+import collections
+import numpy
+import sqlite3
+import time
+
+from ops.calibration.event import CalibrationOver, TemperatureRequested
+
+
+###############################################################################
+# TRACES                                                                      #
+###############################################################################
+
+#: A named tuple that describes a single heating stage for
+#: :meth:`CalibrationArchive.addRun`. Its items are `current`, the heating
+#: current used, in mA; `solution`, the
+#: :class:`~ops.calibration.leastsquare.Solution` or
+#: :class:`~ops.calibration.leastsquare.DoubleSolution` found by the
+#: minimization, or ``None``; and `times` and `voltages`, sequences of the
+#: times (in seconds since the start of the stage) and the temperature sensor
+#: voltages recorded during the stage.
+StageTrace = collections.namedtuple(
+    'StageTrace', 'current, solution, times, voltages')
+
+
+def downsample(times, voltages, maxPoints):
+    """
+    Returns a tuple of two :class:`numpy.ndarray`\s with at most `maxPoints`
+    items, created from the given times and voltages by splitting them into
+    `maxPoints` consecutive bins of nearly equal size, and taking the mean of
+    each bin. If there are no more than `maxPoints` items, they are returned
+    unchanged.
+    """
+    times = numpy.asarray(times, dtype=float)
+    voltages = numpy.asarray(voltages, dtype=float)
+    if len(times) <= maxPoints:
+        return times, voltages
+
+    starts = numpy.linspace(0, len(times), maxPoints + 1).astype(int)
+    counts = numpy.diff(starts)
+    return (numpy.add.reduceat(times, starts[:-1]) / counts,
+        numpy.add.reduceat(voltages, starts[:-1]) / counts)
+
+
+###############################################################################
+# THE CALIBRATION ARCHIVE CLASS                                               #
+###############################################################################
+
+#: The names of the solution parameters that can be passed to
+#: :meth:`CalibrationArchive.getSolutionHistory`, which are the names of
+#: items of :class:`~ops.calibration.leastsquare.DoubleSolution`.
+PARAMETERS = (
+    'startingTemperature', 'finalTemperature', 'tau', 'slowTau',
+    'slowFraction')
+
+# The columns of the stages table that hold the parameters, in the order of
+# PARAMETERS.
+_PARAMETER_COLUMNS = (
+    'starting_temperature', 'final_temperature', 'tau', 'slow_tau',
+    'slow_fraction')
+
+# The statements that create the tables and indexes of an archive.
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY,
+        system TEXT NOT NULL,
+        date REAL NOT NULL,
+        status INTEGER,
+        total_time REAL);
+    CREATE TABLE IF NOT EXISTS stages (
+        run INTEGER NOT NULL REFERENCES runs(id),
+        stage_index INTEGER NOT NULL,
+        current REAL NOT NULL,
+        heating_time REAL,
+        temperature_entry_time REAL,
+        solutions_found INTEGER,
+        starting_temperature REAL,
+        final_temperature REAL,
+        tau REAL,
+        slow_tau REAL,
+        slow_fraction REAL,
+        PRIMARY KEY (run, stage_index));
+    CREATE TABLE IF NOT EXISTS measurements (
+        run INTEGER NOT NULL REFERENCES runs(id),
+        current REAL NOT NULL,
+        voltage REAL NOT NULL,
+        temperature REAL NOT NULL,
+        time REAL);
+    CREATE TABLE IF NOT EXISTS traces (
+        run INTEGER NOT NULL,
+        stage_index INTEGER NOT NULL,
+        time REAL NOT NULL,
+        voltage REAL NOT NULL);
+    CREATE INDEX IF NOT EXISTS runs_by_system ON runs (system, date);
+    CREATE INDEX IF NOT EXISTS stages_by_current ON stages (current);
+    CREATE INDEX IF NOT EXISTS measurements_by_run ON measurements (run);
+    CREATE INDEX IF NOT EXISTS measurements_by_current
+        ON measurements (current);
+    CREATE INDEX IF NOT EXISTS traces_by_stage ON traces (run, stage_index);
+"""
+
+
+class CalibrationArchive(object):
+    """
+    Creates a new instance of this class, which stores calibration procedures
+    in the SQLite database `fileName`. The database is created if it doesn't
+    exist; ``':memory:'`` creates a database that only lives as long as the
+    instance.
+
+    Like all SQLite connections, an instance may only be used from the thread
+    that created it.
+    """
+
+    def __init__(self, fileName):
+        self._fileName = fileName
+        self._connection = sqlite3.connect(fileName)
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+
+
+    @property
+    def fileName(self):
+        """
+        The name of the database file. Immutable.
+        """
+        return self._fileName
+
+
+    @property
+    def systems(self):
+        """
+        A sorted tuple of the identifiers of all systems that have runs in the
+        archive. Read-only.
+        """
+        rows = self._connection.execute(
+            'SELECT DISTINCT system FROM runs ORDER BY system')
+        return tuple(system for (system,) in rows)
+
+
+    def close(self):
+        """
+        Closes the database. The instance can't be used afterwards.
+        """
+        self._connection.close()
+
+
+    def addRun(self, system, date, calibrationData, report=None, stages=()):
+        """
+        Adds a calibration procedure of the system with the identifier
+        `system` that ended at `date` (in seconds since the epoch), and
+        returns the identifier of the new run. `calibrationData` is the
+        :class:`~ops.calibration.data.CalibrationData` after the procedure,
+        `report` is its :class:`~ops.calibration.report.CalibrationReport`,
+        if any, and `stages` is a sequence of :class:`StageTrace`\s for the
+        heating stages, in order. Traces are downsampled to at most
+        :attr:`maxTracePoints` points.
+        """
+        reports = report.stages if report is not None else ()
+        with self._connection:
+            cursor = self._connection.execute(
+                'INSERT INTO runs (system, date, status, total_time) '
+                'VALUES (?, ?, ?, ?)',
+                (system, date,
+                    report.status if report is not None else None,
+                    report.totalTime if report is not None else None))
+            runId = cursor.lastrowid
+
+            self._connection.executemany(
+                'INSERT INTO measurements VALUES (?, ?, ?, ?, ?)',
+                _getMeasurementRows(runId, calibrationData))
+
+            for index in xrange(max(len(reports), len(stages))):
+                stageReport = reports[index] if index < len(reports) else None
+                trace = stages[index] if index < len(stages) else None
+                self._addStage(runId, index, stageReport, trace)
+
+        return runId
+
+
+    def _addStage(self, runId, index, stageReport, trace):
+        """
+        Adds the row of a heating stage and its trace. Either `stageReport` or
+        `trace` may be ``None``.
+        """
+        if stageReport is not None:
+            current = stageReport.current
+            details = (stageReport.heatingTime,
+                stageReport.temperatureEntryTime, stageReport.solutionsFound)
+        else:
+            current = trace.current
+            details = (None, None, None)
+
+        solution = trace.solution if trace is not None else None
+        parameters = tuple(
+            getattr(solution, p, None) for p in PARAMETERS)
+
+        self._connection.execute(
+            'INSERT INTO stages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (runId, index, current) + details + parameters)
+
+        if trace is not None:
+            times, voltages = downsample(
+                trace.times, trace.voltages, self.maxTracePoints)
+            self._connection.executemany(
+                'INSERT INTO traces VALUES (?, ?, ?, ?)',
+                ((runId, index, t, u)
+                    for t, u in zip(times.tolist(), voltages.tolist())))
+
+
+    def getRuns(self, system, start=None, end=None):
+        """
+        Returns a structured :class:`numpy.ndarray` of the runs of the system
+        with the identifier `system`, sorted by date, with the fields `id`,
+        `date`, `status` and `totalTime`. The status is -1 if it is not
+        known. If `start` or `end` are given, only runs whose date lies in
+        that range (in seconds since the epoch, inclusive) are returned.
+        """
+        condition, parameters = _getDateCondition('date', start, end)
+        rows = self._connection.execute(
+            'SELECT id, date, ifnull(status, -1), total_time FROM runs '
+            'WHERE system = ?' + condition + ' ORDER BY date, id',
+            (system,) + parameters)
+        return _createArray(rows, [('id', int), ('date', float),
+            ('status', int), ('totalTime', float)])
+
+
+    def getMeasurements(self, runId):
+        """
+        Returns a structured :class:`numpy.ndarray` of the measurements of the
+        run with the identifier `runId`, with the fields `current`,
+        `voltage`, `temperature`, and `time`, in the order they were stored.
+        """
+        rows = self._connection.execute(
+            'SELECT current, voltage, temperature, time FROM measurements '
+            'WHERE run = ? ORDER BY rowid', (runId,))
+        return _createArray(rows, [('current', float), ('voltage', float),
+            ('temperature', float), ('time', float)])
+
+
+    def getStages(self, runId):
+        """
+        Returns a structured :class:`numpy.ndarray` of the heating stages of
+        the run with the identifier `runId`, in order, with the fields
+        `current`, `heatingTime`, `temperatureEntryTime`, `solutionsFound`
+        (-1 if not known), and the names in :data:`PARAMETERS`.
+        """
+        rows = self._connection.execute(
+            'SELECT current, heating_time, temperature_entry_time, '
+            'ifnull(solutions_found, -1), ' + ', '.join(_PARAMETER_COLUMNS) +
+            ' FROM stages WHERE run = ? ORDER BY stage_index', (runId,))
+        return _createArray(rows, [('current', float),
+            ('heatingTime', float), ('temperatureEntryTime', float),
+            ('solutionsFound', int)] + [(p, float) for p in PARAMETERS])
+
+
+    def getTrace(self, runId, stageIndex):
+        """
+        Returns a tuple of two :class:`numpy.ndarray`\s of the times and
+        the temperature sensor voltages stored for the heating stage with the
+        index `stageIndex` of the run with the identifier `runId`. Both are
+        empty if no trace has been stored.
+        """
+        rows = self._connection.execute(
+            'SELECT time, voltage FROM traces WHERE run = ? AND '
+            'stage_index = ? ORDER BY rowid', (runId, stageIndex))
+        trace = _createArray(rows, [('time', float), ('voltage', float)])
+        return trace['time'], trace['voltage']
+
+
+    def getSolutionHistory(self, system, current, parameter='tau',
+        start=None, end=None):
+        """
+        Returns a tuple of two :class:`numpy.ndarray`\s: the dates of the
+        runs of the system with the identifier `system`, in ascending order,
+        and the values of the solution parameter `parameter`, one of
+        :data:`PARAMETERS`, found in the heating stages of these runs that
+        used the heating current `current` (in mA). Currents that differ by
+        less than :attr:`currentTolerance` are considered equal. If `start`
+        or `end` are given, only runs whose date lies in that range are
+        included.
+        """
+        column = _PARAMETER_COLUMNS[PARAMETERS.index(parameter)]
+        condition, parameters = _getDateCondition('runs.date', start, end)
+        rows = self._connection.execute(
+            'SELECT runs.date, stages.' + column + ' FROM stages '
+            'JOIN runs ON stages.run = runs.id '
+            'WHERE stages.current BETWEEN ? AND ? AND runs.system = ?' +
+            condition + ' ORDER BY runs.date, runs.id, stages.stage_index',
+            (current - self.currentTolerance,
+                current + self.currentTolerance, system) + parameters)
+        history = _createArray(rows, [('date', float), ('value', float)])
+        return history['date'], history['value']
+
+
+    #: The greatest number of points stored for the trace of a heating stage.
+    #: This is a class attribute, but it can be set on an instance to
+    #: override the default value.
+    maxTracePoints = 200
+
+    #: The greatest difference, in mA, between two heating currents that are
+    #: considered equal by :meth:`getSolutionHistory`. This is a class
+    #: attribute, but it can be set on an instance to override the default
+    #: value.
+    currentTolerance = 1e-6
+
+
+def _getMeasurementRows(runId, calibrationData):
+    """
+    Returns an iterable of the rows of the measurements table for the given
+    calibration data.
+    """
+    times = [None if t != t else t
+        for t in calibrationData.measurementTimeArray.tolist()]
+    return zip([runId] * len(times),
+        calibrationData.heatingCurrentArray.tolist(),
+        calibrationData.temperatureSensorVoltageArray.tolist(),
+        calibrationData.temperatureArray.tolist(),
+        times)
+
+
+def _getDateCondition(column, start, end):
+    """
+    Returns a tuple of a condition, to be appended to a ``WHERE`` clause,
+    that restricts `column` to the range from `start` to `end`, either of
+    which may be ``None``, and a tuple of the parameters it uses.
+    """
+    condition = ''
+    parameters = ()
+    if start is not None:
+        condition += ' AND %s >= ?' % column
+        parameters += (start,)
+    if end is not None:
+        condition += ' AND %s <= ?' % column
+        parameters += (end,)
+    return condition, parameters
+
+
+def _createArray(rows, dtype):
+    """
+    Returns a structured :class:`numpy.ndarray` with the given `dtype` that
+    holds the given rows, with ``NULL`` values replaced by ``nan``.
+    """
+    values = [tuple(numpy.nan if v is None else v for v in row)
+        for row in rows]
+    return numpy.array(values, dtype=dtype)
+
+
+###############################################################################
+# THE ARCHIVE RECORDER CLASS                                                  #
+###############################################################################
+
+class ArchiveRecorder(object):
+    """
+    Creates a new instance of this class, which adds a run to the
+    :class:`CalibrationArchive` `archive` whenever a calibration procedure of
+    the :class:`~ops.system.ProductionSystem` `system` is over, using the
+    identifier `systemId` for the system. The trace of each heating stage is
+    noted when the stage ends.
+
+    Like all listeners of the mediator, the instance is only referenced
+    weakly, so the client needs to keep a reference to it.
+    """
+
+    def __init__(self, archive, system, systemId):
+        self._archive = archive
+        self._system = system
+        self._systemId = systemId
+        self._stages = []
+
+        system.mediator.addListener(
+            self._temperatureRequestedListener, TemperatureRequested)
+        system.mediator.addListener(
+            self._calibrationOverListener, CalibrationOver)
+
+
+    @property
+    def archive(self):
+        """
+        The :class:`CalibrationArchive` runs are added to. Immutable.
+        """
+        return self._archive
+
+
+    @property
+    def system(self):
+        """
+        The :class:`~ops.system.ProductionSystem` whose calibration procedures
+        are recorded. Immutable.
+        """
+        return self._system
+
+
+    @property
+    def systemId(self):
+        """
+        The identifier of :attr:`system` in the archive. Immutable.
+        """
+        return self._systemId
+
+
+    def _temperatureRequestedListener(self, event):
+        """
+        Called when a :class:`~ops.calibration.event.TemperatureRequested`
+        event is sent, which means that a heating stage is over. Notes the
+        trace and the solution of that stage.
+        """
+        if event.system is self._system:
+            self._noteStage(event.manager)
+
+
+    def _calibrationOverListener(self, event):
+        """
+        Called when a :class:`~ops.calibration.event.CalibrationOver` event
+        is sent. Notes the trace of a heating stage that has been cut short,
+        and adds the run to the archive.
+        """
+        if event.system is not self._system:
+            return
+
+        if event.report is not None:
+            if len(self._stages) < len(event.report.stages):
+                self._noteStage(event.manager)
+
+        stages = self._stages
+        self._stages = []
+        self._archive.addRun(self._systemId, time.time(),
+            self._system.calibrationData, event.report, stages)
+
+
+    def _noteStage(self, manager):
+        """
+        Notes the trace and the solution of the current heating stage of
+        `manager`.
+        """
+        times, voltages = manager.heatingStageTrace
+        current = manager.currents[manager.heatingStageIndex]
+        self._stages.append(StageTrace(
+            current, manager.heatingStageSolution, times, voltages))
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+This module contains the :class:`AutosaveService` class, which saves the
+calibration data of a :class:`~ops.system.ProductionSystem` to a file
+whenever it changes, so that no measurements are lost if the application
+ends before the user has saved them.
+
+Saving happens in a worker thread, so the main thread never waits for the
+disk. When a :class:`~ops.calibration.event.CalibrationDataChanged` event is
+sent, the service only notes the
+:attr:`~ops.calibration.data.CalibrationData.snapshot` of the calibration
+data, which costs no copy. Changes are debounced: the most recent snapshot
+is written once no further changes have been made for
+:attr:`~AutosaveService.delay` seconds, so a quick series of changes results
+in a single write. Files are written with :func:`util.writeAtomically`, so
+an autosave file is always either the previous or the new version, never
+a partially written one.
+
+An autosave file left behind by an earlier session is not overwritten:
+before an instance first writes its file, an existing one is renamed to
+:attr:`~AutosaveService.backupFileName`, from where it can be recovered.
+"""
+
+import os
+import threading
+import time
+
+from ops.calibration.event import CalibrationDataChanged
+from util import monotonicTime, writeAtomically
+
+import ops.calibration.binary
+import ops.calibration.data
+import util
+
+
+###############################################################################
+# THE AUTOSAVE SERVICE CLASS                                                  #
+###############################################################################
+
+class AutosaveService(object):
+    """
+    Creates a new instance of this class, which saves the calibration data
+    of `system` to the file `fileName`. Files whose extension is ``.calb``
+    are saved in the format of :mod:`ops.calibration.binary`, all others in
+    the XML format of :mod:`ops.calibration.data`. If `delay` is ``None``,
+    :attr:`delay` is used.
+
+    The instance listens for changes as soon as it is created, but the
+    worker thread that writes the file needs to be started with
+    :meth:`start`, and should be stopped with :meth:`stop`. If `fileName`
+    already exists, it is renamed to :attr:`backupFileName` just before the
+    instance first writes it, replacing any earlier backup. Like all
+    listeners of the mediator, the instance is only referenced weakly, so
+    the client needs to keep a reference to it.
+    """
+
+    def __init__(self, system, fileName, delay=None):
+        if delay is not None:
+            self.delay = delay
+
+        self._system = system
+        self._fileName = fileName
+        self._condition = threading.Condition()
+        self._writeLock = threading.Lock()
+        self._pendingSnapshot = None
+        self._lastChange = None
+        self._thread = None
+        self._done = False
+        self._lastSaveTime = None
+        self._lastError = None
+        self._hasRotated = False
+
+        system.mediator.addListener(
+            self._calibrationDataListener, CalibrationDataChanged)
+
+
+    @property
+    def system(self):
+        """
+        The :class:`~ops.system.ProductionSystem` whose calibration data the
+        instance saves. Immutable.
+        """
+        return self._system
+
+
+    @property
+    def fileName(self):
+        """
+        The name of the file the calibration data is saved to. Immutable.
+        """
+        return self._fileName
+
+
+    @property
+    def backupFileName(self):
+        """
+        The name of the file that an existing file :attr:`fileName`, such as
+        the autosave file of an earlier session, is renamed to before it is
+        first overwritten. Immutable.
+        """
+        return self._fileName + '.1'
+
+
+    @property
+    def isRunning(self):
+        """
+        Indicates whether the worker thread has been started, but not yet
+        stopped. Read-only.
+        """
+        return self._thread is not None and not self._done
+
+
+    @property
+    def hasPendingChanges(self):
+        """
+        Indicates whether the calibration data has changed since it was last
+        saved. Read-only.
+        """
+        return self._pendingSnapshot is not None
+
+
+    @property
+    def lastSaveTime(self):
+        """
+        The time the calibration data was last saved successfully, in seconds
+        since the epoch, or ``None`` if it has not been saved yet. Read-only.
+        """
+        return self._lastSaveTime
+
+
+    @property
+    def lastError(self):
+        """
+        The exception raised by the most recent attempt to save the
+        calibration data, or ``None`` if that attempt succeeded, or if there
+        has not been one. A failed attempt is not repeated until the
+        calibration data changes again. Read-only.
+        """
+        return self._lastError
+
+
+    def start(self):
+        """
+        Starts the worker thread. An instance can only be started once.
+        """
+        if self._thread is not None:
+            raise util.ApplicationError('the service has already been started')
+
+        self._thread = threading.Thread(target=self._run)
+        self._thread.setDaemon(True)
+        self._thread.start()
+
+
+    def stop(self):
+        """
+        Stops the worker thread, and saves any pending changes from the
+        calling thread before returning.
+        """
+        with self._condition:
+            self._done = True
+            self._condition.notify()
+
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+
+    def flush(self):
+        """
+        Saves any pending changes immediately, from the calling thread,
+        without waiting for :attr:`delay` to pass.
+        """
+        # The snapshot is taken while holding the write lock, so that
+        # snapshots are always written in the order they were taken, and an
+        # older one cannot replace a newer one that has just been written.
+        with self._writeLock:
+            with self._condition:
+                snapshot = self._takePendingSnapshot()
+            if snapshot is not None:
+                self._save(snapshot)
+
+
+    def _calibrationDataListener(self, event):
+        """
+        Called when a :class:`~ops.calibration.event.CalibrationDataChanged`
+        event is sent. Notes the snapshot of the changed calibration data, and
+        wakes up the worker thread.
+        """
+        if event.system is not self._system:
+            return
+
+        with self._condition:
+            self._pendingSnapshot = event.calibrationData.snapshot
+            self._lastChange = monotonicTime()
+            self._condition.notify()
+
+
+    def _run(self):
+        """
+        The main loop of the worker thread.
+        """
+        while self._waitForChanges():
+            self.flush()
+
+
+    def _waitForChanges(self):
+        """
+        Waits until no changes have been made for :attr:`delay` seconds, and
+        returns ``True``. Returns ``False`` if the instance is stopped before
+        that.
+        """
+        with self._condition:
+            while not self._done:
+                if self._pendingSnapshot is None:
+                    self._condition.wait()
+                    continue
+
+                remaining = self._lastChange + self.delay - monotonicTime()
+                if remaining <= 0.0:
+                    return True
+                self._condition.wait(remaining)
+
+            return False
+
+
+    def _takePendingSnapshot(self):
+        """
+        Returns the pending snapshot, or ``None`` if there is none, and marks
+        it as no longer pending. Must be called with :attr:`_condition` held.
+        """
+        snapshot = self._pendingSnapshot
+        self._pendingSnapshot = None
+        return snapshot
+
+
+    def _save(self, snapshot):
+        """
+        Writes the given snapshot to :attr:`fileName`, and records the
+        outcome in :attr:`lastSaveTime` and :attr:`lastError`. Any exception
+        is recorded rather than raised, so that it cannot end the worker
+        thread. Must be called with :attr:`_writeLock` held.
+        """
+        try:
+            if os.path.splitext(self._fileName)[1] == '.calb':
+                string = ops.calibration.binary.toBinary(snapshot)
+                write = lambda f: f.write(string)
+            else:
+                write = lambda f: ops.calibration.data.writeXML(snapshot, f)
+
+            if not self._hasRotated:
+                self._rotate()
+            writeAtomically(self._fileName, write)
+        except Exception, e:
+            self._lastError = e
+        else:
+            self._lastError = None
+            self._lastSaveTime = time.time()
+
+
+    def _rotate(self):
+        """
+        Renames an existing file :attr:`fileName` to :attr:`backupFileName`.
+        Only done once, before the first write.
+        """
+        if os.path.exists(self._fileName):
+            if os.name == 'nt' and os.path.exists(self.backupFileName):
+                os.remove(self.backupFileName)
+            os.rename(self._fileName, self.backupFileName)
+        self._hasRotated = True
+
+
+    #: The time, in seconds, that needs to pass without further changes
+    #: before the calibration data is saved. This is a class attribute, but it
+    #: can be set on an instance to override the default value.
+    delay = 2.0
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This module saves :class:`~ops.calibration.data.CalibrationData` objects in
+a compact binary format, as an alternative to the XML documents created by
+:func:`~ops.calibration.data.toXML`. The XML format remains the one to use for
+exchanging data with other programs; the binary format is meant for large
+files that need to be loaded and saved quickly.
+
+A binary file consists of a header of :data:`HEADER_SIZE` bytes, followed by
+the columns of heating currents, temperature sensor voltages, temperatures,
+and measurement times, each stored as contiguous little-endian 64-bit
+floats. Measurement times of unknown age are stored as ``nan``. The header
+contains, in this order and in little-endian byte order:
+
+* the eight bytes of :data:`MAGIC`, which identify the format;
+* the version of the format, currently :data:`VERSION`, as a 16-bit unsigned
+  integer;
+* the number of columns, as a 16-bit unsigned integer;
+* the CRC-32 checksum of the columns, as a 32-bit unsigned integer;
+* the number of measurements, as a 64-bit unsigned integer; and
+* eight bytes reserved for later use, which must be zero.
+
+Since the header is a multiple of eight bytes long, the columns are properly
+aligned, and can be used directly from the string or memory map they are
+stored in. Loading a file therefore costs little more than reading it once to
+verify its checksum and measurements (see :func:`fromBinary` and
+:func:`mapFile`).
+"""
+
+import mmap
+import numpy
+import struct
+import zlib
+
+import ops.calibration.data
+
+
+#: The bytes that every binary calibration data file starts with. The first
+#: byte is not valid in an XML document, so the binary format cannot be
+#: confused with the XML format.
+MAGIC = '\x89NoseCal'
+
+#: The version of the binary format that is written by :func:`toBinary`.
+VERSION = 1
+
+#: The size of the header, in bytes.
+HEADER_SIZE = 32
+
+# The layout of the header, as a format string for the struct module.
+_HEADER_FORMAT = '<8sHHIQ8x'
+
+# The number of columns in version 1 of the format.
+_COLUMN_COUNT = 4
+
+# The type of the values in the columns.
+_COLUMN_TYPE = numpy.dtype('<f8')
+
+
+###############################################################################
+# PERSISTENCE FUNCTIONS                                                       #
+###############################################################################
+
+def isBinary(string):
+    """
+    Indicates whether the given string (or buffer) starts like a binary
+    calibration data file. Used to tell binary files from XML documents.
+    """
+    return string[:len(MAGIC)] == MAGIC
+
+
+def toBinary(calibrationData):
+    """
+    Returns a string that contains the given
+    :class:`~ops.calibration.data.CalibrationData` object or
+    :class:`~ops.calibration.data.CalibrationSnapshot` in the binary format.
+    """
+    cd = calibrationData
+    columns = numpy.concatenate((cd.heatingCurrentArray,
+        cd.temperatureSensorVoltageArray, cd.temperatureArray,
+        cd.measurementTimeArray)).astype(_COLUMN_TYPE)
+
+    body = columns.tostring()
+    checksum = zlib.crc32(body) & 0xffffffff
+    header = struct.pack(_HEADER_FORMAT, MAGIC, VERSION, _COLUMN_COUNT,
+        checksum, len(cd.heatingCurrentArray))
+
+    return header + body
+
+
+def fromBinary(string):
+    """
+    Creates a :class:`~ops.calibration.data.CalibrationData` object from the
+    given string, or from any other object that supports the buffer
+    interface, such as a memory map (:class:`mmap.mmap`). The columns of the
+    new object are views of `string`, so it is not copied; if it is a memory
+    map, the map is kept open for as long as the columns are used.
+
+    If `string` is not a valid binary calibration data file, or if its
+    version is not supported, the function returns ``None``.
+    """
+    if len(string) < HEADER_SIZE or not isBinary(string):
+        return None
+
+    magic, version, columnCount, checksum, count = struct.unpack(
+        _HEADER_FORMAT, string[:HEADER_SIZE])
+
+    if version != VERSION or columnCount != _COLUMN_COUNT:
+        return None
+    if len(string) != HEADER_SIZE + columnCount * count * 8:
+        return None
+
+    body = buffer(string, HEADER_SIZE)
+    if zlib.crc32(body) & 0xffffffff != checksum:
+        return None
+
+    columns = numpy.frombuffer(body, _COLUMN_TYPE).reshape(columnCount, count)
+
+    try:
+        return ops.calibration.data.fromColumns(*columns)
+    except ValueError:
+        return None
+
+
+def mapFile(fileName):
+    """
+    Maps the binary calibration data file with the given name into memory,
+    and returns a :class:`~ops.calibration.data.CalibrationData` object whose
+    columns are backed by the map, as created by :func:`fromBinary`. Returns
+    ``None`` if the file is not a valid binary calibration data file, and
+    raises an :exc:`EnvironmentError` if it cannot be read.
+
+    Loading is not lazy: verifying the checksum and the measurements reads
+    the whole file once. What the map saves is the copy of the columns;
+    they share the pages of the operating system's file cache instead of
+    being read into new arrays.
+
+    The file must not be truncated or rewritten in place while the returned
+    object is in use, or accessing its columns crashes the interpreter.
+    Files are therefore saved with :func:`util.writeAtomically`, which
+    replaces them with a new file and leaves the mapped one intact.
+    """
+    with open(fileName, 'rb') as f:
+        try:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped.
+            return None
+
+    return fromBinary(mapping)
+
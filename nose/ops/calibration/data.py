@@ -24,10 +24,19 @@ the data collected during calibration, and a set of functions used to save
 and load instances of this class.
 """
 
+import cStringIO
+import collections
+import contextlib
+import itertools
 import math
 import numpy
-import warnings
-import xml.dom.minidom
+import sys
+import threading
+import time
+import xml.etree.cElementTree
+
+from ops.calibration.evaluator import MonotoneInverse, PolynomialEvaluator
+from ops.calibration.fitting import IncrementalPolynomialFit, getFitDiagnostics
 
 import ops.error
 import ops.calibration.event
@@ -53,7 +62,25 @@ class CalibrationData(object):
     sucessfully fitted, use :attr:`isComplete`.
 
     When measurements are added to or removed from the calibration data,
-    the estimation functions are automatically refitted.
+    the estimation functions are marked as stale. Each of them is refitted
+    when it is next needed, so that a series of changes (for example, the
+    measurements added one by one during a calibration procedure) costs
+    nothing until the estimation functions are actually used. If
+    :attr:`prewarmInBackground` is set, they are refitted in a worker thread
+    right after each change instead.
+
+    The measurements are stored in columns, as :class:`numpy.ndarray`\s that
+    are sorted by heating current. Each column can be accessed directly
+    (:attr:`heatingCurrentArray`, :attr:`temperatureSensorVoltageArray`, and
+    :attr:`temperatureArray`), without copying. The tuples returned by the
+    other measurement properties are created on first access and cached until
+    the measurements change.
+
+    Because the columns are never modified, a :class:`CalibrationSnapshot` of
+    the measurements (:meth:`takeSnapshot`) costs no copy, and can be restored
+    later (:meth:`restoreSnapshot`). The instance also keeps snapshots of its
+    previous states, so that changes can be undone (:meth:`undo`) and redone
+    (:meth:`redo`), within the limit set by :attr:`maxHistorySize`.
     """
 
     ###########################################################################
@@ -65,11 +92,25 @@ class CalibrationData(object):
         Initializes a new instance of this class.
         """
         self._fileName = None
+        self._report = None
         self._system = None
-        self._measurements = {}
-        self._currentFromTargetTemperature = None
-        self._finalTemperatureFromCurrent = None
-        self._temperatureFromVoltage = None
+        self._currents = _createColumn([])
+        self._voltages = _createColumn([])
+        self._temperatures = _createColumn([])
+        self._times = _createColumn([])
+        self._views = {}
+        self._transactionDepth = 0
+        self._hasPendingChanges = False
+        self._fitLock = threading.Lock()
+        self._evaluators = {}
+        self._incrementalFits = {}
+        self._currentSnapshot = self.takeSnapshot()
+        self._undoSnapshots = []
+        self._redoSnapshots = []
+        self._isNavigatingHistory = False
+        self._currentFromTargetTemperature = _STALE
+        self._finalTemperatureFromCurrent = _STALE
+        self._temperatureFromVoltage = _STALE
 
 
     @property
@@ -117,11 +158,31 @@ class CalibrationData(object):
         self._fileName = newFileName
 
 
+    @property
+    def report(self):
+        """
+        The :class:`~ops.calibration.report.CalibrationReport` of the most
+        recent calibration procedure that collected data for the instance,
+        or ``None``.
+
+        :class:`CalibrationData` itself does not use this attribute, and it
+        is not saved by :func:`toXML`. Reports are saved to a file of their
+        own, next to the calibration data file.
+        """
+        return self._report
+
+
+    @report.setter
+    def report(self, newReport):
+        # The setter for the :attr:`report` property.
+        self._report = newReport
+
+
     ###########################################################################
     # MEASUREMENTS                                                           #
     ###########################################################################
 
-    def addMeasurement(self, current, voltage, temperature):
+    def addMeasurement(self, current, voltage, temperature, timestamp=None):
         """
         Adds a new measurement to the calibration data. Arguments are the
         heating current used for the measurement (in mA), and the final
@@ -129,15 +190,47 @@ class CalibrationData(object):
         that are reached with that current. Any measurements for that current
         that may have been added previously are replaced.
 
+        `timestamp` is the time the measurement was taken, in seconds since
+        the epoch. If it is omitted or ``None``, the current time is used.
+        :data:`UNKNOWN_TIME` can be passed for measurements of unknown age.
+
         Also recalculates the estimation functions, and sends
         a :class:`~ops.calibration.event.CalibrationDataChanged` event if the
         instance is associated with a :class:`~ops.system.ProductionSystem`.
         """
         i, u, t = float(current), float(voltage), float(temperature)
-        self._measurements[i] = (i, u, t)
+        timestamp = self._makeTimestamp(timestamp)
+        row = (i, u, t, numpy.nan if timestamp is None else timestamp)
+
+        index = numpy.searchsorted(self._currents, i)
+
+        if index < len(self._currents) and self._currents[index] == i:
+            self._updateIncrementalFits(self._getRows([index]), [row])
+            columns = [numpy.array(c) for c in self._getColumns()]
+            for column, value in zip(columns, row):
+                column[index] = value
+        else:
+            self._updateIncrementalFits([], [row])
+            columns = [numpy.insert(c, index, value)
+                for c, value in zip(self._getColumns(), row)]
+
+        self._setColumns(columns)
         self._measurementChanged()
 
 
+    def _makeTimestamp(self, timestamp):
+        """
+        Returns the timestamp that is to be recorded for a measurement,
+        given the `timestamp` argument passed to :meth:`addMeasurement`.
+        """
+        if timestamp is None:
+            return time.time()
+        elif timestamp is UNKNOWN_TIME:
+            return None
+        else:
+            return float(timestamp)
+
+
     def removeMeasurement(self, current):
         """
         Removes the measurements taken for the given heating current (in mA)
@@ -148,18 +241,185 @@ class CalibrationData(object):
         a :class:`~ops.calibration.event.CalibrationDataChanged` event if the
         instance is associated with a :class:`~ops.system.ProductionSystem`.
         """
-        del self._measurements[current]
+        index = self._getIndex(current)
+        self._updateIncrementalFits(self._getRows([index]), [])
+        self._setColumns(
+            [numpy.delete(c, index) for c in self._getColumns()])
         self._measurementChanged()
 
 
+    def addMeasurements(self, measurements):
+        """
+        Adds several measurements to the calibration data at once.
+        `measurements` is an iterable of tuples that contain the arguments
+        for :meth:`addMeasurement`: a heating current, a voltage,
+        a temperature, and optionally a timestamp. If a heating current
+        occurs more than once, the last measurement for it is used.
+
+        Unlike repeated calls of :meth:`addMeasurement`, this method
+        recalculates the estimation functions and sends
+        a :class:`~ops.calibration.event.CalibrationDataChanged` event only
+        once.
+        """
+        rows = {}
+        for measurement in measurements:
+            i, u, t = [float(n) for n in measurement[:3]]
+            if len(measurement) > 3:
+                timestamp = self._makeTimestamp(measurement[3])
+            else:
+                timestamp = self._makeTimestamp(None)
+            rows[i] = (i, u, t, numpy.nan if timestamp is None else timestamp)
+
+        if not rows:
+            return
+
+        # Existing measurements for the new currents are replaced.
+        new = numpy.array(sorted(rows.values()), dtype=float)
+        keep = ~numpy.in1d(self._currents, new[:, 0])
+        self._updateIncrementalFits(
+            self._getRows(numpy.flatnonzero(~keep)), new)
+
+        columns = [numpy.concatenate((old[keep], new[:, n]))
+            for n, old in enumerate(self._getColumns())]
+        order = numpy.argsort(columns[0], kind='mergesort')
+
+        self._setColumns([c[order] for c in columns])
+        self._measurementChanged()
+
+
+    def removeMeasurements(self, currents):
+        """
+        Removes the measurements taken for the given heating currents (in mA)
+        from the calibration data at once. Raises a :exc:`KeyError`, without
+        removing any measurements, if there are no measurements for one of
+        the currents.
+
+        Unlike repeated calls of :meth:`removeMeasurement`, this method
+        recalculates the estimation functions and sends
+        a :class:`~ops.calibration.event.CalibrationDataChanged` event only
+        once.
+        """
+        indices = sorted(set(self._getIndex(i) for i in currents))
+
+        if indices:
+            self._updateIncrementalFits(self._getRows(indices), [])
+            self._setColumns(
+                [numpy.delete(c, indices) for c in self._getColumns()])
+            self._measurementChanged()
+
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Returns a context manager that defers the recalculation of the
+        estimation functions and the
+        :class:`~ops.calibration.event.CalibrationDataChanged` event until the
+        ``with`` block is left, so that several changes to the measurements
+        cost a single recalculation and a single event::
+
+            with calibrationData.transaction():
+                calibrationData.removeMeasurement(4.0)
+                calibrationData.addMeasurement(6.0, 0.6, 600.0)
+
+        If the block is left because of an exception, the measurements are
+        restored to the state they were in when the block was entered, and
+        the exception is propagated. Transactions can be nested; only the
+        outermost one has an effect.
+        """
+        if self._transactionDepth > 0:
+            self._transactionDepth += 1
+            try:
+                yield self
+            finally:
+                self._transactionDepth -= 1
+            return
+
+        columns = self._getColumns()
+        self._transactionDepth = 1
+        self._hasPendingChanges = False
+
+        try:
+            yield self
+        except:
+            self._transactionDepth = 0
+            self._setColumns(columns)
+            self._views = {}
+            self._incrementalFits = {}
+            raise
+        else:
+            self._transactionDepth = 0
+            if self._hasPendingChanges:
+                self._measurementChanged()
+        finally:
+            self._hasPendingChanges = False
+
+
+    @property
+    def isInTransaction(self):
+        """
+        Indicates whether a :meth:`transaction` is in progress. Read-only.
+        """
+        return self._transactionDepth > 0
+
+
+    def _getIndex(self, current):
+        """
+        Returns the index of the measurement for the given heating current in
+        the columns, or raises a :exc:`KeyError` if there is none.
+        """
+        current = float(current)
+        index = numpy.searchsorted(self._currents, current)
+
+        if index < len(self._currents) and self._currents[index] == current:
+            return index
+        else:
+            raise KeyError(current)
+
+
+    def _getRows(self, indices):
+        """
+        Returns a list of tuples of the heating current, voltage, and
+        temperature of the measurements with the given indices.
+        """
+        return [(self._currents[n], self._voltages[n], self._temperatures[n])
+            for n in indices]
+
+
+    def _getColumns(self):
+        """
+        Returns a tuple of the columns of heating currents, voltages,
+        temperatures, and measurement times, in that order.
+        """
+        return (self._currents, self._voltages, self._temperatures,
+            self._times)
+
+
+    def _setColumns(self, columns):
+        """
+        Replaces the columns returned by :meth:`_getColumns` with the given
+        arrays, which are made read-only.
+        """
+        self._currents, self._voltages, self._temperatures, self._times = [
+            _createColumn(c) for c in columns]
+
+
     def _measurementChanged(self):
         """
         Called when the a measurement has been added to or deleted from
-        :attr:`measurements`. Calls :meth:`_recalculatePolynomials`, and
-        sends a :class:`~ops.calibrationevent.CalibrationDataChanged` event
-        if :attr:`system` is set.
+        :attr:`measurements`. Discards the cached views of the measurements,
+        calls :meth:`_invalidatePolynomials`, and sends
+        a :class:`~ops.calibrationevent.CalibrationDataChanged` event if
+        :attr:`system` is set. During a :meth:`transaction`, the last two
+        steps are deferred until the transaction ends.
         """
-        self._recalculatePolynomials()
+        self._views = {}
+
+        if self._transactionDepth > 0:
+            self._hasPendingChanges = True
+            return
+
+        self._invalidatePolynomials()
+        self._recordChange()
 
         if self._system != None:
             assert self._system.calibrationData is self
@@ -168,6 +428,19 @@ class CalibrationData(object):
                     self._system, self))
 
 
+    def _getView(self, name, function):
+        """
+        Returns the cached view with the given name, creating it by calling
+        `function` if it has not been cached since the measurements last
+        changed.
+        """
+        try:
+            return self._views[name]
+        except KeyError:
+            view = self._views[name] = function()
+            return view
+
+
     @property
     def measurements(self):
         """
@@ -176,7 +449,9 @@ class CalibrationData(object):
         for a measurement that is part of the calibration data. The
         tuple's items are ordered by their heating currents. Read-only.
         """
-        return tuple(sorted(self._measurements.values()))
+        return self._getView('measurements', lambda: tuple(zip(
+            self.heatingCurrents, self.temperatureSensorVoltages,
+            self.temperatures)))
 
 
     @property
@@ -185,7 +460,8 @@ class CalibrationData(object):
         A sorted tuple of the heating currents the measurements that are part
         of the calibration data have been taken for. Read-only.
         """
-        return tuple(m[0] for m in self.measurements)
+        return self._getView('heatingCurrents',
+            lambda: tuple(self._currents.tolist()))
 
 
     @property
@@ -195,7 +471,8 @@ class CalibrationData(object):
         during calibration, sorted by the heating currents they have been
         measured for. Read-only.
         """
-        return tuple(m[1] for m in self.measurements)
+        return self._getView('temperatureSensorVoltages',
+            lambda: tuple(self._voltages.tolist()))
 
 
     @property
@@ -205,7 +482,65 @@ class CalibrationData(object):
         calibration, sorted by the heating currents they have been measured
         for. Read-only.
         """
-        return tuple(m[2] for m in self.measurements)
+        return self._getView('temperatures',
+            lambda: tuple(self._temperatures.tolist()))
+
+
+    @property
+    def heatingCurrentArray(self):
+        """
+        A read-only :class:`numpy.ndarray` that contains the same values as
+        :attr:`heatingCurrents`. The array itself is never modified; when the
+        measurements change, a new array is created. Read-only.
+        """
+        return self._currents
+
+
+    @property
+    def temperatureSensorVoltageArray(self):
+        """
+        A read-only :class:`numpy.ndarray` that contains the same values as
+        :attr:`temperatureSensorVoltages`. The array itself is never modified;
+        when the measurements change, a new array is created. Read-only.
+        """
+        return self._voltages
+
+
+    @property
+    def temperatureArray(self):
+        """
+        A read-only :class:`numpy.ndarray` that contains the same values as
+        :attr:`temperatures`. The array itself is never modified; when the
+        measurements change, a new array is created. Read-only.
+        """
+        return self._temperatures
+
+
+    @property
+    def measurementTimeArray(self):
+        """
+        A read-only :class:`numpy.ndarray` that contains the times the
+        measurements were taken (see :meth:`getMeasurementTime`), with ``nan``
+        for measurements of unknown age, sorted by heating current. The array
+        itself is never modified; when the measurements change, a new array
+        is created. Read-only.
+        """
+        return self._times
+
+
+    def getMeasurementTime(self, current):
+        """
+        Returns the time the measurement for the given heating current (in mA)
+        was taken, in seconds since the epoch, or ``None`` if that time is not
+        known (which is the case for measurements loaded from files that
+        predate the recording of measurement times). Raises a :exc:`KeyError`
+        if there are no measurements for that current.
+        """
+        timestamp = self._times[self._getIndex(current)]
+        if numpy.isnan(timestamp):
+            return None
+        else:
+            return float(timestamp)
 
 
     @property
@@ -213,7 +548,145 @@ class CalibrationData(object):
         """
         Indicates whether the instance has at least one measurement.
         """
-        return len(self._measurements) > 0
+        return len(self._currents) > 0
+
+
+    ###########################################################################
+    # SNAPSHOTS AND HISTORY                                                   #
+    ###########################################################################
+
+    def takeSnapshot(self):
+        """
+        Returns a :class:`CalibrationSnapshot` of the current measurements.
+        The snapshot shares the instance's read-only columns, so taking it
+        costs no copy, no matter how many measurements there are.
+        """
+        return CalibrationSnapshot(self._getColumns(), self._getFitSettings())
+
+
+    @property
+    def snapshot(self):
+        """
+        The :class:`CalibrationSnapshot` of the measurements as they were
+        after the most recent change (or :meth:`transaction`) was complete.
+        A new snapshot is published after every change by replacing a single
+        reference, so this property can be read from any thread, without
+        locks, while the measurements are changed on the main thread. The
+        estimation functions of the snapshot always match its measurements.
+        Read-only.
+        """
+        return self._currentSnapshot
+
+
+    def restoreSnapshot(self, snapshot):
+        """
+        Replaces the measurements with those of the given
+        :class:`CalibrationSnapshot`, which may have been taken from another
+        instance. Like any other change, this recalculates the estimation
+        functions, sends a
+        :class:`~ops.calibration.event.CalibrationDataChanged` event, and can
+        be undone with :meth:`undo`.
+        """
+        with self._fitLock:
+            self._incrementalFits = {}
+        self._setColumns(snapshot._columns)
+        self._measurementChanged()
+
+
+    @property
+    def canUndo(self):
+        """
+        Indicates whether there is a change that can be undone with
+        :meth:`undo`. Read-only.
+        """
+        return len(self._undoSnapshots) > 0
+
+
+    @property
+    def canRedo(self):
+        """
+        Indicates whether there is an undone change that can be redone with
+        :meth:`redo`. Read-only.
+        """
+        return len(self._redoSnapshots) > 0
+
+
+    def undo(self):
+        """
+        Undoes the most recent change to the measurements. A
+        :meth:`transaction` counts as a single change. Raises an
+        :exc:`~util.ApplicationError` if there is nothing to undo, or if
+        a transaction is in progress.
+        """
+        self._navigateHistory(self._undoSnapshots, self._redoSnapshots)
+
+
+    def redo(self):
+        """
+        Redoes the change most recently undone with :meth:`undo`. Raises an
+        :exc:`~util.ApplicationError` if there is nothing to redo, or if
+        a transaction is in progress. Any change other than :meth:`undo` and
+        :meth:`redo` discards the changes that could be redone.
+        """
+        self._navigateHistory(self._redoSnapshots, self._undoSnapshots)
+
+
+    def clearHistory(self):
+        """
+        Discards all changes that could be undone or redone.
+        """
+        self._undoSnapshots = []
+        self._redoSnapshots = []
+
+
+    def _navigateHistory(self, source, target):
+        """
+        Restores the last snapshot in the list `source`, and appends
+        a snapshot of the current measurements to the list `target`.
+        """
+        if self.isInTransaction:
+            raise util.ApplicationError('a transaction is in progress')
+        if not source:
+            raise util.ApplicationError('there are no changes left')
+
+        target.append(self._currentSnapshot)
+        self._isNavigatingHistory = True
+        try:
+            self.restoreSnapshot(source.pop())
+        finally:
+            self._isNavigatingHistory = False
+
+
+    def _recordChange(self):
+        """
+        Called by :meth:`_measurementChanged` when a change is complete.
+        Makes the snapshot of the measurements before the change available
+        to :meth:`undo`, unless the change was made by :meth:`undo` or
+        :meth:`redo`, and discards the oldest snapshots if the history uses
+        more than :attr:`maxHistorySize` bytes. The snapshot before the most
+        recent change is always kept, so that it can be undone.
+        """
+        previous = self._currentSnapshot
+        self._currentSnapshot = self.takeSnapshot()
+
+        if self._isNavigatingHistory or previous == self._currentSnapshot:
+            return
+
+        self._undoSnapshots.append(previous)
+        self._redoSnapshots = []
+
+        snapshots = self._undoSnapshots
+        size = sum(s.size for s in snapshots)
+        while size > self.maxHistorySize and len(snapshots) > 1:
+            size -= snapshots.pop(0).size
+
+
+    #: The maximum number of bytes the snapshots kept for :meth:`undo` and
+    #: :meth:`redo` may use. The oldest changes are forgotten first, but the
+    #: most recent change can always be undone, even if its snapshot alone
+    #: exceeds the limit. This is a class attribute, but can be set on an
+    #: instance to override the default value.
+    maxHistorySize = 2 ** 20
 
 
     ###########################################################################
@@ -228,11 +701,11 @@ class CalibrationData(object):
     def isComplete(self):
         """
         Indicates whether all three estimations functions have been
-        sucessfully fitted. Read-only.
+        sucessfully fitted. Stale estimation functions are refitted first.
+        Read-only.
         """
-        return (self._currentFromTargetTemperature is not None
-            and self._finalTemperatureFromCurrent is not None
-            and self._temperatureFromVoltage is not None)
+        return all(self._getPolynomial(name) is not None
+            for name in _POLYNOMIAL_DATA)
 
 
     # FIXME: Document.
@@ -240,7 +713,7 @@ class CalibrationData(object):
     @property
     def currentFromTargetTemperatureCoefficients(self):
         if self.isComplete:
-            return tuple(self._currentFromTargetTemperature)
+            return tuple(self._getPolynomial('_currentFromTargetTemperature'))
         else:
             return None
 
@@ -248,7 +721,7 @@ class CalibrationData(object):
     @property
     def finalTemperatureFromCurrentCoefficients(self):
         if self.isComplete:
-            return tuple(self._finalTemperatureFromCurrent)
+            return tuple(self._getPolynomial('_finalTemperatureFromCurrent'))
         else:
             return None
 
@@ -256,7 +729,7 @@ class CalibrationData(object):
     @property
     def temperatureFromVoltageCoefficients(self):
         if self.isComplete:
-            return tuple(self._temperatureFromVoltage)
+            return tuple(self._getPolynomial('_temperatureFromVoltage'))
         else:
             return None
 
@@ -265,14 +738,29 @@ class CalibrationData(object):
         """
         Estimates the heating current (in mA) necessary for the heater
         to reach, but not exceed, a given target temperature (in °C).
-        Raises a :exc:`~ops.error.NotCalibratedError` if the estimation
-        function could not be fitted.
+        If :attr:`useMonotoneInverse` is set, the estimate is consistent with
+        :meth:`getFinalTemperatureFromCurrent`. Raises
+        a :exc:`~ops.error.NotCalibratedError` if the estimation function
+        could not be fitted.
+
+        `targetTemperature` may also be a sequence or
+        :class:`numpy.ndarray`, in which case a :class:`numpy.ndarray` is
+        returned, like :meth:`getCurrentsFromTargetTemperatures` does.
+
+        The estimate is only reliable within the range of the measured
+        heating currents. Outside of it, the monotone inverse is extrapolated
+        linearly from the nearest end of its table, and the polynomial is
+        simply evaluated, so either may return a negative current for a
+        target temperature below that range. Clients should check target
+        temperatures against the range they support themselves.
         """
         # TODO: Should be not self.isComplete
-        if self._currentFromTargetTemperature is None:
-            raise ops.error.NotCalibratedError()
+        evaluator = self._getEvaluator('_currentFromTargetTemperature')
+        inverse = self._getInverse()
+        if inverse is not None:
+            return inverse(targetTemperature)
         else:
-            return self._currentFromTargetTemperature(targetTemperature)
+            return evaluator(targetTemperature)
 
 
     def getFinalTemperatureFromCurrent(self, current):
@@ -282,10 +770,8 @@ class CalibrationData(object):
         Raises a :exc:`~ops.error.NotCalibratedError` if the estimation
         function could not be fitted.
         """
-        if self._finalTemperatureFromCurrent is None:
-            raise ops.error.NotCalibratedError()
-        else:
-            return self._finalTemperatureFromCurrent(current)
+        evaluator = self._getEvaluator('_finalTemperatureFromCurrent')
+        return evaluator.evaluate(current)
 
 
     def getTemperatureFromVoltage(self, voltage):
@@ -295,10 +781,132 @@ class CalibrationData(object):
         Raises a :exc:`~ops.error.NotCalibratedError` if the estimation
         function could not be fitted.
         """
-        if self._temperatureFromVoltage is None:
-            raise ops.error.NotCalibratedError()
+        evaluator = self._getEvaluator('_temperatureFromVoltage')
+        return evaluator.evaluate(voltage)
+
+
+    def getCurrentsFromTargetTemperatures(self, targetTemperatures):
+        """
+        Like :meth:`getCurrentFromTargetTemperature`, but takes a sequence or
+        :class:`numpy.ndarray` of target temperatures and returns
+        a :class:`numpy.ndarray` of floats with the estimated heating
+        currents, computed by a single call of :func:`numpy.polyval`.
+        """
+        evaluator = self._getEvaluator('_currentFromTargetTemperature')
+        inverse = self._getInverse()
+        if inverse is not None:
+            return inverse.evaluateArray(targetTemperatures)
         else:
-            return self._temperatureFromVoltage(voltage)
+            return evaluator.evaluateArray(targetTemperatures)
+
+
+    def getMaxTargetTemperatureFromCurrent(self, current):
+        """
+        Returns the highest target temperature (in °C) for which
+        :meth:`getCurrentFromTargetTemperature` returns at most the given
+        heating current (in mA), or ``None`` if :attr:`useMonotoneInverse` is
+        not set or the monotone inverse is not available. Raises
+        a :exc:`~ops.error.NotCalibratedError` if the estimation functions
+        could not be fitted.
+        """
+        self._getEvaluator('_currentFromTargetTemperature')
+        inverse = self._getInverse()
+        if inverse is not None:
+            return inverse.getLimit(current)
+        else:
+            return None
+
+
+    def getFinalTemperaturesFromCurrents(self, currents):
+        """
+        Like :meth:`getFinalTemperatureFromCurrent`, but takes a sequence or
+        :class:`numpy.ndarray` of heating currents and returns
+        a :class:`numpy.ndarray` of floats with the estimated temperatures,
+        computed by a single call of :func:`numpy.polyval`.
+        """
+        return self._evaluate('_finalTemperatureFromCurrent', currents)
+
+
+    def getTemperaturesFromVoltages(self, voltages):
+        """
+        Like :meth:`getTemperatureFromVoltage`, but takes a sequence or
+        :class:`numpy.ndarray` of temperature sensor voltages and returns
+        a :class:`numpy.ndarray` of floats with the estimated temperatures,
+        computed by a single call of :func:`numpy.polyval`.
+        """
+        return self._evaluate('_temperatureFromVoltage', voltages)
+
+
+    def _evaluate(self, name, values):
+        """
+        Evaluates the estimation function stored in the attribute with the
+        given name for an array of values. Raises
+        a :exc:`~ops.error.NotCalibratedError` if the estimation function
+        could not be fitted.
+        """
+        return self._getEvaluator(name).evaluateArray(values)
+
+
+    def _getEvaluator(self, name):
+        """
+        Returns a :class:`~ops.calibration.evaluator.PolynomialEvaluator` for
+        the estimation function stored in the attribute with the given name,
+        or raises a :exc:`~ops.error.NotCalibratedError` if the estimation
+        function could not be fitted. Evaluators are cached, and only created
+        anew when the estimation function has been refitted.
+        """
+        polynomial = self._getPolynomial(name)
+        if polynomial is None:
+            raise ops.error.NotCalibratedError()
+
+        cached = self._evaluators.get(name)
+        if cached is not None and cached[0] is polynomial:
+            return cached[1]
+
+        evaluator = PolynomialEvaluator(polynomial.coeffs)
+        self._evaluators[name] = (polynomial, evaluator)
+        self._shareEvaluator(name, evaluator)
+        return evaluator
+
+
+    def _getInverse(self):
+        """
+        Returns a :class:`~ops.calibration.evaluator.MonotoneInverse` of
+        :meth:`getFinalTemperatureFromCurrent` on the range of the measured
+        heating currents, or ``None`` if :attr:`useMonotoneInverse` is not
+        set, or if that function does not increase on that range. Like the
+        evaluators, the inverse is cached until the function is refitted.
+        """
+        if not self.useMonotoneInverse or len(self._currents) < 2:
+            return None
+
+        forward = self._getEvaluator('_finalTemperatureFromCurrent')
+        cached = self._evaluators.get('inverse')
+        if cached is not None and cached[0] is forward:
+            return cached[1]
+
+        try:
+            inverse = MonotoneInverse(forward, self._currents[0],
+                self._currents[-1], self.inverseTableSize)
+        except ValueError:
+            inverse = None
+
+        self._evaluators['inverse'] = (forward, inverse)
+        self._shareEvaluator('inverse', inverse)
+        return inverse
+
+
+    def _shareEvaluator(self, name, evaluator):
+        """
+        Passes an evaluator that has just been created to the published
+        :attr:`snapshot`, if that still describes the current measurements
+        and fitting attributes, so that readers of the snapshot need not fit
+        it again. `name` is the key the evaluator is cached under.
+        """
+        snapshot = self._currentSnapshot
+        if (snapshot == self.takeSnapshot()
+                and snapshot._settings == self._getFitSettings()):
+            snapshot._evaluators.setdefault(name, evaluator)
 
 
     ###########################################################################
@@ -315,19 +923,138 @@ class CalibrationData(object):
     #: an instance to override the default value.
     minMeasurementsForEstimation = 5
 
+    #: Indicates whether stale estimation functions are refitted in a worker
+    #: thread right after the measurements change, so that they are ready
+    #: when they are needed. This is a class attribute, but can be set on an
+    #: instance to override the default value.
+    prewarmInBackground = False
+
+    #: Indicates whether the heating current for a target temperature is
+    #: estimated by inverting :meth:`getFinalTemperatureFromCurrent` with
+    #: a :class:`~ops.calibration.evaluator.MonotoneInverse`, rather than by
+    #: a separately fitted polynomial. The inverse is monotone, and consistent
+    #: with the forward function. This is a class attribute, but can be set
+    #: on an instance to override the default value.
+    useMonotoneInverse = True
+
+    #: The number of points in the table of the monotone inverse. This is
+    #: a class attribute, but can be set on an instance to override the
+    #: default value.
+    inverseTableSize = 257
+
+
+    def _invalidatePolynomials(self):
+        """
+        Marks the estimation functions as stale, so that each of them is
+        refitted by :meth:`_getPolynomial` when it is next needed. If
+        :attr:`prewarmInBackground` is set, also calls :meth:`prewarm`.
+        """
+        with self._fitLock:
+            for name in _POLYNOMIAL_DATA:
+                setattr(self, name, _STALE)
+
+        if self.prewarmInBackground:
+            self.prewarm()
+
+
+    def _getPolynomial(self, name):
+        """
+        Returns the estimation function stored in the attribute with the given
+        name, which is a key of :data:`_POLYNOMIAL_DATA`, or ``None`` if it
+        could not be fitted. If the estimation function is stale, it is
+        refitted first, using :meth:`_fit`.
+        """
+        polynomial = getattr(self, name)
+        if polynomial is not _STALE:
+            return polynomial
+
+        with self._fitLock:
+            # Another thread may have fitted the polynomial in the meantime.
+            polynomial = getattr(self, name)
+            if polynomial is _STALE:
+                polynomial = self._refit(name)
+                setattr(self, name, polynomial)
+
+        return polynomial
+
+
+    def _refit(self, name):
+        """
+        Refits the estimation function stored in the attribute with the given
+        name, and returns it. If the instance has an
+        :class:`~ops.calibration.fitting.IncrementalPolynomialFit` for that
+        function that is still usable, and that has been kept up to date by
+        :meth:`_updateIncrementalFits`, it is used; otherwise, the function is
+        refitted from scratch using :meth:`_fit`, and a new incremental fit is
+        created for later changes.
+        """
+        x, y = [getattr(self, c) for c in _POLYNOMIAL_DATA[name]]
+        fit = self._incrementalFits.get(name)
+
+        if (fit is not None and fit.isUsable
+                and fit.degree == self.polynomialDegree
+                and len(x) >= self.minMeasurementsForEstimation):
+            return fit.getPolynomial()
+
+        polynomial = self._fit(x, y)
+
+        if polynomial is not None:
+            self._incrementalFits[name] = IncrementalPolynomialFit(
+                x, y, self.polynomialDegree)
+        else:
+            self._incrementalFits.pop(name, None)
+
+        return polynomial
+
+
+    def _updateIncrementalFits(self, removed, added):
+        """
+        Removes the measurements in `removed` from the incremental fits of
+        the estimation functions, and adds those in `added`. Both are
+        sequences of tuples whose first three items are a heating current,
+        a voltage, and a temperature. Fits that become unusable are
+        discarded. If the change is larger than the current number of
+        measurements, all fits are discarded, since refitting from scratch is
+        cheaper then.
+        """
+        with self._fitLock:
+            if len(removed) + len(added) > len(self._currents):
+                self._incrementalFits = {}
+
+            for name, fit in self._incrementalFits.items():
+                xColumn, yColumn = [_COLUMN_INDICES[c]
+                    for c in _POLYNOMIAL_DATA[name]]
+
+                for row in removed:
+                    fit.removePoint(row[xColumn], row[yColumn])
+                for row in added:
+                    fit.addPoint(row[xColumn], row[yColumn])
+
+                if not fit.isUsable:
+                    del self._incrementalFits[name]
+
 
     def _recalculatePolynomials(self):
         """
-        Recalculates the estimation functions. The actual work is done by
-        :meth:`_fit`.
+        Refits all stale estimation functions right away. The actual work is
+        done by :meth:`_getPolynomial`.
         """
-        currents = self.heatingCurrents
-        voltages = self.temperatureSensorVoltages
-        temperatures = self.temperatures
+        for name in _POLYNOMIAL_DATA:
+            self._getPolynomial(name)
 
-        self._currentFromTargetTemperature = self._fit(temperatures, currents)
-        self._finalTemperatureFromCurrent = self._fit(currents, temperatures)
-        self._temperatureFromVoltage = self._fit(voltages, temperatures)
+
+    def prewarm(self):
+        """
+        Starts a worker thread that refits all stale estimation functions,
+        and returns the thread. The estimation functions can be used while
+        the thread is running; if one of them is needed before the thread has
+        refitted it, it is refitted by the calling thread, or the calling
+        thread waits for the worker thread to finish fitting it.
+        """
+        thread = threading.Thread(target=self._recalculatePolynomials)
+        thread.setDaemon(True)
+        thread.start()
+        return thread
 
 
     def _fit(self, x, y):
@@ -336,20 +1063,339 @@ class CalibrationData(object):
         using :func:`numpy.polyfit` and the degree :attr:`polynomialDegree`.
 
         If fewer than :attr:`minMeasurementsForEstimation` points are passed,
-        or if :func:`numpy.polyfit` issues a :exc:`numpy.RankWarning`, ``None``
-        is returned instead. :exc:`numpy.RankWarning`\s that may be issued
-        are not printed to :attr:`sys.stderr`.
+        or if the fit is rank deficient (see :func:`_fitPolynomial`), ``None``
+        is returned instead.
         """
         if len(x) < self.minMeasurementsForEstimation:
             return None
 
-        with warnings.catch_warnings():
-            warnings.simplefilter('error')
+        coefficients = _fitPolynomial(x, y, self.polynomialDegree)
+        if coefficients is None:
+            return None
+        else:
+            return numpy.poly1d(coefficients)
+
+
+    def _getFitSettings(self):
+        """
+        Returns a :class:`_FitSettings` named tuple with the current values
+        of the attributes that determine how the estimation functions are
+        fitted and evaluated.
+        """
+        return _FitSettings(self.polynomialDegree,
+            self.minMeasurementsForEstimation, self.useMonotoneInverse,
+            self.inverseTableSize)
+
+
+    ###########################################################################
+    # DIAGNOSTICS                                                             #
+    ###########################################################################
+
+    @property
+    def diagnostics(self):
+        """
+        A :class:`Diagnostics` named tuple that contains the
+        :class:`~ops.calibration.fitting.FitDiagnostics` of the polynomials
+        fitted for the three estimation functions, or ``None`` for each
+        function that could not be fitted. The values for the measurements are
+        ordered by their heating currents, like :attr:`measurements`.
+
+        The diagnostics are computed by
+        :func:`~ops.calibration.fitting.getFitDiagnostics` without refitting
+        the polynomials for any of the measurements that are left out. They
+        are computed on first access and cached until the measurements
+        change. If :attr:`useMonotoneInverse` is set, the diagnostics for
+        :meth:`getCurrentFromTargetTemperature` still describe the fitted
+        polynomial, not the inverse. Read-only.
+        """
+        return self._getView('diagnostics', self._computeDiagnostics)
+
+
+    def _computeDiagnostics(self):
+        """
+        Returns a new :class:`Diagnostics` named tuple for the current
+        measurements.
+        """
+        result = []
+        for field in Diagnostics._fields:
+            name = '_' + field
+            if self._getPolynomial(name) is None:
+                result.append(None)
+            else:
+                x, y = [getattr(self, c) for c in _POLYNOMIAL_DATA[name]]
+                result.append(getFitDiagnostics(x, y, self.polynomialDegree))
+        return Diagnostics(*result)
+
+
+###############################################################################
+# CALIBRATION SNAPSHOTS                                                       #
+###############################################################################
+
+class CalibrationSnapshot(object):
+    """
+    An immutable snapshot of the measurements of a :class:`CalibrationData`
+    instance, as returned by :meth:`CalibrationData.takeSnapshot` and
+    :attr:`CalibrationData.snapshot`. It can be passed to
+    :meth:`CalibrationData.restoreSnapshot` to roll back changes without
+    a deep copy or a file.
+
+    Since the columns of a :class:`CalibrationData` instance are read-only,
+    and are replaced rather than modified when the measurements change, the
+    snapshot simply keeps references to them. Two snapshots are equal if they
+    share the same columns.
+
+    A snapshot also provides the estimation functions for its measurements,
+    as evaluators (see :mod:`ops.calibration.evaluator`), using the fitting
+    attributes its :class:`CalibrationData` instance had when the snapshot was
+    taken. The evaluators are created on first access, unless the
+    :class:`CalibrationData` instance has already created them. Snapshots
+    are safe to use from any thread without locks: if two threads need an
+    evaluator at the same time, both may fit it, but only one of the results
+    is kept.
+    """
+
+    def __init__(self, columns, settings):
+        self._columns = tuple(columns)
+        self._settings = settings
+        self._evaluators = {}
+
+
+    def __eq__(self, other):
+        if not isinstance(other, CalibrationSnapshot):
+            return NotImplemented
+        pairs = zip(self._columns, other._columns)
+        return all(mine is theirs for mine, theirs in pairs)
+
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+
+    @property
+    def measurements(self):
+        """
+        A tuple of tuples of the heating current, temperature sensor voltage,
+        and temperature of each measurement, like
+        :attr:`CalibrationData.measurements`. Immutable.
+        """
+        return tuple(zip(*[c.tolist() for c in self._columns[:3]]))
+
+
+    @property
+    def size(self):
+        """
+        The approximate number of bytes used by the snapshot, if it does not
+        share its columns with anything else. Immutable.
+        """
+        return sum(c.nbytes + _COLUMN_OVERHEAD for c in self._columns)
+
+
+    @property
+    def heatingCurrentArray(self):
+        """
+        The read-only :class:`numpy.ndarray` of the heating currents, as
+        returned by :attr:`CalibrationData.heatingCurrentArray` when the
+        snapshot was taken. Immutable.
+        """
+        return self._columns[0]
+
+
+    @property
+    def temperatureSensorVoltageArray(self):
+        """
+        The read-only :class:`numpy.ndarray` of the temperature sensor
+        voltages, as returned by
+        :attr:`CalibrationData.temperatureSensorVoltageArray` when the snapshot
+        was taken. Immutable.
+        """
+        return self._columns[1]
+
+
+    @property
+    def temperatureArray(self):
+        """
+        The read-only :class:`numpy.ndarray` of the temperatures, as returned
+        by :attr:`CalibrationData.temperatureArray` when the snapshot was
+        taken. Immutable.
+        """
+        return self._columns[2]
+
+
+    @property
+    def measurementTimeArray(self):
+        """
+        The read-only :class:`numpy.ndarray` of the measurement times, as
+        returned by :attr:`CalibrationData.measurementTimeArray` when the
+        snapshot was taken. Immutable.
+        """
+        return self._columns[3]
+
+
+    @property
+    def isComplete(self):
+        """
+        Indicates whether all three estimation functions could be fitted.
+        Immutable.
+        """
+        return all(self._getEvaluator(name) is not None
+            for name in _POLYNOMIAL_DATA)
+
+
+    @property
+    def currentFromTargetTemperature(self):
+        """
+        An evaluator that estimates the heating current (in mA) from a target
+        temperature (in °C), like
+        :meth:`CalibrationData.getCurrentFromTargetTemperature`, or ``None``
+        if the estimation function could not be fitted. Evaluators can be
+        called with single values, and provide an `evaluateArray` method for
+        arrays. Immutable.
+        """
+        evaluator = self._getEvaluator('_currentFromTargetTemperature')
+        if evaluator is None or not self._settings.useMonotoneInverse:
+            return evaluator
+
+        inverse = self._getEvaluator('inverse')
+        return inverse if inverse is not None else evaluator
+
+
+    @property
+    def finalTemperatureFromCurrent(self):
+        """
+        An evaluator that estimates the final temperature (in °C) from
+        a heating current (in mA), like
+        :meth:`CalibrationData.getFinalTemperatureFromCurrent`, or ``None``
+        if the estimation function could not be fitted. Immutable.
+        """
+        return self._getEvaluator('_finalTemperatureFromCurrent')
+
+
+    @property
+    def temperatureFromVoltage(self):
+        """
+        An evaluator that estimates the temperature (in °C) from
+        a temperature sensor voltage (in V), like
+        :meth:`CalibrationData.getTemperatureFromVoltage`, or ``None`` if the
+        estimation function could not be fitted. Immutable.
+        """
+        return self._getEvaluator('_temperatureFromVoltage')
+
+
+    def _getEvaluator(self, name):
+        """
+        Returns the evaluator cached under the given name, which is a key of
+        :data:`_POLYNOMIAL_DATA` or ``'inverse'``, creating it first if
+        necessary.
+        """
+        try:
+            return self._evaluators[name]
+        except KeyError:
+            # If another thread has stored an evaluator in the meantime,
+            # setdefault returns that one, so all threads use the same.
+            return self._evaluators.setdefault(
+                name, self._createEvaluator(name))
+
+
+    def _createEvaluator(self, name):
+        """
+        Fits the estimation function with the given name to the snapshot's
+        measurements, and returns an evaluator for it, or ``None``.
+        """
+        currents = self._columns[0]
+
+        if name == 'inverse':
+            forward = self._getEvaluator('_finalTemperatureFromCurrent')
+            if forward is None or len(currents) < 2:
+                return None
             try:
-                return numpy.poly1d(numpy.polyfit(x, y, self.polynomialDegree))
-            except numpy.RankWarning:
+                return MonotoneInverse(forward, currents[0], currents[-1],
+                    self._settings.inverseTableSize)
+            except ValueError:
                 return None
 
+        x, y = [self._columns[_COLUMN_INDICES[c]]
+            for c in _POLYNOMIAL_DATA[name]]
+        if len(x) < self._settings.minCount:
+            return None
+
+        coefficients = _fitPolynomial(x, y, self._settings.degree)
+        if coefficients is None:
+            return None
+        else:
+            return PolynomialEvaluator(coefficients)
+
+
+def _fitPolynomial(x, y, degree):
+    """
+    Returns the coefficients of the polynomial of the given degree fitted to
+    the given points with :func:`numpy.polyfit`, highest power first, or
+    ``None`` if the fit is rank deficient, which is the case in which
+    :func:`numpy.polyfit` would issue a :exc:`numpy.RankWarning`.
+
+    The rank is checked directly instead of turning the warning into an
+    exception, because changing the warning filters affects all threads,
+    and fits are done from several threads at once.
+    """
+    coefficients, residuals, rank, singularValues, rcond = numpy.polyfit(
+        x, y, degree, full=True)
+    if rank < degree + 1:
+        return None
+    else:
+        return coefficients
+
+
+def _createColumn(values):
+    """
+    Returns a read-only :class:`numpy.ndarray` of floats with the given
+    values. If `values` already is such an array, it is made read-only and
+    returned without being copied.
+    """
+    column = numpy.asarray(values, dtype=float)
+    column.flags.writeable = False
+    return column
+
+
+# A marker for estimation functions that need to be refitted.
+_STALE = object()
+
+# The approximate number of bytes a column uses in addition to its values.
+_COLUMN_OVERHEAD = sys.getsizeof(numpy.empty(0))
+
+# Maps the attributes of a CalibrationData object that hold the estimation
+# functions to the names of the columns they are fitted to, as (x, y).
+_POLYNOMIAL_DATA = {
+    '_currentFromTargetTemperature': ('_temperatures', '_currents'),
+    '_finalTemperatureFromCurrent': ('_currents', '_temperatures'),
+    '_temperatureFromVoltage': ('_voltages', '_temperatures'),
+}
+
+# Maps the names of the columns to the positions of their values in the
+# tuples passed to CalibrationData._updateIncrementalFits, and to the
+# positions of the columns in a CalibrationSnapshot.
+_COLUMN_INDICES = {'_currents': 0, '_voltages': 1, '_temperatures': 2}
+
+# The attributes of a CalibrationData object that a CalibrationSnapshot needs
+# to fit and evaluate the estimation functions.
+_FitSettings = collections.namedtuple('_FitSettings',
+    'degree, minCount, useMonotoneInverse, inverseTableSize')
+
+
+#: A marker that can be passed to :meth:`CalibrationData.addMeasurement`
+#: as the `timestamp` of a measurement whose age is not known.
+UNKNOWN_TIME = object()
+
+
+#: A named tuple returned by :attr:`CalibrationData.diagnostics`. Its items
+#: are the :class:`~ops.calibration.fitting.FitDiagnostics` of the
+#: polynomials that estimate the heating current from the target temperature,
+#: the final temperature from the heating current, and the temperature from
+#: the temperature sensor voltage, named like the corresponding methods of
+#: :class:`CalibrationData`.
+Diagnostics = collections.namedtuple('Diagnostics',
+    'currentFromTargetTemperature, finalTemperatureFromCurrent, '
+    'temperatureFromVoltage')
+
 
 ###############################################################################
 # PERSISTENCE FUNCTIONS                                                       #
@@ -360,61 +1406,150 @@ class CalibrationData(object):
 def toXML(calibrationData):
     """
     Creates an XML document from the given :class:`CalibrationData` object
-    and returns it as a string.
+    or :class:`CalibrationSnapshot` and returns it as a string. See
+    :func:`writeXML`.
     """
-    measurements = calibrationData.measurements
+    fileObject = cStringIO.StringIO()
+    writeXML(calibrationData, fileObject)
+    return fileObject.getvalue()
 
-    implementation = xml.dom.minidom.getDOMImplementation()
 
-    document = implementation.createDocument(None, 'calibration-data', None)
-    top = document.documentElement
+def writeXML(calibrationData, fileObject):
+    """
+    Writes an XML document that contains the measurements of the given
+    :class:`CalibrationData` object or :class:`CalibrationSnapshot` to
+    `fileObject`, which can be any object with a ``write()`` method. The
+    elements are written one measurement at a time, so no document tree is
+    built in memory.
+    """
+    write = fileObject.write
+    write('<?xml version="1.0" ?><calibration-data>')
 
-    names = ('current', 'voltage', 'temperature')
+    rows = itertools.izip(calibrationData.heatingCurrentArray.tolist(),
+        calibrationData.temperatureSensorVoltageArray.tolist(),
+        calibrationData.temperatureArray.tolist(),
+        calibrationData.measurementTimeArray.tolist())
 
-    for m in measurements:
-        node = document.createElement('measurement')
-        for i in range(3):
-            child = document.createElement(names[i])
-            child.appendChild(document.createTextNode(str(m[i])))
-            node.appendChild(child)
-        top.appendChild(node)
+    for current, voltage, temperature, timestamp in rows:
+        write(_MEASUREMENT_TEMPLATE % (current, voltage, temperature))
+        if not math.isnan(timestamp):
+            write('<time>%r</time>' % timestamp)
+        write('</measurement>')
 
-    return document.toxml()
+    write('</calibration-data>')
 
 
 def fromXML(string):
     """
     Creates a :class:`CalibrationData` object from the given string, which must
-    be a valid XML document.
+    be a valid XML document. See :func:`readXML`.
 
     If an error occurs while parsing the document, the function returns
     ``None``.
     """
-    cd = CalibrationData()
+    return readXML(cStringIO.StringIO(string))
+
+
+def readXML(fileObject):
+    """
+    Creates a :class:`CalibrationData` object from the XML document read from
+    `fileObject`, which can be any object with a ``read()`` method, such as
+    an open file.
+
+    The document is parsed incrementally, and each measurement element is
+    discarded as soon as its values have been read, so apart from the
+    measurements themselves, the memory needed does not grow with the size of
+    the document.
+
+    If an error occurs while reading or parsing the document, the function
+    returns ``None``.
+    """
+    currents = []
+    voltages = []
+    temperatures = []
+    times = []
 
     try:
-        document = xml.dom.minidom.parseString(string)
-        top = document.documentElement
+        events = xml.etree.cElementTree.iterparse(
+            fileObject, events=('start', 'end'))
 
-        if top.tagName != 'calibration-data':
+        event, top = events.next()
+        if top.tag != 'calibration-data':
             return None
 
-        names = ('current', 'voltage', 'temperature')
+        for event, node in events:
+            if event != 'end' or node.tag != 'measurement':
+                continue
 
-        for node in top.getElementsByTagName('measurement'):
-            data = [None, None, None]
+            currents.append(float(node.findtext('current')))
+            voltages.append(float(node.findtext('voltage')))
+            temperatures.append(float(node.findtext('temperature')))
 
-            for i in range(3):
-                children = node.getElementsByTagName(names[i])
-                value = float(children[0].firstChild.nodeValue)
+            timestamp = node.findtext('time')
+            if timestamp is None:
+                times.append(UNKNOWN_TIME)
+            else:
+                times.append(float(timestamp))
 
-                if math.isnan(value) or math.isinf(value):
-                    return None
+            # Drop the measurements that have been read from the tree.
+            top.clear()
 
-                data[i] = value
+        values = numpy.array([currents, voltages, temperatures])
+        if not numpy.isfinite(values).all():
+            return None
+        if any(t is not UNKNOWN_TIME and not numpy.isfinite(t) for t in times):
+            return None
 
-            cd.addMeasurement(*data)
+        cd = CalibrationData()
+        cd.addMeasurements(zip(currents, voltages, temperatures, times))
+        cd.clearHistory()
     except Exception:
         return None
     else:
         return cd
+
+
+# The start of a measurement element written by writeXML, as a format string
+# for its heating current, temperature sensor voltage, and temperature.
+_MEASUREMENT_TEMPLATE = ('<measurement><current>%s</current>'
+    '<voltage>%s</voltage><temperature>%s</temperature>')
+
+
+def fromColumns(currents, voltages, temperatures, times=None):
+    """
+    Creates a :class:`CalibrationData` object whose columns are the given
+    sequences or :class:`numpy.ndarray`\s of heating currents, voltages,
+    temperatures, and measurement times (``nan`` for measurements of unknown
+    age). If `times` is omitted, all measurements are of unknown age.
+
+    The heating currents must be strictly increasing, so that the columns can
+    be used as they are: arrays of floats are made read-only, but not copied,
+    which makes this the fastest way to create calibration data from columns
+    that have been stored elsewhere, such as in a memory-mapped file. The new
+    object has no changes to undo. A :exc:`ValueError` is
+    raised if the columns have different lengths, if the heating currents are
+    not strictly increasing, or if any of the values (except for the unknown
+    measurement times) is not finite.
+    """
+    if times is None:
+        times = numpy.empty(len(currents))
+        times.fill(numpy.nan)
+
+    columns = [_createColumn(c)
+        for c in (currents, voltages, temperatures, times)]
+
+    if len(set(len(c) for c in columns)) != 1:
+        raise ValueError('the columns have different lengths')
+    if not all(numpy.isfinite(c).all() for c in columns[:3]):
+        raise ValueError('the measurements must be finite')
+    if numpy.isinf(columns[3]).any():
+        raise ValueError('the measurement times must be finite or nan')
+    if (numpy.diff(columns[0]) <= 0.0).any():
+        raise ValueError('the heating currents must be strictly increasing')
+
+    cd = CalibrationData()
+    if len(columns[0]) > 0:
+        cd._setColumns(columns)
+        cd._measurementChanged()
+        cd.clearHistory()
+    return cd
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+This module contains the :class:`PolynomialEvaluator` class, which evaluates
+the polynomials that make up the estimation functions of
+a :class:`~ops.calibration.data.CalibrationData` object.
+
+The estimation functions are called with single values several times per
+second, for example by :attr:`ops.system.ProductionSystem.temperature`. For
+polynomials of a low degree, the overhead of :meth:`numpy.poly1d.__call__`
+is far larger than the actual arithmetic, so an evaluator applies Horner's
+scheme to plain floats instead. Arrays of values are evaluated by NumPy in
+a single call.
+
+The module also contains the :class:`MonotoneInverse` class, which inverts
+the function that estimates the final temperature from the heating current,
+so that the heating current for a target temperature is always consistent
+with it.
+
+:class:`~ops.calibration.data.CalibrationData` creates a new evaluator
+whenever one of its estimation functions is refitted.
+"""
+
+import numpy
+
+
+###############################################################################
+# THE POLYNOMIAL EVALUATOR CLASS                                              #
+###############################################################################
+
+class PolynomialEvaluator(object):
+    """
+    Creates a new instance of this class, which evaluates the polynomial with
+    the given coefficients. Like those of :class:`numpy.poly1d`, the
+    coefficients are ordered from the highest power to the lowest.
+
+    Instances can be called like functions: ``evaluator(x)`` evaluates single
+    numbers with :meth:`evaluate` and anything else with
+    :meth:`evaluateArray`.
+    """
+
+    def __init__(self, coefficients):
+        self._coefficients = tuple(float(c) for c in coefficients)
+        if not self._coefficients:
+            raise ValueError('at least one coefficient is required')
+
+        self._array = numpy.array(self._coefficients)
+        self._leadingCoefficient = self._coefficients[0]
+        self._lowerCoefficients = self._coefficients[1:]
+
+
+    @property
+    def coefficients(self):
+        """
+        A tuple of the coefficients of the polynomial, from the highest power
+        to the lowest. Immutable.
+        """
+        return self._coefficients
+
+
+    @property
+    def degree(self):
+        """
+        The degree of the polynomial. Immutable.
+        """
+        return len(self._coefficients) - 1
+
+
+    def __call__(self, x):
+        """
+        Evaluates the polynomial for `x`, which may be a single number or an
+        array.
+        """
+        if isinstance(x, (float, int, long)):
+            return self.evaluate(x)
+        else:
+            return self.evaluateArray(x)
+
+
+    def evaluate(self, x):
+        """
+        Evaluates the polynomial for a single number `x`, and returns the
+        result as a float, using Horner's scheme.
+        """
+        result = self._leadingCoefficient
+        for c in self._lowerCoefficients:
+            result = result * x + c
+        return result
+
+
+    def evaluateArray(self, values):
+        """
+        Evaluates the polynomial for a sequence or :class:`numpy.ndarray` of
+        values, and returns a :class:`numpy.ndarray` of floats with the same
+        shape. The values are evaluated by a single call of
+        :func:`numpy.polyval`, which applies Horner's scheme to the whole
+        array at once.
+        """
+        return numpy.polyval(self._array, numpy.asarray(values, dtype=float))
+
+
+###############################################################################
+# THE MONOTONE INVERSE CLASS                                                  #
+###############################################################################
+
+class MonotoneInverse(object):
+    """
+    Creates a new instance of this class, which inverts a monotonically
+    increasing function on the interval [`low`, `high`]. `function` is
+    a :class:`PolynomialEvaluator`, or any object with a compatible
+    :meth:`~PolynomialEvaluator.evaluateArray` method.
+
+    The function is sampled at `size` points, and any sections in which it
+    does not increase are flattened, so that the samples describe
+    a strictly increasing function. The inverse of that function is then
+    tabulated at `size` equally spaced points, and interpolated linearly
+    between them. Outside of the range of the table, the inverse is
+    extrapolated linearly. This makes the inverse monotone, and lets it be
+    evaluated in constant time.
+
+    If the function does not increase at all on the interval, or if the
+    interval is empty, a :exc:`ValueError` is raised.
+    """
+
+    def __init__(self, function, low, high, size=257):
+        if not low < high:
+            raise ValueError('the interval is empty')
+        if size < 2:
+            raise ValueError('at least two points are required')
+
+        x = numpy.linspace(low, high, size)
+        y = function.evaluateArray(x)
+
+        # Only keep samples greater than all previous ones.
+        previousMaxima = numpy.maximum.accumulate(
+            numpy.concatenate(([-numpy.inf], y[:-1])))
+        keep = y > previousMaxima
+        x, y = x[keep], y[keep]
+
+        if len(x) < 2:
+            raise ValueError('the function does not increase')
+
+        ys = numpy.linspace(y[0], y[-1], size)
+        xs = numpy.interp(ys, y, x)
+        ys[-1], xs[-1] = y[-1], x[-1]
+
+        self._start = float(ys[0])
+        self._inverseStep = (size - 1) / float(ys[-1] - ys[0])
+        self._ys = ys
+        self._xs = xs
+        self._slopes = numpy.diff(xs) / numpy.diff(ys)
+
+        # Plain lists are faster than arrays for single values.
+        self._yList = ys.tolist()
+        self._xList = xs.tolist()
+        self._slopeList = self._slopes.tolist()
+
+
+    @property
+    def domain(self):
+        """
+        A pair of the lowest and highest value covered by the table of the
+        inverse, that is, the values of the function at the ends of the
+        interval it is inverted on. Immutable.
+        """
+        return (self._yList[0], self._yList[-1])
+
+
+    def __call__(self, y):
+        """
+        Evaluates the inverse for `y`, which may be a single number or an
+        array.
+        """
+        if isinstance(y, (float, int, long)):
+            return self.evaluate(y)
+        else:
+            return self.evaluateArray(y)
+
+
+    def evaluate(self, y):
+        """
+        Evaluates the inverse for a single number `y`, and returns the result
+        as a float.
+        """
+        k = int((y - self._start) * self._inverseStep)
+        k = min(max(k, 0), len(self._slopeList) - 1)
+        return self._xList[k] + (y - self._yList[k]) * self._slopeList[k]
+
+
+    def evaluateArray(self, values):
+        """
+        Evaluates the inverse for a sequence or :class:`numpy.ndarray` of
+        values, and returns a :class:`numpy.ndarray` of floats with the same
+        shape.
+        """
+        y = numpy.asarray(values, dtype=float)
+        k = numpy.floor((y - self._start) * self._inverseStep)
+        k = numpy.clip(k, 0, len(self._slopes) - 1).astype(int)
+        return self._xs[k] + (y - self._ys[k]) * self._slopes[k]
+
+
+    def getLimit(self, x):
+        """
+        Returns the highest value for which :meth:`evaluate` returns at
+        most `x`. This is the tabulated function itself, which agrees with
+        the inverted function at the points of the table, so that
+        ``evaluate(getLimit(x)) <= x`` holds exactly.
+        """
+        k = numpy.searchsorted(self._xs, x, side='right') - 1
+        k = min(max(k, 0), len(self._slopeList) - 1)
+        y = self._yList[k] + (x - self._xList[k]) / self._slopeList[k]
+
+        # Rounding errors may put evaluate(y) slightly above x.
+        while self.evaluate(y) > x:
+            y = numpy.nextafter(y, -numpy.inf)
+
+        return float(y)
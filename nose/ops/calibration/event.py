@@ -71,12 +71,14 @@ class CalibrationOver(Event):
     Used to indicate that a calibration procedure has just ended.
     """
 
-    def __init__(self, system, manager, status, usedCurrents, unusedCurrents):
+    def __init__(self, system, manager, status, usedCurrents, unusedCurrents,
+        report=None):
         self._system = system
         self._manager = manager
         self._status = status
         self._usedCurrents = usedCurrents
         self._unusedCurrents = unusedCurrents
+        self._report = report
 
     @property
     def calibrationIsRunning(self):
@@ -123,6 +125,14 @@ class CalibrationOver(Event):
         """
         return self._unusedCurrents
 
+    @property
+    def report(self):
+        """
+        The :class:`~ops.calibration.report.CalibrationReport` that describes
+        where the time of the calibration procedure went, or ``None``.
+        """
+        return self._report
+
 
 ###############################################################################
 # TEMPERATURE REQUESTED                                                       #
@@ -24,11 +24,13 @@ from test import *
 
 class FakeCalibrationManager(CalibrationManager):
 
-    def __init__(self, system, currents):
-        super(self.__class__, self).__init__(system, currents)
+    def __init__(self, system, currents, scheduler=None, backend=None):
+        super(self.__class__, self).__init__(
+            system, currents, scheduler, backend)
         self._ticks = 0
         self._leastSquareThread = Stub(None,
-            refreshData=fun(None), stop=fun(None))
+            refreshData=fun(None), stop=fun(None),
+            solutionsFound=0, fitLatencies=())
 
 
     def _checkHeaterPosition(self):
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+This module contains the :class:`IncrementalPolynomialFit` class, which fits
+a polynomial to a set of points by the method of least squares, and keeps
+the fit up to date as single points are added or removed.
+
+Refitting a polynomial with :func:`numpy.polyfit` takes time proportional to
+the number of points. An :class:`IncrementalPolynomialFit` instead keeps the
+Cholesky factor of the normal equations of the (scaled) Vandermonde system,
+and applies a rank-one update or downdate to it for each point that is added
+or removed, so that the cost of a change does not depend on the number of
+points. If a downdate fails, or if the factor becomes badly conditioned,
+the instance reports that it cannot be used any more, and the polynomial
+should be refitted from scratch.
+
+:class:`~ops.calibration.data.CalibrationData` uses this class to refit its
+estimation functions after small changes to its measurements.
+
+The module also contains the :func:`getFitDiagnostics` function, which
+computes the leave-one-out residuals, leverages, and influences of all points
+of a fit in a single pass, to help judge whether a point is an outlier.
+"""
+
+import collections
+import numpy
+
+
+###############################################################################
+# THE INCREMENTAL POLYNOMIAL FIT CLASS                                        #
+###############################################################################
+
+class IncrementalPolynomialFit(object):
+    """
+    Creates a new instance of this class, which fits a polynomial of the
+    given degree to the points with the coordinates `x` and `y`. At least
+    ``degree + 1`` points are needed, or a :exc:`ValueError` is raised.
+
+    To keep the fit numerically stable, the polynomial is fitted in terms of
+    ``z = (x - center) / scale``, where `center` and `scale` map the range of
+    the initial `x` coordinates onto [-1, 1]. Points added later may lie
+    outside of that range; if they make the fit badly conditioned,
+    :attr:`isUsable` becomes ``False``.
+    """
+
+    def __init__(self, x, y, degree):
+        x = numpy.asarray(x, dtype=float)
+        y = numpy.asarray(y, dtype=float)
+
+        if len(x) < degree + 1:
+            raise ValueError('at least degree + 1 points are required')
+
+        low, high = x.min(), x.max()
+        self._degree = degree
+        self._center = (low + high) / 2.0
+        self._scale = (high - low) / 2.0 if high > low else 1.0
+        self._count = len(x)
+        self._isUsable = True
+
+        # The factor L is lower triangular, with L * L.T equal to M.T * M,
+        # where M is the scaled Vandermonde matrix with y appended as its
+        # last column. The upper left part of L.T is the factor R of the
+        # normal equations, and the last column of L.T holds Q.T * y.
+        matrix = numpy.column_stack((self._getRow(x), y))
+        r = numpy.zeros((degree + 2, degree + 2))
+        qr = numpy.linalg.qr(matrix, mode='r')
+        r[:len(qr)] = qr[:degree + 2]
+        signs = numpy.where(numpy.diag(r) < 0.0, -1.0, 1.0)
+        self._factor = (r * signs[:, numpy.newaxis]).T.copy()
+
+        self._checkConditioning()
+
+
+    @property
+    def degree(self):
+        """
+        The degree of the polynomial. Immutable.
+        """
+        return self._degree
+
+
+    @property
+    def count(self):
+        """
+        The number of points the polynomial is currently fitted to.
+        Read-only.
+        """
+        return self._count
+
+
+    @property
+    def isUsable(self):
+        """
+        Indicates whether the fit can still be used. This becomes ``False``
+        when a point cannot be removed, or when the fit has become badly
+        conditioned, in which case the polynomial should be refitted from
+        scratch. Read-only.
+        """
+        return self._isUsable
+
+
+    def addPoint(self, x, y):
+        """
+        Adds the point (`x`, `y`) to the points the polynomial is fitted to.
+        """
+        self._update(x, y, 1.0)
+        self._count += 1
+
+
+    def removePoint(self, x, y):
+        """
+        Removes the point (`x`, `y`) from the points the polynomial is fitted
+        to. The point must have been added before, or the fit becomes
+        meaningless.
+        """
+        self._update(x, y, -1.0)
+        self._count -= 1
+        if self._count < self._degree + 1:
+            self._isUsable = False
+
+
+    def getPolynomial(self):
+        """
+        Returns a :class:`numpy.poly1d` with the coefficients of the fitted
+        polynomial in terms of `x`, or ``None`` if the fit is not
+        :attr:`usable <isUsable>`.
+        """
+        if not self._isUsable:
+            return None
+
+        n = self._degree + 1
+        r = self._factor[:n, :n].T
+        qty = self._factor[n, :n]
+
+        # Solve R * c = Q.T * y by back substitution.
+        c = numpy.zeros(n)
+        for k in xrange(n - 1, -1, -1):
+            c[k] = (qty[k] - numpy.dot(r[k, k + 1:], c[k + 1:])) / r[k, k]
+
+        # Substitute z = (x - center) / scale to get the coefficients in
+        # terms of x.
+        z = numpy.poly1d([1.0 / self._scale, -self._center / self._scale])
+        return numpy.polyval(c, z)
+
+
+    def _getRow(self, x):
+        """
+        Returns the row (or rows) of the scaled Vandermonde matrix for `x`.
+        """
+        z = (numpy.asarray(x, dtype=float) - self._center) / self._scale
+        return numpy.vander(numpy.atleast_1d(z), self._degree + 1)
+
+
+    def _update(self, x, y, sign):
+        """
+        Applies a rank-one update (if `sign` is 1.0) or downdate (if `sign`
+        is -1.0) for the point (`x`, `y`) to the factor.
+        """
+        if not self._isUsable:
+            return
+
+        v = numpy.append(self._getRow(x)[0], float(y))
+        factor = self._factor
+        n = len(v)
+
+        for k in xrange(n):
+            square = factor[k, k] ** 2 + sign * v[k] ** 2
+
+            if k == n - 1:
+                # The last element is the norm of the residuals, which may
+                # become slightly negative because of rounding errors.
+                factor[k, k] = numpy.sqrt(max(square, 0.0))
+                break
+            elif square <= 0.0 or factor[k, k] == 0.0:
+                self._isUsable = False
+                return
+
+            r = numpy.sqrt(square)
+            c = r / factor[k, k]
+            s = v[k] / factor[k, k]
+            factor[k, k] = r
+            factor[k + 1:, k] = (factor[k + 1:, k] + sign * s * v[k + 1:]) / c
+            v[k + 1:] = c * v[k + 1:] - s * factor[k + 1:, k]
+
+        self._checkConditioning()
+
+
+    def _checkConditioning(self):
+        """
+        Sets :attr:`isUsable` to ``False`` if the factor of the normal
+        equations is badly conditioned. The ratio of the largest to the
+        smallest diagonal element is a lower bound for its condition number.
+        """
+        n = self._degree + 1
+        diagonal = numpy.abs(numpy.diag(self._factor)[:n])
+        if diagonal.min() <= 0.0:
+            self._isUsable = False
+        elif diagonal.max() / diagonal.min() > self.maxConditionNumber:
+            self._isUsable = False
+
+
+    #: The largest acceptable estimate of the condition number of the
+    #: factor. This is a class attribute, but it can be set on an instance to
+    #: override the default value.
+    maxConditionNumber = 1e6
+
+
+###############################################################################
+# LEAVE-ONE-OUT DIAGNOSTICS                                                   #
+###############################################################################
+
+#: A named tuple that describes how well a polynomial fitted by the method of
+#: least squares agrees with each of the points it is fitted to. Its items are
+#: arrays with one value per point: `residuals`, the measured minus the fitted
+#: values; `leverages`, the diagonal elements of the hat matrix, which tell
+#: how strongly each point pulls the fit towards itself; `looResiduals`, the
+#: residuals against a polynomial fitted to all other points (leave-one-out
+#: residuals); and `cooksDistances`, Cook's distance of each point, which
+#: measures how much the fitted values change when the point is left out.
+FitDiagnostics = collections.namedtuple('FitDiagnostics',
+    'residuals, leverages, looResiduals, cooksDistances')
+
+
+def getFitDiagnostics(x, y, degree):
+    """
+    Fits a polynomial of the given degree to the points with the coordinates
+    `x` and `y`, and returns the :class:`FitDiagnostics` of all points. If
+    there are no more than ``degree + 1`` points, or if the polynomial cannot
+    be determined uniquely, ``None`` is returned.
+
+    All values are computed at once from the hat matrix ``Q * Q.T`` of the
+    scaled Vandermonde matrix, so no polynomial has to be refitted for any of
+    the points that are left out. A point with a leverage of one determines
+    the fit on its own; its leave-one-out residual and Cook's distance are
+    infinite (or ``nan``, if its residual is zero).
+    """
+    x = numpy.asarray(x, dtype=float)
+    y = numpy.asarray(y, dtype=float)
+    count, parameters = len(x), degree + 1
+
+    if count <= parameters:
+        return None
+
+    # Leverages do not change under an affine transformation of x, so the
+    # Vandermonde matrix is built from x scaled to [-1, 1] to keep it well
+    # conditioned.
+    low, high = x.min(), x.max()
+    scale = (high - low) / 2.0 if high > low else 1.0
+    z = (x - (low + high) / 2.0) / scale
+
+    q, r = numpy.linalg.qr(numpy.vander(z, parameters))
+    diagonal = numpy.abs(numpy.diag(r))
+    if diagonal.min() <= diagonal.max() * count * numpy.finfo(float).eps:
+        return None
+
+    residuals = y - numpy.dot(q, numpy.dot(q.T, y))
+    leverages = numpy.sum(q ** 2, axis=1)
+    variance = numpy.dot(residuals, residuals) / (count - parameters)
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        looResiduals = residuals / (1.0 - leverages)
+        cooksDistances = (looResiduals ** 2 * leverages
+            / (parameters * variance))
+
+    return FitDiagnostics(residuals, leverages, looResiduals, cooksDistances)
@@ -46,12 +46,37 @@ where :math:`T_0` is the temperature at the beginning of the heating stage,
 The module then estimates :math:`T_0, T_1, \\tau,` and the coefficients
 :math:`a_4, \\dots, a_0` using :func:`scipy.optimize.leastsq`.
 
+Since real heaters may have a second, slower time constant, the module can
+also fit a *double-exponential model*, which assumes that
+
+.. math::
+
+    T = T_0 + (T_1 - T_0) \\times
+        (1 - (1 - f) e^{-t/\\tau} - f e^{-t/\\tau_s}),
+
+where :math:`\\tau_s` is the slow time constant and :math:`f` is the share
+of the temperature rise that follows it. By default, both models are
+fitted to the same data, and the solution of the model with the lowest
+corrected Akaike information criterion is used (see
+:attr:`~LeastSquareThread.models`), so that the additional parameters of the
+double-exponential model are only used if they actually explain the data
+better.
+
+The models are fitted one after the other, in the same thread, so an attempt
+takes as long as the fits of all models together. Fitting them in separate
+threads would not make it finish sooner: :func:`scipy.optimize.leastsq`
+spends most of its time calling the error function, which is Python code
+and holds the global interpreter lock.
+
 The minimization is performed in a worker thread (:class:`LeastSquareThread`)
 since it may take up to half a second, and would otherwise render the
-application unresponsive.
+application unresponsive. When several production systems are calibrated
+at once, a single :class:`LeastSquareBackend` can perform the minimizations
+for all of them instead.
 """
 
 import collections
+import math
 import numpy
 import scipy.optimize
 import time
@@ -61,27 +86,38 @@ import util
 
 
 ###############################################################################
-# THE LEAST SQUARE THREAD CLASS                                               #
+# MODELS                                                                      #
+###############################################################################
+
+#: Identifies the single-exponential model, whose solutions are
+#: :class:`Solution` objects.
+MODEL_SINGLE_EXPONENTIAL = 'single-exponential'
+
+#: Identifies the double-exponential model, whose solutions are
+#: :class:`DoubleSolution` objects.
+MODEL_DOUBLE_EXPONENTIAL = 'double-exponential'
+
+
+###############################################################################
+# MINIMIZATIONS                                                               #
 ###############################################################################
 
-class LeastSquareThread(threading.Thread):
+class _Minimization(object):
     """
-    Creates a new instance of this class. `startingEstimates` must be a
-    :class:`Solution` object that is usable as the starting point of
-    the minimzation. Suitable :class:`Solution`\\s can be optained from
-    :func:`getFirstStartingEstimates` or
-    :func:`getSubsequentStartingEstimates`.
+    The state shared by :class:`LeastSquareThread` and :class:`LeastSquareJob`:
+    the data the minimization is based on, and the most recent solution.
+    `startingEstimates` must be a :class:`Solution` object that is usable as
+    the starting point of the minimization.
     """
 
     def __init__(self, startingEstimates):
-        super(self.__class__, self).__init__()
-        self.setDaemon(True)
-
         self._startingEstimates = startingEstimates
         self._data = None
         self._solution = None
 
+        self._candidates = ()
         self._solutionsFound = 0
+        self._fitLatencies = []
         self._done = False
 
 
@@ -94,31 +130,162 @@ class LeastSquareThread(threading.Thread):
         return self._solution
 
 
+    @property
+    def candidates(self):
+        """
+        A tuple that contains a :class:`Candidate` for each model in
+        :attr:`models` for which the most recent attempt found a valid
+        solution, ordered from the best to the worst model. The solution of
+        the first candidate is the :attr:`solution`. Read-only.
+        """
+        return self._candidates
+
+
     @property
     def solutionsFound(self):
         """
-        The number of solutions the thread has found so far. Read-only.
+        The number of solutions that have been found so far. Read-only.
         """
         return self._solutionsFound
 
 
-    def refreshData(self, times, voltages):
+    @property
+    def fitLatencies(self):
+        """
+        A tuple of the times the minimization attempts made so far took,
+        in seconds. Read-only.
+        """
+        return tuple(self._fitLatencies)
+
+
+    def refreshData(self, times, voltages, variances=None):
         """
         Updates the data the minimization is based on. The arguments are
         a sequences of times (measured from the start of the heating stage)
         and a sequence of the temperature sensor voltages at these times,
         which must have the same length.
 
+        If the voltages are averages of several readings (see
+        :mod:`ops.sampling`), `variances` can be a sequence of the same
+        length that contains the variances of the voltages. The residuals
+        of the voltages are then weighted by the inverse of their standard
+        deviations, so that noisy voltages have less influence on the
+        solution.
+
         This method can be safely called from the main thread. The sequences
         are copied before the method returns.
         """
         if len(times) != len(voltages):
             raise util.ApplicationError('the sequences have different lengths')
+        if variances is not None and len(variances) != len(voltages):
+            raise util.ApplicationError('the sequences have different lengths')
         if len(voltages) >= self.voltagesRequired:
             # Assigning each argument to its own instance attribute would
             # create a race condition, which might cause your computer to
             # explode. Don't do it!
-            self._data = (numpy.asarray(times), numpy.asarray(voltages))
+            self._data = (numpy.asarray(times), numpy.asarray(voltages),
+                _getWeights(variances))
+
+
+    def _findSolution(self):
+        """
+        Does the actual work.
+        """
+        data = self._data
+
+        if data != None:
+            startingTime = time.time()
+
+            candidates = []
+            for model in self.models:
+                candidate = self._findCandidate(model, data)
+                if candidate is not None:
+                    candidates.append(candidate)
+
+            self._fitLatencies.append(time.time() - startingTime)
+
+            if candidates:
+                candidates.sort(key=lambda c: c.score)
+                self._candidates = tuple(candidates)
+                self._solution = candidates[0].solution
+                self._solutionsFound += 1
+
+
+    def _findCandidate(self, model, data):
+        """
+        Fits the given model to the given data, and returns the resulting
+        :class:`Candidate`, or ``None`` if no valid solution was found.
+        """
+        # The previous solution of the same model is the best starting point.
+        # Failing that, the solution of another model or the starting
+        # estimates are converted.
+        previous = [c.solution for c in self._candidates if c.model == model]
+        if previous:
+            start = _getModelParameters(model, previous[0])
+        elif self.solution is not None:
+            start = _getModelParameters(model, self.solution)
+        else:
+            start = _getModelParameters(model, self._startingEstimates)
+
+        # ISSUE: The parameter `warning` is deprecated in favor of using
+        #        the warnings module, but that does not actually work.
+        result, status = scipy.optimize.leastsq(
+            _errorFunction, start, args=data, warning=False)
+
+        # 1, 2, 3, and 4 are magic numbers that indicate that `result`
+        # actually contains a solution, not just random garbage. Searching
+        # the Internet for "minpack lmder" should reveal the subtle and
+        # largely incomprehensible differences in meaning between these
+        # numbers.
+        if status not in (1, 2, 3, 4):
+            return None
+
+        solution = _createSolution(model, result)
+        if not isValidSolution(solution):
+            return None
+
+        residuals = _errorFunction(result, *data)
+        return Candidate(model, solution, _getScore(residuals, len(result)))
+
+
+    #: The smallest number of reported temperature sensor voltages great
+    #: enough to perform a useful estimation. If fewer voltages are
+    #: passed to :meth:`refreshData`, they are ignored.
+    #:
+    #: This is a class attribute, but it can be set on an instance to
+    #: override the default value. If the value is set too low, an
+    #: exception may be raised during minimization.
+    voltagesRequired = 12
+    # TODO: What kind of exception?
+    # TODO: Gracefully handle exceptions caused by this being too low?
+
+    #: A tuple of the models that are fitted to the data, which may contain
+    #: :data:`MODEL_SINGLE_EXPONENTIAL` and :data:`MODEL_DOUBLE_EXPONENTIAL`.
+    #: The models are fitted one after the other, so each additional model
+    #: adds the time of its fit to the time a minimization attempt takes.
+    #:
+    #: This is a class attribute, but it can be set on an instance to
+    #: override the default value.
+    models = (MODEL_SINGLE_EXPONENTIAL, MODEL_DOUBLE_EXPONENTIAL)
+
+
+###############################################################################
+# THE LEAST SQUARE THREAD CLASS                                               #
+###############################################################################
+
+class LeastSquareThread(threading.Thread, _Minimization):
+    """
+    Creates a new instance of this class. `startingEstimates` must be a
+    :class:`Solution` object that is usable as the starting point of
+    the minimzation. Suitable :class:`Solution`\\s can be optained from
+    :func:`getFirstStartingEstimates` or
+    :func:`getSubsequentStartingEstimates`.
+    """
+
+    def __init__(self, startingEstimates):
+        threading.Thread.__init__(self)
+        _Minimization.__init__(self, startingEstimates)
+        self.setDaemon(True)
 
 
     def start(self):
@@ -144,36 +311,6 @@ class LeastSquareThread(threading.Thread):
             time.sleep(self.sleepInterval)
 
 
-    def _findSolution(self):
-        """
-        Does the actual work.
-        """
-        if self.solution == None:
-            start = _flattenSolution(self._startingEstimates)
-        else:
-            start = _flattenSolution(self.solution)
-
-        if self._data != None:
-            # ISSUE: The parameter `warning` is deprecated in favor of using
-            #        the warnings module, but that does not actually work.
-            result, status = scipy.optimize.leastsq(
-                _errorFunction, start, args=self._data, warning=False)
-
-            if status in (1, 2, 3, 4):
-                # 1, 2, 3, and 4 are magic numbers that indicate that `result`
-                # actually contains a solution, not just random garbage.
-                # Searching the Internet for "minpack lmder" should reveal the
-                # subtle and largely incomprehensible differences in meaning
-                # between these numbers.
-                self._solution = Solution(
-                    startingTemperature=result[0],
-                    finalTemperature=result[1],
-                    tau=result[2],
-                    coefficients=tuple(result[3:]))
-
-                self._solutionsFound += 1
-
-
     def stop(self):
         """
         Stops the thread. It may take some time for the thread to actually
@@ -182,18 +319,6 @@ class LeastSquareThread(threading.Thread):
         self._done = True
 
 
-    #: The smallest number of reported temperature sensor voltages great
-    #: enough to perform a useful estimation. If fewer voltages are
-    #: passed to :meth:`refreshData`, they are ignored.
-    #:
-    #: This is a class attribute, but it can be set on an instance to
-    #: override the default value. If the value is set too low, an
-    #: exception may be raised during minimization.
-    voltagesRequired = 12
-    # TODO: What kind of exception?
-    # TODO: Gracefully handle exceptions caused by this being too low?
-
-
     #: The amount of time the thread sleeps after it finds a solution or fails
     #: to find one, in seconds. This is a class attribute, but it can be set
     #: on an instance to override the default value (even after :meth:`start`
@@ -201,6 +326,155 @@ class LeastSquareThread(threading.Thread):
     sleepInterval = 1.0
 
 
+###############################################################################
+# THE SHARED LEAST SQUARE BACKEND                                             #
+###############################################################################
+
+class LeastSquareBackend(object):
+    """
+    Creates a new instance of this class, which performs the minimizations
+    of several concurrent heating stages (most likely on different production
+    systems) in a single worker thread, so that calibrating several systems
+    at once does not require one thread per system.
+
+    Minimizations are represented by :class:`LeastSquareJob` objects, which
+    are created by :meth:`createJob` and can be used in place of
+    a :class:`LeastSquareThread`. The worker thread is started when the first
+    job is started, and terminates when no started jobs remain. It works on
+    each job in turn, and then sleeps for :attr:`sleepInterval` seconds.
+    """
+
+    def __init__(self):
+        self._jobs = []
+        self._lock = threading.Lock()
+        self._worker = None
+
+
+    @property
+    def jobs(self):
+        """
+        A tuple of the jobs that have been started, but not yet stopped.
+        Read-only.
+        """
+        return tuple(self._jobs)
+
+
+    @property
+    def isRunning(self):
+        """
+        Indicates whether the worker thread is running. Read-only.
+        """
+        return self._worker is not None
+
+
+    def createJob(self, startingEstimates):
+        """
+        Returns a new :class:`LeastSquareJob` that uses the instance.
+        `startingEstimates` must be a :class:`Solution` object that is usable
+        as the starting point of the minimization.
+        """
+        return LeastSquareJob(self, startingEstimates)
+
+
+    def _addJob(self, job):
+        """
+        Adds the given job to the jobs the worker thread works on, and starts
+        the worker thread if it is not running. Called by
+        :meth:`LeastSquareJob.start`.
+        """
+        with self._lock:
+            self._jobs.append(job)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run)
+                self._worker.setDaemon(True)
+                self._worker.start()
+
+
+    def _removeJob(self, job):
+        """
+        Removes the given job from the jobs the worker thread works on.
+        Called by :meth:`LeastSquareJob.stop`.
+        """
+        with self._lock:
+            if job in self._jobs:
+                self._jobs.remove(job)
+
+
+    def _run(self):
+        """
+        The main loop of the worker thread.
+        """
+        while self._findSolutions():
+            time.sleep(self.sleepInterval)
+
+
+    def _findSolutions(self):
+        """
+        Tries to find a solution for each job that has been started, and
+        returns ``True``, unless there are no such jobs, in which case the
+        worker thread is considered to be terminated and ``False`` is returned.
+        """
+        with self._lock:
+            jobs = tuple(self._jobs)
+            if not jobs:
+                self._worker = None
+                return False
+
+        for job in jobs:
+            if not job._done:
+                job._findSolution()
+
+        return True
+
+
+    #: The amount of time the worker thread sleeps after it has worked on
+    #: each job, in seconds. This is a class attribute, but it can be set on
+    #: an instance to override the default value.
+    sleepInterval = 1.0
+
+
+class LeastSquareJob(_Minimization):
+    """
+    A minimization that is performed by a :class:`LeastSquareBackend`.
+    Instances provide the same interface as :class:`LeastSquareThread`, but
+    should be created using :meth:`LeastSquareBackend.createJob` rather than
+    directly.
+    """
+
+    def __init__(self, backend, startingEstimates):
+        _Minimization.__init__(self, startingEstimates)
+        self._backend = backend
+        self._started = False
+
+
+    @property
+    def backend(self):
+        """
+        The :class:`LeastSquareBackend` that performs the minimization.
+        Immutable.
+        """
+        return self._backend
+
+
+    def start(self):
+        """
+        Starts the minimization. A job may only be started once.
+        """
+        if self._started:
+            raise util.ApplicationError('the job has already been started')
+        self._started = True
+        self._backend._addJob(self)
+
+
+    def stop(self):
+        """
+        Stops the minimization. If the backend is working on the job at the
+        moment, one last solution may be produced.
+        """
+        self._done = True
+        self._backend._removeJob(self)
+
+
 ###############################################################################
 # SOLUTION                                                                    #
 ###############################################################################
@@ -213,6 +487,84 @@ class LeastSquareThread(threading.Thread):
 Solution = collections.namedtuple('Solution',
     'startingTemperature, finalTemperature, tau, coefficients')
 
+#: A named tuple that contains the solution of a minimization that uses the
+#: double-exponential model. The items in this tuple are
+#: `startingTemperature`, `finalTemperature`, `tau`, `slowTau`,
+#: `slowFraction`, and `coefficients`, where the first five are
+#: :math:`T_0, T_1, \tau, \tau_s,` and :math:`f` as defined above, and the
+#: last is an unnamed tuple containing :math:`a_4, \dots, a_0,` in that
+#: order.
+DoubleSolution = collections.namedtuple('DoubleSolution',
+    'startingTemperature, finalTemperature, tau, slowTau, slowFraction, '
+    'coefficients')
+
+#: A named tuple that describes the result of fitting one of the models to
+#: the data. Its items are `model`, the model used; `solution`, the resulting
+#: :class:`Solution` or :class:`DoubleSolution`; and `score`, the corrected
+#: Akaike information criterion of the solution, where lower scores are
+#: better.
+Candidate = collections.namedtuple('Candidate', 'model, solution, score')
+
+
+def isValidSolution(solution):
+    """
+    Indicates whether the given :class:`Solution` or :class:`DoubleSolution`
+    describes a physically plausible heating process, that is, whether its
+    time constants are positive and the share of the slow time constant is
+    in the range [``0.0``, ``1.0``].
+    """
+    if isinstance(solution, DoubleSolution):
+        return (solution.tau > 0.0 and solution.slowTau > 0.0
+            and 0.0 <= solution.slowFraction <= 1.0)
+    else:
+        return solution.tau > 0.0
+
+
+def getTimeFromTemperature(solution, temperature):
+    """
+    Returns the time (measured from the start of the heating stage) at which
+    the heating temperature reaches the given temperature, according to the
+    given :class:`Solution` or :class:`DoubleSolution`, in seconds. The
+    temperature should lie between the starting temperature and the final
+    temperature of the solution. If it does not, ``0.0`` or infinity is
+    returned, depending on the side it lies on.
+    """
+    T0, T1 = solution.startingTemperature, solution.finalTemperature
+
+    # The remaining fraction of the temperature difference.
+    remaining = 1.0 - (temperature - T0) / (T1 - T0)
+
+    if remaining >= 1.0:
+        return 0.0
+    if remaining <= 0.0:
+        return float('inf')
+
+    if not isinstance(solution, DoubleSolution):
+        return solution.tau * -math.log(remaining)
+
+    # The remaining fraction decreases monotonically, and the time we are
+    # looking for lies between the times the fast and the slow exponential
+    # function need to decrease to it on their own.
+    taus = (solution.tau, solution.slowTau)
+    lower = min(taus) * -math.log(remaining)
+    upper = max(taus) * -math.log(remaining)
+
+    while upper - lower > timeResolution:
+        middle = (lower + upper) / 2.0
+        fraction = 1.0 - _temperaturesFromTimes(middle, 0.0, 1.0,
+            solution.tau, solution.slowTau, solution.slowFraction)
+        if fraction > remaining:
+            lower = middle
+        else:
+            upper = middle
+
+    return (lower + upper) / 2.0
+
+
+#: The precision with which :func:`getTimeFromTemperature` determines times
+#: for the double-exponential model, in seconds.
+timeResolution = 0.01
+
 
 ###############################################################################
 # STARTING ESTIMATES                                                          #
@@ -242,13 +594,14 @@ def getSubsequentStartingEstimates(
     is the solution of the minimization performed in the previous heating
     stage, and `extraCurrent` is the heating current in the new heating
     stage minus the heating current in the previous heating stage.
+
+    The returned object is of the same type as `previousSolution`, so that
+    the time constants of a :class:`DoubleSolution` are kept.
     """
     extraTemperature = extraCurrent * finalTemperatureStartingEstimateFactor
-    return Solution(
+    return previousSolution._replace(
         startingTemperature=previousTemperature,
-        finalTemperature=(previousTemperature + extraTemperature),
-        tau=previousSolution.tau,
-        coefficients=previousSolution.coefficients)
+        finalTemperature=(previousTemperature + extraTemperature))
 
 
 #: A suitable starting estimate for the starting temperature.
@@ -269,41 +622,136 @@ tauStartingEstimate = 100.0
 #: Used by :func:`getFirstStartingEstimates`
 coefficientsStartingEstimate = (0.001, -0.01, 0.1, -1.0, 0.0)
 
+#: A factor by which tau can be multiplied in order to get a suitable
+#: starting estimate for the slow time constant of the double-exponential
+#: model, if no solution of that model is available.
+slowTauStartingEstimateFactor = 10.0
+
+#: A suitable starting estimate for the share of the slow time constant of
+#: the double-exponential model, if no solution of that model is available.
+slowFractionStartingEstimate = 0.1
+
 
 def _flattenSolution(solution):
     """
-    Flattens a :class:`Solution` tuple. That is, the nested tuples
+    Flattens a :class:`Solution` or :class:`DoubleSolution` tuple. That is,
+    the nested tuples
     ``(startingTemperature, finalTemperature, tau, (a4, a3, a2, a1, a0))``
     are turned into a single tuple
     ``(startingTemperature, finalTemperature, tau, a4, a3, a2, a1, a0)``.
     """
-    return solution[0:3] + solution[3]
+    return tuple(solution[:-1]) + tuple(solution[-1])
+
+
+def _getModelParameters(model, solution):
+    """
+    Returns a flat tuple of the parameters of the given model that correspond
+    to the given :class:`Solution` or :class:`DoubleSolution`, so that a
+    solution of one model can be used as the starting point of a minimization
+    that uses another.
+    """
+    T0, T1, tau = solution[0:3]
+
+    if model == MODEL_SINGLE_EXPONENTIAL:
+        return (T0, T1, tau) + tuple(solution.coefficients)
+    elif isinstance(solution, DoubleSolution):
+        return _flattenSolution(solution)
+    else:
+        slowTau = tau * slowTauStartingEstimateFactor
+        return ((T0, T1, tau, slowTau, slowFractionStartingEstimate)
+            + tuple(solution.coefficients))
+
+
+def _createSolution(model, parameters):
+    """
+    Creates a :class:`Solution` or :class:`DoubleSolution` from a flat
+    sequence of the parameters of the given model.
+    """
+    parameters = [float(p) for p in parameters]
+    if model == MODEL_SINGLE_EXPONENTIAL:
+        return Solution(*(parameters[0:3] + [tuple(parameters[3:])]))
+    else:
+        return DoubleSolution(*(parameters[0:5] + [tuple(parameters[5:])]))
+
+
+def _getScore(residuals, parameterCount):
+    """
+    Returns the corrected Akaike information criterion of a solution with
+    the given residuals and number of parameters, or infinity if there are
+    too few residuals to compute it.
+    """
+    n = len(residuals)
+    k = parameterCount
+
+    if n - k - 1 <= 0:
+        return float('inf')
+
+    # A perfect fit would result in the logarithm of zero.
+    rss = max(numpy.sum(numpy.square(residuals)), 1e-300)
+    return n * math.log(rss / n) + 2.0 * k + 2.0 * k * (k + 1) / (n - k - 1)
 
 
 ###############################################################################
 # THE ERROR FUNCTION                                                          #
 ###############################################################################
 
-def _errorFunction(p, times, voltages):
+def _errorFunction(p, times, voltages, weights=None):
+    """
+    The error function used by the minimzation. If `weights` is not ``None``,
+    the residuals are multiplied by it.
+    """
+    residuals = voltages - _voltagesFromTimes(times, *p)
+    if weights is None:
+        return residuals
+    else:
+        return residuals * weights
+
+
+def _getWeights(variances):
     """
-    The error function used by the minimzation.
+    Returns an array of weights for the residuals of voltages with the given
+    variances, or ``None`` if `variances` is ``None`` or does not contain any
+    positive variances. The weights are proportional to the inverse of the
+    standard deviations, and the greatest weight is ``1.0``.
+
+    Variances that are not positive (most likely because the readings they
+    are based on happened to be identical) are replaced with the smallest
+    positive variance, so that no single voltage can dominate the solution.
     """
-    return voltages - _voltagesFromTimes(times, *p)
+    if variances is None:
+        return None
+
+    variances = numpy.asarray(variances, dtype=float)
+    positive = variances[variances > 0.0]
+
+    if len(positive) == 0:
+        return None
+
+    smallest = positive.min()
+    return numpy.sqrt(smallest / numpy.maximum(variances, smallest))
 
 
-def _voltagesFromTimes(times, T0, T1, tau, a4, a3, a2, a1, a0):
+def _voltagesFromTimes(times, *parameters):
     """
-    Returns the voltages at the given times, for the given parameters.
+    Returns the voltages at the given times, for the given parameters. The
+    last five parameters are the coefficients; the others are passed to
+    :func:`_temperaturesFromTimes`.
     """
-    temperatures = _temperaturesFromTimes(times, T0, T1, tau)
-    return _voltagesFromTemperatures(temperatures, a4, a3, a2, a1, a0)
+    temperatures = _temperaturesFromTimes(times, *parameters[:-5])
+    return _voltagesFromTemperatures(temperatures, *parameters[-5:])
 
 
-def _temperaturesFromTimes(times, T0, T1, tau):
+def _temperaturesFromTimes(times, T0, T1, tau, slowTau=None, slowFraction=0.0):
     """
     Returns the temperatures at the given times, for the given parameters.
+    If `slowTau` is ``None``, the single-exponential model is used.
     """
-    return T0 + (T1 - T0) * (1 - numpy.exp(-times / tau))
+    if slowTau is None:
+        return T0 + (T1 - T0) * (1 - numpy.exp(-times / tau))
+    else:
+        f = slowFraction
+        return T0 + (T1 - T0) * (1 - (1 - f) * numpy.exp(-times / tau)
+            - f * numpy.exp(-times / slowTau))
 
 
 def _voltagesFromTemperatures(temperatures, a4, a3, a2, a1, a0):
@@ -0,0 +1,453 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This module contains the :class:`CalibrationLibrary` class, which keeps an
+index of the calibration data files in a directory, so that the calibration
+data of a system can be found without reading every file.
+
+A library directory contains a subdirectory for each system, named like the
+system's identifier, which holds the calibration data files of that system,
+in the XML format of :mod:`ops.calibration.data` or in the binary format of
+:mod:`ops.calibration.binary`. Files directly in the library directory
+belong to the system with the empty identifier. For example::
+
+    library/
+        station-1/
+            2010-03-01.cal
+            2010-04-12.calb
+        station-2/
+            2010-04-02.cal
+
+The index is stored in the library directory, in a file named
+:data:`INDEX_FILE_NAME`. When the library is scanned, only files that are
+not in the index, or that have been modified since they were indexed, are
+read.
+"""
+
+import collections
+import numpy
+import os
+import xml.etree.cElementTree
+
+import ops.calibration.binary
+import ops.calibration.data
+import util
+
+
+#: The name of the file, in the library directory, that holds the index.
+INDEX_FILE_NAME = '.calindex'
+
+#: The extensions of the files that are added to the index.
+FILE_EXTENSIONS = ('.cal', '.calb')
+
+# The version of the index format. Indexes of other versions are discarded.
+_INDEX_VERSION = '1'
+
+
+###############################################################################
+# ENTRIES                                                                     #
+###############################################################################
+
+#: A named tuple that describes a calibration data file in the index of
+#: a :class:`CalibrationLibrary`. Its items are `fileName`, the name of the
+#: file relative to the library directory; `system`, the identifier of the
+#: system it belongs to; `date`, the time the most recent measurement was
+#: taken, or, if that is not known, the time the file was last modified, in
+#: seconds since the epoch; `measurementCount`, the number of measurements;
+#: `minCurrent` and `maxCurrent`, the range of the heating currents (in mA),
+#: or ``None`` if there are no measurements; `coefficients`, the
+#: :class:`FitCoefficients` of the estimation functions, or ``None`` if the
+#: calibration data is not complete; and `modificationTime` and `fileSize`,
+#: which tell whether the file has changed since it was indexed.
+LibraryEntry = collections.namedtuple('LibraryEntry',
+    'fileName, system, date, measurementCount, minCurrent, maxCurrent, '
+    'coefficients, modificationTime, fileSize')
+
+#: A named tuple of the coefficients of the polynomials that estimate the
+#: heating current from the target temperature, the final temperature from
+#: the heating current, and the temperature from the temperature sensor
+#: voltage, named like the corresponding properties of
+#: :class:`~ops.calibration.data.CalibrationData`. Like those of
+#: :class:`numpy.poly1d`, the coefficients are ordered from the highest power
+#: to the lowest.
+FitCoefficients = collections.namedtuple('FitCoefficients',
+    'currentFromTargetTemperature, finalTemperatureFromCurrent, '
+    'temperatureFromVoltage')
+
+
+def getQuality(entry):
+    """
+    Returns a value that orders the given :class:`LibraryEntry` objects by
+    quality, as used by :meth:`CalibrationLibrary.getBest`: complete
+    calibration data is better than incomplete data, more measurements are
+    better than fewer, and of two otherwise equal files, the more recent one
+    is better.
+    """
+    return (entry.coefficients is not None, entry.measurementCount,
+        entry.date)
+
+
+###############################################################################
+# THE CALIBRATION LIBRARY CLASS                                               #
+###############################################################################
+
+class CalibrationLibrary(object):
+    """
+    Creates a new instance of this class for the given library directory.
+    The index is loaded from the directory, if it exists, and the directory
+    is scanned with :meth:`scan`.
+    """
+
+    def __init__(self, directory):
+        self._directory = directory
+        self._entries, self._unreadableFiles = self._readIndex()
+        self.scan()
+
+
+    @property
+    def directory(self):
+        """
+        The library directory. Immutable.
+        """
+        return self._directory
+
+
+    @property
+    def entries(self):
+        """
+        A tuple of the :class:`LibraryEntry` objects of all files in the
+        index, sorted by file name. Read-only.
+        """
+        return tuple(self._entries[name] for name in sorted(self._entries))
+
+
+    @property
+    def systems(self):
+        """
+        A sorted tuple of the identifiers of the systems that have at least
+        one calibration data file in the library. Read-only.
+        """
+        return tuple(sorted(set(e.system for e in self._entries.itervalues())))
+
+
+    ###########################################################################
+    # LOOKUP                                                                  #
+    ###########################################################################
+
+    def getEntries(self, system):
+        """
+        Returns a tuple of the :class:`LibraryEntry` objects of the files of
+        the given system, sorted by date.
+        """
+        entries = [e for e in self._entries.itervalues() if e.system == system]
+        return tuple(sorted(entries, key=lambda e: (e.date, e.fileName)))
+
+
+    def getLatest(self, system):
+        """
+        Returns the :class:`LibraryEntry` of the most recent file of the given
+        system, or ``None`` if the system has no files in the library.
+        """
+        entries = self.getEntries(system)
+        if entries:
+            return entries[-1]
+        else:
+            return None
+
+
+    def getBest(self, system, key=getQuality):
+        """
+        Returns the :class:`LibraryEntry` of the best file of the given
+        system, or ``None`` if the system has no files in the library. The
+        quality of the files is compared using the values `key` returns for
+        their entries; by default, :func:`getQuality` is used.
+        """
+        entries = self.getEntries(system)
+        if entries:
+            return max(entries, key=key)
+        else:
+            return None
+
+
+    def load(self, entry):
+        """
+        Loads the calibration data file described by the given
+        :class:`LibraryEntry`, and returns the resulting
+        :class:`~ops.calibration.data.CalibrationData` object, with its
+        :attr:`~ops.calibration.data.CalibrationData.fileName` set. Binary
+        files are memory-mapped with :func:`ops.calibration.binary.mapFile`;
+        XML files are parsed incrementally with
+        :func:`ops.calibration.data.readXML`.
+
+        A memory-mapped object can be saved back to its
+        :attr:`~ops.calibration.data.CalibrationData.fileName`, since files
+        are saved with :func:`util.writeAtomically`, which doesn't change the
+        mapped file. Writing to the file in place would invalidate the map.
+
+        If the file cannot be read or parsed, ``None`` is returned.
+        """
+        path = os.path.join(self._directory, entry.fileName)
+        calibrationData = _readFile(path)
+        if calibrationData is not None:
+            calibrationData.fileName = path
+        return calibrationData
+
+
+    ###########################################################################
+    # INDEXING                                                                #
+    ###########################################################################
+
+    def scan(self):
+        """
+        Updates the index: files that are not in the index, or whose size or
+        modification time has changed, are read and added to it, and files
+        that no longer exist are removed from it. Files that cannot be read
+        or parsed have no entries, but are remembered as well, so that they
+        are not read again until they change. If the index has changed, it is
+        saved to the library directory; if that fails, for example because
+        the directory is read-only, the index is only kept in memory.
+
+        Returns the number of files that were read.
+        """
+        entries = {}
+        unreadableFiles = {}
+        readCount = 0
+
+        for fileName in self._findFiles():
+            path = os.path.join(self._directory, fileName)
+            try:
+                status = os.stat(path)
+            except OSError:
+                continue
+
+            version = (status.st_mtime, status.st_size)
+            entry = self._entries.get(fileName)
+
+            if entry is not None and \
+                    (entry.modificationTime, entry.fileSize) == version:
+                entries[fileName] = entry
+            elif self._unreadableFiles.get(fileName) == version:
+                unreadableFiles[fileName] = version
+            else:
+                readCount += 1
+                entry = _createEntry(fileName, path, status)
+                if entry is not None:
+                    entries[fileName] = entry
+                else:
+                    unreadableFiles[fileName] = version
+
+        if (entries, unreadableFiles) != \
+                (self._entries, self._unreadableFiles):
+            self._entries = entries
+            self._unreadableFiles = unreadableFiles
+            self._writeIndex()
+
+        return readCount
+
+
+    def _findFiles(self):
+        """
+        Returns a list of the names of the calibration data files in the
+        library directory and its subdirectories, relative to the library
+        directory.
+        """
+        fileNames = []
+        for path, directoryNames, names in os.walk(self._directory):
+            for name in names:
+                if os.path.splitext(name)[1] in FILE_EXTENSIONS:
+                    fileNames.append(os.path.relpath(
+                        os.path.join(path, name), self._directory))
+        return fileNames
+
+
+    def _readIndex(self):
+        """
+        Reads the index from the library directory. Returns a dictionary
+        that maps file names to :class:`LibraryEntry` objects, and
+        a dictionary that maps the names of unreadable files to their
+        modification times and sizes. If there is no index, or if it cannot
+        be parsed, both dictionaries are empty.
+        """
+        try:
+            top = xml.etree.cElementTree.parse(
+                os.path.join(self._directory, INDEX_FILE_NAME)).getroot()
+            if top.tag != 'calibration-library' or \
+                    top.get('version') != _INDEX_VERSION:
+                return {}, {}
+
+            entries = {}
+            for node in top.findall('entry'):
+                entry = _entryFromElement(node)
+                entries[entry.fileName] = entry
+
+            unreadableFiles = {}
+            for node in top.findall('unreadable'):
+                unreadableFiles[node.get('file')] = \
+                    (float(node.get('modified')), int(node.get('size')))
+
+            return entries, unreadableFiles
+        except Exception:
+            return {}, {}
+
+
+    def _writeIndex(self):
+        """
+        Writes the index to the library directory. Errors are ignored.
+        """
+        top = xml.etree.cElementTree.Element('calibration-library',
+            version=_INDEX_VERSION)
+        for entry in self.entries:
+            top.append(_elementFromEntry(entry))
+        for fileName, (modificationTime, fileSize) in \
+                sorted(self._unreadableFiles.items()):
+            xml.etree.cElementTree.SubElement(top, 'unreadable',
+                file=fileName, modified=repr(modificationTime),
+                size=str(fileSize))
+
+        # The index is replaced atomically, so that a crash while writing it
+        # cannot leave a truncated index behind.
+        try:
+            util.writeAtomically(
+                os.path.join(self._directory, INDEX_FILE_NAME),
+                xml.etree.cElementTree.ElementTree(top).write)
+        except (IOError, OSError):
+            pass
+
+
+###############################################################################
+# PRIVATE FUNCTIONS                                                           #
+###############################################################################
+
+def _readFile(path):
+    """
+    Reads the calibration data file with the given path, in either format,
+    and returns the resulting
+    :class:`~ops.calibration.data.CalibrationData` object, or ``None`` if
+    the file cannot be read or parsed.
+    """
+    try:
+        with open(path, 'rb') as dataFile:
+            if ops.calibration.binary.isBinary(dataFile.read(
+                    len(ops.calibration.binary.MAGIC))):
+                return ops.calibration.binary.mapFile(path)
+            dataFile.seek(0)
+            return ops.calibration.data.readXML(dataFile)
+    except (IOError, OSError):
+        return None
+
+
+def _createEntry(fileName, path, status):
+    """
+    Reads the calibration data file with the given name and path, and
+    returns its :class:`LibraryEntry`, or ``None`` if it cannot be read or
+    parsed. `status` is the result of :func:`os.stat` for the file.
+    """
+    calibrationData = _readFile(path)
+    if calibrationData is None:
+        return None
+
+    currents = calibrationData.heatingCurrentArray
+    times = calibrationData.measurementTimeArray
+    times = times[~numpy.isnan(times)]
+
+    if len(times) > 0:
+        date = float(times.max())
+    else:
+        date = status.st_mtime
+
+    if len(currents) > 0:
+        minCurrent, maxCurrent = float(currents[0]), float(currents[-1])
+    else:
+        minCurrent = maxCurrent = None
+
+    if calibrationData.isComplete:
+        coefficients = FitCoefficients(*(
+            tuple(getattr(calibrationData, name + 'Coefficients'))
+            for name in FitCoefficients._fields))
+    else:
+        coefficients = None
+
+    return LibraryEntry(
+        fileName=fileName,
+        system=os.path.dirname(fileName),
+        date=date,
+        measurementCount=len(currents),
+        minCurrent=minCurrent,
+        maxCurrent=maxCurrent,
+        coefficients=coefficients,
+        modificationTime=status.st_mtime,
+        fileSize=status.st_size)
+
+
+def _elementFromEntry(entry):
+    """
+    Returns an element of the index that describes the given
+    :class:`LibraryEntry`.
+    """
+    node = xml.etree.cElementTree.Element('entry',
+        file=entry.fileName,
+        system=entry.system,
+        date=repr(entry.date),
+        count=str(entry.measurementCount),
+        modified=repr(entry.modificationTime),
+        size=str(entry.fileSize))
+
+    if entry.minCurrent is not None:
+        node.set('min-current', repr(entry.minCurrent))
+        node.set('max-current', repr(entry.maxCurrent))
+
+    if entry.coefficients is not None:
+        for name, coefficients in zip(entry.coefficients._fields,
+                entry.coefficients):
+            child = xml.etree.cElementTree.SubElement(node, 'coefficients',
+                function=name)
+            child.text = ' '.join(repr(c) for c in coefficients)
+
+    return node
+
+
+def _entryFromElement(node):
+    """
+    Returns the :class:`LibraryEntry` described by the given element of the
+    index.
+    """
+    coefficients = None
+    children = node.findall('coefficients')
+    if children:
+        values = dict((child.get('function'),
+            tuple(float(c) for c in child.text.split()))
+            for child in children)
+        coefficients = FitCoefficients(
+            *(values[name] for name in FitCoefficients._fields))
+
+    minCurrent = node.get('min-current')
+    maxCurrent = node.get('max-current')
+
+    return LibraryEntry(
+        fileName=node.get('file'),
+        system=node.get('system'),
+        date=float(node.get('date')),
+        measurementCount=int(node.get('count')),
+        minCurrent=minCurrent and float(minCurrent),
+        maxCurrent=maxCurrent and float(maxCurrent),
+        coefficients=coefficients,
+        modificationTime=float(node.get('modified')),
+        fileSize=int(node.get('size')))
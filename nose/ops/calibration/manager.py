@@ -57,6 +57,13 @@ current, but data for heating currents that are not used during the ongoing
 calibration are retained, so that the calibration of a system can be refined
 with subsequent calibration procedures.
 
+By default, the temperature sensor voltage is read once per tick during
+heating stages. Since sensor noise slows down the minimization, the
+calibration manager's :attr:`~CalibrationManager.samplingMode` can be set to
+read the voltage several times per tick instead (see :mod:`ops.sampling`).
+The variances of the averaged voltages are passed to the minimization along
+with the voltages themselves.
+
 The calibration data object uses the data to fit a number of *estimation
 functions*, which are used to estimate the :term:`heating temperature`
 that corresponds to a given :term:`temperature sensor voltage`, and the
@@ -74,21 +81,47 @@ information to the user.
 
 The calibration procedure may end prematurely if it is aborted by a client,
 or if the production system's :term:`safe mode` is triggered. The data that
-have already been collected are used nevertheless.
+have already been collected are used nevertheless, unless the calibration
+manager's :attr:`~CalibrationManager.restoreOnAbort` is set; then, an aborted
+procedure restores a :class:`~ops.calibration.data.CalibrationSnapshot` of the
+measurements taken when it was started.
+
+When the calibration procedure ends, the calibration manager creates
+a :class:`~ops.calibration.report.CalibrationReport` that shows how much time
+was spent on each part of the procedure.
 """
 
 # NOTE: Some of this information is duplicated in the glossary.
 
 import collections
-import math
-import time
+import numpy
 
 from ops.calibration.leastsquare import *
 from ops.calibration.event import *
+from ops.calibration.report import ReportRecorder
+from util import monotonicTime
 
+import ops.sampling
 import util
 
 
+###############################################################################
+# SAMPLING MODES                                                              #
+###############################################################################
+
+#: Indicates that the temperature sensor voltage is read once per tick.
+SAMPLING_SINGLE = 0
+
+#: Indicates that the temperature sensor voltage is read several times in
+#: quick succession each tick, using a :class:`~ops.sampling.BurstSampler`.
+SAMPLING_BURST = 1
+
+#: Indicates that the temperature sensor voltage is read continuously by
+#: a :class:`~ops.sampling.BackgroundSampler`, and the readings taken since
+#: the previous tick are combined each tick.
+SAMPLING_BACKGROUND = 2
+
+
 ###############################################################################
 # THE CALIBRATION MANAGER CLASS                                               #
 ###############################################################################
@@ -103,10 +136,17 @@ class CalibrationManager(object):
     :attr:`~ops.system.ProductionSystem.maxHeatingCurrent` are skipped
     during calibration. In that case, the calibration procedure's exit
     status will be :data:`STATUS_INVALID_CURRENT`.
+
+    `scheduler` and `backend` are used to set :attr:`scheduler` and
+    :attr:`backend`. They allow several calibration managers to share
+    a single timeout and a single minimization thread (see
+    :mod:`ops.calibration.orchestrator`).
     """
 
-    def __init__(self, system, currents):
+    def __init__(self, system, currents, scheduler=None, backend=None):
         self._system = system
+        self._scheduler = scheduler
+        self._backend = backend
 
         # Currents that exceed maxHeatingCurrent are kept just in case that
         # maxHeatingCurrent is increased during the calibration procedure.
@@ -115,6 +155,15 @@ class CalibrationManager(object):
         self._state = STATE_NOT_YET_STARTED
         self._heatingStageIndex = -1
 
+        self._sampler = None
+        self._initialSnapshot = None
+        self._times = []
+        self._voltages = []
+        self._variances = []
+
+        self._recorder = ReportRecorder()
+        self._report = None
+
 
     @property
     def system(self):
@@ -134,6 +183,53 @@ class CalibrationManager(object):
         return self._currents
 
 
+    @property
+    def scheduler(self):
+        """
+        The object the instance uses to have its *tick method* called
+        periodically, or ``None`` if the :attr:`system`'s
+        :attr:`~ops.system.ProductionSystem.mediator` is used. Must provide
+        an ``addTimeout`` method that is compatible with that of
+        :class:`~gui.mediator.Mediator`, like
+        a :class:`~ops.calibration.orchestrator.TickScheduler` does.
+        Immutable.
+        """
+        return self._scheduler
+
+
+    @property
+    def backend(self):
+        """
+        The :class:`~ops.calibration.leastsquare.LeastSquareBackend` that
+        performs the minimizations during the heating stages, or ``None``
+        if each heating stage uses its own
+        :class:`~ops.calibration.leastsquare.LeastSquareThread`. Immutable.
+        """
+        return self._backend
+
+
+    @property
+    def report(self):
+        """
+        The :class:`~ops.calibration.report.CalibrationReport` of the
+        calibration procedure, or ``None`` if the procedure has not yet ended.
+        Read-only.
+        """
+        return self._report
+
+
+    @property
+    def jitterStatistics(self):
+        """
+        A :class:`~ops.calibration.report.JitterStatistics` object that
+        describes how regularly the instance's *tick method* has been called
+        so far, or ``None`` if it has been called less than twice. Large
+        values indicate that the main loop is too busy to check on the
+        calibration procedure in time. Read-only.
+        """
+        return self._recorder.getJitterStatistics()
+
+
     @property
     def isRunning(self):
         """
@@ -168,8 +264,14 @@ class CalibrationManager(object):
             raise util.ApplicationError(message)
 
         self.system.lock(key=self)
+        self._initialSnapshot = self.system.calibrationData.takeSnapshot()
+        self._recorder.noteStart()
         self.system.mediator.noteEvent(CalibrationStarted(self.system, self))
-        self.system.mediator.addTimeout(self.tickInterval, self._tick)
+
+        if self.scheduler is None:
+            self.system.mediator.addTimeout(self.tickInterval, self._tick)
+        else:
+            self.scheduler.addTimeout(self.tickInterval, self._tick)
 
         if self.hasMoreHeatingStages:
             self._startHeaterMovement()
@@ -180,7 +282,7 @@ class CalibrationManager(object):
     def abortCalibration(self):
         """
         Aborts the calibration procedure. The data that have already been
-        collected are still used.
+        collected are still used, unless :attr:`restoreOnAbort` is set.
         """
         if self.isRunning:
             self._done(STATUS_ABORTED)
@@ -196,8 +298,11 @@ class CalibrationManager(object):
         """
         if self.state == STATE_HEATING:
             self._leastSquareThread.stop()
+            self._stopSampler()
+            self._recorder.noteHeatingStageOver(self._leastSquareThread)
 
         if self.state == STATE_WAITING_FOR_TEMPERATURE:
+            self._recorder.noteTemperatureReported()
             self._sendTemperatureRequestOverEvent()
 
         self._state = STATE_DONE
@@ -211,8 +316,14 @@ class CalibrationManager(object):
         usedCurrents = self.currents[:stagesFinished]
         unusedCurrents = self.currents[stagesFinished:]
 
-        self.system.mediator.noteEvent(CalibrationOver(
-            self.system, self, status, usedCurrents, unusedCurrents))
+        if status == STATUS_ABORTED and self.restoreOnAbort:
+            self.system.calibrationData.restoreSnapshot(self._initialSnapshot)
+
+        self._report = self._recorder.createReport(status)
+        self.system.calibrationData.report = self._report
+
+        self.system.mediator.noteEvent(CalibrationOver(self.system, self,
+            status, usedCurrents, unusedCurrents, self._report))
 
 
     def _getNumberOfFinishedHeatingStages(self, status):
@@ -227,6 +338,16 @@ class CalibrationManager(object):
             return max(0, self.heatingStageIndex)
 
 
+    #: Indicates whether the measurements taken during a calibration
+    #: procedure that is aborted are discarded, by restoring a snapshot of the
+    #: calibration data taken when the procedure was started. Restoring the
+    #: snapshot can be undone with
+    #: :meth:`~ops.calibration.data.CalibrationData.undo`. This is a class
+    #: attribute, but it can be set on an instance to override the default
+    #: value.
+    restoreOnAbort = False
+
+
     ###########################################################################
     # TICK                                                                    #
     ###########################################################################
@@ -245,8 +366,11 @@ class CalibrationManager(object):
         *tick method* associated with the current state, if any.
 
         Called periodically by the :attr:`system`'s
-        :attr:`~ops.system.ProductionSystem.mediator`.
+        :attr:`~ops.system.ProductionSystem.mediator`, or by the
+        :attr:`scheduler`.
         """
+        self._recorder.noteTick(self.tickInterval)
+
         if self.system.isInSafeMode:
             self._done(STATUS_SAFE_MODE_TRIGGERED)
         elif self.state == STATE_MOVING_HEATER:
@@ -271,6 +395,7 @@ class CalibrationManager(object):
         """
         self._state = STATE_MOVING_HEATER
         self._initialHeaterPosition = self.system.heaterPosition
+        self._recorder.noteHeaterMovementStarted()
         self.system.startHeaterMovement(1.0, key=self)
 
 
@@ -317,6 +442,35 @@ class CalibrationManager(object):
         return self._heatingStageIndex
 
 
+    @property
+    def heatingStageTrace(self):
+        """
+        A tuple of two :class:`numpy.ndarray`\s of the times (in seconds since
+        the start of the stage) and the temperature sensor voltages recorded
+        during the ongoing heating stage, or during the most recent one if
+        no heating stage is ongoing. Both arrays are empty if the procedure
+        hasn't yet reached the first heating stage. Read-only.
+        """
+        return (numpy.array(self._times, dtype=float),
+            numpy.array(self._voltages, dtype=float))
+
+
+    @property
+    def heatingStageSolution(self):
+        """
+        The most recent solution of the minimization of the ongoing heating
+        stage, or of the most recent one if no heating stage is ongoing, as
+        a :class:`~ops.calibration.leastsquare.Solution` or
+        :class:`~ops.calibration.leastsquare.DoubleSolution` object, or
+        ``None`` if no solution has been found. Read-only.
+        """
+        thread = getattr(self, '_leastSquareThread', None)
+        if thread is None:
+            return None
+        else:
+            return thread.solution
+
+
     def _explainNoMoreHeatingStages(self):
         """
         Can be called when there are no valid heating currents remaining to
@@ -369,27 +523,31 @@ class CalibrationManager(object):
 
         self._state = STATE_HEATING
         self._heatingStageIndex += 1
-        self._stageStartingTime = time.time()
+        self._stageStartingTime = monotonicTime()
 
         if self.heatingStageIndex == 0:
             self._totalPreviousStageTime = 0.0
 
         self._times = []
         self._voltages = []
+        self._variances = []
 
+        self._startSampler()
         self._startLeastSquareThread(previousTemperature)
 
         current = self.currents[self.heatingStageIndex]
+        self._recorder.noteHeatingStageStarted(current)
         self.system.startHeatingWithCurrent(current, key=self)
 
 
     def _startLeastSquareThread(self, previousTemperature=None):
         """
-        Starts a new :class:`~ops.calibration.leastsquare.LeastSquareThread`.
-        If there was a heating stage before the one that is just being started,
-        the results of the minization performed in that heating stage and the
-        user's temperature measurement are used as part of the starting
-        estimation for the minization.
+        Starts a new :class:`~ops.calibration.leastsquare.LeastSquareThread`,
+        or a new :class:`~ops.calibration.leastsquare.LeastSquareJob` if the
+        instance has a :attr:`backend`. If there was a heating stage before
+        the one that is just being started, the results of the minization
+        performed in that heating stage and the user's temperature measurement
+        are used as part of the starting estimation for the minization.
         """
         stage = self.heatingStageIndex
 
@@ -403,7 +561,11 @@ class CalibrationManager(object):
                 self._leastSquareThread.solution,
                 self.currents[stage] - self.currents[stage - 1])
 
-        self._leastSquareThread = LeastSquareThread(est)
+        if self.backend is None:
+            self._leastSquareThread = LeastSquareThread(est)
+        else:
+            self._leastSquareThread = self.backend.createJob(est)
+
         self._leastSquareThread.start()
 
 
@@ -412,18 +574,73 @@ class CalibrationManager(object):
         A *tick method* that requests a heating temperature measurement if
         :meth:`getProgress` returns ``1.0``.
         """
-        self._times.append(time.time() - self._stageStartingTime)
-        self._voltages.append(self.system.temperatureSensorVoltage)
+        if self._sampler is None:
+            # The sample is timestamped right after the voltage has been
+            # read, using a monotonic clock, so that its time is not affected
+            # by work done before the read or by changes to the system time.
+            voltage = self.system.temperatureSensorVoltage
+            self._times.append(monotonicTime() - self._stageStartingTime)
+            self._voltages.append(voltage)
+            variances = None
+        else:
+            sample = self._sampler.read()
+            self._times.append(sample.time - self._stageStartingTime)
+            self._voltages.append(sample.value)
+            self._variances.append(sample.variance)
+            variances = self._variances
 
         if self.getProgress() < 1.0:
             t, u = self._times, self._voltages
-            self._leastSquareThread.refreshData(times=t, voltages=u)
+            self._leastSquareThread.refreshData(
+                times=t, voltages=u, variances=variances)
         else:
             self._totalPreviousStageTime += self._times[-1]
             self._leastSquareThread.stop()
+            self._stopSampler()
+            self._recorder.noteHeatingStageOver(self._leastSquareThread)
             self._sendTemperatureRequest()
 
 
+    ###########################################################################
+    # SAMPLING                                                                #
+    ###########################################################################
+
+    #: Determines how the temperature sensor voltage is sampled during
+    #: heating stages. Must be one of :data:`SAMPLING_SINGLE`,
+    #: :data:`SAMPLING_BURST`, and :data:`SAMPLING_BACKGROUND`. This is
+    #: a class attribute, but it can be set on an instance before
+    #: :meth:`startCalibration` is called to override the default value.
+    samplingMode = SAMPLING_SINGLE
+
+
+    def _startSampler(self):
+        """
+        Creates the sampler used during a heating stage, as required by
+        :attr:`samplingMode`, and starts it if necessary. If the voltage is
+        sampled once per tick, no sampler is needed.
+        """
+        # The system serializes all accesses to the device, so the worker
+        # thread of a BackgroundSampler may read through it as well.
+        readFunction = lambda: self.system.temperatureSensorVoltage
+
+        if self.samplingMode == SAMPLING_BURST:
+            self._sampler = ops.sampling.BurstSampler(readFunction)
+        elif self.samplingMode == SAMPLING_BACKGROUND:
+            self._sampler = ops.sampling.BackgroundSampler(readFunction)
+            self._sampler.start()
+        else:
+            self._sampler = None
+
+
+    def _stopSampler(self):
+        """
+        Stops the sampler used during the ongoing heating stage, if it is
+        a :class:`~ops.sampling.BackgroundSampler`.
+        """
+        if isinstance(self._sampler, ops.sampling.BackgroundSampler):
+            self._sampler.stop()
+
+
     ###########################################################################
     # PROGRESS ESTIMATION                                                     #
     ###########################################################################
@@ -456,11 +673,7 @@ class CalibrationManager(object):
             if solution == None:
                 return 0.0
             else:
-                return self._getHeatingProgress(
-                    solution.startingTemperature,
-                    solution.finalTemperature,
-                    solution.tau,
-                    self._times[-1])
+                return self._getHeatingProgress(solution, self._times[-1])
 
         if self.state in (STATE_WAITING_FOR_TEMPERATURE, STATE_DONE):
             return 1.0
@@ -478,12 +691,16 @@ class CalibrationManager(object):
             return (position - initialPosition) / (1.0 - initialPosition)
 
 
-    def _getHeatingProgress(self, t0, t1, tau, timePassed):
+    def _getHeatingProgress(self, solution, timePassed):
         """
         Estimates what fraction of the time required to finish the ongoing
-        heating stage has already passed, given the starting temperature,
-        final temperature, tau, and time already spent heating.
+        heating stage has already passed, given the
+        :class:`~ops.calibration.leastsquare.Solution` or
+        :class:`~ops.calibration.leastsquare.DoubleSolution` of the
+        minimization, and the time already spent heating.
         """
+        t0, t1 = solution.startingTemperature, solution.finalTemperature
+
         if t1 > t0:
             tt = t1 - self.precision
         elif t1 < t0:
@@ -491,7 +708,13 @@ class CalibrationManager(object):
         else:
             return 1.0
 
-        timeRequired = tau * -math.log(1 - (tt - t0) / (t1 - t0))
+        timeRequired = getTimeFromTemperature(solution, tt)
+
+        # If the temperature has been within the precision of the final
+        # temperature from the start, the heating stage is already finished.
+        if timeRequired <= 0.0:
+            return 1.0
+
         progress = timePassed / timeRequired
 
         # If timePassed exceeds the time that is actually required to finish
@@ -600,6 +823,7 @@ class CalibrationManager(object):
         i = self.system.heatingCurrent
         u = self.system.temperatureSensorVoltage
         self.system.calibrationData.addMeasurement(i, u, temperature)
+        self._recorder.noteTemperatureReported()
 
         if self.hasMoreHeatingStages:
             self._sendTemperatureRequestOverEvent()
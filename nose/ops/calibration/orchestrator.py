@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This module contains the :class:`CalibrationOrchestrator` class, which runs
+the :term:`calibration procedures <calibration procedure>` of several
+:class:`~ops.system.ProductionSystem`\\s at the same time, from a single
+process.
+
+Each calibration procedure is still run by its own
+:class:`~ops.calibration.manager.CalibrationManager`, but the calibration
+managers share
+
+* a single :class:`TickScheduler`, so that the mediator only needs to call
+  one timeout no matter how many systems are being calibrated, and
+* a single :class:`~ops.calibration.leastsquare.LeastSquareBackend`, so that
+  the minimizations of all ongoing heating stages are performed by a single
+  worker thread.
+
+The orchestrator also provides a single place to collect the progress of all
+calibration procedures (:meth:`~CalibrationOrchestrator.getProgress`) and
+their exit status (:meth:`~CalibrationOrchestrator.getLastStatus`).
+
+All systems used with an orchestrator must share the orchestrator's mediator.
+They can wrap real :class:`~ops.interface.DeviceInterface`\\s, or
+:class:`~ops.simulation.SimulatedDeviceInterface`\\s for testing.
+"""
+
+import collections
+
+from ops.calibration.event import *
+from ops.calibration.leastsquare import LeastSquareBackend
+
+import ops.error
+import util
+
+
+###############################################################################
+# THE CALIBRATION ORCHESTRATOR CLASS                                          #
+###############################################################################
+
+class CalibrationOrchestrator(object):
+    """
+    Creates a new instance of this class. `mediator` is used to set
+    :attr:`mediator`. The systems in `systems` are added to the instance
+    using :meth:`addSystem`.
+    """
+
+    def __init__(self, mediator, systems=()):
+        self._mediator = mediator
+        self._scheduler = TickScheduler(mediator)
+        self._backend = LeastSquareBackend()
+        self._systems = []
+        self._lastStatuses = {}
+
+        for system in systems:
+            self.addSystem(system)
+
+        mediator.addListener(self._calibrationOverListener, CalibrationOver)
+
+
+    @property
+    def mediator(self):
+        """
+        The :class:`~gui.mediator.Mediator` shared by the instance and its
+        systems, or an object that provides a compatible interface. Immutable.
+        """
+        return self._mediator
+
+
+    @property
+    def scheduler(self):
+        """
+        The :class:`TickScheduler` shared by the calibration managers the
+        instance creates. Immutable.
+        """
+        return self._scheduler
+
+
+    @property
+    def backend(self):
+        """
+        The :class:`~ops.calibration.leastsquare.LeastSquareBackend` shared by
+        the calibration managers the instance creates. Immutable.
+        """
+        return self._backend
+
+
+    ###########################################################################
+    # SYSTEMS                                                                 #
+    ###########################################################################
+
+    @property
+    def systems(self):
+        """
+        A tuple of the :class:`~ops.system.ProductionSystem`\\s the instance
+        manages, in the order they were added. Read-only.
+        """
+        return tuple(self._systems)
+
+
+    def addSystem(self, system):
+        """
+        Adds a :class:`~ops.system.ProductionSystem` to the systems the
+        instance manages. If the system's
+        :attr:`~ops.system.ProductionSystem.mediator` is not the instance's
+        :attr:`mediator`, or if the system has already been added, an
+        :exc:`~util.ApplicationError` is raised.
+        """
+        if system.mediator is not self.mediator:
+            raise util.ApplicationError('the system uses another mediator')
+        elif system in self._systems:
+            raise util.ApplicationError('the system has already been added')
+        else:
+            self._systems.append(system)
+
+
+    def removeSystem(self, system):
+        """
+        Removes a :class:`~ops.system.ProductionSystem` from the systems the
+        instance manages. An ongoing calibration procedure of that system is
+        not affected.
+        """
+        self._systems.remove(system)
+        self._lastStatuses.pop(system, None)
+
+
+    ###########################################################################
+    # CALIBRATION                                                             #
+    ###########################################################################
+
+    @property
+    def isRunning(self):
+        """
+        Indicates whether any of the instance's systems is being calibrated.
+        Read-only.
+        """
+        return any(system.isBeingCalibrated for system in self._systems)
+
+
+    def startCalibration(self, system, currents):
+        """
+        Starts a calibration procedure for one of the instance's systems,
+        using the given heating currents (in mA). See
+        :meth:`~ops.system.ProductionSystem.startCalibration` for details.
+        """
+        if system not in self._systems:
+            raise util.ApplicationError('unknown system')
+
+        system.startCalibration(currents, self.scheduler, self.backend)
+
+
+    def startCalibrations(self, currents, systems=None):
+        """
+        Starts a calibration procedure for each system in `systems`, or for
+        each of the instance's systems if `systems` is ``None``, using the
+        same heating currents (in mA) for all of them.
+
+        If any of the systems is locked, a
+        :exc:`~ops.error.SystemLockedError` is raised, and no calibration
+        procedure is started.
+        """
+        if systems is None:
+            systems = self.systems
+
+        for system in systems:
+            if system not in self._systems:
+                raise util.ApplicationError('unknown system')
+            if system.isLocked:
+                raise ops.error.SystemLockedError()
+
+        for system in systems:
+            self.startCalibration(system, currents)
+
+
+    def abortCalibrations(self):
+        """
+        Aborts the calibration procedures of all of the instance's systems
+        that are being calibrated.
+        """
+        for system in self._systems:
+            if system.isBeingCalibrated:
+                system.abortCalibration()
+
+
+    def getLastStatus(self, system):
+        """
+        Returns the status code of the most recent calibration procedure of
+        the given system that has ended since the system was added to the
+        instance, or ``None`` if there is none. See
+        :attr:`~ops.calibration.event.CalibrationOver.status` for the possible
+        values.
+        """
+        return self._lastStatuses.get(system)
+
+
+    def _calibrationOverListener(self, event):
+        """
+        Called when a :class:`~ops.calibration.event.CalibrationOver` event
+        is sent. Records the status of the calibration procedure.
+        """
+        if event.system in self._systems:
+            self._lastStatuses[event.system] = event.status
+
+
+    ###########################################################################
+    # PROGRESS                                                                #
+    ###########################################################################
+
+    def getProgress(self):
+        """
+        Returns a tuple that contains a :class:`SystemProgress` for each of
+        the instance's systems that are being calibrated, in the order the
+        systems were added.
+        """
+        result = []
+        for system in self._systems:
+            manager = system.calibrationManager
+            if manager is not None:
+                result.append(SystemProgress(
+                    system, manager.state, manager.getExtendedProgress()))
+        return tuple(result)
+
+
+    def getTotalTimeLeft(self):
+        """
+        Estimates the amount of time remaining until all ongoing calibration
+        procedures are finished, in seconds. Returns ``None`` if no estimation
+        is possible for at least one of them, or if no system is being
+        calibrated.
+        """
+        progress = self.getProgress()
+
+        if not progress:
+            return None
+
+        timesLeft = [p.progress.totalTimeLeft for p in progress]
+        if None in timesLeft:
+            return None
+        else:
+            return max(timesLeft)
+
+
+#: A named tuple that describes the progress of the calibration procedure of
+#: a single system. Its items are `system`, the
+#: :class:`~ops.system.ProductionSystem` that is being calibrated; `state`, the
+#: :attr:`~ops.calibration.manager.CalibrationManager.state` of its calibration
+#: manager; and `progress`, the
+#: :class:`~ops.calibration.manager.ExtendedProgress` returned by its
+#: calibration manager's
+#: :meth:`~ops.calibration.manager.CalibrationManager.getExtendedProgress`.
+SystemProgress = collections.namedtuple('SystemProgress',
+    'system, state, progress')
+
+
+###############################################################################
+# THE TICK SCHEDULER CLASS                                                    #
+###############################################################################
+
+class TickScheduler(object):
+    """
+    Creates a new instance of this class, which multiplexes any number of
+    periodic callbacks onto a single timeout of `mediator`.
+
+    Instances provide an :meth:`addTimeout` method compatible with that of
+    :class:`~gui.mediator.Mediator`, so that they can be passed to
+    a :class:`~ops.calibration.manager.CalibrationManager` as its
+    :attr:`~ops.calibration.manager.CalibrationManager.scheduler`. The
+    mediator's timeout is only active while the instance has callbacks.
+    """
+
+    def __init__(self, mediator):
+        self._mediator = mediator
+        self._callbacks = []
+        self._isTicking = False
+
+
+    @property
+    def callbackCount(self):
+        """
+        The number of callbacks that are called periodically. Read-only.
+        """
+        return len(self._callbacks)
+
+
+    def addTimeout(self, timeout, callback):
+        """
+        Arranges for `callback` to be called every `timeout` milliseconds
+        for as long as it returns ``True``. `timeout` is rounded to a multiple
+        of :attr:`tickInterval`, but callbacks are called at least once per
+        tick.
+
+        Like the mediator, the instance only keeps a weak reference to
+        `callback`, which must be a method.
+        """
+        ticks = max(1, int(round(timeout / float(self.tickInterval))))
+        self._callbacks.append(_ScheduledCallback(callback, ticks))
+
+        if not self._isTicking:
+            self._isTicking = True
+            self._mediator.addTimeout(self.tickInterval, self._tick)
+
+
+    def _tick(self):
+        """
+        Calls each callback that is due. Called by the mediator once every
+        :attr:`tickInterval` milliseconds while the instance has callbacks.
+        """
+        # Callbacks may add new callbacks, so the list needs to be copied.
+        for callback in list(self._callbacks):
+            if not callback.tick():
+                self._callbacks.remove(callback)
+
+        self._isTicking = len(self._callbacks) > 0
+
+        # If this method returns True, it will be called again.
+        return self._isTicking
+
+
+    #: The interval of the mediator's timeout, in milliseconds. This is a
+    #: class attribute, but it can be set on an instance to override the
+    #: default value before the first callback is added.
+    tickInterval = 250
+
+
+class _ScheduledCallback(object):
+    """
+    A callback managed by a :class:`TickScheduler`, which is called once
+    every `ticks` ticks.
+    """
+
+    def __init__(self, callback, ticks):
+        self._callback = util.WeakMethod(callback)
+        self._ticks = ticks
+        self._ticksLeft = ticks
+
+
+    def tick(self):
+        """
+        Calls the callback if it is due. Returns ``False`` if the callback
+        should not be called again.
+        """
+        self._ticksLeft -= 1
+        if self._ticksLeft > 0:
+            return True
+
+        self._ticksLeft = self._ticks
+        try:
+            return self._callback()
+        except ReferenceError:
+            return False
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This module decides which measurements of
+a :class:`~ops.calibration.data.CalibrationData` object should be retaken
+in order to refresh a calibration, so that the user does not have to repeat
+the whole :term:`calibration procedure`.
+
+Two kinds of measurements are flagged for retaking:
+
+* *Outliers*, that is, measurements whose residuals against at least one
+  of the :term:`estimation functions <estimation function>` are unusually
+  large. Residuals are compared using a robust z-score based on the median
+  absolute deviation, so that the outliers themselves do not mask each other
+  by inflating the spread of the residuals.
+* *Stale measurements*, that is, measurements that are older than
+  :data:`maxMeasurementAge`. Measurements of unknown age are not considered
+  to be stale.
+
+:func:`planRetake` combines both into a :class:`RetakePlan`, whose heating
+currents can be passed to
+:meth:`~ops.system.ProductionSystem.startCalibration`.
+"""
+
+import collections
+import numpy
+import time
+
+
+###############################################################################
+# PLANNING                                                                    #
+###############################################################################
+
+def planRetake(calibrationData, maxAge=None, threshold=None, maxCurrent=None,
+    now=None):
+    """
+    Returns a :class:`RetakePlan` for the given calibration data. `maxAge`
+    and `threshold` are passed to :func:`findStaleMeasurements` and
+    :func:`findOutliers`, respectively. If `maxCurrent` is given, heating
+    currents that exceed it (in mA) are left out of the plan, since the
+    :class:`~ops.calibration.manager.CalibrationManager` could not use them
+    anyway. `now` is the current time, in seconds since the epoch, and
+    defaults to the actual current time.
+
+    The heating currents in the plan are in ascending order. Each heating
+    stage of the resulting calibration procedure therefore only needs to heat
+    the heater up, and the procedure never waits for the heater to cool down
+    between two stages.
+    """
+    outliers = findOutliers(calibrationData, threshold)
+    staleMeasurements = findStaleMeasurements(calibrationData, maxAge, now)
+
+    currents = set(outliers) | set(staleMeasurements)
+
+    if maxCurrent is not None:
+        currents = set(i for i in currents if i <= maxCurrent)
+
+    return RetakePlan(tuple(sorted(currents)), outliers, staleMeasurements)
+
+
+#: A named tuple that describes which measurements should be retaken. Its
+#: items are `currents`, a sorted tuple of the heating currents that should be
+#: used by the new calibration procedure (in mA); `outliers`, a sorted tuple
+#: of the heating currents of the measurements that have been flagged as
+#: outliers; and `staleMeasurements`, a sorted tuple of the heating currents
+#: of the measurements that have been flagged as stale.
+RetakePlan = collections.namedtuple('RetakePlan',
+    'currents, outliers, staleMeasurements')
+
+
+###############################################################################
+# OUTLIERS                                                                    #
+###############################################################################
+
+def findOutliers(calibrationData, threshold=None):
+    """
+    Returns a sorted tuple of the heating currents of the measurements whose
+    residuals against at least one of the estimation functions have a robust
+    z-score that exceeds `threshold`, or :data:`outlierThreshold` if
+    `threshold` is ``None``.
+
+    If the estimation functions have not been fitted, no measurements can
+    be flagged, and the returned tuple is empty.
+    """
+    if threshold is None:
+        threshold = outlierThreshold
+
+    if not calibrationData.isComplete:
+        return ()
+
+    currents = calibrationData.heatingCurrentArray
+    flagged = numpy.zeros(len(currents), dtype=bool)
+
+    for residuals, values in _getResiduals(calibrationData):
+        minDeviation = MIN_RELATIVE_DEVIATION * numpy.max(numpy.abs(values))
+        scores = _getRobustScores(residuals, minDeviation)
+        flagged |= numpy.abs(scores) > threshold
+
+    return tuple(float(i) for i in currents[flagged])
+
+
+def _getResiduals(calibrationData):
+    """
+    Returns a tuple of three pairs of arrays. The first array of each pair
+    contains the residuals of the measurements against one of the estimation
+    functions, and the second contains the measured values the function
+    estimates. The pairs are for the functions that estimate the heating
+    current from the target temperature, the final temperature from the
+    heating current, and the temperature from the temperature sensor voltage,
+    in that order.
+    """
+    cd = calibrationData
+    i = cd.heatingCurrentArray
+    u = cd.temperatureSensorVoltageArray
+    t = cd.temperatureArray
+
+    return (
+        (i - cd.getCurrentsFromTargetTemperatures(t), i),
+        (t - cd.getFinalTemperaturesFromCurrents(i), t),
+        (t - cd.getTemperaturesFromVoltages(u), t))
+
+
+def _getRobustScores(residuals, minDeviation=0.0):
+    """
+    Returns the robust z-scores of the given residuals. The scores are
+    scaled so that they are comparable to ordinary z-scores for normally
+    distributed residuals.
+
+    If the median absolute deviation of the residuals is less than
+    `minDeviation`, `minDeviation` is used in its place, so that rounding
+    errors in an essentially perfect fit are not mistaken for outliers.
+    If the deviation used is zero, all scores are zero.
+    """
+    deviations = residuals - numpy.median(residuals)
+    mad = max(numpy.median(numpy.abs(deviations)), minDeviation)
+
+    if mad == 0.0:
+        return numpy.zeros(len(residuals))
+    else:
+        return MAD_SCALE * deviations / mad
+
+
+#: The smallest median absolute deviation of the residuals of a fit that is
+#: taken at face value, relative to the largest absolute value the fitted
+#: function estimates. Used by :func:`findOutliers`.
+MIN_RELATIVE_DEVIATION = 1e-6
+
+#: The factor that turns the ratio of a deviation to the median absolute
+#: deviation into a score comparable to an ordinary z-score.
+MAD_SCALE = 0.6745
+
+
+###############################################################################
+# STALE MEASUREMENTS                                                          #
+###############################################################################
+
+def findStaleMeasurements(calibrationData, maxAge=None, now=None):
+    """
+    Returns a sorted tuple of the heating currents of the measurements that
+    were taken more than `maxAge` seconds (or :data:`maxMeasurementAge`
+    seconds, if `maxAge` is ``None``) before `now`, which defaults to the
+    current time.
+    """
+    if maxAge is None:
+        maxAge = maxMeasurementAge
+    if now is None:
+        now = time.time()
+
+    result = []
+    for current in calibrationData.heatingCurrents:
+        timestamp = calibrationData.getMeasurementTime(current)
+        if timestamp is not None and now - timestamp > maxAge:
+            result.append(current)
+
+    return tuple(result)
+
+
+###############################################################################
+# DEFAULTS                                                                    #
+###############################################################################
+
+#: The robust z-score a residual needs to exceed for the measurement to be
+#: flagged as an outlier. Used by :func:`findOutliers`.
+outlierThreshold = 3.5
+
+#: The age a measurement needs to exceed to be considered stale, in seconds.
+#: Used by :func:`findStaleMeasurements`.
+maxMeasurementAge = 30 * 24 * 60 * 60.0
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+This module contains the :class:`ProfileCache` class, which keeps several
+sets of calibration data for a single
+:class:`~ops.system.ProductionSystem`, such as one for each fixture or
+sensor position, and switches the system between them.
+
+A :term:`calibration profile` is simply a named
+:class:`~ops.calibration.data.CalibrationData` object. Since the estimation
+functions of calibration data are fitted when they are first needed, and
+kept until the measurements change, a profile whose data has been used once
+can be reactivated without reloading or refitting anything: activating
+a profile only assigns its calibration data to the system's
+:attr:`~ops.system.ProductionSystem.calibrationData`, which sends a single
+:class:`~ops.calibration.event.CalibrationDataChanged` event.
+"""
+
+import ops.error
+import util
+
+
+###############################################################################
+# THE PROFILE CACHE CLASS                                                     #
+###############################################################################
+
+class ProfileCache(object):
+    """
+    Creates a new instance of this class for the given
+    :class:`~ops.system.ProductionSystem`. If `maxProfiles` is ``None``,
+    :attr:`maxProfiles` is used.
+    """
+
+    def __init__(self, system, maxProfiles=None):
+        if maxProfiles is not None:
+            self.maxProfiles = maxProfiles
+        if self.maxProfiles < 1:
+            raise ValueError('maxProfiles < 1')
+
+        self._system = system
+        self._profiles = {}
+        self._lastUses = {}
+        self._useCount = 0
+
+
+    @property
+    def system(self):
+        """
+        The :class:`~ops.system.ProductionSystem` whose profiles the instance
+        holds. Immutable.
+        """
+        return self._system
+
+
+    @property
+    def profileNames(self):
+        """
+        A tuple of the names of the profiles the instance holds, starting
+        with the one that has been added or activated most recently.
+        Read-only.
+        """
+        return tuple(sorted(self._profiles,
+            key=self._lastUses.__getitem__, reverse=True))
+
+
+    @property
+    def activeProfile(self):
+        """
+        The name of the profile whose calibration data the system currently
+        uses, or ``None`` if the system uses calibration data that does not
+        belong to any of the instance's profiles. Read-only.
+        """
+        calibrationData = self._system.calibrationData
+        for name, profile in self._profiles.iteritems():
+            if profile is calibrationData:
+                return name
+        return None
+
+
+    def getProfile(self, name):
+        """
+        Returns the :class:`~ops.calibration.data.CalibrationData` object of
+        the profile with the given name. A :exc:`KeyError` is raised if
+        there is no such profile.
+        """
+        return self._profiles[name]
+
+
+    def addProfile(self, name, calibrationData):
+        """
+        Adds a profile with the given name and
+        :class:`~ops.calibration.data.CalibrationData` object, replacing any
+        profile of the same name, and starts fitting its estimation functions
+        in the background (see
+        :meth:`~ops.calibration.data.CalibrationData.prewarm`). If the
+        replaced profile is active, the new profile is activated.
+
+        If the instance holds more than :attr:`maxProfiles` profiles
+        afterwards, the least recently used ones that are not active are
+        discarded. Calibration data that is used by another system cannot be
+        added; an :exc:`~util.ApplicationError` is raised. The active profile
+        cannot be replaced while the system is locked; a
+        :exc:`~ops.error.SystemLockedError` is raised, and the instance is
+        left unchanged.
+        """
+        if calibrationData.system not in (None, self._system):
+            raise util.ApplicationError('the CalibrationData object '
+                'is used by another ProductionSystem')
+
+        isActive = name in self._profiles and self.activeProfile == name
+        if isActive and self._system.isLocked:
+            raise ops.error.SystemLockedError()
+
+        self._profiles[name] = calibrationData
+        self._noteUse(name)
+        calibrationData.prewarm()
+
+        if isActive:
+            self.activate(name)
+
+        self._evict()
+
+
+    def removeProfile(self, name):
+        """
+        Removes the profile with the given name. The active profile cannot
+        be removed; an :exc:`~util.ApplicationError` is raised.
+        """
+        if self.activeProfile == name:
+            raise util.ApplicationError('the profile is active')
+
+        del self._profiles[name]
+        del self._lastUses[name]
+
+
+    def activate(self, name):
+        """
+        Makes the system use the calibration data of the profile with the
+        given name. This takes constant time, and sends a single
+        :class:`~ops.calibration.event.CalibrationDataChanged` event, unless
+        the profile is already active.
+
+        A :exc:`KeyError` is raised if there is no such profile, and
+        a :exc:`~ops.error.SystemLockedError` if the system is locked, for
+        example because it is being calibrated.
+        """
+        calibrationData = self._profiles[name]
+        if self._system.isLocked:
+            raise ops.error.SystemLockedError()
+
+        self._system.calibrationData = calibrationData
+        self._noteUse(name)
+
+
+    def _noteUse(self, name):
+        """
+        Marks the profile with the given name as the most recently used one.
+        """
+        self._useCount += 1
+        self._lastUses[name] = self._useCount
+
+
+    def _evict(self):
+        """
+        Discards the least recently used profiles that are not active until
+        the instance holds no more than :attr:`maxProfiles` profiles, or only
+        the active profile is left.
+        """
+        activeProfile = self.activeProfile
+        while len(self._profiles) > self.maxProfiles:
+            candidates = [name for name in self._profiles
+                if name != activeProfile]
+            if not candidates:
+                break
+            self.removeProfile(min(candidates, key=self._lastUses.__getitem__))
+
+
+    #: The maximum number of profiles an instance holds. The active profile
+    #: is never discarded. This is a class attribute, but it can be set on an
+    #: instance to override the default value.
+    maxProfiles = 8
@@ -0,0 +1,467 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This module contains the :class:`CalibrationReport` class, which describes
+where the time of a :term:`calibration procedure` went, and
+the :class:`ReportRecorder` class, which the
+:class:`~ops.calibration.manager.CalibrationManager` uses to collect the
+necessary information while the procedure is running.
+
+When a calibration procedure ends, its report is sent along with the
+:class:`~ops.calibration.event.CalibrationOver` event, and assigned to the
+:attr:`~ops.calibration.data.CalibrationData.report` attribute of the
+calibration data of the system that has been calibrated. Reports can be
+saved with :func:`toXML` and loaded with :func:`fromXML`.
+"""
+
+import collections
+import math
+import xml.dom.minidom
+
+from util import monotonicTime
+
+
+###############################################################################
+# THE CALIBRATION REPORT CLASS                                                #
+###############################################################################
+
+class CalibrationReport(object):
+    """
+    Creates a new instance of this class, using the arguments to set
+    :attr:`status`, :attr:`totalTime`, :attr:`heaterMovementTime`,
+    :attr:`stages`, :attr:`missedTicks`, and :attr:`jitter`. Instances are
+    immutable.
+    """
+
+    def __init__(self, status, totalTime, heaterMovementTime, stages,
+        missedTicks, jitter=None):
+        self._status = status
+        self._totalTime = totalTime
+        self._heaterMovementTime = heaterMovementTime
+        self._stages = tuple(stages)
+        self._missedTicks = missedTicks
+        self._jitter = jitter
+
+
+    def __eq__(self, other):
+        """Checks two reports for equality."""
+        return (isinstance(other, CalibrationReport)
+            and self.__dict__ == other.__dict__)
+
+
+    def __ne__(self, other):
+        """Checks two reports for inequality."""
+        return not self == other
+
+
+    @property
+    def status(self):
+        """
+        The status code the calibration procedure ended with. See
+        :attr:`~ops.calibration.event.CalibrationOver.status` for the possible
+        values. Immutable.
+        """
+        return self._status
+
+
+    @property
+    def totalTime(self):
+        """
+        The time that passed between the start and the end of the calibration
+        procedure, in seconds. Immutable.
+        """
+        return self._totalTime
+
+
+    @property
+    def heaterMovementTime(self):
+        """
+        The time it took to move the heater into its foremost position, in
+        seconds, or ``None`` if the procedure ended before the heater got
+        there. Immutable.
+        """
+        return self._heaterMovementTime
+
+
+    @property
+    def stages(self):
+        """
+        A tuple that contains a :class:`StageReport` for each heating stage
+        that has been started. Immutable.
+        """
+        return self._stages
+
+
+    @property
+    def missedTicks(self):
+        """
+        The number of times the calibration manager's *tick method* was not
+        called because the main loop was late. Immutable.
+        """
+        return self._missedTicks
+
+
+    @property
+    def jitter(self):
+        """
+        A :class:`JitterStatistics` object that describes how regularly the
+        calibration manager's tick method was called, or ``None`` if it was
+        called less than twice. Immutable.
+        """
+        return self._jitter
+
+
+    @property
+    def heatingTime(self):
+        """
+        The total time spent heating, in seconds. Read-only.
+        """
+        return sum(stage.heatingTime for stage in self.stages)
+
+
+    @property
+    def temperatureEntryTime(self):
+        """
+        The total time spent waiting for the user to report temperature
+        measurements, in seconds. Read-only.
+        """
+        return sum(stage.temperatureEntryTime for stage in self.stages
+            if stage.temperatureEntryTime is not None)
+
+
+    @property
+    def solutionsFound(self):
+        """
+        The total number of solutions found by the minimizations during the
+        heating stages. Read-only.
+        """
+        return sum(stage.solutionsFound for stage in self.stages)
+
+
+    @property
+    def fitLatencies(self):
+        """
+        A tuple of the times the individual minimization attempts took during
+        all heating stages, in seconds. Read-only.
+        """
+        result = ()
+        for stage in self.stages:
+            result += stage.fitLatencies
+        return result
+
+
+    def getFitLatencyPercentile(self, percent):
+        """
+        Returns the given percentile (in the range [``0.0``, ``100.0``]) of
+        :attr:`fitLatencies`, in seconds, or ``None`` if there were no
+        minimization attempts.
+        """
+        return getPercentile(self.fitLatencies, percent)
+
+
+#: A named tuple that describes a single heating stage of a calibration
+#: procedure. Its items are `current`, the heating current used, in mA;
+#: `heatingTime`, the time spent heating, in seconds; `temperatureEntryTime`,
+#: the time spent waiting for the user to report a temperature measurement,
+#: in seconds, or ``None`` if the stage ended before a measurement was
+#: requested; `solutionsFound`, the number of solutions found by the
+#: minimization; and `fitLatencies`, a tuple of the times the individual
+#: minimization attempts took, in seconds.
+StageReport = collections.namedtuple('StageReport',
+    'current, heatingTime, temperatureEntryTime, solutionsFound, fitLatencies')
+
+
+#: A named tuple that describes how regularly a periodic callback has been
+#: called. Its items are `intervalCount`, the number of intervals between two
+#: consecutive calls; `meanInterval`, the mean length of those intervals, in
+#: seconds; `rmsJitter`, the root mean square of the differences between the
+#: lengths of the intervals and the length they should have had, in seconds;
+#: and `maxJitter`, the greatest absolute difference, in seconds.
+JitterStatistics = collections.namedtuple('JitterStatistics',
+    'intervalCount, meanInterval, rmsJitter, maxJitter')
+
+
+def getPercentile(values, percent):
+    """
+    Returns the given percentile (in the range [``0.0``, ``100.0``]) of the
+    given values, interpolating linearly between the closest ranks, or
+    ``None`` if `values` is empty.
+    """
+    if len(values) == 0:
+        return None
+
+    values = sorted(values)
+    rank = (len(values) - 1) * percent / 100.0
+    lower = int(math.floor(rank))
+    upper = int(math.ceil(rank))
+
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+###############################################################################
+# THE REPORT RECORDER CLASS                                                   #
+###############################################################################
+
+class ReportRecorder(object):
+    """
+    Collects the information needed to create a :class:`CalibrationReport`
+    while a calibration procedure is running. The
+    :class:`~ops.calibration.manager.CalibrationManager` calls the
+    instance's ``note...`` methods as the procedure progresses, and
+    :meth:`createReport` when it ends.
+    """
+
+    def __init__(self):
+        self._startingTime = None
+        self._heaterMovementStartingTime = None
+        self._heaterMovementTime = None
+        self._stages = []
+        self._stageStartingTime = None
+        self._requestTime = None
+        self._lastTickTime = None
+        self._missedTicks = 0
+        self._intervalCount = 0
+        self._intervalSum = 0.0
+        self._jitterSquareSum = 0.0
+        self._maxJitter = 0.0
+
+
+    def noteStart(self):
+        """
+        Notes that the calibration procedure has started.
+        """
+        self._startingTime = monotonicTime()
+
+
+    def noteTick(self, tickInterval):
+        """
+        Notes that the tick method has been called. `tickInterval` is the
+        interval it is supposed to be called in, in milliseconds.
+        """
+        now = monotonicTime()
+
+        if self._lastTickTime is not None:
+            interval = now - self._lastTickTime
+            jitter = abs(interval - tickInterval / 1000.0)
+
+            self._intervalCount += 1
+            self._intervalSum += interval
+            self._jitterSquareSum += jitter ** 2
+            self._maxJitter = max(self._maxJitter, jitter)
+
+            ticks = interval * 1000.0 / tickInterval
+            self._missedTicks += max(0, int(round(ticks)) - 1)
+
+        self._lastTickTime = now
+
+
+    def getJitterStatistics(self):
+        """
+        Returns a :class:`JitterStatistics` object that describes the
+        intervals between the calls of :meth:`noteTick` so far, or ``None``
+        if it has been called less than twice.
+        """
+        n = self._intervalCount
+
+        if n == 0:
+            return None
+
+        return JitterStatistics(
+            intervalCount=n,
+            meanInterval=self._intervalSum / n,
+            rmsJitter=math.sqrt(self._jitterSquareSum / n),
+            maxJitter=self._maxJitter)
+
+
+    def noteHeaterMovementStarted(self):
+        """
+        Notes that the heater has started moving to its foremost position.
+        """
+        self._heaterMovementStartingTime = monotonicTime()
+
+
+    def noteHeatingStageStarted(self, current):
+        """
+        Notes that a heating stage has been started with the given heating
+        current (in mA). The first heating stage also marks the end of the
+        heater movement.
+        """
+        now = monotonicTime()
+
+        if (self._heaterMovementStartingTime is not None
+            and self._heaterMovementTime is None):
+            self._heaterMovementTime = now - self._heaterMovementStartingTime
+
+        self._stages.append([current, None, None, 0, ()])
+        self._stageStartingTime = now
+
+
+    def noteHeatingStageOver(self, minimization):
+        """
+        Notes that the ongoing heating stage is over, either because
+        a temperature measurement is requested or because the procedure
+        has ended. `minimization` is the
+        :class:`~ops.calibration.leastsquare.LeastSquareThread` or
+        :class:`~ops.calibration.leastsquare.LeastSquareJob` used during
+        the stage. If no heating stage is ongoing, nothing happens.
+        """
+        if self._stageStartingTime is None:
+            return
+
+        now = monotonicTime()
+        stage = self._stages[-1]
+        stage[1] = now - self._stageStartingTime
+        stage[3] = minimization.solutionsFound
+        stage[4] = minimization.fitLatencies
+        self._stageStartingTime = None
+        self._requestTime = now
+
+
+    def noteTemperatureReported(self):
+        """
+        Notes that the requested temperature measurement has been reported,
+        or that the procedure has ended while it was waiting for one. If no
+        temperature measurement has been requested, nothing happens.
+        """
+        if self._requestTime is None:
+            return
+
+        self._stages[-1][2] = monotonicTime() - self._requestTime
+        self._requestTime = None
+
+
+    def createReport(self, status):
+        """
+        Returns a :class:`CalibrationReport` with the information collected
+        so far, using the given status code.
+        """
+        return CalibrationReport(
+            status=status,
+            totalTime=monotonicTime() - self._startingTime,
+            heaterMovementTime=self._heaterMovementTime,
+            stages=[StageReport(*stage) for stage in self._stages],
+            missedTicks=self._missedTicks,
+            jitter=self.getJitterStatistics())
+
+
+###############################################################################
+# PERSISTENCE FUNCTIONS                                                       #
+###############################################################################
+
+# Check the documentation for information on the file format.
+
+def toXML(report):
+    """
+    Creates an XML document from the given :class:`CalibrationReport` object
+    and returns it as a string.
+    """
+    implementation = xml.dom.minidom.getDOMImplementation()
+
+    document = implementation.createDocument(None, 'calibration-report', None)
+    top = document.documentElement
+
+    def addElement(parent, name, value):
+        if value is not None:
+            child = document.createElement(name)
+            child.appendChild(document.createTextNode(repr(value)))
+            parent.appendChild(child)
+
+    addElement(top, 'status', report.status)
+    addElement(top, 'total-time', report.totalTime)
+    addElement(top, 'heater-movement-time', report.heaterMovementTime)
+    addElement(top, 'missed-ticks', report.missedTicks)
+
+    for stage in report.stages:
+        node = document.createElement('stage')
+        addElement(node, 'current', stage.current)
+        addElement(node, 'heating-time', stage.heatingTime)
+        addElement(node, 'temperature-entry-time', stage.temperatureEntryTime)
+        addElement(node, 'solutions-found', stage.solutionsFound)
+        for latency in stage.fitLatencies:
+            addElement(node, 'fit-latency', latency)
+        top.appendChild(node)
+
+    if report.jitter is not None:
+        node = document.createElement('jitter')
+        addElement(node, 'interval-count', report.jitter.intervalCount)
+        addElement(node, 'mean-interval', report.jitter.meanInterval)
+        addElement(node, 'rms-jitter', report.jitter.rmsJitter)
+        addElement(node, 'max-jitter', report.jitter.maxJitter)
+        top.appendChild(node)
+
+    return document.toxml()
+
+
+def fromXML(string):
+    """
+    Creates a :class:`CalibrationReport` object from the given string, which
+    must be a valid XML document.
+
+    If an error occurs while parsing the document, the function returns
+    ``None``.
+    """
+    def getValues(parent, name, function):
+        return [function(node.firstChild.nodeValue)
+            for node in parent.childNodes
+            if node.nodeType == node.ELEMENT_NODE and node.tagName == name]
+
+    def getValue(parent, name, function, optional=False):
+        values = getValues(parent, name, function)
+        if optional and not values:
+            return None
+        else:
+            return values[0]
+
+    try:
+        document = xml.dom.minidom.parseString(string)
+        top = document.documentElement
+
+        if top.tagName != 'calibration-report':
+            return None
+
+        stages = []
+        for node in top.getElementsByTagName('stage'):
+            stages.append(StageReport(
+                current=getValue(node, 'current', float),
+                heatingTime=getValue(node, 'heating-time', float),
+                temperatureEntryTime=getValue(
+                    node, 'temperature-entry-time', float, True),
+                solutionsFound=getValue(node, 'solutions-found', int),
+                fitLatencies=tuple(getValues(node, 'fit-latency', float))))
+
+        jitter = None
+        for node in top.getElementsByTagName('jitter'):
+            jitter = JitterStatistics(
+                intervalCount=getValue(node, 'interval-count', int),
+                meanInterval=getValue(node, 'mean-interval', float),
+                rmsJitter=getValue(node, 'rms-jitter', float),
+                maxJitter=getValue(node, 'max-jitter', float))
+
+        return CalibrationReport(
+            status=getValue(top, 'status', int),
+            totalTime=getValue(top, 'total-time', float),
+            heaterMovementTime=getValue(
+                top, 'heater-movement-time', float, True),
+            stages=stages,
+            missedTicks=getValue(top, 'missed-ticks', int),
+            jitter=jitter)
+    except Exception:
+        return None
@@ -63,3 +63,26 @@ class SystemPropertiesChanged(Event):
         The name of the property that has been changed.
         """
         return self._name
+
+
+class TemperatureSensorSampled(Event):
+
+    def __init__(self, system, reading):
+        self._system = system
+        self._reading = reading
+
+    @property
+    def system(self):
+        """
+        The :class:`~ops.system.ProductionSystem` whose temperature sensor
+        has been read.
+        """
+        return self._system
+
+    @property
+    def reading(self):
+        """
+        The new :class:`~ops.sampling.Reading` of the temperature sensor
+        voltage, in V.
+        """
+        return self._reading
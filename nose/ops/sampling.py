@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This module contains classes that read a sensor of the production system
+several times and combine the readings into a single :class:`Sample`, whose
+value has less noise than a single reading, and whose variance tells how much
+noise is left.
+
+* A :class:`BurstSampler` reads the sensor several times in quick succession
+  whenever a sample is needed.
+* A :class:`BackgroundSampler` reads the sensor continuously in a worker
+  thread, and combines all readings taken since the previous sample.
+
+Both classes take a function without parameters that reads the sensor, such
+as ``lambda: system.temperatureSensorVoltage``. The
+:class:`~ops.calibration.manager.CalibrationManager` uses them to sample the
+:term:`temperature sensor voltage` during heating stages if its
+:attr:`~ops.calibration.manager.CalibrationManager.samplingMode` asks for it.
+
+A :class:`SensorService` does not combine readings, but shares them: it
+keeps the most recent reading of a sensor, so that several consumers that
+read the sensor periodically don't each access the device. Each
+:class:`~ops.system.ProductionSystem` uses one for its temperature sensor.
+"""
+
+import collections
+import numpy
+import threading
+import time
+
+from util import monotonicTime
+
+import util
+
+
+###############################################################################
+# SAMPLES                                                                     #
+###############################################################################
+
+#: A named tuple that describes a sample combined from several readings of
+#: a sensor. Its items are `time`, the time the sample was taken, as returned
+#: by :func:`util.monotonicTime`; `value`, the mean of the readings;
+#: `variance`, the estimated variance of that mean; and `count`, the number
+#: of readings.
+Sample = collections.namedtuple('Sample', 'time, value, variance, count')
+
+
+def createSample(time, values):
+    """
+    Returns a :class:`Sample` taken at the given time, that combines the given
+    values. At least two values are needed to estimate the variance.
+    """
+    if len(values) < 2:
+        raise util.ApplicationError('at least two readings are required')
+
+    values = numpy.asarray(values, dtype=float)
+    count = len(values)
+
+    # The variance of the mean is the variance of the readings divided by
+    # their number.
+    return Sample(
+        time=time,
+        value=float(values.mean()),
+        variance=float(values.var(ddof=1) / count),
+        count=count)
+
+
+###############################################################################
+# THE BURST SAMPLER CLASS                                                     #
+###############################################################################
+
+class BurstSampler(object):
+    """
+    Creates a new instance of this class, which reads a sensor `count` times
+    in quick succession whenever :meth:`read` is called, using the function
+    `readFunction`. If `count` is ``None``, :attr:`count` is used.
+    """
+
+    def __init__(self, readFunction, count=None):
+        if count is not None:
+            self.count = count
+        if self.count < 2:
+            raise util.ApplicationError('at least two readings are required')
+
+        self._readFunction = readFunction
+
+
+    def read(self):
+        """
+        Reads the sensor :attr:`count` times and returns the resulting
+        :class:`Sample`. The time of the sample is halfway between the
+        start of the first reading and the end of the last one.
+        """
+        startingTime = monotonicTime()
+        values = [self._readFunction() for n in xrange(self.count)]
+        endingTime = monotonicTime()
+
+        return createSample((startingTime + endingTime) / 2.0, values)
+
+
+    #: The number of times the sensor is read for each sample. This is
+    #: a class attribute, but it can be set on an instance to override the
+    #: default value.
+    count = 8
+
+
+###############################################################################
+# THE BACKGROUND SAMPLER CLASS                                                #
+###############################################################################
+
+class BackgroundSampler(object):
+    """
+    Creates a new instance of this class, which reads a sensor every
+    `interval` seconds in a worker thread, using the function `readFunction`.
+    If `interval` is ``None``, :attr:`interval` is used.
+
+    The worker thread needs to be started with :meth:`start`, and should be
+    stopped with :meth:`stop` when the samples are no longer needed.
+    `readFunction` is called from the worker thread, so it must be safe to
+    call while the main thread uses the device. This is the case for
+    ``lambda: system.temperatureSensorVoltage``, because
+    a :class:`~ops.system.ProductionSystem` serializes all accesses to its
+    device.
+    """
+
+    def __init__(self, readFunction, interval=None):
+        if interval is not None:
+            self.interval = interval
+
+        self._readFunction = readFunction
+        self._readings = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._done = False
+
+
+    @property
+    def isRunning(self):
+        """
+        Indicates whether the worker thread has been started, but not yet
+        stopped. Read-only.
+        """
+        return self._thread is not None and not self._done
+
+
+    def start(self):
+        """
+        Starts the worker thread. An instance can only be started once.
+        """
+        if self._thread is not None:
+            raise util.ApplicationError('the sampler has already been started')
+
+        self._thread = threading.Thread(target=self._run)
+        self._thread.setDaemon(True)
+        self._thread.start()
+
+
+    def stop(self):
+        """
+        Stops the worker thread. It may take up to :attr:`interval` seconds
+        for the thread to actually terminate.
+        """
+        self._done = True
+
+
+    def _run(self):
+        """
+        The main loop of the worker thread.
+        """
+        while not self._done:
+            self._takeReading()
+            time.sleep(self.interval)
+
+
+    def _takeReading(self):
+        """
+        Reads the sensor once, and stores the reading along with its time.
+        """
+        value = self._readFunction()
+        now = monotonicTime()
+
+        with self._lock:
+            self._readings.append((now, value))
+
+
+    def read(self):
+        """
+        Returns a :class:`Sample` that combines the readings taken since the
+        previous call, and discards those readings. The time of the sample is
+        the mean time of the readings.
+
+        If fewer than two readings have been taken, for example because the
+        worker thread has not been started, the sensor is read directly from
+        the calling thread until there are two.
+        """
+        with self._lock:
+            readings = self._readings
+            self._readings = []
+
+        while len(readings) < 2:
+            value = self._readFunction()
+            readings.append((monotonicTime(), value))
+
+        times, values = zip(*readings)
+        return createSample(sum(times) / len(times), values)
+
+
+    #: The interval in which the worker thread reads the sensor, in seconds.
+    #: This is a class attribute, but it can be set on an instance to
+    #: override the default value.
+    interval = 0.025
+
+
+###############################################################################
+# THE SENSOR SERVICE CLASS                                                    #
+###############################################################################
+
+#: A named tuple that describes a single reading of a sensor. Its items are
+#: `time`, the time the sensor was read, as returned by
+#: :func:`util.monotonicTime`, and `value`, the value that was read.
+Reading = collections.namedtuple('Reading', 'time, value')
+
+
+class SensorService(object):
+    """
+    Creates a new instance of this class, which shares the readings of
+    a sensor between all its consumers, using the function `readFunction` to
+    read the sensor. If `maxAge` is ``None``, :attr:`maxAge` is used.
+
+    Consumers that only need a recent value call :meth:`getReading`, which
+    reads the sensor only if the most recent reading is older than
+    :attr:`maxAge` seconds, so any number of consumers cause at most one
+    read per :attr:`maxAge` seconds. Consumers that need a fresh value call
+    :meth:`poll`; the reading it takes is shared with the other consumers as
+    well. The instance does not read the sensor on its own; its owner polls
+    it periodically, usually from a timeout.
+
+    All methods may be called from any thread.
+    """
+
+    def __init__(self, readFunction, maxAge=None):
+        if maxAge is not None:
+            self.maxAge = maxAge
+
+        self._readFunction = readFunction
+        self._lock = threading.Lock()
+        self._latestReading = None
+        self._readCount = 0
+
+
+    @property
+    def latestReading(self):
+        """
+        The most recent :class:`Reading`, or ``None`` if the sensor hasn't
+        been read yet. Read-only.
+        """
+        return self._latestReading
+
+
+    @property
+    def readCount(self):
+        """
+        The number of times the sensor has been read. Read-only.
+        """
+        return self._readCount
+
+
+    def poll(self):
+        """
+        Reads the sensor, and returns the resulting :class:`Reading`, which
+        becomes the :attr:`latestReading`.
+        """
+        with self._lock:
+            value = self._readFunction()
+            reading = Reading(monotonicTime(), value)
+            self._latestReading = reading
+            self._readCount += 1
+        return reading
+
+
+    def getReading(self, maxAge=None):
+        """
+        Returns the :attr:`latestReading` if it is no older than `maxAge`
+        seconds, or :attr:`maxAge` seconds if `maxAge` is ``None``.
+        Otherwise, reads the sensor with :meth:`poll`.
+        """
+        if maxAge is None:
+            maxAge = self.maxAge
+
+        reading = self._latestReading
+        if reading is None or monotonicTime() - reading.time > maxAge:
+            reading = self.poll()
+        return reading
+
+
+    #: The age, in seconds, up to which :meth:`getReading` returns the most
+    #: recent reading instead of reading the sensor again. This is a class
+    #: attribute, but it can be set on an instance to override the default
+    #: value.
+    maxAge = 0.25
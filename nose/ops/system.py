@@ -24,6 +24,8 @@ the application.
 """
 
 import math
+import numpy
+import threading
 
 from ops.event import *
 from ops.calibration.event import *
@@ -33,6 +35,8 @@ import ops.simulation
 import ops.calibration.data
 import ops.calibration.fake
 import ops.calibration.manager
+import ops.sampling
+import ops.telemetry
 import util
 
 
@@ -83,6 +87,21 @@ class ProductionSystem(object):
       instance's :attr:`isInSafeMode` flag is set. The instance leaves safe
       mode when a new new heating procedure is started.
 
+    * Instances read the temperature sensor voltage once every
+      :attr:`samplingInterval` milliseconds, and share that reading between
+      all clients that need a recent value: :attr:`temperatureSensorReading`
+      returns it, and a :class:`~ops.event.TemperatureSensorSampled` event is
+      sent for each new reading. This keeps periodic consumers, such as the
+      safety monitoring and the user interface, from each accessing the
+      device. A history of these readings, along with the temperature and the
+      commanded heating current and heater position, is kept in
+      :attr:`telemetry`.
+
+    * All accesses to the device go through a single lock owned by the
+      instance, so the device may be used from several threads, for example
+      by a :class:`~ops.sampling.BackgroundSampler` reading the temperature
+      sensor voltage while the main thread changes the heating current.
+
     * Instances can be locked. While an instance is locked, clients cannot
       perform any operations on the device without providing the appropriate
       key. This ensures that different operations do not interfere with each
@@ -120,12 +139,21 @@ class ProductionSystem(object):
         else:
             self._interface = interface
 
+        # Serializes all accesses to the device, which may be made from
+        # worker threads as well as from the main thread.
+        self._deviceLock = threading.RLock()
         self._key = None
         self._calibrationData = None
         self._calibrationManager = None
         self._isInSafeMode = False
         self._targetTemperature = None
+        self._targetTemperatureEnvelope = None
         self._heaterTargetPosition = self._interface.heaterPosition
+        self._commandedHeatingCurrent = self._interface.heatingCurrent
+        self._sensorService = ops.sampling.SensorService(
+            self._readTemperatureSensorVoltage,
+            ProductionSystem.samplingInterval / 1000.0)
+        self._publishedReading = None
 
         self._maxHeatingCurrent = 28.0
         self._maxSafeTemperatureSensorVoltage = 6.7
@@ -137,8 +165,14 @@ class ProductionSystem(object):
         # CalibrationData object must have its system set!
         self.calibrationData = ops.calibration.data.CalibrationData()
 
+        self._telemetry = ops.telemetry.TelemetryStore(self)
+
+        mediator.addTimeout(ProductionSystem.samplingInterval,
+            self._sampleTemperatureSensor)
         mediator.addTimeout(
             ProductionSystem.monitorInterval, self._monitorSafeOperation)
+        mediator.addListener(self._envelopeListener,
+            SystemPropertiesChanged, CalibrationDataChanged)
 
 
     @property
@@ -301,13 +335,16 @@ class ProductionSystem(object):
                 CalibrationDataChanged(self, newCalibrationData))
 
 
-    def startCalibration(self, currents):
+    def startCalibration(self, currents, scheduler=None, backend=None):
         """
         Starts a :term:`calibration procedure`. `currents` is a list of the
         heating currents (in mA) for which measurements are to be taken.
         The actual work is done by
         :class:`ops.calibration.manager.CalibrationManager`.
-        See that class for further documentation.
+        See that class for further documentation. `scheduler` and `backend`
+        are passed on to the calibration manager; they are used when several
+        systems are calibrated at once by
+        a :class:`~ops.calibration.orchestrator.CalibrationOrchestrator`.
 
         *This method is asynchronous.* The calibration procedure itself may
         take several hours to complete, but the method returns immediately.
@@ -326,9 +363,11 @@ class ProductionSystem(object):
                 self._calibrationOverListener, CalibrationOver)
 
             if self.testingUseFakeCalibration:
-                m = ops.calibration.fake.FakeCalibrationManager(self, currents)
+                m = ops.calibration.fake.FakeCalibrationManager(
+                    self, currents, scheduler, backend)
             else:
-                m = ops.calibration.manager.CalibrationManager(self, currents)
+                m = ops.calibration.manager.CalibrationManager(
+                    self, currents, scheduler, backend)
 
             self._calibrationManager = m
             self._calibrationManager.startCalibration()
@@ -344,8 +383,14 @@ class ProductionSystem(object):
     def _calibrationOverListener(self, event):
         """
         Called when a :class:`~ops.calibration..event.CalibrationOver` event
-        is sent. Clears :attr:`calibrationManager`.
+        is sent. Clears :attr:`calibrationManager` if the event is about the
+        instance's own calibration procedure; systems calibrated at once by
+        a :class:`~ops.calibration.orchestrator.CalibrationOrchestrator`
+        share a mediator, and finish at different times.
         """
+        if event.manager is not self._calibrationManager:
+            return
+
         self._calibrationManager = None
         self.mediator.removeListener(
             self._calibrationOverListener, CalibrationOver)
@@ -359,6 +404,11 @@ class ProductionSystem(object):
     #: This is a class attribute. Setting it on an instance has no effect.
     monitorInterval = 1000
 
+    #: The interval the temperature sensor voltage is sampled in, in
+    #: milliseconds. This is a class attribute. Setting it on an instance has
+    #: no effect.
+    samplingInterval = 250
+
 
     # ISSUE: If operating the heater at heatingCurrentInSafeMode is still
     #        unsafe, monitoring doesn't help. We could turn the device off
@@ -369,15 +419,39 @@ class ProductionSystem(object):
         """
         Switches the instance into its safe mode if heating temperature or
         temperature sensor voltage exceed their safe limits. Called once
-        every :attr:`monitorInterval` milliseconds.
+        every :attr:`monitorInterval` milliseconds. Uses the shared
+        :attr:`temperatureSensorReading`.
         """
-        if self._isUnsafe(self.temperatureSensorVoltage, self.temperature):
+        voltage = self.temperatureSensorReading.value
+        if self.isCalibrated:
+            temperature = self.calibrationData.getTemperatureFromVoltage(
+                voltage)
+        else:
+            temperature = None
+
+        if self._isUnsafe(voltage, temperature):
             self.enterSafeMode()
 
         # This method needs to return ``True`` so that it is called again.
         return True
 
 
+    def _sampleTemperatureSensor(self):
+        """
+        Makes sure that :attr:`temperatureSensorReading` is up to date, and
+        sends a :class:`~ops.event.TemperatureSensorSampled` event if there
+        is a new reading. Called once every :attr:`samplingInterval`
+        milliseconds.
+        """
+        reading = self.temperatureSensorReading
+        if reading is not self._publishedReading:
+            self._publishedReading = reading
+            self.mediator.noteEvent(TemperatureSensorSampled(self, reading))
+
+        # This method needs to return ``True`` so that it is called again.
+        return True
+
+
     def _isUnsafe(self, voltage, temperature):
         """
         Indicates whether the given temperature sensor voltage (in V) or
@@ -430,7 +504,19 @@ class ProductionSystem(object):
         The device's heating current, in mA. Read-only. To change the
         heating current, use the :meth:`startHeatingWithCurrent` method.
         """
-        return self._interface.heatingCurrent
+        with self._deviceLock:
+            return self._interface.heatingCurrent
+
+
+    @property
+    def commandedHeatingCurrent(self):
+        """
+        The heating current last set with :meth:`startHeatingWithCurrent`,
+        or, if it hasn't been set, the one the device had when the instance
+        was created, in mA. Unlike :attr:`heatingCurrent`, this doesn't
+        access the device. Read-only.
+        """
+        return self._commandedHeatingCurrent
 
 
     @property
@@ -447,8 +533,45 @@ class ProductionSystem(object):
             accurate reflection of the heater's temperature. If the user
             has moved the temperature sensor aside, it will be unrelated
             to the heater's temperature.
+
+        Each access reads the device. The reading is shared like those taken
+        every :attr:`samplingInterval` milliseconds, so clients that only need
+        a recent value should use :attr:`temperatureSensorReading` instead.
+        """
+        return self._sensorService.poll().value
+
+
+    @property
+    def temperatureSensorReading(self):
+        """
+        The most recent :class:`~ops.sampling.Reading` of the temperature
+        sensor voltage, in V, which is no older than :attr:`samplingInterval`
+        milliseconds. The device is only read if there is no such reading.
+        Read-only.
+
+        The notes on :attr:`temperatureSensorVoltage` apply.
+        """
+        return self._sensorService.getReading()
+
+
+    @property
+    def telemetry(self):
+        """
+        The :class:`~ops.telemetry.TelemetryStore` that keeps the history of
+        the temperature sensor voltage, the temperature, and the commanded
+        heating current and heater position of the device, recorded every
+        :attr:`samplingInterval` milliseconds. Immutable.
+        """
+        return self._telemetry
+
+
+    def _readTemperatureSensorVoltage(self):
+        """
+        Reads the temperature sensor voltage from the device. Used by the
+        instance's :class:`~ops.sampling.SensorService`.
         """
-        return self._interface.temperatureSensorVoltage
+        with self._deviceLock:
+            return self._interface.temperatureSensorVoltage
 
 
     @property
@@ -473,6 +596,22 @@ class ProductionSystem(object):
             return None
 
 
+    def getTemperaturesFromVoltages(self, voltages):
+        """
+        Converts a recorded trace of temperature sensor voltages (in V) to
+        the corresponding heating temperatures (in °C) in a single step,
+        using the method of the same name of :attr:`calibrationData`.
+        Returns a :class:`numpy.ndarray` with the same shape as `voltages`,
+        or ``None`` if the device isn't calibrated.
+
+        The notes on :attr:`temperature` apply to each converted voltage.
+        """
+        if self.isCalibrated:
+            return self.calibrationData.getTemperaturesFromVoltages(voltages)
+        else:
+            return None
+
+
     @property
     def targetTemperature(self):
         """
@@ -500,12 +639,11 @@ class ProductionSystem(object):
         calibration procedure. Read-only.
         """
         if self.isCalibrated:
-            return min(self.calibrationData.temperatures)
+            return self._getTargetTemperatureEnvelope()[0]
         else:
             return None
 
 
-
     @property
     def maxTargetTemperature(self):
         """
@@ -518,33 +656,104 @@ class ProductionSystem(object):
         :attr:`maxHeatingCurrent`, or the highest temperature measured
         during the calibration procedure. Read-only.
         """
-        if not self.isCalibrated:
+        if self.isCalibrated:
+            return self._getTargetTemperatureEnvelope()[1]
+        else:
             return None
 
+
+    def _getTargetTemperatureEnvelope(self):
+        """
+        Returns a tuple of :attr:`minTargetTemperature` and
+        :attr:`maxTargetTemperature`. The tuple is computed by
+        :meth:`_computeTargetTemperatureEnvelope` when it is first needed,
+        and cached until the calibration data, :attr:`maxHeatingCurrent`, or
+        :attr:`maxSafeTemperature` change.
+        """
+        if self._targetTemperatureEnvelope is None:
+            self._targetTemperatureEnvelope = \
+                self._computeTargetTemperatureEnvelope()
+        return self._targetTemperatureEnvelope
+
+
+    def _computeTargetTemperatureEnvelope(self):
+        """
+        Computes the tuple returned by :meth:`_getTargetTemperatureEnvelope`.
+        The calibration data must be complete.
+        """
         cd = self.calibrationData
         maxI = self.maxHeatingCurrent
+        minResult = float(cd.temperatureArray.min())
+        maxMeasured = float(cd.temperatureArray.max())
+
+        # With a monotone inverse, the limit for maxHeatingCurrent is known
+        # exactly, and no search is needed.
+        limit = cd.getMaxTargetTemperatureFromCurrent(maxI)
+        if limit is not None:
+            result = min(self.maxSafeTemperature, limit, maxMeasured)
+            return (minResult, result)
+
         result = min(
             self.maxSafeTemperature,
             cd.getFinalTemperatureFromCurrent(maxI),
-            max(cd.temperatures))
+            maxMeasured)
 
-        # HACK: At this point, currentFromTargetTemperature(result) may be
-        # greater than maxHeatingCurrent, and hence invalid, since, given
-        # sufficiently wonky calibration data, it is not guaranteed that
+        # HACK: Without a monotone inverse, the estimated current for result
+        # may be greater than maxHeatingCurrent, and hence invalid, since,
+        # given sufficiently wonky calibration data, it is not guaranteed that
         # currentFromTargetTemperature(finalTemperatureFromCurrent(i)) == i.
         # We fix this by trying lower results until one fits, or until result
         # should have been reduced to a third of its original value, in which
-        # case something is probably very wrong, and we give up to avoid
-        # entering an endless loop (which would be bad).
-        for attempt in xrange(111):
-            if cd.getCurrentFromTargetTemperature(result) <= maxI:
-                break
+        # case something is probably very wrong, and we give up. All
+        # candidates are checked at once; numpy.cumprod multiplies them in the
+        # same order as repeatedly applying "result *= 0.99" would.
+        factors = numpy.empty(111)
+        factors[0] = result
+        factors[1:] = 0.99
+        candidates = numpy.cumprod(factors)
+        currents = cd.getCurrentsFromTargetTemperatures(candidates)
+
+        valid = numpy.flatnonzero(currents <= maxI)
+        if len(valid) == 0:
+            raise util.ApplicationError('something seems to be very wrong')
+        elif valid[0] == 0:
+            return (minResult, result)
+
+        # The highest valid result lies between the first valid candidate
+        # and the one before it, and is found by bisection.
+        low = float(candidates[valid[0]])
+        high = float(candidates[valid[0] - 1])
+        for iteration in xrange(self.envelopeBisections):
+            middle = (low + high) / 2.0
+            if cd.getCurrentFromTargetTemperature(middle) <= maxI:
+                low = middle
             else:
-                result *= 0.99
+                high = middle
+
+        return (minResult, low)
+
+
+    def _envelopeListener(self, event):
+        """
+        Called when a :class:`~ops.event.SystemPropertiesChanged` or
+        :class:`~ops.calibration.event.CalibrationDataChanged` event is sent.
+        Discards the cached target temperature envelope if the event affects
+        it.
+        """
+        if event.system is not self:
+            return
+        elif isinstance(event, SystemPropertiesChanged):
+            if event.name in ('maxHeatingCurrent', 'maxSafeTemperature'):
+                self._targetTemperatureEnvelope = None
         else:
-            raise util.ApplicationError('something seems to be very wrong')
+            self._targetTemperatureEnvelope = None
+
 
-        return result
+    #: The number of bisection steps used to find :attr:`maxTargetTemperature`
+    #: if the estimated heating current for the first candidate exceeds
+    #: :attr:`maxHeatingCurrent`. This is a class attribute, but it can be set
+    #: on an instance to override the default value.
+    envelopeBisections = 52
 
 
     def isValidTargetTemperature(self, temperature):
@@ -582,7 +791,9 @@ class ProductionSystem(object):
         if 0.0 <= current <= self.maxHeatingCurrent:
             self._isInSafeMode = False
             self._targetTemperature = None
-            self._interface.startHeatingWithCurrent(current)
+            with self._deviceLock:
+                self._interface.startHeatingWithCurrent(current)
+                self._commandedHeatingCurrent = current
         else:
             raise ops.error.InvalidHeatingCurrentError(current)
 
@@ -657,7 +868,8 @@ class ProductionSystem(object):
         Read-only. To move the heater to another position, use the
         :meth:`startHeaterMovement` method.
         """
-        return self._interface.heaterPosition
+        with self._deviceLock:
+            return self._interface.heaterPosition
 
 
     @property
@@ -673,7 +885,19 @@ class ProductionSystem(object):
         Read-only. To change the heater's target position, use the
         :meth:`startHeaterMovement` method.
         """
-        return self._interface.heaterTargetPosition
+        with self._deviceLock:
+            return self._interface.heaterTargetPosition
+
+
+    @property
+    def commandedHeaterPosition(self):
+        """
+        The target position last passed to :meth:`startHeaterMovement`, or,
+        if the heater hasn't been moved, the position it had when the
+        instance was created. Unlike :attr:`heaterTargetPosition`, this
+        doesn't access the device. Read-only.
+        """
+        return self._heaterTargetPosition
 
 
     def startHeaterMovement(self, targetPosition, key=None):
@@ -699,7 +923,9 @@ class ProductionSystem(object):
         :attr:`heaterPosition`.
         """
         self._tryKey(key)
-        self._interface.startHeaterMovement(targetPosition)
+        with self._deviceLock:
+            self._interface.startHeaterMovement(targetPosition)
+            self._heaterTargetPosition = targetPosition
 
 
     ###########################################################################
@@ -731,7 +957,8 @@ class ProductionSystem(object):
         if not self.isSimulation:
             raise ops.error.RequiresSimulationError()
         else:
-            return self._interface.speedFactor
+            with self._deviceLock:
+                return self._interface.speedFactor
 
 
     @speedFactor.setter
@@ -740,7 +967,8 @@ class ProductionSystem(object):
         if not self.isSimulation:
             raise ops.error.RequiresSimulationError()
         else:
-            self._interface.speedFactor = newSpeedFactor
+            with self._deviceLock:
+                self._interface.speedFactor = newSpeedFactor
 
 
     def performMagicCalibration(self):
@@ -764,8 +992,9 @@ class ProductionSystem(object):
         if not self.isSimulation:
             raise ops.error.RequiresSimulationError()
 
-        self.calibrationData = cd = ops.calibration.data.CalibrationData()
+        cd = ops.calibration.data.CalibrationData()
         current = self.heatingCurrentWhileIdle
+        measurements = []
 
         while True:
             if current > self.maxHeatingCurrent:
@@ -777,9 +1006,12 @@ class ProductionSystem(object):
             if voltage > self.maxSafeTemperatureSensorVoltage:
                 break
 
-            cd.addMeasurement(current, voltage, temperature)
+            measurements.append((current, voltage, temperature))
             current += 2.0
 
+        cd.addMeasurements(measurements)
+        self.calibrationData = cd
+
 
     # TODO: Comment
     testingUseFakeCalibration = False
\ No newline at end of file
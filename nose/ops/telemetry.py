@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This module contains the :class:`TelemetryStore` class, which keeps a history
+of the commanded heating current, the temperature sensor voltage, the
+temperature and the commanded heater position of a
+:class:`~ops.system.ProductionSystem` in memory, so that trends can be
+charted and the moments before a safe mode trip can be examined.
+
+The history of each signal is kept by a :class:`SignalHistory` in several
+*tiers* of decreasing resolution. By default, the raw values are kept for ten
+minutes, the minimum, mean and maximum of each second for a day, and those of
+each minute for thirty days. Each tier is a :class:`RingBuffer` of fixed
+capacity, so the memory used is bounded no matter how long the application
+runs.
+
+All times are those of :func:`util.monotonicTime`, like the times of the
+readings of a :class:`~ops.sampling.SensorService`.
+"""
+
+import collections
+import math
+import numpy
+
+from ops.event import TemperatureSensorSampled
+
+
+###############################################################################
+# THE RING BUFFER CLASS                                                       #
+###############################################################################
+
+class RingBuffer(object):
+    """
+    Creates a new instance of this class, which holds up to `capacity` rows of
+    `width` floating-point numbers each. When the buffer is full, appending
+    a row discards the oldest one. The first column is the time of a row, and
+    rows must be appended in ascending order of time.
+
+    The underlying :class:`numpy.ndarray` grows as rows are appended, so
+    a buffer that is never filled doesn't use the memory for its whole
+    capacity.
+    """
+
+    def __init__(self, capacity, width):
+        if capacity < 1:
+            raise ValueError('capacity < 1')
+
+        self._capacity = capacity
+        self._rows = numpy.empty((min(capacity, 64), width))
+        self._start = 0
+        self._length = 0
+
+
+    @property
+    def capacity(self):
+        """
+        The greatest number of rows the buffer holds. Immutable.
+        """
+        return self._capacity
+
+
+    def __len__(self):
+        """
+        Returns the number of rows in the buffer.
+        """
+        return self._length
+
+
+    def append(self, row):
+        """
+        Appends a row, discarding the oldest row if the buffer is full.
+        """
+        if self._length == len(self._rows) < self._capacity:
+            self._grow()
+
+        end = (self._start + self._length) % len(self._rows)
+        self._rows[end] = row
+        if self._length < len(self._rows):
+            self._length += 1
+        else:
+            self._start = (self._start + 1) % len(self._rows)
+
+
+    def _grow(self):
+        """
+        Doubles the size of the underlying array, up to :attr:`capacity`.
+        The buffer must not be wrapped around, which it never is before it
+        reaches its capacity.
+        """
+        size = min(2 * len(self._rows), self._capacity)
+        rows = numpy.empty((size, self._rows.shape[1]))
+        rows[:self._length] = self._rows[:self._length]
+        self._rows = rows
+
+
+    def getRows(self, start=None, end=None):
+        """
+        Returns a new :class:`numpy.ndarray` of the rows whose time lies
+        between `start` and `end` (inclusive), in ascending order of time.
+        Either may be ``None`` to include all rows from the beginning or up
+        to the end.
+        """
+        rows = self._rows
+        head = rows[self._start:self._start + self._length]
+        tail = rows[:max(0, self._start + self._length - len(rows))]
+
+        # Only the slice that is actually asked for is copied.
+        times = (head[:, 0], tail[:, 0])
+        first = [0, 0] if start is None else [
+            numpy.searchsorted(t, start, 'left') for t in times]
+        last = [len(head), len(tail)] if end is None else [
+            numpy.searchsorted(t, end, 'right') for t in times]
+        return numpy.concatenate(
+            (head[first[0]:last[0]], tail[first[1]:last[1]]))
+
+
+###############################################################################
+# THE SIGNAL HISTORY CLASS                                                    #
+###############################################################################
+
+#: A named tuple that describes a tier of a :class:`SignalHistory`. Its items
+#: are `resolution`, the length of the intervals values are combined over,
+#: in seconds, or 0 for raw values; and `duration`, the time the tier covers,
+#: in seconds.
+Tier = collections.namedtuple('Tier', 'resolution, duration')
+
+#: The tiers used by default: raw values for ten minutes, one second
+#: intervals for a day, and one minute intervals for thirty days.
+DEFAULT_TIERS = (Tier(0, 600.0), Tier(1.0, 86400.0), Tier(60.0, 2592000.0))
+
+# The dtype of the arrays returned by SignalHistory.getRange.
+_RANGE_DTYPE = [('time', float), ('min', float), ('mean', float),
+    ('max', float), ('count', int)]
+
+
+class SignalHistory(object):
+    """
+    Creates a new instance of this class, which keeps the history of a single
+    signal in the given tiers, a sequence of :class:`Tier`\s ordered from the
+    finest resolution to the coarsest. If `tiers` is ``None``,
+    :data:`DEFAULT_TIERS` is used. `interval` is the shortest expected time
+    between two values, in seconds, which determines the capacity of a raw
+    tier.
+
+    Values that are ``nan`` are kept in a raw tier, but are left out of the
+    intervals of the other tiers.
+    """
+
+    def __init__(self, tiers=None, interval=0.25):
+        if tiers is None:
+            tiers = DEFAULT_TIERS
+
+        self._tiers = tuple(Tier(*t) for t in tiers)
+        self._buffers = []
+        self._bins = []
+        for tier in self._tiers:
+            if tier.resolution:
+                capacity = tier.duration / tier.resolution
+                self._buffers.append(RingBuffer(int(math.ceil(capacity)), 5))
+            else:
+                capacity = tier.duration / interval
+                self._buffers.append(RingBuffer(int(math.ceil(capacity)), 2))
+            self._bins.append(None)
+
+        self._latestTime = None
+
+
+    @property
+    def tiers(self):
+        """
+        A tuple of the :class:`Tier`\s of the instance. Immutable.
+        """
+        return self._tiers
+
+
+    @property
+    def latestTime(self):
+        """
+        The time of the most recent value, or ``None`` if no value has been
+        added. Read-only.
+        """
+        return self._latestTime
+
+
+    def add(self, time, value):
+        """
+        Adds a value of the signal at the given time. Times must be added in
+        ascending order.
+        """
+        for index, tier in enumerate(self._tiers):
+            if tier.resolution:
+                self._addToBin(index, time, value)
+            else:
+                self._buffers[index].append((time, value))
+        self._latestTime = time
+
+
+    def _addToBin(self, index, time, value):
+        """
+        Adds a value to the current interval of the tier with the given index.
+        When the value belongs to a later interval, the current one is
+        appended to the tier's buffer first.
+        """
+        if value != value:
+            return
+
+        resolution = self._tiers[index].resolution
+        binStart = math.floor(time / resolution) * resolution
+        current = self._bins[index]
+
+        # The current interval is kept as a list of its start, minimum, sum,
+        # maximum, and count.
+        if current is not None and current[0] == binStart:
+            current[1] = min(current[1], value)
+            current[2] += value
+            current[3] = max(current[3], value)
+            current[4] += 1
+        else:
+            if current is not None:
+                self._buffers[index].append((current[0], current[1],
+                    current[2] / current[4], current[3], current[4]))
+            self._bins[index] = [binStart, value, value, value, 1]
+
+
+    def getRange(self, start=None, end=None, resolution=None):
+        """
+        Returns a structured :class:`numpy.ndarray` of the history of the
+        signal between `start` and `end`, with the fields `time`, `min`,
+        `mean`, `max`, and `count`. Either may be ``None`` to include all
+        history from the beginning or up to the most recent value.
+
+        The values are taken from the tier whose resolution is `resolution`.
+        If `resolution` is ``None``, the tier with the finest resolution that
+        still covers `start` is used, or the finest tier if `start` is
+        ``None`` as well. For intervals, `time` is the start of
+        the interval; only intervals that are complete are included. For raw
+        values, `min`, `mean`, and `max` are all the value, and `count`
+        is 1.
+        """
+        index = self._getTierIndex(start, resolution)
+        rows = self._buffers[index].getRows(start, end)
+
+        result = numpy.empty(len(rows), dtype=_RANGE_DTYPE)
+        result['time'] = rows[:, 0]
+        if self._tiers[index].resolution:
+            for column, name in enumerate(('min', 'mean', 'max', 'count'), 1):
+                result[name] = rows[:, column]
+        else:
+            for name in ('min', 'mean', 'max'):
+                result[name] = rows[:, 1]
+            result['count'] = 1
+        return result
+
+
+    def _getTierIndex(self, start, resolution):
+        """
+        Returns the index of the tier :meth:`getRange` uses.
+        """
+        if resolution is not None:
+            resolutions = [t.resolution for t in self._tiers]
+            if resolution not in resolutions:
+                raise ValueError('no tier with resolution %r' % resolution)
+            return resolutions.index(resolution)
+
+        if start is None or self._latestTime is None:
+            return 0
+        for index, tier in enumerate(self._tiers):
+            if self._latestTime - start <= tier.duration:
+                return index
+        return len(self._tiers) - 1
+
+
+###############################################################################
+# THE TELEMETRY STORE CLASS                                                   #
+###############################################################################
+
+#: The names of the signals a :class:`TelemetryStore` keeps, which are the
+#: names of the corresponding properties of
+#: :class:`~ops.system.ProductionSystem`.
+SIGNALS = (
+    'commandedHeatingCurrent', 'temperatureSensorVoltage', 'temperature',
+    'commandedHeaterPosition')
+
+
+class TelemetryStore(object):
+    """
+    Creates a new instance of this class, which keeps the history of the
+    :data:`SIGNALS` of the :class:`~ops.system.ProductionSystem` `system`,
+    using the given tiers (see :class:`SignalHistory`).
+
+    A value of each signal is recorded whenever a
+    :class:`~ops.event.TemperatureSensorSampled` event is sent for the
+    system, that is, once every
+    :attr:`~ops.system.ProductionSystem.samplingInterval` milliseconds. The
+    temperature sensor voltage is taken from the event's reading, and the
+    temperature is computed from it; it is ``nan`` while the system isn't
+    calibrated. The heating current and the heater position are those the
+    system last commanded, so recording never accesses the device.
+    """
+
+    def __init__(self, system, tiers=None):
+        self._system = system
+        interval = system.samplingInterval / 1000.0
+        self._histories = dict(
+            (name, SignalHistory(tiers, interval)) for name in SIGNALS)
+
+        system.mediator.addListener(
+            self._temperatureSensorListener, TemperatureSensorSampled)
+
+
+    @property
+    def system(self):
+        """
+        The :class:`~ops.system.ProductionSystem` whose signals are recorded.
+        Immutable.
+        """
+        return self._system
+
+
+    def getHistory(self, signal):
+        """
+        Returns the :class:`SignalHistory` of `signal`, one of
+        :data:`SIGNALS`.
+        """
+        return self._histories[signal]
+
+
+    def getRange(self, signal, start=None, end=None, resolution=None):
+        """
+        Returns the history of `signal`, one of :data:`SIGNALS`, between
+        `start` and `end`. See :meth:`SignalHistory.getRange`.
+        """
+        return self._histories[signal].getRange(start, end, resolution)
+
+
+    def record(self, time, voltage):
+        """
+        Records the values of all signals at the given time, given the
+        temperature sensor voltage.
+        """
+        system = self._system
+        if system.isCalibrated:
+            temperature = system.calibrationData.getTemperatureFromVoltage(
+                voltage)
+        else:
+            temperature = numpy.nan
+
+        values = {
+            'commandedHeatingCurrent': system.commandedHeatingCurrent,
+            'temperatureSensorVoltage': voltage,
+            'temperature': temperature,
+            'commandedHeaterPosition': system.commandedHeaterPosition}
+        for name, value in values.iteritems():
+            self._histories[name].add(time, value)
+
+
+    def _temperatureSensorListener(self, event):
+        """
+        Called when a :class:`~ops.event.TemperatureSensorSampled` event is
+        sent. Records the values of all signals.
+        """
+        if event.system is self._system:
+            self.record(event.reading.time, event.reading.value)
@@ -24,9 +24,14 @@ Contains a number of assorted utility functions used by the application.
 
 # TODO: Add referrence to GUI-related utility functions.
 
+import ctypes
+import ctypes.util
 import gettext as gettextmodule
 import math
 import os
+import stat
+import tempfile
+import time
 import weakref
 
 
@@ -140,6 +145,123 @@ def roundToMultiple(n, m):
         return round(n / float(m)) * m
 
 
+###############################################################################
+# TIME                                                                        #
+###############################################################################
+
+def _getMonotonicClock():
+    """
+    Returns a function that returns the time of a monotonic clock with
+    a high resolution, in seconds. The time of the clock is only meaningful
+    in relation to other times of the same clock.
+
+    If no monotonic clock is available, :func:`time.time` is returned. This
+    is decided once, by reading the clock, so that all times of the process
+    come from the same clock. Should the monotonic clock fail later on, the
+    returned function raises an :exc:`OSError` rather than mixing in
+    a different clock.
+    """
+    if hasattr(time, 'monotonic'):
+        return time.monotonic
+
+    try:
+        librt = ctypes.CDLL(ctypes.util.find_library('rt'), use_errno=True)
+        clock_gettime = librt.clock_gettime
+    except (AttributeError, OSError, TypeError):
+        return time.time
+
+    class timespec(ctypes.Structure):
+        _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+    CLOCK_MONOTONIC = 1
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+
+    t = timespec()
+    if clock_gettime(CLOCK_MONOTONIC, ctypes.pointer(t)) != 0:
+        return time.time
+
+    def monotonic():
+        t = timespec()
+        if clock_gettime(CLOCK_MONOTONIC, ctypes.pointer(t)) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        return t.tv_sec + t.tv_nsec * 1e-9
+
+    return monotonic
+
+
+_monotonicClock = _getMonotonicClock()
+
+
+def monotonicTime():
+    """
+    Returns the time of a monotonic clock with a high resolution, in
+    seconds. Unlike :func:`time.time`, the clock is not affected by changes
+    to the system time, so the differences between its times can be used to
+    measure time periods. The times themselves have no defined meaning.
+
+    If the platform provides no monotonic clock, :func:`time.time` is used.
+    """
+    return _monotonicClock()
+
+
+###############################################################################
+# FILES                                                                       #
+###############################################################################
+
+def _getUmask():
+    """
+    Returns the file mode creation mask of the process. The mask can only be
+    read by setting it, so this is done once, when the module is imported.
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+_umask = _getUmask()
+
+
+def writeAtomically(fileName, write):
+    """
+    Replaces the file `fileName` atomically with the output of `write`,
+    a function that takes a file object opened for writing in binary mode.
+    The output is written to a temporary file in the same directory, which
+    is flushed to disk and then renamed to `fileName`. If anything goes wrong,
+    the temporary file is removed, the original file is left unchanged, and
+    the exception is reraised.
+
+    The new file gets the permissions of the file it replaces, or, if there
+    is none, those of a file created with :func:`open`. On platforms whose
+    :func:`os.rename` cannot replace existing files, the original file is
+    removed just before the rename.
+    """
+    directory, name = os.path.split(os.path.abspath(fileName))
+    descriptor, temporaryName = tempfile.mkstemp(
+        prefix='.' + name + '.', suffix='.tmp', dir=directory)
+
+    try:
+        with os.fdopen(descriptor, 'wb') as temporaryFile:
+            write(temporaryFile)
+            temporaryFile.flush()
+            os.fsync(temporaryFile.fileno())
+
+        # mkstemp creates files that only their owner can read and write.
+        if os.path.exists(fileName):
+            mode = stat.S_IMODE(os.stat(fileName).st_mode)
+        else:
+            mode = 0666 & ~_umask
+        os.chmod(temporaryName, mode)
+
+        if os.name == 'nt' and os.path.exists(fileName):
+            os.remove(fileName)
+        os.rename(temporaryName, fileName)
+    except:
+        if os.path.exists(temporaryName):
+            os.remove(temporaryName)
+        raise
+
+
 ###############################################################################
 # WEAK REFERNCES                                                              #
 ###############################################################################
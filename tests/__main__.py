@@ -44,9 +44,21 @@ if __name__ == '__main__':
         'utiltest',
         'opstest.simulationtest',
         'opstest.systemtest',
+        'opstest.samplingtest',
+        'opstest.telemetrytest',
         'opstest.calibrationtest.datatest',
+        'opstest.calibrationtest.binarytest',
+        'opstest.calibrationtest.librarytest',
+        'opstest.calibrationtest.profilestest',
+        'opstest.calibrationtest.autosavetest',
+        'opstest.calibrationtest.archivetest',
+        'opstest.calibrationtest.evaluatortest',
+        'opstest.calibrationtest.fittingtest',
         'opstest.calibrationtest.leastsquaretest',
         'opstest.calibrationtest.managertest',
+        'opstest.calibrationtest.plannertest',
+        'opstest.calibrationtest.orchestratortest',
+        'opstest.calibrationtest.reporttest',
 
         'guitest.calibrationtest.tabletest',
         'guitest.calibrationtest.functionstest',
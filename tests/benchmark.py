@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+
+"""
+Compares the speed of the estimation functions of
+:class:`~ops.calibration.data.CalibrationData`, which use
+:class:`~ops.calibration.evaluator.PolynomialEvaluator`, to that of
+:class:`numpy.poly1d`. To run the benchmarks, run this module from the
+command line.
+"""
+
+import numpy
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.join('.', 'nose'))
+
+from ops.calibration.evaluator import PolynomialEvaluator
+
+
+def benchmark(name, function, number):
+    """
+    Calls `function` `number` times, and prints the time per call.
+    """
+    seconds = min(timeit.repeat(function, number=number, repeat=3))
+    print '%-40s %10.3f us' % (name, seconds / number * 1e6)
+
+
+if __name__ == '__main__':
+    coefficients = (1.2e-9, -3.4e-6, 2.5e-3, 1.1, 20.0)
+    polynomial = numpy.poly1d(coefficients)
+    evaluator = PolynomialEvaluator(coefficients)
+    values = numpy.linspace(0.0, 2.0, 1000)
+
+    print 'Single values:'
+    benchmark('numpy.poly1d', lambda: polynomial(0.7), 100000)
+    benchmark('PolynomialEvaluator.__call__', lambda: evaluator(0.7), 100000)
+    benchmark('PolynomialEvaluator.evaluate',
+        lambda: evaluator.evaluate(0.7), 100000)
+
+    print 'Arrays of %d values:' % len(values)
+    benchmark('numpy.poly1d, one call per value',
+        lambda: [polynomial(x) for x in values], 100)
+    benchmark('numpy.poly1d, one call', lambda: polynomial(values), 1000)
+    benchmark('PolynomialEvaluator.evaluateArray',
+        lambda: evaluator.evaluateArray(values), 1000)
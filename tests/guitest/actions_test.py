@@ -122,6 +122,31 @@ class AllTests(unittest.TestCase):
                 self.uninstallFakeIOFunctions()
 
 
+    def testSaveCalibrationDataActionWithReport(self):
+        """Checks that the calibration report is saved next to the data."""
+        action = gui.actions.SaveCalibrationDataAction(*self.p)
+        cd = self.system.calibrationData
+        cd.addMeasurement(1.0, 2.0, 3.0)
+        cd.fileName = 'foo.cal'
+        cd.report = 'dummy report'
+
+        oldSave = gui.io.save
+        calls = []
+        def newSave(*p):
+            calls.append(p)
+            return True
+        gui.io.save = newSave
+        try:
+            action.activate()
+        finally:
+            gui.io.save = oldSave
+
+        parent = self.mainWindowHandler._window
+        self.assertEqual(calls, [
+            (cd, 'CalibrationData', 'foo.cal', parent),
+            ('dummy report', 'CalibrationReport', 'foo.calreport', parent)])
+
+
     def testSaveCalibrationDataActionWithNoData(self):
         """Tests the illegal activation of a SaveCalibrationDataAction."""
         action = gui.actions.SaveCalibrationDataAction(*self.p)
@@ -192,6 +217,94 @@ class AllTests(unittest.TestCase):
         self.assertEqual(gui.widgets.TESTING_REPORT_ID, 'illegal activation')
 
 
+    def testRetakeSuspiciousMeasurementsActionYes(self):
+        """
+        Tests activating a RetakeSuspiciousMeasurementsAction and answering
+        Yes to the prompt.
+        """
+        action = gui.actions.RetakeSuspiciousMeasurementsAction(*self.p)
+        self.system.calibrationData = test.makeCalibrationData()
+        self.system.calibrationData.addMeasurement(4.0, 0.4, 400.0, 0.0)
+        logger = test.replaceWithLogger(self.system.startCalibration)
+        gui.widgets.TESTING_DEFAULT_ANSWER = True
+        action.activate()
+        self.assertTrue(gui.widgets.TESTING_QUESTION_ASKED)
+        self.assertEqual(logger.log, [(4.0,)])
+
+
+    def testRetakeSuspiciousMeasurementsActionNo(self):
+        """
+        Tests activating a RetakeSuspiciousMeasurementsAction and answering
+        No to the prompt.
+        """
+        action = gui.actions.RetakeSuspiciousMeasurementsAction(*self.p)
+        self.system.calibrationData = test.makeCalibrationData()
+        self.system.calibrationData.addMeasurement(4.0, 0.4, 400.0, 0.0)
+        logger = test.replaceWithLogger(self.system.startCalibration)
+        gui.widgets.TESTING_DEFAULT_ANSWER = False
+        action.activate()
+        self.assertTrue(gui.widgets.TESTING_QUESTION_ASKED)
+        self.assertEqual(logger.log, [])
+
+
+    def testRetakeSuspiciousMeasurementsActionWithNothingToRetake(self):
+        """
+        Tests activating a RetakeSuspiciousMeasurementsAction when none of the
+        measurements are suspicious.
+        """
+        action = gui.actions.RetakeSuspiciousMeasurementsAction(*self.p)
+        self.system.calibrationData = test.makeCalibrationData()
+        action.activate()
+        self.assertEqual(gui.widgets.TESTING_REPORT_ID, 'nothing to retake')
+
+
+    def testRetakeSuspiciousMeasurementsActionWithLockedSystem(self):
+        """
+        Checks that nothing is planned or retaken while the system is locked.
+        """
+        action = gui.actions.RetakeSuspiciousMeasurementsAction(*self.p)
+        self.system.calibrationData = test.makeCalibrationData()
+        logger = test.replaceWithLogger(self.system.startCalibration)
+        self.system.lock(key=self)
+        action.activate()
+        self.system.unlock(key=self)
+        self.assertEqual(gui.widgets.TESTING_REPORT_ID, 'system locked')
+        self.assertFalse(gui.widgets.TESTING_QUESTION_ASKED)
+        self.assertEqual(logger.log, [])
+
+
+    def testUndoCalibrationChangeAction(self):
+        """Tests the UndoCalibrationChangeAction class."""
+        action = gui.actions.UndoCalibrationChangeAction(*self.p)
+        cd = self.system.calibrationData
+        cd.addMeasurement(1.0, 2.0, 3.0)
+        action.activate()
+        self.assertFalse(cd.hasMeasurements)
+        self.assertTrue(cd.canRedo)
+
+
+    def testRedoCalibrationChangeAction(self):
+        """Tests the RedoCalibrationChangeAction class."""
+        action = gui.actions.RedoCalibrationChangeAction(*self.p)
+        cd = self.system.calibrationData
+        cd.addMeasurement(1.0, 2.0, 3.0)
+        cd.undo()
+        action.activate()
+        self.assertTrue(cd.hasMeasurements)
+
+
+    def testUndoCalibrationChangeActionWithLockedSystem(self):
+        """Checks that changes are not undone while the system is locked."""
+        action = gui.actions.UndoCalibrationChangeAction(*self.p)
+        cd = self.system.calibrationData
+        cd.addMeasurement(1.0, 2.0, 3.0)
+        self.system.lock(key=self)
+        action.activate()
+        self.system.unlock(key=self)
+        self.assertEqual(gui.widgets.TESTING_REPORT_ID, 'system locked')
+        self.assertTrue(cd.hasMeasurements)
+
+
     def testCreateActionGroup(self):
         """
         Does some minimal testing of the createActionGroup function.
@@ -18,6 +18,7 @@
 # You should have received a copy of the GNU General Public License
 # along with NOSE. If not, see <http://www.gnu.org/licenses/>.
 
+import numpy
 import unittest
 
 from gui.calibration.table import *
@@ -73,6 +74,19 @@ class MeasurementTableTests(unittest.TestCase):
         self.assertEqual(rowCount(None), len(self.cd.measurements))
 
 
+    def testGetInfluences(self):
+        """Tests the :func:`getInfluences` function."""
+        # NOTE: Uses knowledge about makeCalibrationData's behavior.
+        self.cd.addMeasurement(8.0, 0.8, 900.0)
+        expected = numpy.max(
+            [d.cooksDistances for d in self.cd.diagnostics], axis=0)
+        self.assertTrue(numpy.allclose(getInfluences(self.cd), expected))
+
+        cd = CalibrationData()
+        cd.addMeasurement(2.0, 0.2, 200.0)
+        self.assertTrue(numpy.isnan(getInfluences(cd)).all())
+
+
     def testButtonPressed(self):
         """Tests the :meth:`_buttonPressed` method."""
         method = self.handler._buttonPressed
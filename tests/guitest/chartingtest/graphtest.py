@@ -58,6 +58,18 @@ class GraphTests(unittest.TestCase):
             self.chart, self.chart.abscissa, self.chart.ordinate)
 
 
+    def testDrawVectorizedFunctionGraph(self):
+        """Tests drawing a vectorized :class:`FunctionGraph`."""
+        calls = []
+        def function(x):
+            calls.append(x)
+            return 2 * x * x
+
+        graph = FunctionGraph(function, 'pink', False, isVectorized=True)
+        graph.draw(self.chart, self.chart.abscissa, self.chart.ordinate)
+        self.assertEqual(len(calls), 1)
+
+
     def testBadPontGraphStyle(self):
         """Tests creating a :class:`PointGraph` with an invalid style."""
         self.assertRaises(ValueError, PointGraph, ((1, 2), (3, 4)), 'red', 'x')
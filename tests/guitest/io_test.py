@@ -25,6 +25,8 @@ import unittest
 
 import gui.io
 import gui.widgets
+import ops.calibration.binary
+import test
 
 
 class AllTests(unittest.TestCase):
@@ -101,6 +103,34 @@ class AllTests(unittest.TestCase):
             self.uninstallFakeChooseFile()
 
 
+    def testSaveAndLoadBinaryCalibrationData(self):
+        """Checks that binary files are chosen and detected automatically."""
+        cd = test.makeCalibrationData()
+        fileName = self.DEL + '.calb'
+        try:
+            self.assertTrue(gui.io.save(cd, 'CalibrationData', fileName))
+            self.assertTrue(ops.calibration.binary.isBinary(
+                gui.io.read(fileName)))
+
+            loaded = gui.io.load('CalibrationData', fileName)
+            self.assertEqual(loaded.measurements, cd.measurements)
+            self.assertEqual(loaded.fileName, fileName)
+        finally:
+            os.remove(fileName)
+
+
+    def testLoadXMLAsBinaryCalibrationData(self):
+        """Checks that XML files can be loaded with the binary type."""
+        cd = test.makeCalibrationData()
+        fileName = self.DEL + '.cal'
+        try:
+            self.assertTrue(gui.io.save(cd, 'BinaryCalibrationData', fileName))
+            loaded = gui.io.load('BinaryCalibrationData', fileName)
+            self.assertEqual(loaded.measurements, cd.measurements)
+        finally:
+            os.remove(fileName)
+
+
     def installFakeChooseFile(self, fileName):
         self.oldChooseFile = gui.io.chooseFile
         gui.io.chooseFile = lambda type, mode, parent=None: fileName
@@ -188,6 +218,15 @@ class AllTests(unittest.TestCase):
             self.assertEqual(gui.io.stripPath(os.path.join(*path)), path[-1])
 
 
+    def testReplaceExtension(self):
+        """Tests replaceExtension."""
+        for name in ('foo.cal', 'foo'):
+            path = os.path.join('bar', name)
+            self.assertEqual(
+                gui.io.replaceExtension(path, 'CalibrationReport'),
+                os.path.join('bar', 'foo.calreport'))
+
+
     def testCreateFileChooser(self):
         """Test _createFileChooser."""
         for type in gui.io.FILE_TYPES:
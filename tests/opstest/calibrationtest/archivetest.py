@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+
+import math
+import os
+import unittest
+
+from ops.calibration.archive import *
+from ops.calibration.event import CalibrationOver, TemperatureRequested
+from ops.calibration.leastsquare import DoubleSolution, Solution
+from ops.calibration.manager import STATUS_ABORTED, STATUS_FINISHED
+from ops.calibration.report import CalibrationReport, StageReport
+from test import *
+
+import gui.mediator
+import ops.system
+
+
+def makeReport(*currents):
+    stages = [StageReport(current, 60.0, 5.0, 3, (0.1, 0.2, 0.1))
+        for current in currents]
+    return CalibrationReport(STATUS_FINISHED, 200.0, 10.0, stages, 0)
+
+
+class DownsampleTests(unittest.TestCase):
+    """
+    Tests for the :func:`~ops.calibration.archive.downsample` function.
+    """
+
+    def testShortTrace(self):
+        """Checks that short traces are returned unchanged."""
+        times, voltages = downsample([0.0, 1.0], [0.5, 0.6], 2)
+        self.assertEqual(times.tolist(), [0.0, 1.0])
+        self.assertEqual(voltages.tolist(), [0.5, 0.6])
+
+
+    def testLongTrace(self):
+        """Checks that long traces are reduced to bin means."""
+        times, voltages = downsample(range(10), range(10, 20), 4)
+        self.assertEqual(len(times), 4)
+        self.assertEqual(times.tolist(), [0.5, 3.0, 5.5, 8.0])
+        self.assertEqual(voltages.tolist(), [10.5, 13.0, 15.5, 18.0])
+
+
+class CalibrationArchiveTests(unittest.TestCase):
+    """
+    Tests for the :class:`~ops.calibration.archive.CalibrationArchive` class.
+    """
+
+    FILE_NAME = os.path.join('tests', 'saves', 'delete.me')
+
+
+    def setUp(self):
+        self.archive = CalibrationArchive(':memory:')
+        self.cd = makeCalibrationData()
+
+
+    def tearDown(self):
+        self.archive.close()
+        if os.path.exists(self.FILE_NAME):
+            os.remove(self.FILE_NAME)
+
+
+    def testReadOnly(self):
+        """Checks that read-only properties are actually read-only."""
+        for p in 'fileName systems'.split():
+            self.assertRaises(AttributeError, setattr, self.archive, p, None)
+
+
+    def testSystems(self):
+        """Tests the :attr:`systems` property."""
+        self.assertEqual(self.archive.systems, ())
+        self.archive.addRun('station-2', 100.0, self.cd)
+        self.archive.addRun('station-1', 200.0, self.cd)
+        self.archive.addRun('station-2', 300.0, self.cd)
+        self.assertEqual(self.archive.systems, ('station-1', 'station-2'))
+
+
+    def testAddRunAndGetRuns(self):
+        """Tests the :meth:`addRun` and :meth:`getRuns` methods."""
+        first = self.archive.addRun('station-1', 200.0, self.cd,
+            makeReport(4.0))
+        second = self.archive.addRun('station-1', 100.0, self.cd)
+        self.archive.addRun('station-2', 150.0, self.cd)
+
+        runs = self.archive.getRuns('station-1')
+        self.assertEqual(runs['id'].tolist(), [second, first])
+        self.assertEqual(runs['date'].tolist(), [100.0, 200.0])
+        self.assertEqual(runs['status'].tolist(), [-1, STATUS_FINISHED])
+        self.assertTrue(math.isnan(runs['totalTime'][0]))
+        self.assertEqual(runs['totalTime'][1], 200.0)
+
+        runs = self.archive.getRuns('station-1', start=150.0)
+        self.assertEqual(runs['id'].tolist(), [first])
+        runs = self.archive.getRuns('station-1', end=150.0)
+        self.assertEqual(runs['id'].tolist(), [second])
+        self.assertEqual(len(self.archive.getRuns('station-3')), 0)
+
+
+    def testGetMeasurements(self):
+        """Tests the :meth:`getMeasurements` method."""
+        self.cd.addMeasurement(3.0, 0.3, 300.0, 1000.0)
+        runId = self.archive.addRun('station-1', 100.0, self.cd)
+
+        measurements = self.archive.getMeasurements(runId)
+        self.assertEqual(measurements['current'].tolist(),
+            self.cd.heatingCurrentArray.tolist())
+        self.assertEqual(measurements['voltage'].tolist(),
+            self.cd.temperatureSensorVoltageArray.tolist())
+        self.assertEqual(measurements['temperature'].tolist(),
+            self.cd.temperatureArray.tolist())
+        self.assertEqual(measurements['time'].tolist(),
+            self.cd.measurementTimeArray.tolist())
+
+
+    def testGetStages(self):
+        """Tests the :meth:`getStages` method."""
+        stages = [
+            StageTrace(4.0, Solution(300.0, 400.0, 20.0, ()), (), ()),
+            StageTrace(6.0, DoubleSolution(300.0, 500.0, 15.0, 90.0, 0.25,
+                ()), (), ()),
+            StageTrace(8.0, None, (), ())]
+        runId = self.archive.addRun('station-1', 100.0, self.cd,
+            makeReport(4.0, 6.0), stages)
+
+        stages = self.archive.getStages(runId)
+        self.assertEqual(stages['current'].tolist(), [4.0, 6.0, 8.0])
+        self.assertEqual(stages['heatingTime'][:2].tolist(), [60.0, 60.0])
+        self.assertTrue(math.isnan(stages['heatingTime'][2]))
+        self.assertEqual(stages['solutionsFound'].tolist(), [3, 3, -1])
+        self.assertEqual(stages['tau'][:2].tolist(), [20.0, 15.0])
+        self.assertTrue(math.isnan(stages['tau'][2]))
+        self.assertTrue(math.isnan(stages['slowTau'][0]))
+        self.assertEqual(stages['slowTau'][1], 90.0)
+        self.assertEqual(stages['slowFraction'][1], 0.25)
+
+
+    def testGetTrace(self):
+        """Tests the :meth:`getTrace` method."""
+        self.archive.maxTracePoints = 5
+        stages = [StageTrace(4.0, None, range(10), range(10, 20)),
+            StageTrace(6.0, None, [0.0, 1.0], [0.5, 0.6])]
+        runId = self.archive.addRun('station-1', 100.0, self.cd, None, stages)
+
+        times, voltages = self.archive.getTrace(runId, 0)
+        self.assertEqual(times.tolist(), [0.5, 2.5, 4.5, 6.5, 8.5])
+        self.assertEqual(voltages.tolist(), [10.5, 12.5, 14.5, 16.5, 18.5])
+        times, voltages = self.archive.getTrace(runId, 1)
+        self.assertEqual(times.tolist(), [0.0, 1.0])
+        self.assertEqual(len(self.archive.getTrace(runId, 2)[0]), 0)
+
+
+    def testGetSolutionHistory(self):
+        """Tests the :meth:`getSolutionHistory` method."""
+        for date, tau in [(300.0, 22.0), (100.0, 20.0), (200.0, 21.0)]:
+            stages = [StageTrace(20.0, Solution(300.0, 400.0, tau, ()),
+                (), ()), StageTrace(10.0, Solution(300.0, 350.0, 1.0, ()),
+                (), ())]
+            self.archive.addRun('station-3', date, self.cd, None, stages)
+        self.archive.addRun('station-1', 150.0, self.cd, None, stages)
+
+        dates, values = self.archive.getSolutionHistory('station-3', 20.0)
+        self.assertEqual(dates.tolist(), [100.0, 200.0, 300.0])
+        self.assertEqual(values.tolist(), [20.0, 21.0, 22.0])
+
+        dates, values = self.archive.getSolutionHistory('station-3', 20.0,
+            'finalTemperature', start=150.0, end=250.0)
+        self.assertEqual(dates.tolist(), [200.0])
+        self.assertEqual(values.tolist(), [400.0])
+
+        self.assertRaises(ValueError,
+            self.archive.getSolutionHistory, 'station-3', 20.0, 'foo')
+
+
+    def testReopen(self):
+        """Checks that runs are kept when the database is reopened."""
+        archive = CalibrationArchive(self.FILE_NAME)
+        runId = archive.addRun('station-1', 100.0, self.cd)
+        archive.close()
+
+        archive = CalibrationArchive(self.FILE_NAME)
+        self.assertEqual(archive.getRuns('station-1')['id'].tolist(), [runId])
+        self.assertEqual(len(archive.getMeasurements(runId)), 10)
+        archive.close()
+
+
+class ArchiveRecorderTests(unittest.TestCase):
+    """
+    Tests for the :class:`~ops.calibration.archive.ArchiveRecorder` class.
+    """
+
+    def setUp(self):
+        self.mediator = gui.mediator.Mediator()
+        self.system = ops.system.ProductionSystem(self.mediator)
+        self.archive = CalibrationArchive(':memory:')
+        self.recorder = ArchiveRecorder(self.archive, self.system, 'station-1')
+        self.manager = Stub(None,
+            currents=(4.0, 6.0),
+            heatingStageIndex=0,
+            heatingStageTrace=([0.0, 1.0], [0.5, 0.6]),
+            heatingStageSolution=Solution(300.0, 400.0, 20.0, ()))
+
+
+    def tearDown(self):
+        self.archive.close()
+
+
+    def testReadOnly(self):
+        """Checks that read-only properties are actually read-only."""
+        for p in 'archive system systemId'.split():
+            self.assertRaises(AttributeError, setattr, self.recorder, p, None)
+
+
+    def testRecording(self):
+        """Checks that a finished calibration procedure is recorded."""
+        self.mediator.noteEvent(
+            TemperatureRequested(self.manager, self.system, None))
+        self.manager.heatingStageIndex = 1
+        self.mediator.noteEvent(
+            TemperatureRequested(self.manager, self.system, None))
+
+        report = makeReport(4.0, 6.0)
+        self.mediator.noteEvent(CalibrationOver(self.system, self.manager,
+            STATUS_FINISHED, (4.0, 6.0), (), report))
+
+        runs = self.archive.getRuns('station-1')
+        self.assertEqual(len(runs), 1)
+        runId = runs['id'][0]
+        stages = self.archive.getStages(runId)
+        self.assertEqual(stages['current'].tolist(), [4.0, 6.0])
+        self.assertEqual(stages['tau'].tolist(), [20.0, 20.0])
+        self.assertEqual(self.archive.getTrace(runId, 1)[1].tolist(),
+            [0.5, 0.6])
+
+
+    def testAbortedStage(self):
+        """Checks that the trace of an aborted stage is recorded."""
+        report = CalibrationReport(STATUS_ABORTED, 50.0, 10.0,
+            [StageReport(4.0, 40.0, None, 1, (0.1,))], 0)
+        self.mediator.noteEvent(CalibrationOver(self.system, self.manager,
+            STATUS_ABORTED, (), (4.0, 6.0), report))
+
+        runId = self.archive.getRuns('station-1')['id'][0]
+        self.assertEqual(self.archive.getTrace(runId, 0)[0].tolist(),
+            [0.0, 1.0])
+
+
+    def testOtherSystem(self):
+        """Checks that events of other systems are ignored."""
+        system = ops.system.ProductionSystem(self.mediator)
+        self.mediator.noteEvent(CalibrationOver(system, self.manager,
+            STATUS_FINISHED, (), (), makeReport()))
+        self.assertEqual(self.archive.systems, ())
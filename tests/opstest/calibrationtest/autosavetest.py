@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+
+import os
+import threading
+import time
+import unittest
+
+from ops.calibration.autosave import *
+from ops.calibration.binary import mapFile
+from ops.calibration.data import fromXML
+
+import gui.mediator
+import ops.system
+
+
+class AutosaveServiceTests(unittest.TestCase):
+    """
+    Tests for the :class:`~ops.calibration.autosave.AutosaveService` class.
+    """
+
+    FILE_NAME = os.path.join('tests', 'saves', 'delete.me')
+    BINARY_FILE_NAME = os.path.join('tests', 'saves', 'delete.calb')
+
+
+    def setUp(self):
+        self.mediator = gui.mediator.Mediator()
+        self.system = ops.system.ProductionSystem(self.mediator)
+        self.cd = self.system.calibrationData
+        self.service = AutosaveService(self.system, self.FILE_NAME, 0.05)
+
+
+    def tearDown(self):
+        if self.service.isRunning:
+            self.service.stop()
+        for name in (self.FILE_NAME, self.BINARY_FILE_NAME,
+                self.service.backupFileName):
+            if os.path.exists(name):
+                os.remove(name)
+
+
+    def readFile(self):
+        """Returns the calibration data in the autosave file."""
+        with open(self.FILE_NAME, 'rb') as f:
+            return fromXML(f.read())
+
+
+    def testReadOnly(self):
+        """Checks that read-only properties are actually read-only."""
+        properties = ('system fileName backupFileName isRunning '
+            'hasPendingChanges lastSaveTime lastError')
+        for p in properties.split():
+            self.assertRaises(AttributeError, setattr, self.service, p, None)
+
+
+    def testFlush(self):
+        """Tests the :meth:`flush` method."""
+        self.service.flush()
+        self.assertFalse(os.path.exists(self.FILE_NAME))
+
+        self.cd.addMeasurement(2.0, 0.2, 200.0)
+        self.assertTrue(self.service.hasPendingChanges)
+        self.service.flush()
+
+        self.assertFalse(self.service.hasPendingChanges)
+        self.assertEqual(self.readFile().measurements, self.cd.measurements)
+        self.assertNotEqual(self.service.lastSaveTime, None)
+        self.assertEqual(self.service.lastError, None)
+
+
+    def testOtherSystem(self):
+        """Checks that changes of other systems are ignored."""
+        system = ops.system.ProductionSystem(self.mediator)
+        system.calibrationData.addMeasurement(2.0, 0.2, 200.0)
+        self.assertFalse(self.service.hasPendingChanges)
+
+
+    def testRotation(self):
+        """Checks that the file of an earlier session is kept."""
+        with open(self.FILE_NAME, 'wb') as f:
+            f.write('earlier session')
+
+        self.cd.addMeasurement(2.0, 0.2, 200.0)
+        self.service.flush()
+        with open(self.service.backupFileName, 'rb') as f:
+            self.assertEqual(f.read(), 'earlier session')
+
+        # Only the file of the earlier session is rotated.
+        self.cd.addMeasurement(3.0, 0.3, 300.0)
+        self.service.flush()
+        with open(self.service.backupFileName, 'rb') as f:
+            self.assertEqual(f.read(), 'earlier session')
+        self.assertEqual(len(self.readFile().measurements), 2)
+
+
+    def testDebouncing(self):
+        """Checks that a series of changes is saved once, after a delay."""
+        self.service.start()
+        self.assertTrue(self.service.isRunning)
+
+        for n in xrange(1, 6):
+            self.cd.addMeasurement(2.0 * n, 0.2 * n, 200.0 * n)
+        self.assertFalse(os.path.exists(self.FILE_NAME))
+
+        for n in xrange(100):
+            if self.service.lastSaveTime is not None:
+                break
+            time.sleep(0.01)
+
+        self.assertEqual(len(self.readFile().measurements), 5)
+        self.assertFalse(self.service.hasPendingChanges)
+
+
+    def testStop(self):
+        """Checks that pending changes are saved when the service stops."""
+        self.service.delay = 60.0
+        self.service.start()
+        self.cd.addMeasurement(2.0, 0.2, 200.0)
+        self.service.stop()
+
+        self.assertFalse(self.service.isRunning)
+        self.assertEqual(len(self.readFile().measurements), 1)
+
+
+    def testWriteOrder(self):
+        """Checks that an older snapshot never replaces a newer one."""
+        self.cd.addMeasurement(2.0, 0.2, 200.0)
+        with self.service._writeLock:
+            thread = threading.Thread(target=self.service.flush)
+            thread.start()
+            # A snapshot is only taken once the thread may write it.
+            time.sleep(0.05)
+            self.assertTrue(self.service.hasPendingChanges)
+            self.cd.addMeasurement(3.0, 0.3, 300.0)
+        thread.join()
+
+        self.assertEqual(len(self.readFile().measurements), 2)
+        self.assertFalse(self.service.hasPendingChanges)
+
+
+    def waitForSave(self):
+        """Waits until the worker thread has attempted to save."""
+        for n in xrange(100):
+            if not self.service.hasPendingChanges:
+                break
+            time.sleep(0.01)
+        time.sleep(0.05)
+
+
+    def testUnexpectedError(self):
+        """Checks that any error is recorded without ending the thread."""
+        def rotate():
+            raise ValueError('unexpected')
+
+        self.service._rotate = rotate
+        self.service.start()
+        self.cd.addMeasurement(2.0, 0.2, 200.0)
+        self.waitForSave()
+        self.assertTrue(isinstance(self.service.lastError, ValueError))
+        self.assertTrue(self.service._thread.isAlive())
+
+        del self.service._rotate
+        self.cd.addMeasurement(3.0, 0.3, 300.0)
+        self.waitForSave()
+        self.assertEqual(self.service.lastError, None)
+        self.assertEqual(len(self.readFile().measurements), 2)
+
+
+    def testBinaryFile(self):
+        """Checks that files with the binary extension are saved as such."""
+        service = AutosaveService(self.system, self.BINARY_FILE_NAME)
+        self.cd.addMeasurement(2.0, 0.2, 200.0)
+        service.flush()
+        self.assertEqual(
+            mapFile(service.fileName).measurements, self.cd.measurements)
+
+
+    def testWriteError(self):
+        """Checks that errors while saving are recorded."""
+        service = AutosaveService(self.system,
+            os.path.join('tests', 'saves', 'no', 'such', 'directory.cal'))
+        self.cd.addMeasurement(2.0, 0.2, 200.0)
+        service.flush()
+        self.assertTrue(isinstance(service.lastError, OSError))
+        self.assertEqual(service.lastSaveTime, None)
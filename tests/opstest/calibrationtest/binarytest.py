@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import struct
+import unittest
+
+from ops.calibration.binary import *
+from ops.calibration.data import UNKNOWN_TIME, toXML
+from util import writeAtomically
+
+import test
+
+
+class BinaryFormatTests(unittest.TestCase):
+    """
+    Tests for the :mod:`~ops.calibration.binary` module.
+    """
+
+    FILE_NAME = os.path.join('tests', 'saves', 'delete.me')
+
+
+    def setUp(self):
+        self.cd = test.makeCalibrationData()
+        self.cd.addMeasurement(2.0, 0.2, 200.0, 1234.5)
+        self.cd.addMeasurement(4.0, 0.4, 400.0, UNKNOWN_TIME)
+        self.string = toBinary(self.cd)
+
+
+    def tearDown(self):
+        if os.path.exists(self.FILE_NAME):
+            os.remove(self.FILE_NAME)
+
+
+    def assertSameData(self, cd):
+        """Checks that `cd` contains the same data as :attr:`cd`."""
+        self.assertEqual(cd.measurements, self.cd.measurements)
+        self.assertEqual(cd.getMeasurementTime(2.0), 1234.5)
+        self.assertEqual(cd.getMeasurementTime(4.0), None)
+
+
+    def testLayout(self):
+        """Checks the size and header of the binary format."""
+        self.assertEqual(len(self.string), HEADER_SIZE + 4 * 10 * 8)
+        self.assertTrue(isBinary(self.string))
+        self.assertFalse(isBinary(toXML(self.cd)))
+        self.assertEqual(
+            struct.unpack('<HHIQ', self.string[8:24])[:2], (VERSION, 4))
+        self.assertEqual(struct.unpack('<d', self.string[32:40]), (2.0,))
+
+
+    def testRoundTrip(self):
+        """Checks that calibration data survives a round trip."""
+        cd = fromBinary(self.string)
+        self.assertSameData(cd)
+        self.assertTrue(cd.isComplete)
+        self.assertFalse(cd.canUndo)
+
+
+    def testNoCopy(self):
+        """Checks that the columns are views of the string."""
+        cd = fromBinary(self.string)
+        self.assertFalse(cd.heatingCurrentArray.flags.owndata)
+        self.assertFalse(cd.heatingCurrentArray.flags.writeable)
+
+
+    def testNoMeasurements(self):
+        """Tests the binary format with no measurements."""
+        self.cd.removeMeasurements(self.cd.heatingCurrents)
+        string = toBinary(self.cd)
+        self.assertEqual(len(string), HEADER_SIZE)
+        self.assertFalse(fromBinary(string).hasMeasurements)
+
+
+    def testBadStrings(self):
+        """Tests :func:`fromBinary` with some bad strings."""
+        s = self.string
+        version = struct.pack('<H', VERSION + 1)
+        badStrings = (
+            '',
+            s[:HEADER_SIZE - 1],
+            'x' + s[1:],
+            s[:8] + version + s[10:],
+            s[:-1],
+            s + '\0' * 8,
+            s[:-1] + chr((ord(s[-1]) + 1) % 256))
+        for string in badStrings:
+            self.assertEqual(fromBinary(string), None)
+
+
+    def testMapFile(self):
+        """Tests the :func:`mapFile` function."""
+        with open(self.FILE_NAME, 'wb') as f:
+            f.write(self.string)
+        self.assertSameData(mapFile(self.FILE_NAME))
+
+        open(self.FILE_NAME, 'wb').close()
+        self.assertEqual(mapFile(self.FILE_NAME), None)
+
+
+    def testReplaceMappedFile(self):
+        """Checks that a mapped file can be replaced atomically."""
+        with open(self.FILE_NAME, 'wb') as f:
+            f.write(self.string)
+        cd = mapFile(self.FILE_NAME)
+
+        writeAtomically(self.FILE_NAME, lambda f: f.write(toBinary(cd)[:16]))
+        self.assertSameData(cd)
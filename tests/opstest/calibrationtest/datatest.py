@@ -21,7 +21,11 @@
 import itertools
 import numpy
 import sys
+import tempfile
+import threading
+import time
 import unittest
+import warnings
 
 from ops.calibration.data import *
 from ops.calibration.event import *
@@ -100,6 +104,13 @@ class CalibrationManagerTests(unittest.TestCase):
         self.assertEqual(self.cd.fileName, None)
 
 
+    def testReport(self):
+        """Tests the :attr:`report` property."""
+        self.assertEqual(self.cd.report, None)
+        self.cd.report = 'dummy report'
+        self.assertEqual(self.cd.report, 'dummy report')
+
+
     ###########################################################################
     # MEASUREMENTS                                                            #
     ###########################################################################
@@ -107,28 +118,27 @@ class CalibrationManagerTests(unittest.TestCase):
     def testAddMeasurement(self):
         """Tests the :meth:`addMeasurement` method."""
         currents = (4.0, 2.0, 8.0, 6.0)
-        expected = {}
+        expected = []
         for count, current in enumerate(currents, start=1):
             measurement = (current, current / 10, current * 100)
-            expected[current] = measurement
+            expected = sorted(expected + [measurement])
             self.cd.addMeasurement(*measurement)
-            self.assertEqual(self.cd._measurements[current], measurement)
-            self.assertEqual(self.cd._measurements, expected)
+            self.assertEqual(self.cd.measurements, tuple(expected))
             self.assertEqual(len(self.mcLogger.log), count)
 
 
     def testAddIntegerMeasurement(self):
         """Tests the :meth:`addMeasurement` method with integer arguments."""
         currents = (4, 2, 8, 6)
-        expected = {}
+        expected = []
         for count, current in enumerate(currents, start=1):
             measurement = (current, current / 10, current * 100)
             floatMeasurement = tuple(float(n) for n in measurement)
-            expected[float(current)] = floatMeasurement
+            expected = sorted(expected + [floatMeasurement])
             self.cd.addMeasurement(*measurement)
-            self.assertEqual(
-                self.cd._measurements[float(current)], floatMeasurement)
-            self.assertEqual(self.cd._measurements, expected)
+            self.assertEqual(self.cd.measurements, tuple(expected))
+            self.assertTrue(
+                all(type(n) is float for n in self.cd.measurements[0]))
             self.assertEqual(len(self.mcLogger.log), count)
 
 
@@ -136,7 +146,8 @@ class CalibrationManagerTests(unittest.TestCase):
         """Tests replacing a measurement in :meth:`addMeasurement`."""
         self._addSomeMeasurements()
         self.cd.addMeasurement(4.0, 0.2, 200.0)
-        self.assertEqual(self.cd._measurements[4.0], (4.0, 0.2, 200.0))
+        self.assertEqual(self.cd.measurements[1], (4.0, 0.2, 200.0))
+        self.assertEqual(len(self.cd.measurements), 4)
         self.assertEqual(len(self.mcLogger.log), 1)
 
 
@@ -144,7 +155,7 @@ class CalibrationManagerTests(unittest.TestCase):
         """Tests the :meth:`removeMeasurement` method."""
         self._addSomeMeasurements()
         self.cd.removeMeasurement(4.0)
-        self.assertTrue(4.0 not in self.cd._measurements)
+        self.assertTrue(4.0 not in self.cd.heatingCurrents)
         self.assertEqual(len(self.mcLogger.log), 1)
 
 
@@ -152,7 +163,7 @@ class CalibrationManagerTests(unittest.TestCase):
         """Tests the :meth:`removeMeasurement` method with an integer."""
         self._addSomeMeasurements()
         self.cd.removeMeasurement(4)
-        self.assertTrue(4.0 not in self.cd._measurements)
+        self.assertTrue(4.0 not in self.cd.heatingCurrents)
         self.assertEqual(len(self.mcLogger.log), 1)
 
 
@@ -168,10 +179,10 @@ class CalibrationManagerTests(unittest.TestCase):
     def testMeasurementChanged(self):
         """Tests the :meth:`_measurementChanged` method."""
         eventCount = len(self.mediator.eventsNoted)
-        rpLogger = test.wrapLogger(self.cd._recalculatePolynomials)
+        ipLogger = test.wrapLogger(self.cd._invalidatePolynomials)
 
         self.cd._measurementChanged()
-        self.assertEqual(len(rpLogger.log), 1)
+        self.assertEqual(len(ipLogger.log), 1)
         self.assertEqual(len(self.mediator.eventsNoted), eventCount + 1)
         self.assertEqual(self.mediator.eventsNoted[-1],
             CalibrationDataChanged(self.system, self.cd))
@@ -179,12 +190,88 @@ class CalibrationManagerTests(unittest.TestCase):
         self.system.calibrationData = CalibrationData()
         self.assertEqual(len(self.mediator.eventsNoted), eventCount + 2)
 
-        # cd is now free; recalculate poynomials, but send no events.
+        # cd is now free; invalidate poynomials, but send no events.
         self.cd._measurementChanged()
-        self.assertEqual(len(rpLogger.log), 2)
+        self.assertEqual(len(ipLogger.log), 2)
         self.assertEqual(len(self.mediator.eventsNoted), eventCount + 2)
 
 
+    def testAddMeasurements(self):
+        """Tests the :meth:`addMeasurements` method."""
+        self._addSomeMeasurements()
+        self.mediator.clearLog()
+        ipLogger = test.wrapLogger(self.cd._invalidatePolynomials)
+
+        self.cd.addMeasurements([(5, 0.5, 500), (4.0, 0.3, 300.0, 1234.5),
+            (1.0, 0.1, 100.0, UNKNOWN_TIME), (5.0, 0.55, 550.0)])
+
+        self.assertEqual(self.cd.measurements, ((1.0, 0.1, 100.0),
+            (2.0, 0.2, 200.0), (4.0, 0.3, 300.0), (5.0, 0.55, 550.0),
+            (6.0, 0.6, 600.0), (8.0, 0.8, 800.0)))
+        self.assertEqual(self.cd.getMeasurementTime(4.0), 1234.5)
+        self.assertEqual(self.cd.getMeasurementTime(1.0), None)
+        self.assertEqual(len(ipLogger.log), 1)
+        self.assertEqual(self.mediator.eventsNoted,
+            [CalibrationDataChanged(self.system, self.cd)])
+
+        self.cd.addMeasurements([])
+        self.assertEqual(len(ipLogger.log), 1)
+
+
+    def testRemoveMeasurements(self):
+        """Tests the :meth:`removeMeasurements` method."""
+        self._addSomeMeasurements()
+        self.cd.removeMeasurements([8, 2.0])
+        self.assertEqual(self.cd.heatingCurrents, (4.0, 6.0))
+        self.assertEqual(len(self.mcLogger.log), 1)
+
+        self.assertRaises(KeyError, self.cd.removeMeasurements, [4.0, 5.0])
+        self.assertEqual(self.cd.heatingCurrents, (4.0, 6.0))
+        self.assertEqual(len(self.mcLogger.log), 1)
+
+
+    def testTransaction(self):
+        """Tests the :meth:`transaction` method."""
+        self._addSomeMeasurements()
+        self.mediator.clearLog()
+        ipLogger = test.wrapLogger(self.cd._invalidatePolynomials)
+
+        with self.cd.transaction():
+            self.assertTrue(self.cd.isInTransaction)
+            self.cd.removeMeasurement(2.0)
+            with self.cd.transaction():
+                self.cd.addMeasurement(3.0, 0.3, 300.0)
+            self.assertEqual(self.cd.heatingCurrents, (3.0, 4.0, 6.0, 8.0))
+            self.assertEqual(ipLogger.log, [])
+            self.assertEqual(self.mediator.eventsNoted, [])
+
+        self.assertFalse(self.cd.isInTransaction)
+        self.assertEqual(len(ipLogger.log), 1)
+        self.assertEqual(self.mediator.eventsNoted,
+            [CalibrationDataChanged(self.system, self.cd)])
+
+        # A transaction without changes does nothing.
+        with self.cd.transaction():
+            pass
+        self.assertEqual(len(ipLogger.log), 1)
+
+
+    def testFailedTransaction(self):
+        """Checks that a failed transaction is rolled back."""
+        self._addSomeMeasurements()
+        self.mediator.clearLog()
+
+        def change():
+            with self.cd.transaction():
+                self.cd.addMeasurement(3.0, 0.3, 300.0)
+                self.cd.removeMeasurement(5.0)
+
+        self.assertRaises(KeyError, change)
+        self.assertFalse(self.cd.isInTransaction)
+        self.assertEqual(self.cd.heatingCurrents, (2.0, 4.0, 6.0, 8.0))
+        self.assertEqual(self.mediator.eventsNoted, [])
+
+
     def testMeasurementsProperties(self):
         """Test the measurements-related properties."""
         self._addSomeMeasurements()
@@ -197,6 +284,57 @@ class CalibrationManagerTests(unittest.TestCase):
             self.cd.temperatureSensorVoltages, (0.2, 0.4, 0.6, 0.8))
         self.assertEqual(
             self.cd.temperatures, (200.0, 400.0, 600.0, 800.0))
+        self.assertEqual(
+            list(self.cd.heatingCurrentArray), [2.0, 4.0, 6.0, 8.0])
+        self.assertEqual(
+            list(self.cd.temperatureSensorVoltageArray), [0.2, 0.4, 0.6, 0.8])
+        self.assertEqual(
+            list(self.cd.temperatureArray), [200.0, 400.0, 600.0, 800.0])
+
+
+    def testCachedViews(self):
+        """Checks that the measurements are cached until they change."""
+        self._addSomeMeasurements()
+        measurements = self.cd.measurements
+        currents = self.cd.heatingCurrentArray
+        self.assertTrue(self.cd.measurements is measurements)
+
+        self.cd.addMeasurement(5.0, 0.5, 500.0)
+        self.assertTrue(self.cd.measurements is not measurements)
+        self.assertEqual(len(self.cd.measurements), 5)
+
+        # Arrays that have been handed out are not modified.
+        self.assertEqual(list(currents), [2.0, 4.0, 6.0, 8.0])
+
+
+    def testReadOnlyArrays(self):
+        """Checks that the measurement arrays cannot be modified."""
+        self._addSomeMeasurements()
+        for name in ('heatingCurrentArray', 'temperatureSensorVoltageArray',
+            'temperatureArray'):
+            array = getattr(self.cd, name)
+            self.assertRaises(Exception, array.__setitem__, 0, 1.0)
+            self.assertRaises(AttributeError, setattr, self.cd, name, None)
+
+
+    def testMeasurementTimes(self):
+        """Tests the :meth:`getMeasurementTime` method."""
+        before = time.time()
+        self.cd.addMeasurement(2.0, 0.2, 200.0)
+        after = time.time()
+        self.cd.addMeasurement(4.0, 0.4, 400.0, 1234.5)
+        self.cd.addMeasurement(6.0, 0.6, 600.0, UNKNOWN_TIME)
+
+        self.assertTrue(before <= self.cd.getMeasurementTime(2.0) <= after)
+        self.assertEqual(self.cd.getMeasurementTime(4.0), 1234.5)
+        self.assertEqual(self.cd.getMeasurementTime(6.0), None)
+
+        times = self.cd.measurementTimeArray
+        self.assertEqual(times[1], 1234.5)
+        self.assertTrue(numpy.isnan(times[2]))
+
+        self.cd.removeMeasurement(4.0)
+        self.assertRaises(KeyError, self.cd.getMeasurementTime, 4.0)
 
 
     def testHasMeasurements(self):
@@ -208,6 +346,214 @@ class CalibrationManagerTests(unittest.TestCase):
         self.assertFalse(self.cd.hasMeasurements)
 
 
+    ###########################################################################
+    # SNAPSHOTS AND HISTORY                                                   #
+    ###########################################################################
+
+    def testSnapshot(self):
+        """Tests :meth:`takeSnapshot` and :meth:`restoreSnapshot`."""
+        self._addSomeMeasurements()
+        snapshot = self.cd.takeSnapshot()
+        measurements = self.cd.measurements
+
+        # The snapshot shares the columns.
+        self.assertTrue(snapshot._columns[0] is self.cd.heatingCurrentArray)
+        self.assertEqual(snapshot, self.cd.takeSnapshot())
+        self.assertEqual(snapshot.measurements, measurements)
+        self.assertTrue(snapshot.size > 4 * 4 * 8)
+
+        self.cd.removeMeasurements([2.0, 4.0])
+        self.assertNotEqual(snapshot, self.cd.takeSnapshot())
+        self.assertEqual(snapshot.measurements, measurements)
+
+        self.cd.restoreSnapshot(snapshot)
+        self.assertEqual(self.cd.measurements, measurements)
+        self.assertEqual(self.mcLogger.log, [(), ()])
+
+
+    def testRestoreSnapshotFromOtherInstance(self):
+        """Tests :meth:`restoreSnapshot` with another instance."""
+        cd = test.makeCalibrationData()
+        self.cd.restoreSnapshot(cd.takeSnapshot())
+        self.assertEqual(self.cd.measurements, cd.measurements)
+        self.assertEqual(self.mediator.eventsNoted[-1],
+            CalibrationDataChanged(self.system, self.cd))
+
+
+    def testPublishedSnapshot(self):
+        """Tests the :attr:`snapshot` property."""
+        self._addSomeMeasurements()
+        snapshot = self.cd.snapshot
+        self.assertEqual(snapshot, self.cd.takeSnapshot())
+        self.assertTrue(
+            snapshot.heatingCurrentArray is self.cd.heatingCurrentArray)
+        self.assertTrue(
+            snapshot.measurementTimeArray is self.cd.measurementTimeArray)
+
+        with self.cd.transaction():
+            self.cd.removeMeasurement(2.0)
+            self.cd.addMeasurement(10.0, 1.0, 1000.0)
+            self.assertTrue(self.cd.snapshot is snapshot)
+
+        self.assertEqual(self.cd.snapshot.measurements, self.cd.measurements)
+        self.assertEqual(snapshot.measurements[0], (2.0, 0.2, 200.0))
+        self.assertEqual(len(snapshot.temperatureArray), 4)
+
+
+    def testSnapshotEvaluators(self):
+        """Tests the estimation functions of a :class:`CalibrationSnapshot`."""
+        cd = test.makeCalibrationData()
+        snapshot = cd.snapshot
+        self.assertTrue(snapshot.isComplete)
+
+        self.assertAlmostEqual(snapshot.temperatureFromVoltage(0.55),
+            cd.getTemperatureFromVoltage(0.55))
+        self.assertAlmostEqual(snapshot.finalTemperatureFromCurrent(5.5),
+            cd.getFinalTemperatureFromCurrent(5.5))
+        self.assertAlmostEqual(snapshot.currentFromTargetTemperature(550.0),
+            cd.getCurrentFromTargetTemperature(550.0))
+
+        values = snapshot.temperatureFromVoltage.evaluateArray([0.3, 0.5])
+        self.assertTrue(numpy.allclose(values, [300.0, 500.0]))
+
+        # The snapshot keeps its estimation functions after changes.
+        cd.removeMeasurements(cd.heatingCurrents[:8])
+        self.assertFalse(cd.isComplete)
+        self.assertAlmostEqual(snapshot.temperatureFromVoltage(0.55), 550.0)
+
+
+    def testSnapshotSharesEvaluators(self):
+        """Checks that the published snapshot reuses fitted evaluators."""
+        cd = test.makeCalibrationData()
+        cd.getTemperatureFromVoltage(0.5)
+        cd.getCurrentFromTargetTemperature(500.0)
+
+        evaluators = cd.snapshot._evaluators
+        self.assertTrue(evaluators['_temperatureFromVoltage']
+            is cd._evaluators['_temperatureFromVoltage'][1])
+        self.assertTrue(cd.snapshot.currentFromTargetTemperature
+            is cd._evaluators['inverse'][1])
+
+        # Snapshots taken with other fitting attributes are left alone.
+        cd = test.makeCalibrationData()
+        snapshot = cd.snapshot
+        cd.polynomialDegree = 2
+        cd.getTemperatureFromVoltage(0.5)
+        self.assertEqual(snapshot._evaluators, {})
+
+
+    def testIncompleteSnapshot(self):
+        """Tests a :class:`CalibrationSnapshot` without estimations."""
+        self._addSomeMeasurements()
+        snapshot = self.cd.snapshot
+        self.assertFalse(snapshot.isComplete)
+        self.assertEqual(snapshot.temperatureFromVoltage, None)
+        self.assertEqual(snapshot.currentFromTargetTemperature, None)
+
+
+    def testSnapshotFromOtherThread(self):
+        """Checks that snapshots can be read while the data change."""
+        cd = test.makeCalibrationData()
+        errors = []
+
+        def read():
+            for n in xrange(200):
+                snapshot = cd.snapshot
+                i = snapshot.heatingCurrentArray
+                t = snapshot.temperatureArray
+                if len(i) != len(t):
+                    errors.append(n)
+                elif not numpy.allclose(
+                        snapshot.finalTemperatureFromCurrent.evaluateArray(i),
+                        t, 1e-6, 1e-6):
+                    errors.append(n)
+
+        thread = threading.Thread(target=read)
+        thread.start()
+        for n in xrange(50):
+            current = 21.0 + n
+            cd.addMeasurement(current, current / 10, current * 100)
+            cd.getFinalTemperatureFromCurrent(current)
+        thread.join()
+
+        self.assertEqual(errors, [])
+
+
+    def testUndoRedo(self):
+        """Tests the :meth:`undo` and :meth:`redo` methods."""
+        self.assertFalse(self.cd.canUndo)
+        self.assertFalse(self.cd.canRedo)
+
+        self.cd.addMeasurement(2.0, 0.2, 200.0)
+        self.cd.addMeasurement(4.0, 0.4, 400.0)
+        self.assertTrue(self.cd.canUndo)
+
+        self.cd.undo()
+        self.assertEqual(self.cd.heatingCurrents, (2.0,))
+        self.assertTrue(self.cd.canRedo)
+        self.cd.undo()
+        self.assertEqual(self.cd.heatingCurrents, ())
+        self.assertFalse(self.cd.canUndo)
+        self.assertRaises(util.ApplicationError, self.cd.undo)
+
+        self.cd.redo()
+        self.cd.redo()
+        self.assertEqual(self.cd.heatingCurrents, (2.0, 4.0))
+        self.assertFalse(self.cd.canRedo)
+        self.assertRaises(util.ApplicationError, self.cd.redo)
+
+        # A new change discards the changes that could be redone.
+        self.cd.undo()
+        self.cd.addMeasurement(6.0, 0.6, 600.0)
+        self.assertFalse(self.cd.canRedo)
+        self.assertEqual(self.mcLogger.log, [()] * 8)
+
+
+    def testUndoTransaction(self):
+        """Checks that a transaction is undone as a single change."""
+        self._addSomeMeasurements()
+        measurements = self.cd.measurements
+
+        with self.cd.transaction():
+            self.cd.removeMeasurement(2.0)
+            self.cd.addMeasurement(10.0, 1.0, 1000.0)
+            self.assertRaises(util.ApplicationError, self.cd.undo)
+
+        self.cd.undo()
+        self.assertEqual(self.cd.measurements, measurements)
+
+
+    def testHistorySize(self):
+        """Tests the :attr:`maxHistorySize` attribute."""
+        self._addSomeMeasurements()
+        self.cd.addMeasurement(10.0, 1.0, 1000.0)
+        self.cd.addMeasurement(12.0, 1.2, 1200.0)
+        self.cd.maxHistorySize = 2 * self.cd.takeSnapshot().size
+        self.cd.addMeasurement(14.0, 1.4, 1400.0)
+
+        # Only the snapshots with 5 and 6 measurements fit.
+        self.cd.undo()
+        self.cd.undo()
+        self.assertFalse(self.cd.canUndo)
+        self.assertEqual(len(self.cd.heatingCurrents), 5)
+
+        self.cd.clearHistory()
+        self.assertFalse(self.cd.canRedo)
+
+
+    def testHistorySizeKeepsLastChange(self):
+        """Checks that the most recent change can always be undone."""
+        self._addSomeMeasurements()
+        self.cd.maxHistorySize = 0
+        measurements = self.cd.measurements
+        self.cd.addMeasurement(10.0, 1.0, 1000.0)
+        self.cd.addMeasurement(12.0, 1.2, 1200.0)
+
+        self.cd.undo()
+        self.assertFalse(self.cd.canUndo)
+        self.assertEqual(len(self.cd.heatingCurrents), len(measurements) + 1)
+
+
     ###########################################################################
     # ESTIMATION FUNCTIONS                                                    #
     ###########################################################################
@@ -236,6 +582,93 @@ class CalibrationManagerTests(unittest.TestCase):
         self.assertEqual(self.cd.getTemperatureFromVoltage(10.0), 625.2)
 
 
+    def testVectorizedEstimationFunctions(self):
+        """Tests the accessors that evaluate arrays of values."""
+        ift = numpy.poly1d([0.1, -0.5, 2.5, -12.5, 0.0])
+        tfi = numpy.poly1d([0.1, -0.5, 2.5, -12.5, 0.1])
+        tfu = numpy.poly1d([0.1, -0.5, 2.5, -12.5, 0.2])
+        self.cd._currentFromTargetTemperature = ift
+        self.cd._finalTemperatureFromCurrent = tfi
+        self.cd._temperatureFromVoltage = tfu
+
+        values = [10.0, 0.0, -2.0]
+        pairs = (
+            (self.cd.getCurrentsFromTargetTemperatures, ift),
+            (self.cd.getFinalTemperaturesFromCurrents, tfi),
+            (self.cd.getTemperaturesFromVoltages, tfu))
+
+        for function, polynomial in pairs:
+            result = function(values)
+            self.assertTrue(isinstance(result, numpy.ndarray))
+            self.assertEqual(result.tolist(), [polynomial(x) for x in values])
+            self.assertEqual(function(numpy.ones((2, 3))).shape, (2, 3))
+
+
+    def testEvaluatorCache(self):
+        """Checks that evaluators are only created when a fit changes."""
+        self._addSomeMeasurements()
+        self.cd.addMeasurement(10.0, 1.0, 1000.0)
+        name = '_temperatureFromVoltage'
+
+        evaluator = self.cd._getEvaluator(name)
+        self.assertTrue(self.cd._getEvaluator(name) is evaluator)
+        self.assertEqual(self.cd.getTemperatureFromVoltage(0.5),
+            evaluator.evaluate(0.5))
+
+        self.cd.addMeasurement(12.0, 1.2, 1200.0)
+        self.assertFalse(self.cd._getEvaluator(name) is evaluator)
+
+
+    def testMonotoneInverse(self):
+        """Checks that the current estimates invert the temperatures."""
+        cd = test.makeCalibrationData()
+        for i in (2.0, 5.5, 11.0, 19.5):
+            t = cd.getFinalTemperatureFromCurrent(i)
+            self.assertAlmostEqual(cd.getCurrentFromTargetTemperature(t), i, 6)
+
+        temperatures = numpy.linspace(200.0, 2000.0, 50)
+        currents = cd.getCurrentsFromTargetTemperatures(temperatures)
+        self.assertTrue(numpy.all(numpy.diff(currents) > 0.0))
+
+        limit = cd.getMaxTargetTemperatureFromCurrent(10.0)
+        self.assertAlmostEqual(limit, 1000.0, 6)
+        self.assertTrue(cd.getCurrentFromTargetTemperature(limit) <= 10.0)
+
+
+    def testCurrentFromTargetTemperatureArray(self):
+        """Checks that arrays of target temperatures are accepted."""
+        temperatures = numpy.array([300.0, 550.0, 900.0])
+        for useMonotoneInverse in (True, False):
+            cd = test.makeCalibrationData()
+            cd.useMonotoneInverse = useMonotoneInverse
+            self.assertEqual(
+                cd.getCurrentFromTargetTemperature(temperatures).tolist(),
+                cd.getCurrentsFromTargetTemperatures(temperatures).tolist())
+
+
+    def testCurrentFromTargetTemperatureOutOfRange(self):
+        """Checks that the monotone inverse is extrapolated linearly."""
+        cd = test.makeCalibrationData()
+        low, high = cd._getInverse().domain
+        f = cd.getCurrentFromTargetTemperature
+
+        for end, step in ((low, -100.0), (high, 100.0)):
+            first = f(end + step) - f(end)
+            second = f(end + 2.0 * step) - f(end + step)
+            self.assertAlmostEqual(first, second, 9)
+        self.assertTrue(f(low - 1000.0) < 0.0)
+
+
+    def testNoMonotoneInverse(self):
+        """Tests the estimates if :attr:`useMonotoneInverse` isn't set."""
+        cd = test.makeCalibrationData()
+        cd.useMonotoneInverse = False
+        polynomial = cd._getPolynomial('_currentFromTargetTemperature')
+        self.assertEqual(cd.getCurrentFromTargetTemperature(550.0),
+            polynomial(550.0))
+        self.assertEqual(cd.getMaxTargetTemperatureFromCurrent(10.0), None)
+
+
     def testEstimationFunctionsError(self):
         """Tests the accessors when the estimation function aren't fitted."""
         functions = (
@@ -245,6 +678,13 @@ class CalibrationManagerTests(unittest.TestCase):
         for f in functions:
             self.assertRaises(ops.error.NotCalibratedError, f, 10.0)
 
+        functions = (
+            self.cd.getCurrentsFromTargetTemperatures,
+            self.cd.getFinalTemperaturesFromCurrents,
+            self.cd.getTemperaturesFromVoltages)
+        for f in functions:
+            self.assertRaises(ops.error.NotCalibratedError, f, [10.0])
+
 
     ###########################################################################
     # FITTING                                                                 #
@@ -258,6 +698,7 @@ class CalibrationManagerTests(unittest.TestCase):
 
         for n in xrange(7):
             self.cd.addMeasurement(i[n], u[n], t[n])
+        self.cd._recalculatePolynomials()
 
         iftx = self.cd._fit(t, i)
         tfix = self.cd._fit(i, t)
@@ -268,6 +709,110 @@ class CalibrationManagerTests(unittest.TestCase):
         self.assertEqual(self.cd._temperatureFromVoltage, tfux)
 
 
+    def testLazyFitting(self):
+        """Checks that estimation functions are only fitted when needed."""
+        self._addSomeMeasurements()
+        self.cd.addMeasurement(10.0, 1.0, 1000.0)
+        fitLogger = test.wrapLogger(self.cd._fit)
+
+        self.cd.getTemperatureFromVoltage(0.5)
+        self.cd.getTemperatureFromVoltage(0.6)
+        self.assertEqual(len(fitLogger.log), 1)
+
+        self.assertTrue(self.cd.isComplete)
+        self.assertEqual(len(fitLogger.log), 3)
+
+        self.cd.removeMeasurement(10.0)
+        self.assertEqual(len(fitLogger.log), 3)
+        # isComplete stops at the first function that cannot be fitted.
+        self.assertFalse(self.cd.isComplete)
+        self.assertEqual(len(fitLogger.log), 4)
+
+
+    def testIncrementalRefit(self):
+        """Checks that small changes are applied to incremental fits."""
+        cd = test.makeCalibrationData()
+        cd.isComplete
+        fitLogger = test.wrapLogger(cd._fit)
+
+        cd.addMeasurement(11.0, 1.15, 1080.0)
+        cd.addMeasurement(4.0, 0.45, 420.0)
+        cd.removeMeasurement(16.0)
+
+        self.assertTrue(cd.isComplete)
+        self.assertEqual(fitLogger.log, [])
+
+        expected = numpy.polyfit(cd.heatingCurrentArray, cd.temperatureArray,
+            cd.polynomialDegree)
+        actual = cd._getPolynomial('_finalTemperatureFromCurrent').c
+        self.assertTrue(numpy.allclose(actual, expected, 1e-8, 1e-8))
+
+
+    def testIncrementalRefitDiscarded(self):
+        """Checks when incremental fits are discarded."""
+        cd = test.makeCalibrationData()
+        cd.isComplete
+        self.assertEqual(len(cd._incrementalFits), 3)
+
+        # Large changes are refitted from scratch.
+        cd.addMeasurements(
+            [(n + 0.5, n / 10.0, n * 100.0) for n in xrange(2, 14)])
+        self.assertEqual(cd._incrementalFits, {})
+
+        cd.isComplete
+        try:
+            with cd.transaction():
+                cd.removeMeasurement(2.0)
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertEqual(cd._incrementalFits, {})
+
+
+    def testPrewarm(self):
+        """Tests the :meth:`prewarm` method."""
+        self._addSomeMeasurements()
+        self.cd.addMeasurement(10.0, 1.0, 1000.0)
+        self.cd.prewarm().join()
+
+        fitLogger = test.wrapLogger(self.cd._fit)
+        self.assertTrue(self.cd.isComplete)
+        self.assertEqual(fitLogger.log, [])
+
+
+    def testPrewarmInBackground(self):
+        """Tests the :attr:`prewarmInBackground` attribute."""
+        self.cd.prewarmInBackground = True
+        prewarmLogger = test.replaceWithLogger(self.cd.prewarm)
+        self._addSomeMeasurements()
+        self.assertEqual(len(prewarmLogger.log), 4)
+
+
+    def testDiagnostics(self):
+        """Tests the :attr:`diagnostics` property."""
+        self.cd.polynomialDegree = 1
+        self.cd.minMeasurementsForEstimation = 3
+        self._addSomeMeasurements()
+
+        diagnostics = self.cd.diagnostics
+        self.assertTrue(self.cd.diagnostics is diagnostics)
+        for d in diagnostics:
+            self.assertEqual(len(d.leverages), 4)
+            self.assertTrue(numpy.allclose(d.residuals, 0.0))
+
+        # The measurement for 8.0 mA is moved off the line.
+        self.cd.addMeasurement(8.0, 0.8, 900.0)
+        d = self.cd.diagnostics.finalTemperatureFromCurrent
+        self.assertAlmostEqual(d.looResiduals[3], 900.0 - 800.0)
+        self.assertEqual(numpy.argmax(d.cooksDistances), 3)
+
+
+    def testDiagnosticsNotFitted(self):
+        """Tests the :attr:`diagnostics` property without fits."""
+        self._addSomeMeasurements()
+        self.assertEqual(self.cd.diagnostics, Diagnostics(None, None, None))
+
+
     def testFit(self):
         """Tests the :meth:`_fit` method."""
         self.cd.minMeasurementsForEstimation = 7
@@ -307,6 +852,29 @@ class CalibrationManagerTests(unittest.TestCase):
             sys.stderr = stderrOld
 
 
+    def testFitLeavesWarningFiltersAlone(self):
+        """
+        Checks that fitting doesn't change the warning filters, which are
+        shared by all threads.
+        """
+        def fail(*args, **kwargs):
+            self.fail('the warning filters have been changed')
+
+        self.cd.minMeasurementsForEstimation = 0
+        self.cd.polynomialDegree = 15
+        x, y = self._getSomePoints(0.1, -0.75, 12.0)
+        snapshot = test.makeCalibrationData().snapshot
+
+        simplefilter = warnings.simplefilter
+        try:
+            warnings.simplefilter = fail
+            self.assertTrue(self.cd._fit(x, y) is None)
+            self.assertTrue(snapshot._createEvaluator(
+                '_temperatureFromVoltage') is not None)
+        finally:
+            warnings.simplefilter = simplefilter
+
+
     ###########################################################################
     # TEST UTILIY METHODS                                                     #
     ###########################################################################
@@ -346,6 +914,85 @@ class CalibrationManagerPersistenceTest(unittest.TestCase):
         self.assertEqual(result.measurements, self.cd.measurements)
 
 
+    def testRoundTripWithMeasurementTimes(self):
+        """Checks that measurement times survive a round trip to XML."""
+        self.cd.addMeasurement(2.0, 0.2, 200.0, 1234.5)
+        self.cd.addMeasurement(4.0, 0.4, 400.0, UNKNOWN_TIME)
+        result = fromXML(toXML(self.cd))
+        self.assertEqual(result.getMeasurementTime(2.0), 1234.5)
+        self.assertEqual(result.getMeasurementTime(4.0), None)
+
+
+    def testToXML(self):
+        """Checks the document created by the :func:`toXML` function."""
+        self.cd.addMeasurement(2.0, 0.2, 200.0, 1234.5)
+        self.cd.addMeasurement(4.0, 0.4, 400.0, UNKNOWN_TIME)
+        self.assertEqual(toXML(self.cd), self.DOCUMENT_TEMPLATE % (
+            '<measurement><current>2.0</current><voltage>0.2</voltage>'
+            '<temperature>200.0</temperature><time>1234.5</time>'
+            '</measurement><measurement><current>4.0</current>'
+            '<voltage>0.4</voltage><temperature>400.0</temperature>'
+            '</measurement>'))
+
+
+    def testToXMLWithSnapshot(self):
+        """Tests the :func:`toXML` function with a snapshot."""
+        self.cd.addMeasurement(2.0, 0.2, 200.0, 1234.5)
+        self.cd.addMeasurement(4.0, 0.4, 400.0, UNKNOWN_TIME)
+        self.assertEqual(toXML(self.cd.snapshot), toXML(self.cd))
+
+
+    def testWriteXMLAndReadXML(self):
+        """Checks that calibration data survives a round trip to a file."""
+        self.system.performMagicCalibration()
+        self.cd.addMeasurement(1.0, 0.1, 100.0, 1234.5)
+
+        with tempfile.TemporaryFile() as fileObject:
+            writeXML(self.cd, fileObject)
+            fileObject.seek(0)
+            result = readXML(fileObject)
+
+        self.assertEqual(result.measurements, self.cd.measurements)
+        self.assertEqual(result.getMeasurementTime(1.0), 1234.5)
+        self.assertFalse(result.canUndo)
+
+
+    def testFromXMLHasNoHistory(self):
+        """Checks that loaded calibration data has no changes to undo."""
+        self.system.performMagicCalibration()
+        self.assertFalse(fromXML(toXML(self.cd)).canUndo)
+
+
+    def testFromColumns(self):
+        """Tests the :func:`fromColumns` function."""
+        currents = numpy.array([2.0, 4.0, 6.0])
+        cd = fromColumns(currents, [0.2, 0.4, 0.6], [200.0, 400.0, 600.0],
+            [1.0, numpy.nan, 3.0])
+
+        self.assertTrue(cd.heatingCurrentArray is currents)
+        self.assertEqual(cd.measurements[1], (4.0, 0.4, 400.0))
+        self.assertEqual(cd.getMeasurementTime(2.0), 1.0)
+        self.assertEqual(cd.getMeasurementTime(4.0), None)
+        self.assertFalse(cd.canUndo)
+
+        cd = fromColumns([2.0], [0.2], [200.0])
+        self.assertEqual(cd.getMeasurementTime(2.0), None)
+        self.assertFalse(fromColumns([], [], []).hasMeasurements)
+
+
+    def testFromColumnsWithBadColumns(self):
+        """Tests the :func:`fromColumns` function with bad columns."""
+        badColumns = (
+            ([2.0, 4.0], [0.2], [200.0, 400.0]),
+            ([4.0, 2.0], [0.4, 0.2], [400.0, 200.0]),
+            ([2.0, 2.0], [0.2, 0.2], [200.0, 200.0]),
+            ([2.0, 4.0], [0.2, numpy.nan], [200.0, 400.0]),
+            ([2.0, 4.0], [0.2, 0.4], [200.0, numpy.inf]),
+            ([2.0], [0.2], [200.0], [numpy.inf]))
+        for columns in badColumns:
+            self.assertRaises(ValueError, fromColumns, *columns)
+
+
     def testDocumentWithNoMeasurements(self):
         """
         Tests the :func:`fromXML` function with a document that does not
@@ -360,6 +1007,7 @@ class CalibrationManagerPersistenceTest(unittest.TestCase):
         badDocuments = (
             '',
             'this is not an XML document',
+            '<?xml version="1.0" ?><calibration-data><measurement>',
             '<?xml version="1.0" ?><unexpected></unexpected>')
         for document in badDocuments:
             self.assertEqual(fromXML(document), None)
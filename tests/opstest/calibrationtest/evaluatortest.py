@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+
+import numpy
+import unittest
+
+from ops.calibration.evaluator import *
+
+
+class PolynomialEvaluatorTests(unittest.TestCase):
+    """
+    Tests for the :class:`~ops.calibration.evaluator.PolynomialEvaluator`
+    class.
+    """
+
+    def setUp(self):
+        self.coefficients = (0.1, -0.5, 2.5, -12.5, 0.2)
+        self.polynomial = numpy.poly1d(self.coefficients)
+        self.evaluator = PolynomialEvaluator(self.coefficients)
+
+
+    def testReadOnly(self):
+        """Checks that read-only properties are actually read-only."""
+        for p in ('coefficients', 'degree'):
+            self.assertRaises(AttributeError, setattr, self.evaluator, p, 1)
+
+
+    def testProperties(self):
+        """Tests the :attr:`coefficients` and :attr:`degree` properties."""
+        self.assertEqual(self.evaluator.coefficients, self.coefficients)
+        self.assertEqual(self.evaluator.degree, 4)
+
+
+    def testNoCoefficients(self):
+        """Checks that at least one coefficient is required."""
+        self.assertRaises(ValueError, PolynomialEvaluator, [])
+
+
+    def testEvaluate(self):
+        """Tests the :meth:`evaluate` method."""
+        for x in (-3.5, 0.0, 1.0, 10.0, 1234.5, 7):
+            result = self.evaluator.evaluate(x)
+            self.assertTrue(isinstance(result, float))
+            self.assertEqual(result, self.polynomial(x))
+
+        # The method is an ordinary method, not replaced per instance.
+        self.assertFalse('evaluate' in vars(self.evaluator))
+        self.assertEqual(PolynomialEvaluator.evaluate(self.evaluator, 2.0),
+            self.polynomial(2.0))
+
+
+    def testEvaluateConstant(self):
+        """Tests :meth:`evaluate` with a polynomial of degree zero."""
+        self.assertEqual(PolynomialEvaluator([2.5]).evaluate(10.0), 2.5)
+
+
+    def testEvaluateArray(self):
+        """Tests the :meth:`evaluateArray` method."""
+        values = numpy.linspace(-10.0, 10.0, 21).reshape((3, 7))
+        result = self.evaluator.evaluateArray(values)
+        self.assertEqual(result.shape, (3, 7))
+        self.assertTrue(numpy.all(result == self.polynomial(values)))
+        self.assertEqual(self.evaluator.evaluateArray([10.0]).tolist(),
+            [625.2])
+
+
+    def testCall(self):
+        """Checks that calls are dispatched by the type of the argument."""
+        self.assertEqual(self.evaluator(10.0), 625.2)
+        self.assertEqual(self.evaluator(10), 625.2)
+        self.assertEqual(self.evaluator(numpy.float64(10.0)), 625.2)
+        self.assertEqual(self.evaluator([10.0, 10.0]).tolist(), [625.2] * 2)
+
+
+class MonotoneInverseTests(unittest.TestCase):
+    """
+    Tests for the :class:`~ops.calibration.evaluator.MonotoneInverse` class.
+    """
+
+    def setUp(self):
+        # t = 2 * i * i + 10 on [1, 10].
+        self.forward = PolynomialEvaluator((2.0, 0.0, 10.0))
+        self.inverse = MonotoneInverse(self.forward, 1.0, 10.0, 1001)
+
+
+    def testDomain(self):
+        """Tests the :attr:`domain` property."""
+        self.assertEqual(self.inverse.domain, (12.0, 210.0))
+        self.assertRaises(AttributeError,
+            setattr, self.inverse, 'domain', (0.0, 1.0))
+
+
+    def testEvaluate(self):
+        """Tests the :meth:`evaluate` method."""
+        for i in (1.0, 2.5, 7.0, 10.0):
+            self.assertAlmostEqual(
+                self.inverse.evaluate(self.forward.evaluate(i)), i, 3)
+
+        # Values outside of the table are extrapolated.
+        self.assertTrue(self.inverse.evaluate(11.0) < 1.0)
+        self.assertTrue(self.inverse.evaluate(220.0) > 10.0)
+
+
+    def testEvaluateArray(self):
+        """Tests the :meth:`evaluateArray` method."""
+        values = numpy.linspace(0.0, 250.0, 101)
+        result = self.inverse.evaluateArray(values)
+        self.assertEqual(result.tolist(),
+            [self.inverse.evaluate(y) for y in values])
+        self.assertEqual(self.inverse([12.0, 210.0]).tolist(), [1.0, 10.0])
+
+
+    def testLimit(self):
+        """Tests the :meth:`getLimit` method."""
+        for i in numpy.linspace(0.5, 10.5, 77):
+            limit = self.inverse.getLimit(i)
+            self.assertTrue(self.inverse.evaluate(limit) <= i)
+            self.assertAlmostEqual(self.inverse.evaluate(limit), i, 9)
+
+
+    def testNotIncreasing(self):
+        """Checks that sections that do not increase are flattened."""
+        # t = i ** 3 - 15 * i * i + 60 * i decreases between about 2.8 and
+        # 7.2, but t(10) > t(0).
+        forward = PolynomialEvaluator((1.0, -15.0, 60.0, 0.0))
+        inverse = MonotoneInverse(forward, 0.0, 10.0)
+        values = inverse.evaluateArray(numpy.linspace(-10.0, 110.0, 241))
+        self.assertTrue(numpy.all(numpy.diff(values) >= 0.0))
+
+
+    def testErrors(self):
+        """Checks that invalid arguments are rejected."""
+        self.assertRaises(ValueError, MonotoneInverse, self.forward, 1.0, 1.0)
+        decreasing = PolynomialEvaluator((-1.0, 0.0))
+        self.assertRaises(ValueError, MonotoneInverse, decreasing, 0.0, 1.0)
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+
+import numpy
+import unittest
+
+from ops.calibration.fitting import *
+
+
+class IncrementalPolynomialFitTests(unittest.TestCase):
+    """
+    Tests for the :class:`~ops.calibration.fitting.IncrementalPolynomialFit`
+    class.
+    """
+
+    def setUp(self):
+        # Some noisy points in the range of typical temperatures.
+        self.x = numpy.linspace(200.0, 2000.0, 25)
+        self.y = 0.5 + 0.01 * self.x + 1e-6 * self.x ** 2 + numpy.sin(self.x)
+        self.fit = IncrementalPolynomialFit(self.x[:15], self.y[:15], 4)
+
+
+    def assertMatchesPolyfit(self, polynomial, x, y):
+        """
+        Checks that `polynomial` matches the result of :func:`numpy.polyfit`
+        for the given points.
+        """
+        expected = numpy.polyval(numpy.polyfit(x, y, 4), x)
+        self.assertTrue(numpy.allclose(polynomial(x), expected, 1e-9, 1e-9))
+
+
+    def testReadOnly(self):
+        """Checks that read-only properties are actually read-only."""
+        for p in ('degree', 'count', 'isUsable'):
+            self.assertRaises(AttributeError, setattr, self.fit, p, 1)
+
+
+    def testInitialFit(self):
+        """Checks the polynomial before any points are added or removed."""
+        self.assertEqual(self.fit.degree, 4)
+        self.assertEqual(self.fit.count, 15)
+        self.assertTrue(self.fit.isUsable)
+        self.assertMatchesPolyfit(
+            self.fit.getPolynomial(), self.x[:15], self.y[:15])
+
+
+    def testTooFewPoints(self):
+        """Checks that at least degree + 1 points are required."""
+        self.assertRaises(ValueError,
+            IncrementalPolynomialFit, self.x[:4], self.y[:4], 4)
+
+
+    def testAddPoint(self):
+        """Tests the :meth:`addPoint` method."""
+        for x, y in zip(self.x[15:], self.y[15:]):
+            self.fit.addPoint(x, y)
+        self.assertEqual(self.fit.count, 25)
+        self.assertMatchesPolyfit(self.fit.getPolynomial(), self.x, self.y)
+
+
+    def testRemovePoint(self):
+        """Tests the :meth:`removePoint` method."""
+        for x, y in zip(self.x[:5], self.y[:5]):
+            self.fit.removePoint(x, y)
+        self.assertEqual(self.fit.count, 10)
+        self.assertTrue(self.fit.isUsable)
+        self.assertMatchesPolyfit(
+            self.fit.getPolynomial(), self.x[5:15], self.y[5:15])
+
+
+    def testExactFit(self):
+        """Tests a fit to exactly degree + 1 points."""
+        fit = IncrementalPolynomialFit(self.x[:5], self.y[:5], 4)
+        fit.addPoint(self.x[5], self.y[5])
+        self.assertMatchesPolyfit(fit.getPolynomial(), self.x[:6], self.y[:6])
+
+
+    def testRemoveTooManyPoints(self):
+        """Checks that the fit is unusable with too few points."""
+        for x, y in zip(self.x[:11], self.y[:11]):
+            self.fit.removePoint(x, y)
+        self.assertFalse(self.fit.isUsable)
+        self.assertEqual(self.fit.getPolynomial(), None)
+
+
+    def testBadConditioning(self):
+        """Checks that the fit is unusable when badly conditioned."""
+        self.fit.addPoint(1e6, 1.0)
+        self.assertFalse(self.fit.isUsable)
+
+
+class FitDiagnosticsTests(unittest.TestCase):
+    """
+    Tests for the :func:`~ops.calibration.fitting.getFitDiagnostics`
+    function.
+    """
+
+    def setUp(self):
+        self.x = numpy.linspace(200.0, 2000.0, 12)
+        self.y = 0.5 + 0.01 * self.x + 1e-6 * self.x ** 2 + numpy.sin(self.x)
+        self.diagnostics = getFitDiagnostics(self.x, self.y, 2)
+
+
+    def testResiduals(self):
+        """Checks the residuals against :func:`numpy.polyfit`."""
+        fitted = numpy.polyval(numpy.polyfit(self.x, self.y, 2), self.x)
+        self.assertTrue(numpy.allclose(
+            self.diagnostics.residuals, self.y - fitted, 1e-9, 1e-9))
+
+
+    def testLeverages(self):
+        """Checks the leverages against the explicit hat matrix."""
+        v = numpy.vander(self.x, 3)
+        hat = numpy.dot(v, numpy.dot(numpy.linalg.inv(numpy.dot(v.T, v)), v.T))
+        self.assertTrue(numpy.allclose(
+            self.diagnostics.leverages, numpy.diag(hat), 1e-6, 1e-9))
+        self.assertAlmostEqual(self.diagnostics.leverages.sum(), 3.0)
+
+
+    def testLeaveOneOut(self):
+        """Checks the leave-one-out values against explicit refits."""
+        fitted = numpy.polyval(numpy.polyfit(self.x, self.y, 2), self.x)
+        variance = numpy.sum((self.y - fitted) ** 2) / (len(self.x) - 3)
+
+        for i in xrange(len(self.x)):
+            x = numpy.delete(self.x, i)
+            y = numpy.delete(self.y, i)
+            coefficients = numpy.polyfit(x, y, 2)
+
+            looResidual = self.y[i] - numpy.polyval(coefficients, self.x[i])
+            self.assertAlmostEqual(
+                self.diagnostics.looResiduals[i], looResidual)
+
+            change = fitted - numpy.polyval(coefficients, self.x)
+            cooksDistance = numpy.sum(change ** 2) / (3 * variance)
+            self.assertAlmostEqual(
+                self.diagnostics.cooksDistances[i], cooksDistance)
+
+
+    def testTooFewPoints(self):
+        """Checks that more than degree + 1 points are required."""
+        self.assertEqual(getFitDiagnostics(self.x[:3], self.y[:3], 2), None)
+        self.assertEqual(getFitDiagnostics([1.0] * 5, self.y[:5], 2), None)
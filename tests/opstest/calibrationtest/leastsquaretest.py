@@ -71,6 +71,11 @@ class LeastSquareModuleTests(unittest.TestCase):
         self.assertEqual(solution.tau, 5.0)
         self.assertEqual(solution.coefficients, tuple('DUMMY'))
 
+        prev = ls.DoubleSolution(-10.0, 100.0, 5.0, 50.0, 0.2, tuple('DUMMY'))
+        solution = ls.getSubsequentStartingEstimates(200.0, prev, 3.0)
+        self.assertEqual(solution,
+            ls.DoubleSolution(200.0, 230.0, 5.0, 50.0, 0.2, tuple('DUMMY')))
+
 
     def testFlattenSolution(self):
         """Tests the :func:`_flattenSolution` function."""
@@ -78,6 +83,76 @@ class LeastSquareModuleTests(unittest.TestCase):
         self.assertEqual(ls._flattenSolution(solution),
             (25.0, 125.0, 15.0, 'd', 'u', 'm', 'm', 'y'))
 
+        solution = ls.DoubleSolution(25.0, 125.0, 15.0, 90.0, 0.1, (1, 2))
+        self.assertEqual(ls._flattenSolution(solution),
+            (25.0, 125.0, 15.0, 90.0, 0.1, 1, 2))
+
+
+    def testGetModelParameters(self):
+        """Tests the :func:`_getModelParameters` function."""
+        single = ls.Solution(25.0, 125.0, 15.0, (1, 2))
+        double = ls.DoubleSolution(25.0, 125.0, 15.0, 90.0, 0.2, (1, 2))
+        f = ls._getModelParameters
+
+        self.assertEqual(f(ls.MODEL_SINGLE_EXPONENTIAL, single),
+            (25.0, 125.0, 15.0, 1, 2))
+        self.assertEqual(f(ls.MODEL_SINGLE_EXPONENTIAL, double),
+            (25.0, 125.0, 15.0, 1, 2))
+        self.assertEqual(f(ls.MODEL_DOUBLE_EXPONENTIAL, double),
+            (25.0, 125.0, 15.0, 90.0, 0.2, 1, 2))
+        self.assertEqual(f(ls.MODEL_DOUBLE_EXPONENTIAL, single),
+            (25.0, 125.0, 15.0, 150.0, 0.1, 1, 2))
+
+
+    def testCreateSolution(self):
+        """Tests the :func:`_createSolution` function."""
+        parameters = numpy.arange(10.0)
+        self.assertEqual(
+            ls._createSolution(ls.MODEL_SINGLE_EXPONENTIAL, parameters[:8]),
+            ls.Solution(0.0, 1.0, 2.0, (3.0, 4.0, 5.0, 6.0, 7.0)))
+        self.assertEqual(
+            ls._createSolution(ls.MODEL_DOUBLE_EXPONENTIAL, parameters),
+            ls.DoubleSolution(0.0, 1.0, 2.0, 3.0, 4.0,
+                (5.0, 6.0, 7.0, 8.0, 9.0)))
+
+
+    def testIsValidSolution(self):
+        """Tests the :func:`isValidSolution` function."""
+        self.assertTrue(ls.isValidSolution(ls.Solution(0, 0, 1.0, ())))
+        self.assertFalse(ls.isValidSolution(ls.Solution(0, 0, -1.0, ())))
+        valid = ls.DoubleSolution(0, 0, 1.0, 10.0, 0.5, ())
+        self.assertTrue(ls.isValidSolution(valid))
+        self.assertFalse(ls.isValidSolution(valid._replace(slowTau=0.0)))
+        self.assertFalse(ls.isValidSolution(valid._replace(slowFraction=2)))
+
+
+    def testGetTimeFromTemperature(self):
+        """Tests the :func:`getTimeFromTemperature` function."""
+        solution = ls.Solution(50.0, 550.0, 5.0, ())
+        t = ls.getTimeFromTemperature(solution, 100.0)
+        self.assertAlmostEqual(t, -numpy.log(0.9) * 5.0)
+        self.assertEqual(ls.getTimeFromTemperature(solution, 40.0), 0.0)
+        self.assertEqual(
+            ls.getTimeFromTemperature(solution, 600.0), float('inf'))
+
+        solution = ls.DoubleSolution(50.0, 550.0, 5.0, 50.0, 0.3, ())
+        t = ls.getTimeFromTemperature(solution, 400.0)
+        temperature = ls._temperaturesFromTimes(t, *solution[:-1])
+        self.assertAlmostEqual(temperature, 400.0, 0)
+
+
+    def testGetScore(self):
+        """Tests the :func:`_getScore` function."""
+        residuals = numpy.asarray([1.0, -1.0] * 5)
+        self.assertAlmostEqual(ls._getScore(residuals, 3), 6.0 + 24.0 / 6.0)
+        self.assertEqual(ls._getScore(residuals, 9), float('inf'))
+
+        # Additional parameters need to reduce the residuals to pay off.
+        self.assertTrue(
+            ls._getScore(residuals * 0.9, 5) > ls._getScore(residuals, 3))
+        self.assertTrue(
+            ls._getScore(residuals * 0.1, 5) < ls._getScore(residuals, 3))
+
 
     def testVoltagesFromTemperatures(self):
         """Tests the :func:`_voltagesFromTemperatures` function."""
@@ -94,6 +169,15 @@ class LeastSquareModuleTests(unittest.TestCase):
         self.assertAlmostEqual(temperatures[0], 55.0)
         self.assertAlmostEqual(temperatures[1], 100.0)
 
+        # With a slow fraction of zero, the slow time constant is irrelevant.
+        temperatures = ls._temperaturesFromTimes(
+            times, 50.0, 550.0, 5.0, 1000.0, 0.0)
+        self.assertAlmostEqual(temperatures[0], 55.0)
+
+        temperatures = ls._temperaturesFromTimes(
+            times, 50.0, 550.0, 5.0, 5.0, 0.4)
+        self.assertAlmostEqual(temperatures[1], 100.0)
+
 
     def testVoltagesFromTimes(self):
         """Tests the :func:`_voltagesFromTimes` function."""
@@ -113,6 +197,19 @@ class LeastSquareModuleTests(unittest.TestCase):
         self.assertAlmostEqual(error[0], 1.0)
         self.assertAlmostEqual(error[1], -1.0)
 
+        error = ls._errorFunction(parameters, times, voltages, [0.5, 2.0])
+        self.assertAlmostEqual(error[0], 0.5)
+        self.assertAlmostEqual(error[1], -2.0)
+
+
+    def testGetWeights(self):
+        """Tests the :func:`_getWeights` function."""
+        self.assertEqual(ls._getWeights(None), None)
+        self.assertEqual(ls._getWeights([0.0, 0.0]), None)
+
+        weights = ls._getWeights([0.01, 0.04, 0.0, 0.01])
+        self.assertEqual(list(weights), [1.0, 0.5, 1.0, 1.0])
+
 
 
 class LeastSquareThradTests(unittest.TestCase):
@@ -133,7 +230,8 @@ class LeastSquareThradTests(unittest.TestCase):
 
     def testReadOnly(self):
         """Checks that read-only properties are actually read-only."""
-        for p in ('solution', 'solutionsFound'):
+        for p in ('solution', 'candidates', 'solutionsFound',
+            'fitLatencies'):
             self.assertRaises(AttributeError, setattr, self.thread, p, None)
 
 
@@ -150,10 +248,45 @@ class LeastSquareThradTests(unittest.TestCase):
         self.assertTrue(all(self.thread._data[0] == times))
         self.assertTrue(all(self.thread._data[1] == voltages))
 
+        self.assertEqual(self.thread._data[2], None)
+
         self.assertRaises(util.ApplicationError, self.thread.refreshData,
             times=times, voltages=voltages[:2])
 
 
+    def testModelSelection(self):
+        """Checks that the solution of the best model is used."""
+        single = ls.Candidate(ls.MODEL_SINGLE_EXPONENTIAL, 'single', 12.0)
+        double = ls.Candidate(ls.MODEL_DOUBLE_EXPONENTIAL, 'double', 4.0)
+        logger = replaceWithLogger(
+            self.thread._findCandidate, [single, double, single, None])
+        self.thread._data = 'dummy data'
+
+        self.thread._findSolution()
+        self.assertEqual(self.thread.candidates, (double, single))
+        self.assertEqual(self.thread.solution, 'double')
+        self.assertEqual(logger.log, [
+            (ls.MODEL_SINGLE_EXPONENTIAL, 'dummy data'),
+            (ls.MODEL_DOUBLE_EXPONENTIAL, 'dummy data')])
+
+        self.thread._findSolution()
+        self.assertEqual(self.thread.solution, 'single')
+        self.assertEqual(self.thread.solutionsFound, 2)
+
+
+    def testRefreshDataWithVariances(self):
+        """Tests :meth:`refreshData` with the `variances` argument."""
+        times = [0.1, 0.2, 0.3]
+        voltages = [0.4, 0.45, 0.5]
+        self.thread.voltagesRequired = 3
+
+        self.thread.refreshData(times, voltages, [0.04, 0.01, 0.01])
+        self.assertEqual(list(self.thread._data[2]), [0.5, 1.0, 1.0])
+
+        self.assertRaises(util.ApplicationError, self.thread.refreshData,
+            times, voltages, [0.01])
+
+
     def testStart(self):
         """Tests the :meth:`start` method."""
         logger = wrapLogger(self.thread.run)
@@ -176,3 +309,64 @@ class LeastSquareThradTests(unittest.TestCase):
 
 
 
+
+
+class LeastSquareBackendTests(unittest.TestCase):
+    """
+    Tests for the :class:`~ops.calibration.leastsquare.LeastSquareBackend`
+    and :class:`~ops.calibration.leastsquare.LeastSquareJob` classes.
+    """
+
+    def setUp(self):
+        self.backend = ls.LeastSquareBackend()
+        self.backend.sleepInterval = 60.0
+        self.jobs = [self.backend.createJob(None) for n in xrange(3)]
+
+
+    def tearDown(self):
+        for job in self.jobs:
+            job.stop()
+
+
+    def testReadOnly(self):
+        """Checks that read-only properties are actually read-only."""
+        for p in ('jobs', 'isRunning'):
+            self.assertRaises(AttributeError, setattr, self.backend, p, None)
+        for p in ('backend', 'solution', 'candidates', 'solutionsFound',
+            'fitLatencies'):
+            self.assertRaises(AttributeError, setattr, self.jobs[0], p, None)
+
+
+    def testCreateJob(self):
+        """Tests the :meth:`createJob` method."""
+        self.assertEqual(self.jobs[0].backend, self.backend)
+        self.assertEqual(self.backend.jobs, ())
+        self.assertFalse(self.backend.isRunning)
+
+
+    def testStartAndStopJobs(self):
+        """Tests starting and stopping jobs."""
+        for job in self.jobs:
+            replaceWithLogger(job._findSolution)
+            job.start()
+
+        self.assertEqual(self.backend.jobs, tuple(self.jobs))
+        self.assertTrue(self.backend.isRunning)
+        self.assertRaises(util.ApplicationError, self.jobs[0].start)
+
+        self.jobs[1].stop()
+        self.assertEqual(self.backend.jobs, (self.jobs[0], self.jobs[2]))
+
+
+    def testFindSolutions(self):
+        """Tests the :meth:`_findSolutions` method."""
+        loggers = [replaceWithLogger(job._findSolution) for job in self.jobs]
+        self.backend._jobs = self.jobs[:2]
+
+        self.assertTrue(self.backend._findSolutions())
+        self.assertEqual([l.log for l in loggers], [[()], [()], []])
+
+        self.backend._jobs = []
+        self.assertFalse(self.backend._findSolutions())
+        self.assertFalse(self.backend.isRunning)
+
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+
+import numpy
+import os
+import shutil
+import unittest
+import xml.etree.cElementTree
+
+from ops.calibration.binary import toBinary
+from ops.calibration.data import CalibrationData, fromColumns, toXML
+from ops.calibration.library import *
+from util import writeAtomically
+
+
+class CalibrationLibraryTests(unittest.TestCase):
+    """
+    Tests for the :class:`~ops.calibration.library.CalibrationLibrary` class.
+    """
+
+    DIRECTORY = os.path.join('tests', 'saves', 'library')
+
+
+    def setUp(self):
+        os.makedirs(os.path.join(self.DIRECTORY, 'one'))
+        os.makedirs(os.path.join(self.DIRECTORY, 'two'))
+
+        self.writeFile(
+            os.path.join('one', 'a.cal'), toXML(self.makeData(10, 1000.0)))
+
+        self.cd = self.makeData(9, 2000.0)
+        self.writeFile(os.path.join('one', 'b.calb'), toBinary(self.cd))
+
+        self.writeFile(os.path.join('two', 'c.cal'), 'not a document')
+        self.writeFile(os.path.join('two', 'd.txt'), toXML(self.cd))
+
+        self.library = CalibrationLibrary(self.DIRECTORY)
+
+
+    def tearDown(self):
+        shutil.rmtree(self.DIRECTORY)
+
+
+    def makeData(self, count, timestamp):
+        """
+        Returns calibration data with `count` linear measurements, all taken
+        at the given time.
+        """
+        currents = numpy.arange(1, count + 1) * 2.0
+        return fromColumns(currents, currents / 10.0, currents * 100.0,
+            numpy.repeat(timestamp, count))
+
+
+    def writeFile(self, fileName, string):
+        """Writes `string` to a file in the library directory."""
+        with open(os.path.join(self.DIRECTORY, fileName), 'wb') as f:
+            f.write(string)
+
+
+    def testReadOnly(self):
+        """Checks that read-only properties are actually read-only."""
+        for p in 'directory entries systems'.split():
+            self.assertRaises(AttributeError, setattr, self.library, p, None)
+
+
+    def testEntries(self):
+        """Tests the :attr:`entries` property."""
+        a, b = self.library.entries
+        self.assertEqual(a.fileName, os.path.join('one', 'a.cal'))
+        self.assertEqual(b.fileName, os.path.join('one', 'b.calb'))
+        self.assertEqual(
+            (a.system, a.date, a.measurementCount), ('one', 1000.0, 10))
+        self.assertEqual((b.minCurrent, b.maxCurrent), (2.0, 18.0))
+        self.assertEqual(
+            b.coefficients.temperatureFromVoltage,
+            self.cd.temperatureFromVoltageCoefficients)
+        self.assertEqual(self.library.systems, ('one',))
+
+
+    def testIncompleteData(self):
+        """Tests an entry of a file with too few measurements."""
+        self.writeFile('e.cal', toXML(CalibrationData()))
+        self.assertEqual(self.library.scan(), 1)
+
+        entry = self.library.getLatest('')
+        self.assertEqual(entry.measurementCount, 0)
+        self.assertEqual((entry.minCurrent, entry.coefficients), (None, None))
+        self.assertEqual(self.library.systems, ('', 'one'))
+
+
+    def testLookup(self):
+        """Tests :meth:`getEntries`, :meth:`getLatest` and :meth:`getBest`."""
+        a, b = self.library.entries
+        self.assertEqual(self.library.getEntries('one'), (a, b))
+        self.assertEqual(self.library.getLatest('one'), b)
+        self.assertEqual(self.library.getBest('one'), a)
+        self.assertEqual(self.library.getBest('one',
+            key=lambda e: e.date), b)
+
+        for method in (self.library.getLatest, self.library.getBest):
+            self.assertEqual(method('two'), None)
+        self.assertEqual(self.library.getEntries('two'), ())
+
+
+    def testLoad(self):
+        """Tests the :meth:`load` method."""
+        a, b = self.library.entries
+        for entry in (a, b):
+            cd = self.library.load(entry)
+            self.assertEqual(
+                cd.fileName, os.path.join(self.DIRECTORY, entry.fileName))
+            self.assertEqual(len(cd.measurements), entry.measurementCount)
+        self.assertEqual(cd.measurements, self.cd.measurements)
+
+        os.remove(os.path.join(self.DIRECTORY, a.fileName))
+        self.assertEqual(self.library.load(a), None)
+
+
+    def testSaveLoadedDataToSameFile(self):
+        """Checks that mapped data survives being saved to its own file."""
+        entry = self.library.getEntries('one')[1]
+        self.assertEqual(entry.fileName, os.path.join('one', 'b.calb'))
+        cd = self.library.load(entry)
+
+        # This is how gui.io saves files.
+        writeAtomically(cd.fileName, lambda f: f.write(toBinary(cd)))
+        self.assertEqual(cd.heatingCurrentArray.tolist(),
+            self.cd.heatingCurrentArray.tolist())
+        self.assertEqual(cd.temperatureArray.tolist(),
+            self.cd.temperatureArray.tolist())
+
+        self.assertEqual(self.library.load(entry).measurements,
+            self.cd.measurements)
+
+
+    def testIndex(self):
+        """Checks that the index is saved and used by other instances."""
+        self.assertTrue(
+            os.path.exists(os.path.join(self.DIRECTORY, INDEX_FILE_NAME)))
+
+        # Replace the binary file with one of the same size and modification
+        # time, so that only the index knows the old data.
+        path = os.path.join(self.DIRECTORY, 'one', 'b.calb')
+        os.utime(path, (1000000000, 1000000000))
+        self.assertEqual(self.library.scan(), 1)
+
+        self.writeFile(
+            os.path.join('one', 'b.calb'), toBinary(self.makeData(9, 3000.0)))
+        os.utime(path, (1000000000, 1000000000))
+
+        library = CalibrationLibrary(self.DIRECTORY)
+        self.assertEqual(library.entries, self.library.entries)
+        self.assertEqual(library.scan(), 0)
+
+
+    def testScan(self):
+        """Tests the :meth:`scan` method."""
+        self.assertEqual(self.library.scan(), 0)
+
+        os.remove(os.path.join(self.DIRECTORY, 'one', 'a.cal'))
+        self.writeFile(os.path.join('two', 'c.cal'), toXML(self.cd))
+        self.assertEqual(self.library.scan(), 1)
+        self.assertEqual(self.library.systems, ('one', 'two'))
+        self.assertEqual(len(self.library.entries), 2)
+
+        library = CalibrationLibrary(self.DIRECTORY)
+        self.assertEqual(library.entries, self.library.entries)
+
+
+    def testIndexWriteError(self):
+        """Checks that a failed write leaves the previous index intact."""
+        path = os.path.join(self.DIRECTORY, INDEX_FILE_NAME)
+        with open(path, 'rb') as f:
+            index = f.read()
+
+        class ElementTree(object):
+            def __init__(self, element):
+                pass
+
+            def write(self, indexFile):
+                indexFile.write(index[:10])
+                raise IOError('disk full')
+
+        module = xml.etree.cElementTree
+        original = module.ElementTree
+        module.ElementTree = ElementTree
+        try:
+            self.library._writeIndex()
+        finally:
+            module.ElementTree = original
+
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), index)
+        library = CalibrationLibrary(self.DIRECTORY)
+        self.assertEqual(library.entries, self.library.entries)
+
+
+    def testBadIndex(self):
+        """Checks that a bad index is discarded."""
+        self.writeFile(INDEX_FILE_NAME, 'not an index')
+        library = CalibrationLibrary(self.DIRECTORY)
+        self.assertEqual(library.entries, self.library.entries)
+
+
+class GetQualityTests(unittest.TestCase):
+    """
+    Tests for the :func:`~ops.calibration.library.getQuality` function.
+    """
+
+    def testGetQuality(self):
+        """Checks the order of entries with different qualities."""
+        def entry(coefficients, count, date):
+            return LibraryEntry(
+                None, None, date, count, None, None, coefficients, None, None)
+
+        entries = [
+            entry(None, 20, 300.0),
+            entry(FitCoefficients((), (), ()), 10, 100.0),
+            entry(FitCoefficients((), (), ()), 10, 200.0),
+            entry(FitCoefficients((), (), ()), 15, 100.0)]
+        self.assertEqual(sorted(entries, key=getQuality), entries)
@@ -19,7 +19,6 @@
 # along with NOSE. If not, see <http://www.gnu.org/licenses/>.
 
 import math
-import time
 import unittest
 
 from ops.calibration.manager import *
@@ -28,6 +27,7 @@ from test import *
 
 import gui.mediator
 import ops.interface
+import ops.sampling
 import ops.system
 import util
 
@@ -50,14 +50,20 @@ class CalibrationManagerTests(unittest.TestCase):
 
 
     def tearDown(self):
-        # Some tests modify :mod:`ops.calibration.manager`'s reference to the
-        # :mod:`time` module in order to feed it canned timestamps. Fix that.
-        ops.calibration.manager.time = time
+        # Some tests modify :mod:`ops.calibration.manager`'s reference to
+        # :func:`util.monotonicTime` in order to feed it canned timestamps.
+        # Fix that.
+        ops.calibration.manager.monotonicTime = util.monotonicTime
 
         if hasattr(self.manager, '_leastSquareThread'):
             self.manager._leastSquareThread.stop()
 
 
+    def setTimes(self, times):
+        ops.calibration.manager.monotonicTime = Stub(
+            util, monotonicTime=fun(times)).monotonicTime
+
+
     ###########################################################################
     # GENERAL ATTRIBUTES                                                      #
     ###########################################################################
@@ -72,7 +78,8 @@ class CalibrationManagerTests(unittest.TestCase):
 
     def testReadOnly(self):
         """Checks that read-only properties are actually read-only."""
-        properties = ('system currents isRunning state hasMoreHeatingStages '
+        properties = ('system currents scheduler backend report '
+            'jitterStatistics isRunning state hasMoreHeatingStages '
             'heatingStageIndex heatingStageCount remainingHeatingStageCount')
         for p in properties.split():
             self.assertRaises(AttributeError, setattr, self.manager, p, None)
@@ -130,6 +137,20 @@ class CalibrationManagerTests(unittest.TestCase):
         self.assertEqual(event.manager, self.manager)
 
 
+    def testStartCalibrationWithScheduler(self):
+        """Tests :meth:`startCalibration` with a scheduler."""
+        scheduler = Stub(None, addTimeout=fun(None))
+        manager = CalibrationManager(self.system, [4.0], scheduler)
+        self.mediator.clearLog()
+        manager.startCalibration()
+
+        self.assertEqual(manager.scheduler, scheduler)
+        self.assertEqual(self.mediator.timeoutsAdded, [])
+        name, (timeout, callback), result = scheduler.log[-1]
+        self.assertEqual(timeout, manager.tickInterval)
+        self.assertEqual(callback, manager._tick)
+
+
     def testStartCalibrationTwice(self):
         """Tests calling :meth:`startCalibration` twice."""
         self.manager.startCalibration()
@@ -184,6 +205,27 @@ class CalibrationManagerTests(unittest.TestCase):
         self.assertEqual(doneLogger.log, [STATUS_ABORTED])
 
 
+    def testRestoreOnAbort(self):
+        """Tests the :attr:`restoreOnAbort` attribute."""
+        self.cd.addMeasurement(2.0, 0.2, 200.0)
+        self.manager.restoreOnAbort = True
+        self.manager.startCalibration()
+        self.cd.addMeasurement(4.0, 0.4, 400.0)
+        self.manager.abortCalibration()
+
+        self.assertEqual(self.cd.measurements, ((2.0, 0.2, 200.0),))
+        self.cd.undo()
+        self.assertEqual(self.cd.heatingCurrents, (2.0, 4.0))
+
+
+    def testNoRestoreOnAbort(self):
+        """Checks that aborting keeps the measurements by default."""
+        self.manager.startCalibration()
+        self.cd.addMeasurement(4.0, 0.4, 400.0)
+        self.manager.abortCalibration()
+        self.assertEqual(self.cd.heatingCurrents, (4.0,))
+
+
     def testAbortUnstartedCalibration(self):
         """Tests aborting a calibration procedure that hasn't been started."""
         doneLogger = wrapLogger(self.manager._done)
@@ -208,7 +250,10 @@ class CalibrationManagerTests(unittest.TestCase):
         self.assertEqual(stageLogger.log, ['dummy status'])
         self.assertEqual(self.mediator.eventsNoted[-1], CalibrationOver(
             self.system, self.manager, 'dummy status',
-            (), tuple(self.currents)))
+            (), tuple(self.currents), self.manager.report))
+
+        self.assertEqual(self.manager.report.status, 'dummy status')
+        self.assertEqual(self.cd.report, self.manager.report)
 
 
     def testDoNotIdleIfDoneBecauseSafeModeWasTriggered(self):
@@ -444,7 +489,7 @@ class CalibrationManagerTests(unittest.TestCase):
     def testStartFirstHeatingStage(self):
         """Tests calling :meth:`_startHeatingStage` for the first time."""
         logger = wrapLogger(self.manager._startLeastSquareThread)
-        ops.calibration.manager.time = Stub(time, time=fun(once(23.0)))
+        self.setTimes(once(23.0))
         self.manager.startCalibration()
 
         self.manager._startHeatingStage()
@@ -461,7 +506,7 @@ class CalibrationManagerTests(unittest.TestCase):
     def testStartSubsequentHeatingStage(self):
         """Tests calls to :meth:`_startHeatingStage` other than the first."""
         logger = replaceWithLogger(self.manager._startLeastSquareThread)
-        ops.calibration.manager.time = Stub(time, time=fun(once(42.0)))
+        self.setTimes(once(42.0))
         self.manager.startCalibration()
 
         # Pretend there have been previous heating stages.
@@ -504,6 +549,23 @@ class CalibrationManagerTests(unittest.TestCase):
             getFirstStartingEstimates(self.currents[0]))
 
 
+    def testStartLeastSquareJob(self):
+        """Tests :meth:`_startLeastSquareThread` with a backend."""
+        backend = LeastSquareBackend()
+        manager = CalibrationManager(self.system, self.currents, None, backend)
+        manager._heatingStageIndex = 0
+        manager._startLeastSquareThread()
+
+        self.assertEqual(manager.backend, backend)
+        self.assertTrue(isinstance(manager._leastSquareThread, LeastSquareJob))
+        self.assertEqual(backend.jobs, (manager._leastSquareThread,))
+        self.assertEqual(
+            manager._leastSquareThread._startingEstimates,
+            getFirstStartingEstimates(self.currents[0]))
+
+        manager._leastSquareThread.stop()
+
+
     def testStartSubsequentLeastSquareThread(self):
         """
         Tests calling :meth:`_startLeastSquareThread` with starting estimates
@@ -529,7 +591,7 @@ class CalibrationManagerTests(unittest.TestCase):
         times = [10.1, 10.2, 10.3, 10.4, 10.5]
         heatingTimes = [t - 10.0 for t in times]
         voltages = [0.45, 0.5, 0.55, 0.6, 0.65]
-        ops.calibration.manager.time = Stub(time, time=fun(queue(10., *times)))
+        self.setTimes(queue(10., *times))
 
         self.manager.startCalibration()
         self.manager._startHeatingStage()
@@ -551,10 +613,63 @@ class CalibrationManagerTests(unittest.TestCase):
             self.assertEqual(logger.log[0]['voltages'], voltages[:n])
 
 
+    def testCheckHeatingProgressWithSampler(self):
+        """Tests :meth:`_checkHeatingProgress` with a sampler."""
+        self.setTimes(once(10.0))
+        self.manager.samplingMode = SAMPLING_BURST
+        self.manager.startCalibration()
+        self.manager._startHeatingStage()
+
+        sample = ops.sampling.Sample(10.5, 0.45, 0.0001, 8)
+        self.manager._sampler = Stub(None, read=fun(sample))
+        logger = replaceWithLogger(self.manager._leastSquareThread.refreshData)
+
+        self.manager._checkHeatingProgress()
+        self.assertEqual(self.manager._times, [0.5])
+        self.assertEqual(self.manager._voltages, [0.45])
+        self.assertEqual(logger.log[0]['variances'], [0.0001])
+
+
+    def testHeatingStageTraceAndSolution(self):
+        """Tests :attr:`heatingStageTrace` and :attr:`heatingStageSolution`."""
+        times, voltages = self.manager.heatingStageTrace
+        self.assertEqual((len(times), len(voltages)), (0, 0))
+        self.assertEqual(self.manager.heatingStageSolution, None)
+
+        self.manager.startCalibration()
+        self.manager._startHeatingStage()
+        self.manager._times.extend([0.5, 1.0])
+        self.manager._voltages.extend([0.45, 0.5])
+        self.manager._leastSquareThread._solution = 'solution'
+
+        times, voltages = self.manager.heatingStageTrace
+        self.assertEqual(times.tolist(), [0.5, 1.0])
+        self.assertEqual(voltages.tolist(), [0.45, 0.5])
+        self.assertEqual(self.manager.heatingStageSolution, 'solution')
+
+
+    def testStartSampler(self):
+        """Tests the :meth:`_startSampler` method."""
+        self.manager._startSampler()
+        self.assertEqual(self.manager._sampler, None)
+
+        self.manager.samplingMode = SAMPLING_BURST
+        self.manager._startSampler()
+        self.assertTrue(
+            isinstance(self.manager._sampler, ops.sampling.BurstSampler))
+
+        self.manager.samplingMode = SAMPLING_BACKGROUND
+        self.manager._startSampler()
+        sampler = self.manager._sampler
+        self.assertTrue(sampler.isRunning)
+        self.manager._stopSampler()
+        self.assertFalse(sampler.isRunning)
+
+
     def testCheckHeatingProgressDone(self):
         """Tests :meth:`_checkHeatingProgress` when the stage is finished."""
         replaceWithLogger(self.manager.getProgress, [1.0])
-        ops.calibration.manager.time = Stub(time, time=fun(queue(10.0, 52.0)))
+        self.setTimes(queue(10.0, 52.0))
 
         self.manager.startCalibration()
         self.manager._startHeatingStage()
@@ -600,7 +715,7 @@ class CalibrationManagerTests(unittest.TestCase):
         self.manager._times.append(0.42)
 
         self.assertEqual(self.manager.getProgress(), 0.23)
-        self.assertEqual(l.log, [('f', 'a', 'k', 0.42)])
+        self.assertEqual(l.log, [(Solution(*'fake'), 0.42)])
 
 
     def testGetProgressInOtherStates(self):
@@ -628,10 +743,25 @@ class CalibrationManagerTests(unittest.TestCase):
         self.manager.precision = 10.0
         method = self.manager._getHeatingProgress
         expected = 10.0 / (35.0 * -math.log(1 - 40.0 / 50.0))
-        self.assertEqual(method(75.0, 125.0, 35.0, 10.0), expected)
-        self.assertEqual(method(125.0, 75.0, 35.0, 10.0), expected)
-        self.assertEqual(method(125.0, 125.0, 35.0, 10.0), 1.0)
-        self.assertEqual(method(75.0, 125.0, 35.0, 1000.0), 1.0)
+        self.assertEqual(method(Solution(75.0, 125.0, 35.0, ()), 10.0),
+            expected)
+        self.assertEqual(method(Solution(125.0, 75.0, 35.0, ()), 10.0),
+            expected)
+        self.assertEqual(method(Solution(125.0, 125.0, 35.0, ()), 10.0), 1.0)
+        self.assertEqual(method(Solution(75.0, 125.0, 35.0, ()), 1000.0), 1.0)
+
+        # The final temperature is already within the precision.
+        self.assertEqual(method(Solution(120.0, 125.0, 35.0, ()), 10.0), 1.0)
+
+
+    def testGetHeatingProgressWithDoubleSolution(self):
+        """Tests :meth:`_getHeatingProgress` with a double solution."""
+        self.manager.precision = 10.0
+        solution = DoubleSolution(75.0, 125.0, 35.0, 350.0, 0.5, ())
+        timeRequired = getTimeFromTemperature(solution, 115.0)
+        self.assertAlmostEqual(
+            self.manager._getHeatingProgress(solution, 10.0),
+            10.0 / timeRequired)
 
 
     def testGetExtendedProgressInStateMovingHeater(self):
@@ -794,3 +924,37 @@ class CalibrationManagerTests(unittest.TestCase):
             self.manager._state = state
             self.assertRaises(util.ApplicationError, method, 300.0)
 
+
+
+    ###########################################################################
+    # REPORT                                                                  #
+    ###########################################################################
+
+    def testReport(self):
+        """Checks that the calibration report is recorded."""
+        replaceWithLogger(self.manager.getProgress, [1.0])
+        self.manager.startCalibration()
+        self.manager._startHeatingStage()
+        self.manager._checkHeatingProgress()
+        replaceWithLogger(self.manager._startLeastSquareThread)
+        self.manager._temperatureReportCallback(300.0)
+        self.manager.abortCalibration()
+
+        report = self.manager.report
+        self.assertEqual(report.status, STATUS_ABORTED)
+        self.assertNotEqual(report.heaterMovementTime, None)
+        self.assertEqual([s.current for s in report.stages], [4.0, 6.0])
+        self.assertNotEqual(report.stages[0].temperatureEntryTime, None)
+        self.assertEqual(report.stages[1].temperatureEntryTime, None)
+        self.assertEqual(self.mediator.eventsNoted[-1].report, report)
+
+
+    def testJitterStatistics(self):
+        """Tests the :attr:`jitterStatistics` property."""
+        replaceWithLogger(self.manager._checkHeaterPosition)
+        self.manager.startCalibration()
+        self.assertEqual(self.manager.jitterStatistics, None)
+
+        self.manager._tick()
+        self.manager._tick()
+        self.assertEqual(self.manager.jitterStatistics.intervalCount, 1)
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+import unittest
+
+from ops.calibration.manager import *
+from ops.calibration.orchestrator import *
+from ops.error import SystemLockedError
+from test import *
+
+import gui.mediator
+import ops.simulation
+import ops.system
+import util
+
+
+class CalibrationOrchestratorTests(unittest.TestCase):
+    """
+    Tests for the
+    :class:`~ops.calibration.orchestrator.CalibrationOrchestrator` class.
+    """
+
+    def setUp(self):
+        self.mediator = gui.mediator.Mediator(logging=True)
+        self.systems = [
+            ops.system.ProductionSystem(
+                self.mediator, ops.simulation.SimulatedDeviceInterface())
+            for n in xrange(3)]
+        self.orchestrator = CalibrationOrchestrator(
+            self.mediator, self.systems)
+        self.mediator.clearLog()
+
+
+    def tearDown(self):
+        for system in self.systems:
+            if system.isBeingCalibrated:
+                system.abortCalibration()
+
+
+    def testReadOnly(self):
+        """Checks that read-only properties are actually read-only."""
+        properties = 'mediator scheduler backend systems isRunning'
+        for p in properties.split():
+            self.assertRaises(
+                AttributeError, setattr, self.orchestrator, p, None)
+
+
+    def testSystems(self):
+        """Tests the :attr:`systems` property."""
+        self.assertEqual(self.orchestrator.systems, tuple(self.systems))
+
+
+    def testAddSystem(self):
+        """Tests the :meth:`addSystem` method."""
+        system = ops.system.ProductionSystem(self.mediator)
+        self.orchestrator.addSystem(system)
+        self.assertEqual(self.orchestrator.systems[-1], system)
+        self.assertRaises(
+            util.ApplicationError, self.orchestrator.addSystem, system)
+
+
+    def testAddSystemWithOtherMediator(self):
+        """Tests :meth:`addSystem` with a system that uses another mediator."""
+        system = ops.system.ProductionSystem(gui.mediator.Mediator())
+        self.assertRaises(
+            util.ApplicationError, self.orchestrator.addSystem, system)
+
+
+    def testRemoveSystem(self):
+        """Tests the :meth:`removeSystem` method."""
+        self.orchestrator.removeSystem(self.systems[1])
+        self.assertEqual(
+            self.orchestrator.systems, (self.systems[0], self.systems[2]))
+
+
+    def testStartCalibrations(self):
+        """Tests the :meth:`startCalibrations` method."""
+        self.orchestrator.startCalibrations([4.0, 6.0])
+
+        self.assertTrue(self.orchestrator.isRunning)
+        for system in self.systems:
+            manager = system.calibrationManager
+            self.assertEqual(manager.state, STATE_MOVING_HEATER)
+            self.assertEqual(manager.currents, (4.0, 6.0))
+            self.assertEqual(manager.scheduler, self.orchestrator.scheduler)
+            self.assertEqual(manager.backend, self.orchestrator.backend)
+
+        # All calibration managers share a single timeout.
+        self.assertEqual(len(self.mediator.timeoutsAdded), 1)
+        self.assertEqual(self.orchestrator.scheduler.callbackCount, 3)
+
+
+    def testStartCalibrationsWithLockedSystem(self):
+        """Checks that no calibration is started if a system is locked."""
+        self.systems[2].lock(key=self)
+        self.assertRaises(SystemLockedError,
+            self.orchestrator.startCalibrations, [4.0])
+        self.assertFalse(self.systems[0].isBeingCalibrated)
+        self.systems[2].unlock(key=self)
+
+
+    def testStartCalibrationsWithSomeSystems(self):
+        """Tests :meth:`startCalibrations` with the `systems` argument."""
+        self.orchestrator.startCalibrations([4.0], self.systems[1:])
+        self.assertEqual([s.isBeingCalibrated for s in self.systems],
+            [False, True, True])
+
+
+    def testStartCalibration(self):
+        """Tests the :meth:`startCalibration` method."""
+        self.orchestrator.startCalibration(self.systems[1], [8.0, 4.0])
+        self.assertEqual(
+            self.systems[1].calibrationManager.currents, (4.0, 8.0))
+
+        system = ops.system.ProductionSystem(self.mediator)
+        self.assertRaises(util.ApplicationError,
+            self.orchestrator.startCalibration, system, [4.0])
+
+
+    def testAbortCalibrations(self):
+        """Tests the :meth:`abortCalibrations` method."""
+        self.orchestrator.startCalibrations([4.0], self.systems[:2])
+        self.orchestrator.abortCalibrations()
+
+        self.assertFalse(self.orchestrator.isRunning)
+        for system in self.systems[:2]:
+            self.assertEqual(
+                self.orchestrator.getLastStatus(system), STATUS_ABORTED)
+        self.assertEqual(
+            self.orchestrator.getLastStatus(self.systems[2]), None)
+
+
+    def testCalibrationsOverAtDifferentTimes(self):
+        """Checks that systems that finish early don't affect the others."""
+        self.orchestrator.startCalibrations([4.0])
+        self.systems[0].abortCalibration()
+
+        self.assertEqual([s.isBeingCalibrated for s in self.systems],
+            [False, True, True])
+        self.assertEqual([s.isLocked for s in self.systems],
+            [False, True, True])
+
+        self.systems[2].abortCalibration()
+        self.assertEqual([s.isBeingCalibrated for s in self.systems],
+            [False, True, False])
+
+        self.orchestrator.abortCalibrations()
+        self.assertEqual([s.isLocked for s in self.systems],
+            [False, False, False])
+        self.assertFalse(self.orchestrator.isRunning)
+
+
+    def testTick(self):
+        """Checks that a single tick reaches all calibration managers."""
+        self.orchestrator.startCalibrations([4.0])
+        loggers = [
+            replaceWithLogger(s.calibrationManager._checkHeaterPosition)
+            for s in self.systems]
+
+        self.assertTrue(self.orchestrator.scheduler._tick())
+        self.assertEqual([l.log for l in loggers], [[()], [()], [()]])
+
+
+    def testGetProgress(self):
+        """Tests the :meth:`getProgress` method."""
+        self.assertEqual(self.orchestrator.getProgress(), ())
+
+        self.orchestrator.startCalibrations([4.0], self.systems[1:])
+        progress = self.orchestrator.getProgress()
+
+        self.assertEqual([p.system for p in progress], self.systems[1:])
+        for p in progress:
+            self.assertEqual(p.state, STATE_MOVING_HEATER)
+            self.assertEqual(p.progress, ExtendedProgress(
+                p.progress.stageProgress, None, 0.0, None))
+
+
+    def testGetTotalTimeLeft(self):
+        """Tests the :meth:`getTotalTimeLeft` method."""
+        self.assertEqual(self.orchestrator.getTotalTimeLeft(), None)
+
+        progress = (
+            SystemProgress(None, None, ExtendedProgress(0.5, 10, 0.5, 100.0)),
+            SystemProgress(None, None, ExtendedProgress(0.5, 10, 0.5, 300.0)))
+        self.orchestrator.getProgress = lambda: progress
+        self.assertEqual(self.orchestrator.getTotalTimeLeft(), 300.0)
+
+        unknown = ExtendedProgress(0.0, None, 0.0, None)
+        progress += (SystemProgress(None, None, unknown),)
+        self.orchestrator.getProgress = lambda: progress
+        self.assertEqual(self.orchestrator.getTotalTimeLeft(), None)
+
+
+class TickSchedulerTests(unittest.TestCase):
+    """
+    Tests for the :class:`~ops.calibration.orchestrator.TickScheduler` class.
+    """
+
+    def setUp(self):
+        self.mediator = gui.mediator.Mediator(logging=True)
+        self.scheduler = TickScheduler(self.mediator)
+        self.scheduler.tickInterval = 100
+        self.calls = []
+
+
+    def callback(self):
+        self.calls.append('callback')
+        return len(self.calls) < 3
+
+
+    def slowCallback(self):
+        self.calls.append('slowCallback')
+        return True
+
+
+    def testAddTimeout(self):
+        """Tests the :meth:`addTimeout` method."""
+        self.scheduler.addTimeout(100, self.callback)
+        self.scheduler.addTimeout(200, self.slowCallback)
+
+        self.assertEqual(self.scheduler.callbackCount, 2)
+        self.assertEqual(len(self.mediator.timeoutsAdded), 1)
+        timeout, callback = self.mediator.timeoutsAdded[0]
+        self.assertEqual(timeout, 100)
+        self.assertTrue(callback.isSameMethod(self.scheduler._tick))
+
+
+    def testTick(self):
+        """Tests the :meth:`_tick` method."""
+        self.scheduler.addTimeout(100, self.callback)
+        self.scheduler.addTimeout(200, self.slowCallback)
+
+        self.assertTrue(self.scheduler._tick())
+        self.assertEqual(self.calls, ['callback'])
+        self.assertTrue(self.scheduler._tick())
+        self.assertEqual(self.calls, ['callback', 'callback', 'slowCallback'])
+
+        # callback returns False when it is called for the third time.
+        self.assertTrue(self.scheduler._tick())
+        self.assertEqual(self.scheduler.callbackCount, 1)
+
+
+    def testStopTicking(self):
+        """Checks that the instance stops ticking when it has no callbacks."""
+        self.scheduler.addTimeout(100, self.callback)
+        for n in xrange(2):
+            self.assertTrue(self.scheduler._tick())
+        self.assertFalse(self.scheduler._tick())
+
+        # Adding a callback restarts the timeout.
+        self.scheduler.addTimeout(100, self.callback)
+        self.assertEqual(len(self.mediator.timeoutsAdded), 2)
+
+
+    def testDeadCallback(self):
+        """Checks that callbacks of reclaimed objects are dropped."""
+        class Object(object):
+            def method(self):
+                return True
+
+        o = Object()
+        self.scheduler.addTimeout(100, o.method)
+        o = None
+
+        self.assertFalse(self.scheduler._tick())
+        self.assertEqual(self.scheduler.callbackCount, 0)
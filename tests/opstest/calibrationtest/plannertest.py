@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+import numpy
+import unittest
+
+from ops.calibration.data import CalibrationData, UNKNOWN_TIME
+
+import ops.calibration.planner as planner
+
+
+class PlannerTests(unittest.TestCase):
+    """
+    Tests for the :mod:`~ops.calibration.planner` module.
+    """
+
+    def setUp(self):
+        # Some slightly noisy measurements that are well explained by
+        # polynomials of the fourth degree.
+        self.cd = CalibrationData()
+        noise = (0.3, -0.2, 0.1, -0.3, 0.2, -0.1, 0.3, -0.2, 0.1, -0.3,
+            0.2, -0.1)
+        for n, e in enumerate(noise):
+            i = 4.0 + 2.0 * n
+            t = 76.0 * i + e
+            u = 0.001 * t + e / 1000.0
+            self.cd.addMeasurement(i, u, t, timestamp=1000.0 * n)
+
+
+    def testNoOutliers(self):
+        """Tests :func:`findOutliers` with well-behaved measurements."""
+        self.assertEqual(planner.findOutliers(self.cd), ())
+
+
+    def testOutlier(self):
+        """Tests :func:`findOutliers` with a single outlier."""
+        i, u, t = self.cd.measurements[5]
+        self.cd.addMeasurement(i, u, t + 40.0)
+        self.assertEqual(planner.findOutliers(self.cd), (i,))
+
+
+    def testOutliersThreshold(self):
+        """Tests the `threshold` parameter of :func:`findOutliers`."""
+        i, u, t = self.cd.measurements[5]
+        self.cd.addMeasurement(i, u, t + 40.0)
+        self.assertEqual(planner.findOutliers(self.cd, 1e6), ())
+
+
+    def testNoOutliersInPerfectFit(self):
+        """Checks that rounding errors are not mistaken for outliers."""
+        cd = CalibrationData()
+        for i in xrange(2, 21, 2):
+            cd.addMeasurement(i, i / 10.0, i * 100.0)
+        self.assertEqual(planner.findOutliers(cd), ())
+
+
+    def testOutliersWithIncompleteData(self):
+        """Tests :func:`findOutliers` when the functions aren't fitted."""
+        cd = CalibrationData()
+        cd.addMeasurement(4.0, 0.3, 300.0)
+        self.assertEqual(planner.findOutliers(cd), ())
+
+
+    def testRobustScores(self):
+        """Tests the :func:`_getRobustScores` function."""
+        scores = planner._getRobustScores(numpy.asarray([1.0, 2.0, 3.0]))
+        self.assertEqual(list(scores), [-0.6745, 0.0, 0.6745])
+        scores = planner._getRobustScores(numpy.asarray([1.0, 1.0, 5.0]))
+        self.assertEqual(list(scores), [0.0, 0.0, 0.0])
+        scores = planner._getRobustScores(numpy.asarray([1.0, 1.0, 5.0]), 2.0)
+        self.assertEqual(list(scores), [0.0, 0.0, 2 * 0.6745])
+
+
+    def testFindStaleMeasurements(self):
+        """Tests the :func:`findStaleMeasurements` function."""
+        stale = planner.findStaleMeasurements(self.cd, 9500.0, 11000.0)
+        self.assertEqual(stale, (4.0, 6.0))
+
+
+    def testFindStaleMeasurementsWithUnknownTimes(self):
+        """Checks that measurements of unknown age are never stale."""
+        self.cd.addMeasurement(4.0, 0.304, 304.0, UNKNOWN_TIME)
+        stale = planner.findStaleMeasurements(self.cd, 9500.0, 11000.0)
+        self.assertEqual(stale, (6.0,))
+
+
+    def testPlanRetake(self):
+        """Tests the :func:`planRetake` function."""
+        i, u, t = self.cd.measurements[8]
+        self.cd.addMeasurement(i, u, t + 40.0, timestamp=8000.0)
+
+        plan = planner.planRetake(self.cd, 9500.0, now=11000.0)
+        self.assertEqual(plan.currents, (4.0, 6.0, i))
+        self.assertEqual(plan.outliers, (i,))
+        self.assertEqual(plan.staleMeasurements, (4.0, 6.0))
+
+        plan = planner.planRetake(
+            self.cd, 9500.0, maxCurrent=10.0, now=11000.0)
+        self.assertEqual(plan.currents, (4.0, 6.0))
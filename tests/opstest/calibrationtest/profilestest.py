@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+
+import unittest
+
+from ops.calibration.data import CalibrationData
+from ops.calibration.event import CalibrationDataChanged
+from ops.calibration.profiles import *
+from ops.error import SystemLockedError
+
+import gui.mediator
+import ops.system
+import test
+import util
+
+
+class ProfileCacheTests(unittest.TestCase):
+    """
+    Tests for the :class:`~ops.calibration.profiles.ProfileCache` class.
+    """
+
+    def setUp(self):
+        self.mediator = gui.mediator.Mediator(logging=True)
+        self.system = ops.system.ProductionSystem(self.mediator)
+        self.cache = ProfileCache(self.system, maxProfiles=3)
+        self.profiles = {}
+        for name in 'abc':
+            self.profiles[name] = test.makeCalibrationData()
+            self.cache.addProfile(name, self.profiles[name])
+        self.mediator.clearLog()
+
+
+    def testReadOnly(self):
+        """Checks that read-only properties are actually read-only."""
+        for p in 'system profileNames activeProfile'.split():
+            self.assertRaises(AttributeError, setattr, self.cache, p, None)
+
+
+    def testBadMaxProfiles(self):
+        """Checks that at least one profile must be allowed."""
+        self.assertRaises(ValueError, ProfileCache, self.system, 0)
+
+
+    def testAddProfile(self):
+        """Tests the :meth:`addProfile` method."""
+        self.assertEqual(self.cache.profileNames, ('c', 'b', 'a'))
+        self.assertEqual(self.cache.getProfile('b'), self.profiles['b'])
+        self.assertEqual(self.cache.activeProfile, None)
+        self.assertEqual(self.mediator.eventsNoted, [])
+
+        other = ops.system.ProductionSystem(self.mediator)
+        self.assertRaises(util.ApplicationError,
+            self.cache.addProfile, 'd', other.calibrationData)
+
+
+    def testActivate(self):
+        """Tests the :meth:`activate` method."""
+        self.cache.activate('a')
+
+        self.assertTrue(self.system.calibrationData is self.profiles['a'])
+        self.assertEqual(self.cache.activeProfile, 'a')
+        self.assertEqual(self.cache.profileNames, ('a', 'c', 'b'))
+        self.assertEqual(self.mediator.eventsNoted,
+            [CalibrationDataChanged(self.system, self.profiles['a'])])
+
+        self.cache.activate('b')
+        self.assertEqual(self.profiles['a'].system, None)
+        self.assertRaises(KeyError, self.cache.activate, 'd')
+
+
+    def testActivateLockedSystem(self):
+        """Checks that profiles cannot be activated on a locked system."""
+        self.system.lock(key=self)
+        self.assertRaises(SystemLockedError, self.cache.activate, 'a')
+        self.system.unlock(key=self)
+
+
+    def testNoRefit(self):
+        """Checks that switching back to a profile does not refit it."""
+        self.cache.activate('a')
+        self.assertTrue(self.system.isCalibrated)
+        self.cache.activate('b')
+
+        logger = test.wrapLogger(self.profiles['a']._refit)
+        self.cache.activate('a')
+        self.assertTrue(self.system.isCalibrated)
+        self.assertEqual(logger.log, [])
+
+
+    def testEviction(self):
+        """Checks that the least recently used profile is discarded."""
+        self.cache.activate('a')
+        self.cache.addProfile('d', CalibrationData())
+        self.assertEqual(self.cache.profileNames, ('d', 'a', 'c'))
+
+        # The active profile is never discarded.
+        self.cache.maxProfiles = 1
+        self.cache.addProfile('e', CalibrationData())
+        self.assertEqual(self.cache.profileNames, ('a',))
+
+
+    def testReplaceActiveProfile(self):
+        """Checks that replacing the active profile activates the new one."""
+        self.cache.activate('a')
+        cd = CalibrationData()
+        self.cache.addProfile('a', cd)
+        self.assertTrue(self.system.calibrationData is cd)
+        self.assertEqual(self.cache.activeProfile, 'a')
+
+
+    def testReplaceActiveProfileLockedSystem(self):
+        """
+        Checks that the active profile is left alone on a locked system.
+        """
+        self.cache.activate('a')
+        names = self.cache.profileNames
+        self.system.lock(key=self)
+        self.assertRaises(SystemLockedError,
+            self.cache.addProfile, 'a', CalibrationData())
+        self.system.unlock(key=self)
+
+        self.assertTrue(self.cache.getProfile('a') is self.profiles['a'])
+        self.assertEqual(self.cache.activeProfile, 'a')
+        self.assertEqual(self.cache.profileNames, names)
+
+        # Inactive profiles can still be replaced.
+        self.system.lock(key=self)
+        cd = CalibrationData()
+        self.cache.addProfile('b', cd)
+        self.system.unlock(key=self)
+        self.assertTrue(self.cache.getProfile('b') is cd)
+
+
+    def testRemoveProfile(self):
+        """Tests the :meth:`removeProfile` method."""
+        self.cache.activate('a')
+        self.cache.removeProfile('b')
+        self.assertEqual(self.cache.profileNames, ('a', 'c'))
+        self.assertRaises(
+            util.ApplicationError, self.cache.removeProfile, 'a')
+        self.assertRaises(KeyError, self.cache.removeProfile, 'b')
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+import math
+import unittest
+
+from ops.calibration.report import *
+from test import *
+
+import ops.calibration.report
+import util
+
+
+class CalibrationReportTests(unittest.TestCase):
+    """
+    Tests for the :class:`~ops.calibration.report.CalibrationReport` class.
+    """
+
+    def setUp(self):
+        self.stages = (
+            StageReport(4.0, 100.0, 20.0, 3, (0.1, 0.3, 0.2)),
+            StageReport(6.0, 200.0, None, 1, (0.4,)))
+        self.jitter = JitterStatistics(1600, 0.25, 0.01, 0.75)
+        self.report = CalibrationReport(
+            0, 400.0, 10.0, self.stages, 2, self.jitter)
+
+
+    def testReadOnly(self):
+        """Checks that read-only properties are actually read-only."""
+        properties = ('status totalTime heaterMovementTime stages '
+            'missedTicks jitter heatingTime temperatureEntryTime '
+            'solutionsFound fitLatencies')
+        for p in properties.split():
+            self.assertRaises(AttributeError, setattr, self.report, p, None)
+
+
+    def testProperties(self):
+        """Tests the properties of :class:`CalibrationReport`."""
+        self.assertEqual(self.report.status, 0)
+        self.assertEqual(self.report.totalTime, 400.0)
+        self.assertEqual(self.report.heaterMovementTime, 10.0)
+        self.assertEqual(self.report.stages, self.stages)
+        self.assertEqual(self.report.missedTicks, 2)
+        self.assertEqual(self.report.jitter, self.jitter)
+        self.assertEqual(self.report.heatingTime, 300.0)
+        self.assertEqual(self.report.temperatureEntryTime, 20.0)
+        self.assertEqual(self.report.solutionsFound, 4)
+        self.assertEqual(self.report.fitLatencies, (0.1, 0.3, 0.2, 0.4))
+
+
+    def testGetFitLatencyPercentile(self):
+        """Tests the :meth:`getFitLatencyPercentile` method."""
+        self.assertAlmostEqual(self.report.getFitLatencyPercentile(0), 0.1)
+        self.assertAlmostEqual(self.report.getFitLatencyPercentile(50), 0.25)
+        self.assertAlmostEqual(self.report.getFitLatencyPercentile(100), 0.4)
+
+        report = CalibrationReport(0, 0.0, None, (), 0)
+        self.assertEqual(report.getFitLatencyPercentile(50), None)
+
+
+    def testRoundTrip(self):
+        """Checks that reports survive :func:`toXML` and :func:`fromXML`."""
+        self.assertEqual(fromXML(toXML(self.report)), self.report)
+
+        report = CalibrationReport(0, 0.0, None, (), 0)
+        self.assertEqual(fromXML(toXML(report)), report)
+
+
+    def testFromXMLErrors(self):
+        """Tests :func:`fromXML` with invalid documents."""
+        self.assertEqual(fromXML('<calibration-data/>'), None)
+        self.assertEqual(fromXML('<calibration-report/>'), None)
+        self.assertEqual(fromXML('Not even XML.'), None)
+
+
+class ReportRecorderTests(unittest.TestCase):
+    """
+    Tests for the :class:`~ops.calibration.report.ReportRecorder` class.
+    """
+
+    def setUp(self):
+        self.recorder = ReportRecorder()
+        self.minimization = Stub(None, solutionsFound=2, fitLatencies=(0.5,))
+
+
+    def tearDown(self):
+        ops.calibration.report.monotonicTime = util.monotonicTime
+
+
+    def setTimes(self, *times):
+        ops.calibration.report.monotonicTime = Stub(
+            util, monotonicTime=fun(queue(*times))).monotonicTime
+
+
+    def testRecording(self):
+        """Records a calibration procedure with two heating stages."""
+        self.setTimes(
+            100.0, 101.0, 110.0, 150.0, 170.0, 180.0, 230.0, 240.0, 240.0)
+        r = self.recorder
+        r.noteStart()
+        r.noteHeaterMovementStarted()
+        r.noteHeatingStageStarted(4.0)
+        r.noteHeatingStageOver(self.minimization)
+        r.noteTemperatureReported()
+        r.noteHeatingStageStarted(6.0)
+        r.noteHeatingStageOver(self.minimization)
+        r.noteTemperatureReported()
+
+        # A second call has no effect.
+        r.noteTemperatureReported()
+
+        report = r.createReport('dummy status')
+        self.assertEqual(report.status, 'dummy status')
+        self.assertEqual(report.totalTime, 140.0)
+        self.assertEqual(report.heaterMovementTime, 9.0)
+        self.assertEqual(report.stages, (
+            StageReport(4.0, 40.0, 20.0, 2, (0.5,)),
+            StageReport(6.0, 50.0, 10.0, 2, (0.5,))))
+
+
+    def testMissedTicks(self):
+        """Tests the :meth:`noteTick` method."""
+        self.setTimes(10.0, 10.25, 10.5, 11.25, 11.5, 12.5)
+        for n in xrange(6):
+            self.recorder.noteTick(250)
+        self.assertEqual(self.recorder._missedTicks, 5)
+
+
+    def testJitterStatistics(self):
+        """Tests the :meth:`getJitterStatistics` method."""
+        self.setTimes(9.0, 10.0, 10.25, 10.75, 11.0, 11.0)
+        self.recorder.noteStart()
+        self.recorder.noteTick(250)
+        self.assertEqual(self.recorder.getJitterStatistics(), None)
+        for n in xrange(3):
+            self.recorder.noteTick(250)
+
+        jitter = self.recorder.getJitterStatistics()
+        self.assertEqual(jitter.intervalCount, 3)
+        self.assertAlmostEqual(jitter.meanInterval, 1.0 / 3.0)
+        self.assertAlmostEqual(jitter.rmsJitter, 0.25 / math.sqrt(3))
+        self.assertEqual(jitter.maxJitter, 0.25)
+
+        report = self.recorder.createReport(0)
+        self.assertEqual(report.jitter, jitter)
+
+
+    def testNotesOutOfOrder(self):
+        """Checks that notes without a matching heating stage are ignored."""
+        self.recorder.noteHeatingStageOver(self.minimization)
+        self.recorder.noteTemperatureReported()
+        self.assertEqual(self.recorder._stages, [])
+
+
+class PercentileTests(unittest.TestCase):
+    """
+    Tests for the :func:`~ops.calibration.report.getPercentile` function.
+    """
+
+    def testGetPercentile(self):
+        """Tests the :func:`getPercentile` function."""
+        values = [4.0, 1.0, 3.0, 2.0, 5.0]
+        self.assertEqual(getPercentile(values, 0), 1.0)
+        self.assertEqual(getPercentile(values, 50), 3.0)
+        self.assertEqual(getPercentile(values, 90), 4.6)
+        self.assertEqual(getPercentile(values, 100), 5.0)
+        self.assertEqual(getPercentile([], 50), None)
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+
+import time
+import unittest
+
+from ops.sampling import *
+from test import *
+
+import ops.sampling
+import util
+
+
+class SamplingTests(unittest.TestCase):
+    """Tests for the :mod:`ops.sampling` module."""
+
+    def setUp(self):
+        self.values = queue(1.0, 2.0, 3.0, 6.0)
+        self.readFunction = Stub(None, read=fun(self.values)).read
+
+
+    def tearDown(self):
+        ops.sampling.monotonicTime = util.monotonicTime
+
+
+    def setTimes(self, *times):
+        ops.sampling.monotonicTime = Stub(
+            util, monotonicTime=fun(queue(*times))).monotonicTime
+
+
+    def testCreateSample(self):
+        """Tests the :func:`createSample` function."""
+        sample = createSample(10.0, [1.0, 2.0, 3.0, 6.0])
+        self.assertEqual(sample, Sample(10.0, 3.0, 14.0 / 3.0 / 4.0, 4))
+        self.assertRaises(util.ApplicationError, createSample, 10.0, [1.0])
+
+
+    def testBurstSampler(self):
+        """Tests the :class:`BurstSampler` class."""
+        self.setTimes(10.0, 11.0)
+        sampler = BurstSampler(self.readFunction, 4)
+        self.assertEqual(sampler.read(), createSample(10.5, [1, 2, 3, 6]))
+
+        self.assertRaises(
+            util.ApplicationError, BurstSampler, self.readFunction, 1)
+
+
+    def testBackgroundSampler(self):
+        """Tests the :class:`BackgroundSampler` class."""
+        self.setTimes(10.0, 11.0, 12.0, 13.0)
+        sampler = BackgroundSampler(self.readFunction)
+        for n in xrange(3):
+            sampler._takeReading()
+
+        self.assertEqual(sampler.read(), createSample(11.0, [1, 2, 3]))
+        self.assertEqual(sampler._readings, [])
+
+
+    def testBackgroundSamplerWithoutReadings(self):
+        """Checks that :meth:`read` reads the sensor if necessary."""
+        self.setTimes(10.0, 12.0)
+        sampler = BackgroundSampler(self.readFunction)
+        self.assertEqual(sampler.read(), createSample(11.0, [1, 2]))
+
+
+    def testBackgroundSamplerThread(self):
+        """Checks that the worker thread reads the sensor."""
+        sampler = BackgroundSampler(lambda: 1.0, interval=0.001)
+        self.assertFalse(sampler.isRunning)
+
+        sampler.start()
+        self.assertTrue(sampler.isRunning)
+        self.assertRaises(util.ApplicationError, sampler.start)
+
+        for n in xrange(1000):
+            if len(sampler._readings) >= 3:
+                break
+            time.sleep(0.001)
+
+        sampler.stop()
+        self.assertFalse(sampler.isRunning)
+        self.assertTrue(sampler.read().count >= 3)
+
+
+    def testSensorServicePoll(self):
+        """Tests the :meth:`SensorService.poll` method."""
+        self.setTimes(10.0, 11.0)
+        service = SensorService(self.readFunction)
+        self.assertEqual(service.latestReading, None)
+
+        self.assertEqual(service.poll(), Reading(10.0, 1.0))
+        self.assertEqual(service.poll(), Reading(11.0, 2.0))
+        self.assertEqual(service.latestReading, Reading(11.0, 2.0))
+        self.assertEqual(service.readCount, 2)
+
+
+    def testSensorServiceGetReading(self):
+        """Tests the :meth:`SensorService.getReading` method."""
+        self.setTimes(10.0, 10.2, 10.6, 10.6, 10.8, 10.8)
+        service = SensorService(self.readFunction, maxAge=0.5)
+
+        # The first call reads the sensor, the second reuses the reading.
+        self.assertEqual(service.getReading(), Reading(10.0, 1.0))
+        self.assertEqual(service.getReading(), Reading(10.0, 1.0))
+        self.assertEqual(service.readCount, 1)
+
+        # The reading is now too old.
+        self.assertEqual(service.getReading(), Reading(10.6, 2.0))
+        self.assertEqual(service.getReading(maxAge=0.1), Reading(10.8, 3.0))
+        self.assertEqual(service.readCount, 3)
+
+
+    def testSensorServiceReadOnly(self):
+        """Checks that read-only properties are actually read-only."""
+        service = SensorService(self.readFunction)
+        for p in 'latestReading readCount'.split():
+            self.assertRaises(AttributeError, setattr, service, p, None)
@@ -19,11 +19,14 @@
 # along with NOSE. If not, see <http://www.gnu.org/licenses/>.
 
 import gc
+import numpy
 import unittest
 import sys
+import time
 import weakref
 
 from ops.error import *
+from ops.event import TemperatureSensorSampled
 from ops.calibration.event import *
 from ops.system import ProductionSystem
 from stubs import DeviceInterfaceStub
@@ -31,6 +34,7 @@ from stubs import DeviceInterfaceStub
 import gui.mediator
 import ops.calibration.data
 import ops.calibration.manager
+import ops.sampling
 import ops.simulation
 import test
 
@@ -278,6 +282,51 @@ class ProductionSystemTests(unittest.TestCase):
         self.assertEqual(logger.log, [(), ()])
 
 
+    def testSamplingCallbackSetup(self):
+        """Checks that the sampling callback is set up correctly."""
+        timeout, weakMethod = self.mediator.timeoutsAdded[-2]
+        self.assertEqual(timeout, ProductionSystem.samplingInterval)
+        self.assertTrue(
+            weakMethod.isSameMethod(self.system._sampleTemperatureSensor))
+
+
+    def testSampleTemperatureSensor(self):
+        """Tests the :meth:`_sampleTemperatureSensor` method."""
+        self.system._interface = DeviceInterfaceStub(
+            voltages=[0.2, 0.8])
+        self.mediator.clearLog()
+
+        self.assertTrue(self.system._sampleTemperatureSensor())
+        reading = self.system.temperatureSensorReading
+        self.assertEqual(reading.value, 0.2)
+        self.assertEqual(self.mediator.eventsNoted,
+            [TemperatureSensorSampled(self.system, reading)])
+
+        # The reading is still recent, so no new event is sent.
+        self.assertTrue(self.system._sampleTemperatureSensor())
+        self.assertEqual(len(self.mediator.eventsNoted), 1)
+
+        # Direct reads are shared as well.
+        self.assertEqual(self.system.temperatureSensorVoltage, 0.8)
+        self.assertTrue(self.system._sampleTemperatureSensor())
+        self.assertEqual(self.mediator.eventsNoted[-1].reading.value, 0.8)
+
+
+    def testMonitorSafeOperationUsesSharedReading(self):
+        """Checks that monitoring doesn't read the device on its own."""
+        self.system._interface = DeviceInterfaceStub(voltages=[0.2])
+        self.system.calibrationData = test.makeCalibrationData()
+        self.system._isUnsafe = logger = test.CallLogger()
+
+        self.system._sampleTemperatureSensor()
+        self.system._monitorSafeOperation()
+        self.system._monitorSafeOperation()
+        self.assertEqual(len(logger.log), 2)
+        for voltage, temperature in logger.log:
+            self.assertEqual(voltage, 0.2)
+            self.assertAlmostEqual(temperature, 200.0)
+
+
     def testIsUnsafe(self):
         """Tests the :meth:`_isUnsafe` method."""
         maxU = self.system.maxSafeTemperatureSensorVoltage * 2.0
@@ -368,6 +417,19 @@ class ProductionSystemTests(unittest.TestCase):
             setattr, self.system, 'heatingCurrent', 3.0)
 
 
+    def testCommandedHeatingCurrent(self):
+        """Tests the :attr:`commandedHeatingCurrent` property."""
+        self.assertEqual(self.system.commandedHeatingCurrent,
+            self.system.heatingCurrent)
+        self.system._interface = DeviceInterfaceStub()
+        for i in (2.0, 8.0, 0.0, 4.5):
+            self.system.startHeatingWithCurrent(i)
+            self.assertEqual(self.system.commandedHeatingCurrent, i)
+
+        self.assertRaises(AttributeError,
+            setattr, self.system, 'commandedHeatingCurrent', 3.0)
+
+
     def testTemperatureSensorVoltage(self):
         """Tests the :attr:`temperatureSensorVoltage` property."""
         voltages = [0.2, 0.8, 0.0, 0.45]
@@ -380,6 +442,62 @@ class ProductionSystemTests(unittest.TestCase):
             setattr, self.system, 'temperatureSensorVoltage', 0.3)
 
 
+    def testTemperatureSensorReading(self):
+        """Tests the :attr:`temperatureSensorReading` property."""
+        self.system._interface = DeviceInterfaceStub(voltages=[0.2, 0.8])
+
+        reading = self.system.temperatureSensorReading
+        self.assertEqual(reading.value, 0.2)
+        self.assertTrue(self.system.temperatureSensorReading is reading)
+
+        self.system._sensorService.maxAge = -1.0
+        self.assertEqual(self.system.temperatureSensorReading.value, 0.8)
+
+
+    def testDeviceAccessFromWorkerThread(self):
+        """
+        Checks that a background sampler's reads never overlap with accesses
+        to the device from the main thread.
+        """
+        class Interface(object):
+            heatingCurrent = 0.0
+            heaterPosition = 0.0
+            overlaps = 0
+            busy = False
+
+            def access(self):
+                if self.busy:
+                    self.overlaps += 1
+                self.busy = True
+                time.sleep(0.0005)
+                self.busy = False
+
+            @property
+            def temperatureSensorVoltage(self):
+                self.access()
+                return 0.5
+
+            def startHeatingWithCurrent(self, current):
+                self.access()
+
+        self.system._interface = interface = Interface()
+        sampler = ops.sampling.BackgroundSampler(
+            lambda: self.system.temperatureSensorVoltage, 0.0)
+        sampler.start()
+        try:
+            for n in xrange(200):
+                self.system.startHeatingWithCurrent(4.0)
+        finally:
+            sampler.stop()
+            sampler._thread.join()
+
+        self.assertTrue(sampler.read().count > 2)
+        self.assertEqual(interface.overlaps, 0)
+
+        self.assertRaises(AttributeError,
+            setattr, self.system, 'temperatureSensorReading', None)
+
+
     def testTemperature(self):
         """Tests the :attr:`temperature` property."""
         self.assertEqual(self.system.temperature, None)
@@ -395,6 +513,19 @@ class ProductionSystemTests(unittest.TestCase):
             setattr, self.system, 'temperature', 1200.0)
 
 
+    def testGetTemperaturesFromVoltages(self):
+        """Tests the :meth:`getTemperaturesFromVoltages` method."""
+        voltages = numpy.array([0.2, 0.8, 0.0, 0.45])
+        self.assertEqual(self.system.getTemperaturesFromVoltages(voltages),
+            None)
+
+        self.system.calibrationData = test.makeCalibrationData()
+        temperatures = self.system.getTemperaturesFromVoltages(voltages)
+        self.assertEqual(temperatures.shape, voltages.shape)
+        for t, u in zip(temperatures, voltages):
+            self.assertAlmostEqual(t, u * 1000)
+
+
     def testTargetTemperature(self):
         """Tests the :attr:`targetTemperature` property."""
         self.assertEqual(self.system.targetTemperature, None)
@@ -480,6 +611,69 @@ class ProductionSystemTests(unittest.TestCase):
         self.system.startHeatingToTemperature(self.system.maxTargetTemperature)
 
 
+    def testMaxTargetTemperatureWithMonotoneInverse(self):
+        """Checks that :attr:`maxTargetTemperature` needs no search."""
+        self.system.calibrationData = cd = test.makeCalibrationData()
+        self.system.maxSafeTemperature = 5000.0
+        self.system.maxHeatingCurrent = 9.3
+        logger = test.wrapLogger(cd.getCurrentsFromTargetTemperatures)
+
+        maxTemperature = self.system.maxTargetTemperature
+        self.assertAlmostEqual(maxTemperature, 930.0, 6)
+        self.assertTrue(
+            cd.getCurrentFromTargetTemperature(maxTemperature) <= 9.3)
+        self.assertEqual(logger.log, [])
+
+
+    def testMaxTargetTemperatureBisection(self):
+        """Checks that :attr:`maxTargetTemperature` is found by bisection."""
+        self.system.calibrationData = test.makeCalibrationData()
+        self.system.maxSafeTemperature = 5000.0
+        self.system.maxHeatingCurrent = maxI = 10.0
+
+        # Pretend that the first candidate needs slightly too much current.
+        cd = self.system.calibrationData
+        cd.useMonotoneInverse = False
+        cd.getCurrentsFromTargetTemperatures = lambda t: numpy.where(
+            t > 995.0, maxI + 1.0, 0.0)
+        cd.getCurrentFromTargetTemperature = lambda t: (
+            maxI + 1.0 if t > 995.0 else 0.0)
+
+        self.assertAlmostEqual(self.system.maxTargetTemperature, 995.0)
+        self.assertTrue(self.system.maxTargetTemperature <= 995.0)
+
+
+    def testTargetTemperatureEnvelopeCache(self):
+        """Checks that the target temperature envelope is cached."""
+        self.system.calibrationData = test.makeCalibrationData()
+        self.system.maxSafeTemperature = 5000.0
+        self.system.maxHeatingCurrent = 50.0
+        logger = test.wrapLogger(
+            self.system._computeTargetTemperatureEnvelope)
+
+        self.assertEqual(self.system.maxTargetTemperature, 2000.0)
+        self.assertEqual(self.system.minTargetTemperature, 200.0)
+        self.assertTrue(self.system.isValidTargetTemperature(500.0))
+        self.assertEqual(len(logger.log), 1)
+
+        # Unrelated properties do not affect the envelope.
+        self.system.heatingCurrentWhileIdle = 5.0
+        self.assertEqual(self.system.maxTargetTemperature, 2000.0)
+        self.assertEqual(len(logger.log), 1)
+
+        self.system.maxSafeTemperature = 800.0
+        self.assertEqual(self.system.maxTargetTemperature, 800.0)
+        self.assertEqual(len(logger.log), 2)
+
+        self.system.calibrationData.removeMeasurement(2.0)
+        self.assertEqual(self.system.minTargetTemperature, 400.0)
+        self.assertEqual(len(logger.log), 3)
+
+        self.system.calibrationData = test.makeCalibrationData()
+        self.assertEqual(self.system.minTargetTemperature, 200.0)
+        self.assertEqual(len(logger.log), 4)
+
+
     def testIsValidTargetTemperature(self):
         """Tests the :meth:`isValidTargetTemperature` method."""
         class SimplifiedProductionSystem(ProductionSystem):
@@ -617,6 +811,19 @@ class ProductionSystemTests(unittest.TestCase):
             setattr, self.system, 'heaterTargetPosition', 0.3)
 
 
+    def testCommandedHeaterPosition(self):
+        """Tests the :attr:`commandedHeaterPosition` property."""
+        self.assertEqual(self.system.commandedHeaterPosition,
+            self.system.heaterPosition)
+        self.system._interface = DeviceInterfaceStub()
+        for position in (0.4, 0.2, 1.0, 0.8, 0.0, 0.6):
+            self.system.startHeaterMovement(position)
+            self.assertEqual(self.system.commandedHeaterPosition, position)
+
+        self.assertRaises(AttributeError,
+            setattr, self.system, 'commandedHeaterPosition', 0.3)
+
+
     def testStartHeaterMovement(self):
         """Tests the :meth:`startHeaterMovement` method."""
         self.system.lock(key=23)
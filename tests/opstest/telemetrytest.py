@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2010 Institute for High-Frequency Technology, Technical
+# University of Braunschweig
+#
+# This file is part of NOSE.
+#
+# NOSE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# NOSE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with NOSE. If not, see <http://www.gnu.org/licenses/>.
+
+
+import math
+import unittest
+
+from ops.event import TemperatureSensorSampled
+from ops.sampling import Reading
+from ops.telemetry import *
+from stubs import DeviceInterfaceStub
+
+import gui.mediator
+import ops.system
+import test
+
+
+class RingBufferTests(unittest.TestCase):
+    """Tests for the :class:`~ops.telemetry.RingBuffer` class."""
+
+    def testAppend(self):
+        """Tests the :meth:`append` method."""
+        buffer = RingBuffer(100, 2)
+        for n in xrange(70):
+            buffer.append((n, n * 2))
+        self.assertEqual(len(buffer), 70)
+        self.assertEqual(buffer.getRows()[:, 1].tolist(), range(0, 140, 2))
+
+
+    def testWrapAround(self):
+        """Checks that a full buffer discards the oldest rows."""
+        buffer = RingBuffer(5, 2)
+        for n in xrange(12):
+            buffer.append((n, -n))
+        self.assertEqual(len(buffer), 5)
+        self.assertEqual(buffer.getRows()[:, 0].tolist(), [7, 8, 9, 10, 11])
+        self.assertEqual(buffer._rows.shape, (5, 2))
+
+
+    def testGetRows(self):
+        """Tests the :meth:`getRows` method with a time range."""
+        buffer = RingBuffer(5, 2)
+        for n in xrange(8):
+            buffer.append((n, 0))
+        self.assertEqual(buffer.getRows(4, 6)[:, 0].tolist(), [4, 5, 6])
+        self.assertEqual(buffer.getRows(start=6)[:, 0].tolist(), [6, 7])
+        self.assertEqual(buffer.getRows(end=4.5)[:, 0].tolist(), [3, 4])
+        self.assertEqual(len(buffer.getRows(10, 20)), 0)
+
+
+    def testInvalidCapacity(self):
+        """Checks that the capacity must be positive."""
+        self.assertRaises(ValueError, RingBuffer, 0, 2)
+
+
+class SignalHistoryTests(unittest.TestCase):
+    """Tests for the :class:`~ops.telemetry.SignalHistory` class."""
+
+    def setUp(self):
+        self.history = SignalHistory(
+            [Tier(0, 2.0), Tier(1.0, 10.0), Tier(5.0, 100.0)], interval=0.5)
+        for n in xrange(24):
+            self.history.add(n * 0.5, float(n))
+
+
+    def testTiers(self):
+        """Tests the :attr:`tiers` property."""
+        self.assertEqual(self.history.tiers[1], Tier(1.0, 10.0))
+        self.assertEqual(SignalHistory().tiers, DEFAULT_TIERS)
+
+
+    def testRawTier(self):
+        """Checks that the raw tier keeps the most recent values."""
+        result = self.history.getRange(resolution=0)
+        self.assertEqual(result['time'].tolist(), [10.0, 10.5, 11.0, 11.5])
+        self.assertEqual(result['mean'].tolist(), [20.0, 21.0, 22.0, 23.0])
+        self.assertEqual(result['count'].tolist(), [1] * 4)
+
+
+    def testIntervalTier(self):
+        """Checks the minimum, mean and maximum of complete intervals."""
+        result = self.history.getRange(resolution=5.0)
+        self.assertEqual(result['time'].tolist(), [0.0, 5.0])
+        self.assertEqual(result['min'].tolist(), [0.0, 10.0])
+        self.assertEqual(result['mean'].tolist(), [4.5, 14.5])
+        self.assertEqual(result['max'].tolist(), [9.0, 19.0])
+        self.assertEqual(result['count'].tolist(), [10, 10])
+
+
+    def testTierSelection(self):
+        """Checks which tier :meth:`getRange` uses."""
+        self.assertEqual(len(self.history.getRange()), 4)
+        self.assertEqual(len(self.history.getRange(start=10.5)), 3)
+        self.assertEqual(self.history.getRange(start=5.0)['time'].tolist(),
+            [5.0, 6.0, 7.0, 8.0, 9.0, 10.0])
+        self.assertEqual(self.history.getRange(start=0.0)['time'].tolist(),
+            [0.0, 5.0])
+        self.assertRaises(ValueError, self.history.getRange, resolution=2.0)
+
+
+    def testNaN(self):
+        """Checks that ``nan`` is left out of intervals."""
+        history = SignalHistory([Tier(0, 10.0), Tier(1.0, 10.0)], 0.5)
+        for t, value in [(0.0, 1.0), (0.5, float('nan')), (1.0, 2.0)]:
+            history.add(t, value)
+        self.assertEqual(history.getRange(resolution=1.0)['mean'].tolist(),
+            [1.0])
+        self.assertTrue(math.isnan(history.getRange()['mean'][1]))
+        self.assertEqual(history.latestTime, 1.0)
+
+
+class TelemetryStoreTests(unittest.TestCase):
+    """Tests for the :class:`~ops.telemetry.TelemetryStore` class."""
+
+    def setUp(self):
+        self.mediator = gui.mediator.Mediator()
+        self.system = ops.system.ProductionSystem(self.mediator)
+        self.telemetry = self.system.telemetry
+
+
+    def testSystem(self):
+        """Tests the :attr:`system` property."""
+        self.assertTrue(self.telemetry.system is self.system)
+        self.assertRaises(AttributeError, setattr, self.telemetry, 'system',
+            None)
+
+
+    def testRecording(self):
+        """Checks that readings of the temperature sensor are recorded."""
+        self.system.calibrationData = test.makeCalibrationData()
+        for t, u in [(10.0, 0.2), (10.25, 0.3)]:
+            self.mediator.noteEvent(
+                TemperatureSensorSampled(self.system, Reading(t, u)))
+
+        voltages = self.telemetry.getRange('temperatureSensorVoltage')
+        self.assertEqual(voltages['time'].tolist(), [10.0, 10.25])
+        self.assertEqual(voltages['mean'].tolist(), [0.2, 0.3])
+
+        temperatures = self.telemetry.getRange('temperature', start=10.1)
+        self.assertEqual(len(temperatures), 1)
+        self.assertAlmostEqual(temperatures['mean'][0], 300.0)
+
+        currents = self.telemetry.getRange('commandedHeatingCurrent')
+        self.assertEqual(currents['mean'].tolist(),
+            [self.system.commandedHeatingCurrent] * 2)
+        positions = self.telemetry.getRange('commandedHeaterPosition')
+        self.assertEqual(positions['mean'].tolist(),
+            [self.system.commandedHeaterPosition] * 2)
+
+
+    def testRecordingCommandedValues(self):
+        """Checks that recording doesn't access the device."""
+        self.system.startHeatingWithCurrent(4.0)
+        self.system.startHeaterMovement(0.5)
+        self.system._interface = DeviceInterfaceStub()
+
+        self.telemetry.record(1.0, 0.5)
+        self.assertEqual(self.telemetry.getRange(
+            'commandedHeatingCurrent')['mean'].tolist(), [4.0])
+        self.assertEqual(self.telemetry.getRange(
+            'commandedHeaterPosition')['mean'].tolist(), [0.5])
+
+
+    def testOtherSystem(self):
+        """Checks that readings of other systems are ignored."""
+        system = ops.system.ProductionSystem(self.mediator)
+        self.mediator.noteEvent(
+            TemperatureSensorSampled(system, Reading(1.0, 0.1)))
+        self.assertEqual(self.telemetry.getHistory('temperature').latestTime,
+            None)
+
+
+    def testUncalibrated(self):
+        """Checks that temperatures are ``nan`` while not calibrated."""
+        self.telemetry.record(1.0, 0.5)
+        self.assertTrue(math.isnan(
+            self.telemetry.getRange('temperature')['mean'][0]))
+
+
+    def testSampleTemperatureSensor(self):
+        """Checks that the system's sampling timeout feeds the store."""
+        self.system._sampleTemperatureSensor()
+        history = self.telemetry.getHistory('temperatureSensorVoltage')
+        self.assertEqual(history.latestTime,
+            self.system.temperatureSensorReading.time)
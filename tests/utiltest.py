@@ -18,6 +18,8 @@
 # You should have received a copy of the GNU General Public License
 # along with NOSE. If not, see <http://www.gnu.org/licenses/>.
 
+import os
+import stat
 import unittest
 
 import util
@@ -234,6 +236,99 @@ class RoundToMultipleTests(unittest.TestCase):
 
 ###############################################################################
 
+class MonotonicTimeTests(unittest.TestCase):
+    """Tests the :func:`monotonicTime` function."""
+
+    def testMonotonic(self):
+        """Checks that the times returned never decrease."""
+        times = [util.monotonicTime() for n in xrange(1000)]
+        self.assertEqual(times, sorted(times))
+
+
+    def testUnavailableClock(self):
+        """Checks that a failing clock is replaced for good."""
+        class Library(object):
+            pass
+
+        library = Library()
+        library.clock_gettime = lambda clock, timespec: -1
+
+        CDLL = util.ctypes.CDLL
+        util.ctypes.CDLL = lambda name, use_errno: library
+        try:
+            self.assertTrue(util._getMonotonicClock() is util.time.time)
+        finally:
+            util.ctypes.CDLL = CDLL
+
+###############################################################################
+
+class WriteAtomicallyTests(unittest.TestCase):
+    """Tests the :func:`writeAtomically` function."""
+
+    FILE_NAME = os.path.join('tests', 'saves', 'delete.me')
+
+
+    def tearDown(self):
+        if os.path.exists(self.FILE_NAME):
+            os.remove(self.FILE_NAME)
+
+
+    def getFiles(self):
+        """Returns the set of files in the directory of the file."""
+        return set(os.listdir(os.path.dirname(self.FILE_NAME)))
+
+
+    def testWrite(self):
+        """Checks that the file is replaced."""
+        files = self.getFiles()
+        util.writeAtomically(self.FILE_NAME, lambda f: f.write('old'))
+        util.writeAtomically(self.FILE_NAME, lambda f: f.write('new'))
+
+        with open(self.FILE_NAME, 'rb') as f:
+            self.assertEqual(f.read(), 'new')
+        self.assertEqual(self.getFiles() - files, set(['delete.me']))
+
+
+    def testError(self):
+        """Checks that the file is left unchanged if writing fails."""
+        util.writeAtomically(self.FILE_NAME, lambda f: f.write('old'))
+        files = self.getFiles()
+
+        def write(f):
+            f.write('partial')
+            raise IOError('disk full')
+
+        self.assertRaises(IOError, util.writeAtomically, self.FILE_NAME, write)
+        with open(self.FILE_NAME, 'rb') as f:
+            self.assertEqual(f.read(), 'old')
+        self.assertEqual(self.getFiles(), files)
+
+
+    def getMode(self):
+        """Returns the permission bits of the file."""
+        return stat.S_IMODE(os.stat(self.FILE_NAME).st_mode)
+
+
+    def testNewFileMode(self):
+        """Checks that new files get the permissions the umask allows."""
+        with open(self.FILE_NAME, 'wb') as f:
+            pass
+        expected = self.getMode()
+        os.remove(self.FILE_NAME)
+
+        util.writeAtomically(self.FILE_NAME, lambda f: f.write('new'))
+        self.assertEqual(self.getMode(), expected)
+
+
+    def testReplacedFileMode(self):
+        """Checks that replaced files keep their permissions."""
+        util.writeAtomically(self.FILE_NAME, lambda f: f.write('old'))
+        os.chmod(self.FILE_NAME, 0640)
+        util.writeAtomically(self.FILE_NAME, lambda f: f.write('new'))
+        self.assertEqual(self.getMode(), 0640)
+
+###############################################################################
+
 class WeakMethodTest(unittest.TestCase):
     """Tests the :class:`WeakMethod` class."""
 